@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+End-to-end throughput benchmark for the application pipeline.
+
+Drives analyze -> customize -> compile -> send for a number of jobs using the
+offline StubBackend in place of the Mistral API, the real LatexDocumentHandler
+and a local SMTP sink, then reports jobs/sec, per-stage p50/p99 latencies and
+peak RSS.
+
+Example:
+    python -m benchmarks.bench_pipeline --jobs 50 --concurrency 4 \\
+        --latency-distribution lognormal --latency-mean 0.4 --latency-stddev 0.2
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+from .smtp_sink import SMTPSink
+
+EXAMPLES_DIR = Path(__file__).parent.parent / "examples"
+STAGES = ["analyze", "customize", "compile", "send"]
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def setup_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the job application pipeline offline")
+    parser.add_argument("--jobs", type=int, default=20, help="Number of applications to process")
+    parser.add_argument("--concurrency", type=int, default=1, help="Number of applications processed in parallel")
+    parser.add_argument("--job-file", type=str, default=str(EXAMPLES_DIR / "sample_job.txt"))
+    parser.add_argument("--resume-file", type=str, default=str(EXAMPLES_DIR / "sample_resume.tex"))
+    parser.add_argument("--latency-distribution", default="fixed",
+                        choices=["fixed", "uniform", "normal", "lognormal"])
+    parser.add_argument("--latency-mean", type=float, default=0.0, help="Mean stub latency in seconds")
+    parser.add_argument("--latency-stddev", type=float, default=0.0, help="Stub latency standard deviation")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0,
+                        help="Simulated completion token rate (0 disables)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of LLM calls that fail")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-compile", action="store_true", help="Skip the pdflatex stage")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    return parser
+
+
+def run_benchmark(args) -> Dict:
+    workdir = Path(tempfile.mkdtemp(prefix="job-automator-bench-"))
+    compile_enabled = not args.no_compile
+    if compile_enabled and not shutil.which("pdflatex"):
+        raise SystemExit("pdflatex not found on PATH; install TeX or pass --no-compile")
+
+    with SMTPSink() as sink:
+        host, port = sink.address
+        # The package reads its configuration at import time
+        os.environ.update({
+            "DATABASE_URL": f"sqlite:///{workdir / 'bench.db'}",
+            "SMTP_SERVER": host,
+            "SMTP_PORT": str(port),
+            "SMTP_STARTTLS": "false",
+            "EMAIL_USERNAME": "bench@localhost",
+            "EMAIL_PASSWORD": "bench",
+        })
+        from job_application_automator.core.email_communicator import EmailCommunicator
+        from job_application_automator.core.latex_handler import LatexDocumentHandler
+        from job_application_automator.core.manager import JobApplicationManager
+        from job_application_automator.db.models import init_db
+        from job_application_automator.utils.ai_client import MistralAIClient
+        from job_application_automator.utils.llm_backends import StubBackend
+
+        init_db()
+        backend = StubBackend(
+            latency_distribution=args.latency_distribution,
+            latency_mean=args.latency_mean,
+            latency_stddev=args.latency_stddev,
+            tokens_per_second=args.tokens_per_second,
+            error_rate=args.error_rate,
+            seed=args.seed,
+        )
+        manager = JobApplicationManager(
+            ai_client=MistralAIClient(backend=backend),
+            latex_handler=LatexDocumentHandler(output_dir=workdir / "output"),
+            email_communicator=EmailCommunicator(),
+        )
+
+        job_desc = Path(args.job_file).read_text()
+        resume = Path(args.resume_file).read_text()
+        timings = defaultdict(list)
+        errors = defaultdict(int)
+        lock = threading.Lock()
+
+        def timed(stage, func, *func_args):
+            start = time.perf_counter()
+            try:
+                return func(*func_args)
+            except Exception:
+                with lock:
+                    errors[stage] += 1
+                raise
+            finally:
+                with lock:
+                    timings[stage].append(time.perf_counter() - start)
+
+        def process(index: int):
+            try:
+                details = timed("analyze", manager.ai_client.analyze_job_description, job_desc)
+                customized = timed("customize", manager.ai_client.customize_resume, details, resume)
+                attachments = []
+                if compile_enabled:
+                    attachments.append(timed("compile", manager.latex_handler.compile_latex,
+                                             customized, f"resume_{index}"))
+                timed("send", manager.send_application, {
+                    "to": f"hiring-{index}@example.com",
+                    "attachments": attachments,
+                })
+                return True
+            except Exception:
+                return False
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+            results = list(executor.map(process, range(args.jobs)))
+        elapsed = time.perf_counter() - start
+
+        report = {
+            "jobs": args.jobs,
+            "completed": sum(results),
+            "elapsed_seconds": round(elapsed, 4),
+            "jobs_per_second": round(sum(results) / elapsed, 3) if elapsed else 0.0,
+            "llm_calls": backend.calls,
+            "emails_received": sink.messages_received,
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "stages": {
+                stage: {
+                    "count": len(timings[stage]),
+                    "errors": errors[stage],
+                    "p50_ms": round(percentile(timings[stage], 50) * 1000, 2),
+                    "p99_ms": round(percentile(timings[stage], 99) * 1000, 2),
+                }
+                for stage in STAGES if timings[stage] or errors[stage]
+            },
+        }
+
+    shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def print_report(report: Dict):
+    print(f"\nProcessed {report['completed']}/{report['jobs']} jobs in {report['elapsed_seconds']}s "
+          f"({report['jobs_per_second']} jobs/sec)")
+    print(f"LLM calls: {report['llm_calls']}  Emails delivered: {report['emails_received']}  "
+          f"Peak RSS: {report['peak_rss_mb']} MiB\n")
+    print(f"{'stage':<12}{'count':>8}{'errors':>8}{'p50 ms':>12}{'p99 ms':>12}")
+    for stage, stats in report["stages"].items():
+        print(f"{stage:<12}{stats['count']:>8}{stats['errors']:>8}{stats['p50_ms']:>12}{stats['p99_ms']:>12}")
+
+
+def main():
+    args = setup_parser().parse_args()
+    report = run_benchmark(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark for full-text search over stored applications.
+
+Fills a fresh SQLite database with synthetic postings (the full-text index
+is kept in sync by triggers as they are inserted), then runs a mix of
+searches and reports their p50/p99 latency.
+
+Example:
+    python -m benchmarks.bench_search --postings 1000000
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from job_application_automator.db.models import Application, Base
+from job_application_automator.db.search import DEFAULT_RANK_WINDOW, search
+
+from .bench_pipeline import percentile
+
+COMPANIES = ["Acme", "Initech", "Globex", "Umbrella", "Hooli", "Stark", "Wayne", "Wonka", "Cyberdyne", "Tyrell"]
+TITLES = ["Backend Engineer", "Data Engineer", "Frontend Developer", "ML Engineer", "SRE", "Product Manager"]
+SKILLS = ["Python", "Java", "Go", "Rust", "SQL", "Kubernetes", "Terraform", "React", "Spark", "Airflow",
+          "PyTorch", "AWS", "GCP", "Kafka", "PostgreSQL", "Redis", "GraphQL", "Docker", "Scala", "TypeScript"]
+FILLER = ("build maintain scale design review ship operate services pipelines platforms teams customers "
+          "reliable secure fast distributed systems data products features APIs infrastructure").split()
+# Rarer words, so postings differ in more than their skills
+VOCABULARY = [f"term{i}" for i in range(20000)]
+QUERIES = ["python", "kubernetes terraform", '"data pipelines"', "rust -java", "spark airflow", "react*",
+           "ml engineer pytorch", "acme"]
+
+
+def setup_parser():
+    parser = argparse.ArgumentParser(description="Benchmark full-text search over stored applications")
+    parser.add_argument("--postings", type=int, default=100000, help="Number of postings to store")
+    parser.add_argument("--repeat", type=int, default=20, help="Times each query is run")
+    parser.add_argument("--limit", type=int, default=20, help="Results per search")
+    parser.add_argument("--window", type=int, default=DEFAULT_RANK_WINDOW,
+                        help="Most recent matches ranked per search (0 ranks all)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    return parser
+
+
+def posting(rng: random.Random) -> Dict:
+    skills = rng.sample(SKILLS, 4)
+    words = [rng.choice(FILLER) for _ in range(10)] + [rng.choice(VOCABULARY) for _ in range(110)]
+    for skill in skills:
+        words.insert(rng.randrange(len(words)), skill)
+    return {
+        "company_name": rng.choice(COMPANIES),
+        "position_title": rng.choice(TITLES),
+        "job_description": " ".join(words),
+        "job_analysis": json.dumps({"required_skills": skills}),
+        "status": "submitted",
+    }
+
+
+def run_benchmark(args) -> Dict:
+    rng = random.Random(args.seed)
+    workdir = Path(tempfile.mkdtemp(prefix="job-automator-search-"))
+    engine = create_engine(f"sqlite:///{workdir / 'search.db'}")
+    Base.metadata.create_all(engine)
+
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        for offset in range(0, args.postings, 10000):
+            conn.execute(insert(Application.__table__),
+                         [posting(rng) for _ in range(min(10000, args.postings - offset))])
+    load_seconds = time.perf_counter() - start
+
+    session = sessionmaker(bind=engine)()
+    latencies = {query: [] for query in QUERIES}
+    for _ in range(args.repeat):
+        for query in QUERIES:
+            start = time.perf_counter()
+            search(session, query, args.limit, window=args.window)
+            latencies[query].append(time.perf_counter() - start)
+    session.close()
+
+    samples = [sample for values in latencies.values() for sample in values]
+    return {
+        "postings": args.postings,
+        "load_seconds": round(load_seconds, 2),
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        "queries": {query: round(percentile(values, 50) * 1000, 2) for query, values in latencies.items()},
+    }
+
+
+def main():
+    args = setup_parser().parse_args()
+    report = run_benchmark(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"Stored {report['postings']} postings in {report['load_seconds']}s")
+    print(f"Search latency: p50 {report['p50_ms']} ms, p99 {report['p99_ms']} ms")
+    for query, p50 in report["queries"].items():
+        print(f"  {query:<24} p50 {p50} ms")
+
+
+if __name__ == "__main__":
+    main()
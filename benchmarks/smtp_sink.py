@@ -0,0 +1,86 @@
+"""Minimal local SMTP server that accepts and discards messages."""
+import socketserver
+import threading
+from typing import Tuple
+
+
+class _SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Speaks just enough SMTP (including AUTH) for smtplib.SMTP clients."""
+
+    def _reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self._reply("220 localhost SMTP sink ready")
+        in_data = False
+        size = 0
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            if in_data:
+                if raw in (b".\r\n", b".\n"):
+                    in_data = False
+                    self.server.record(size)
+                    self._reply("250 OK: queued")
+                else:
+                    size += len(raw)
+                continue
+
+            command = raw.decode(errors="replace").strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self._reply("250-localhost")
+                self._reply("250-AUTH PLAIN LOGIN")
+                self._reply("250 8BITMIME")
+            elif command.startswith("AUTH"):
+                self._reply("235 Authentication successful")
+            elif command.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                self._reply("250 OK")
+            elif command == "DATA":
+                in_data, size = True, 0
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+            elif command == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """
+    Threaded SMTP sink bound to localhost.
+
+    Usage:
+        with SMTPSink() as sink:
+            host, port = sink.address
+            ...
+            print(sink.messages_received)
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: Tuple[str, int] = ("127.0.0.1", 0)):
+        super().__init__(address, _SMTPSinkHandler)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.messages_received = 0
+        self.bytes_received = 0
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.server_address[0], self.server_address[1]
+
+    def record(self, size: int):
+        with self._lock:
+            self.messages_received += 1
+            self.bytes_received += size
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
@@ -1,10 +1,27 @@
 #!/usr/bin/env python3
 import argparse
+import json
 import logging
 import sys
 from pathlib import Path
+from job_application_automator.core.artifact_store import ArtifactStore
+from job_application_automator.core.batch import QUEUES, BatchRunner
+from job_application_automator.core.bullet_library import BulletLibrary
+from job_application_automator.core.clustering import DEFAULT_MIN_SIMILARITY
+from job_application_automator.core.fetcher import ERROR, JobFetcher
+from job_application_automator.core.inbox_sync import create_inbox_sync
+from job_application_automator.core.ingestion import iter_jobs
 from job_application_automator.core.manager import JobApplicationManager
-from job_application_automator.utils.config import get_mistral_config
+from job_application_automator.core.pdf_optimizer import PdfOptimizer, summarize_reports
+from job_application_automator.core.scheduler import ApplicationScheduler
+from job_application_automator.core.tenancy import find_candidate, save_candidate
+from job_application_automator.core.work_queue import DEFAULT_LEASE_SECONDS, Worker, WorkQueue
+from job_application_automator.db.models import Session, init_db
+from job_application_automator.db.search import DEFAULT_HIGHLIGHT, search
+from job_application_automator.server import serve
+from job_application_automator.utils.batch_inference import create_batch_inference_client
+from job_application_automator.utils.config import get_bullet_library_config, get_mistral_config, get_pdf_config
+from job_application_automator.utils.metrics import metrics, export_configured
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -14,12 +31,23 @@ def setup_parser():
         description="AI-powered job application automation tool"
     )
     
+    parser.add_argument("--metrics-file", type=str, help="Write Prometheus metrics to this file on exit")
+    parser.add_argument("--trace-file", type=str, help="Append trace spans (JSON lines) to this file on exit")
+    
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
     
     # Analyze job description
     analyze_parser = subparsers.add_parser("analyze", help="Analyze a job description")
     analyze_parser.add_argument("job_file", type=str, help="Path to job description file")
     
+    # Fetch postings
+    fetch_parser = subparsers.add_parser("fetch", help="Download and analyze job postings from their URLs")
+    fetch_parser.add_argument("urls", type=str, nargs="*", help="Posting URLs")
+    fetch_parser.add_argument("--urls-file", type=str, help="File with one posting URL per line")
+    fetch_parser.add_argument("--output", "-o", type=str,
+                              help="Write the postings as a JSONL job feed for ingest/batch")
+    fetch_parser.add_argument("--no-analyze", action="store_true", help="Only download and extract the text")
+    
     # Customize resume
     customize_parser = subparsers.add_parser("customize", help="Customize resume for a job")
     customize_parser.add_argument("job_file", type=str, help="Path to job description file")
@@ -36,6 +64,112 @@ def setup_parser():
     suggest_parser = subparsers.add_parser("suggest", help="Get resume improvement suggestions")
     suggest_parser.add_argument("resume_file", type=str, help="Path to resume file")
     
+    # Full application for a single job
+    apply_parser = subparsers.add_parser("apply", help="Prepare (and optionally send) a full application")
+    apply_parser.add_argument("job_file", type=str, help="Path to job description file")
+    apply_parser.add_argument("resume_file", type=str, help="Path to resume file")
+    apply_parser.add_argument("--candidate-info", type=str, help="Path to JSON file with candidate details")
+    apply_parser.add_argument("--to", type=str, help="Recipient email; when omitted nothing is sent")
+    apply_parser.add_argument("--company", type=str, default="", help="Company name for the email")
+    
+    # Build the resume bullet library
+    library_parser = subparsers.add_parser("library", help="Add the bullets of resumes to the bullet library")
+    library_parser.add_argument("resume_files", type=str, nargs="+", help="Paths to LaTeX resumes")
+    library_parser.add_argument("--path", type=str, help="Library file (defaults to BULLET_LIBRARY)")
+    
+    # Load a job feed into a batch run without processing it
+    ingest_parser = subparsers.add_parser("ingest", help="Load a job feed export into a batch run")
+    ingest_parser.add_argument("jobs_file", type=str, help="Path to JSONL or CSV job feed (optionally .gz)")
+    ingest_parser.add_argument("resume_file", type=str, nargs="?",
+                               help="Path to resume file (defaults to the candidate's resume)")
+    ingest_parser.add_argument("--name", type=str, help="Name of the batch run (defaults to the jobs file name)")
+    ingest_parser.add_argument("--candidate-info", type=str, help="Path to JSON file with candidate details")
+    ingest_parser.add_argument("--candidate", type=str,
+                               help="Candidate the run belongs to; their profile fills in what is not given")
+    ingest_parser.add_argument("--enqueue", action="store_true",
+                               help="Queue the run's unfinished applications for `worker` processes")
+    
+    # Batch run
+    batch_parser = subparsers.add_parser("batch", help="Apply to every job in a job feed export")
+    batch_parser.add_argument("jobs_file", type=str, help="Path to JSONL or CSV job feed (optionally .gz)")
+    batch_parser.add_argument("resume_file", type=str, help="Path to resume file")
+    batch_parser.add_argument("--name", type=str, help="Name of the batch run (defaults to the jobs file name)")
+    batch_parser.add_argument("--candidate-info", type=str, help="Path to JSON file with candidate details")
+    batch_parser.add_argument("--resume", action="store_true",
+                              help="Resume the latest run with this name, skipping completed stages")
+    batch_mode = batch_parser.add_mutually_exclusive_group()
+    batch_mode.add_argument("--offline", action="store_true",
+                            help="Do all LLM work as provider batch jobs instead of synchronous calls")
+    batch_mode.add_argument("--cluster", action="store_true",
+                            help="Customize the resume once per group of near-identical jobs")
+    batch_parser.add_argument("--cluster-similarity", type=float, default=DEFAULT_MIN_SIMILARITY,
+                              help="Skill similarity (0-1) required between jobs sharing a resume")
+    batch_parser.add_argument("--prioritize", action="store_true",
+                              help="Process the best-matching and soonest-expiring postings first")
+    batch_parser.add_argument("--budget-tokens", type=int,
+                              help="LLM token budget; lower-priority applications are deferred when it runs out")
+    batch_parser.add_argument("--company-priorities", type=str,
+                              help="Path to JSON file mapping company names to priority multipliers")
+    batch_parser.add_argument("--concurrency", type=int, default=1,
+                              help="Applications processed at once when prioritizing")
+    
+    # Candidate profile
+    candidate_parser = subparsers.add_parser("candidate", help="Create or update a candidate sharing the workers")
+    candidate_parser.add_argument("name", type=str, help="Unique name of the candidate")
+    candidate_parser.add_argument("--resume-file", type=str, help="Path to the candidate's resume")
+    candidate_parser.add_argument("--candidate-info", type=str, help="Path to JSON file with candidate details")
+    candidate_parser.add_argument("--templates", type=str,
+                                  help="Path to JSON file mapping template name to subject and content")
+    candidate_parser.add_argument("--weight", type=float, help="Share of the workers relative to other candidates")
+    candidate_parser.add_argument("--max-in-flight", type=int, help="Most items processed for the candidate at once")
+    candidate_parser.add_argument("--daily-quota", type=int, help="Most emails sent for the candidate per day")
+    candidate_parser.add_argument("--smtp-server", type=str, help="SMTP server of the candidate's mailbox")
+    candidate_parser.add_argument("--smtp-port", type=int, help="SMTP port of the candidate's mailbox")
+    candidate_parser.add_argument("--smtp-username", type=str, help="SMTP login of the candidate's mailbox")
+    candidate_parser.add_argument("--smtp-password-env", type=str,
+                                  help="Environment variable holding the candidate's SMTP password")
+    
+    # Queue worker
+    worker_parser = subparsers.add_parser("worker", help="Process queued applications from the shared database")
+    worker_parser.add_argument("--queues", type=str, default=",".join(QUEUES),
+                               help="Comma-separated queues this node serves (llm, tex, send)")
+    worker_parser.add_argument("--concurrency", type=int, default=4, help="Number of items processed at once")
+    worker_parser.add_argument("--lease", type=int, default=DEFAULT_LEASE_SECONDS,
+                               help="Seconds a claimed item stays leased without a heartbeat")
+    worker_parser.add_argument("--until-idle", action="store_true", help="Exit once no work is available")
+    
+    # Update statuses from replies and bounces
+    sync_parser = subparsers.add_parser("sync-inbox", help="Match new replies and bounces to sent applications")
+    sync_parser.add_argument("--mailbox", type=str, help="Mailbox to read (defaults to IMAP_MAILBOX)")
+    
+    # Search stored applications
+    search_parser = subparsers.add_parser("search", help="Search stored postings, analyses and cover letters")
+    search_parser.add_argument("query", type=str, nargs="+",
+                               help='Words to find; use "quoted phrases", prefix* and -excluded words')
+    search_parser.add_argument("--limit", type=int, default=20, help="Maximum number of results")
+    
+    # Retrieve a stored document
+    artifact_parser = subparsers.add_parser("artifact", help="Export a stored document by its hash")
+    artifact_parser.add_argument("digest", type=str, help="Hash recorded on the application")
+    artifact_parser.add_argument("--output", "-o", type=str, required=True, help="Path to write the document to")
+    
+    # Shrink PDFs before sending them
+    optimize_parser = subparsers.add_parser("optimize-pdf", help="Shrink PDFs and report the size and send-time savings")
+    optimize_parser.add_argument("pdf_files", type=str, nargs="+", help="PDFs to optimize in place")
+    optimize_parser.add_argument("--tool", type=str, choices=["auto", "gs", "qpdf"], default="auto",
+                                 help="Tools to run (auto uses every installed one)")
+    optimize_parser.add_argument("--linearize", action="store_true", help="Linearize for fast first-page display")
+    optimize_parser.add_argument("--no-subset-fonts", action="store_true", help="Skip Ghostscript font subsetting")
+    
+    # Long-running HTTP/JSON server
+    serve_parser = subparsers.add_parser("serve", help="Serve the pipeline over a local HTTP/JSON API")
+    serve_parser.add_argument("--host", type=str, default="127.0.0.1", help="Interface to bind")
+    serve_parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    serve_parser.add_argument("--max-concurrency", type=int, default=8,
+                              help="Maximum number of requests processed at once")
+    serve_parser.add_argument("--queue-timeout", type=float, default=30.0,
+                              help="Seconds a request waits for a free slot before getting a 503")
+    
     return parser
 
 def main():
@@ -46,13 +180,25 @@ def main():
         parser.print_help()
         sys.exit(1)
     
+    if args.command == "batch" and (args.offline or args.cluster):
+        # These modes do not go through the scheduler, so its options would be ignored
+        scheduling = [flag for flag, value in (("--prioritize", args.prioritize),
+                                               ("--budget-tokens", args.budget_tokens is not None),
+                                               ("--company-priorities", args.company_priorities)) if value]
+        if scheduling:
+            mode = "--offline" if args.offline else "--cluster"
+            parser.error(f"argument {scheduling[0]}: not allowed with argument {mode}")
+    
+    if args.metrics_file or args.trace_file:
+        metrics.enabled = True
+    
     try:
         manager = JobApplicationManager()
         
         if args.command == "analyze":
             with open(args.job_file, 'r') as f:
                 job_desc = f.read()
-            result = manager.analyze_job_description(job_desc)
+            result = manager.handle_job_description(job_desc)
             print("\nJob Analysis:")
             for key, value in result.items():
                 print(f"\n{key.replace('_', ' ').title()}:")
@@ -62,6 +208,46 @@ def main():
                 else:
                     print(f"  {value}")
         
+        elif args.command == "fetch":
+            urls = list(args.urls)
+            if args.urls_file:
+                with open(args.urls_file, 'r') as f:
+                    urls.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+            if not urls:
+                raise ValueError("No URLs given")
+            fetcher = JobFetcher.from_config()
+            analyze = None if args.no_analyze else manager.handle_job_description
+            counts = {}
+            jobs = []
+            try:
+                for result in fetcher.fetch_all(urls, analyze):
+                    counts[result["status"]] = counts.get(result["status"], 0) + 1
+                    if result["status"] == ERROR:
+                        print(f"  failed       {result['url']}: {result['error']}")
+                        continue
+                    analysis = result["analysis"] or {}
+                    # Analyses have no company; it comes from the page's JobPosting data
+                    title = analysis.get("title") or result["title"] or ""
+                    print(f"  {result['status']:<12} {result['url']} {title}")
+                    job = {
+                        "job_url": result["url"],
+                        "company_name": result["company_name"] or "",
+                        "position_title": title,
+                        "job_description": result["text"],
+                    }
+                    if result["analysis"]:
+                        # Saves `batch` from analyzing the posting again
+                        job["job_analysis"] = result["analysis"]
+                    jobs.append(job)
+            finally:
+                fetcher.close()
+            if args.output:
+                with open(args.output, 'w') as f:
+                    for job in jobs:
+                        f.write(json.dumps(job) + "\n")
+                print(f"\nWrote {len(jobs)} postings to {args.output}")
+            print("\n" + ", ".join(f"{status}: {count}" for status, count in sorted(counts.items())))
+        
         elif args.command == "customize":
             with open(args.job_file, 'r') as f:
                 job_desc = f.read()
@@ -80,7 +266,10 @@ def main():
             with open(args.resume_file, 'r') as f:
                 resume = f.read()
             
-            cover_letter = manager.generate_cover_letter(job_desc, resume)
+            init_db()
+            job_details = manager.handle_job_description(job_desc)
+            candidate_details = manager.candidate_profiles.candidate_details(resume)
+            cover_letter = manager.generate_cover_letter(job_details, candidate_details)
             output_path = args.output or "cover_letter.tex"
             with open(output_path, 'w') as f:
                 f.write(cover_letter)
@@ -94,10 +283,221 @@ def main():
             print("\nSuggested Improvements:")
             for suggestion in suggestions:
                 print(f"\n- {suggestion}")
+        
+        elif args.command == "apply":
+            init_db()
+            with open(args.job_file, 'r') as f:
+                job_desc = f.read()
+            with open(args.resume_file, 'r') as f:
+                resume = f.read()
+            candidate_info = {}
+            if args.candidate_info:
+                with open(args.candidate_info, 'r') as f:
+                    candidate_info = json.load(f)
+            
+            email_details = None
+            if args.to:
+                email_details = {
+                    "to": args.to,
+                    "company_name": args.company,
+                    "candidate_name": candidate_info.get("name", ""),
+                }
+            result = manager.process_application(job_desc, resume, candidate_info, email_details)
+            print(f"\nResume: {result['resume_path']}")
+            print(f"Cover letter: {result['cover_letter_path']}")
+            print(f"\nEmail body:\n{result['email_body']}")
+            if result["sent"]:
+                print(f"\nApplication sent to {args.to}")
+        
+        elif args.command == "ingest":
+            init_db()
+            candidate = None
+            if args.candidate:
+                candidate = find_candidate(args.candidate)
+                if candidate is None:
+                    raise ValueError(f"No candidate named '{args.candidate}'")
+            candidate_info = candidate["candidate_info"] if candidate else {}
+            if args.candidate_info:
+                with open(args.candidate_info, 'r') as f:
+                    candidate_info = json.load(f)
+            
+            if args.resume_file:
+                with open(args.resume_file, 'r') as f:
+                    resume = f.read()
+            elif candidate and candidate["resume_content"]:
+                resume = candidate["resume_content"]
+            else:
+                raise ValueError("No resume given; pass a resume file or a candidate with a resume")
+            
+            runner = BatchRunner(manager)
+            name = args.name or Path(args.jobs_file).stem
+            run_id = runner.find_run(name)
+            if run_id is None:
+                run_id = runner.create_run(name, [], args.resume_file or "", candidate_info, resume_content=resume,
+                                           candidate_id=candidate["id"] if candidate else None)
+            added = runner.add_jobs(run_id, iter_jobs(args.jobs_file))
+            print(f"\nAdded {added} new jobs to batch run '{name}' (id {run_id})")
+            if args.enqueue:
+                queued = WorkQueue().enqueue_run(run_id)
+                print(f"Queued {queued} applications; process them with: job-automator worker")
+            elif args.resume_file:
+                print(f"Process them with: job-automator batch {args.jobs_file} {args.resume_file} --name {name} --resume")
+            else:
+                print("Queue them for the workers by running ingest again with --enqueue")
+        
+        elif args.command == "batch":
+            init_db()
+            with open(args.resume_file, 'r') as f:
+                resume = f.read()
+            candidate_info = {}
+            if args.candidate_info:
+                with open(args.candidate_info, 'r') as f:
+                    candidate_info = json.load(f)
+            
+            runner = BatchRunner(manager, artifact_store=ArtifactStore.from_config())
+            name = args.name or Path(args.jobs_file).stem
+            run_id = runner.find_run(name) if args.resume else None
+            if args.resume and run_id is None:
+                raise ValueError(f"No batch run named '{name}' to resume")
+            if run_id is None:
+                run_id = runner.create_run(name, iter_jobs(args.jobs_file), args.resume_file, candidate_info)
+            else:
+                added = runner.add_jobs(run_id, iter_jobs(args.jobs_file))
+                print(f"\nResuming batch run '{name}' ({added} new jobs)")
+            
+            if args.offline:
+                counts = runner.run_offline(run_id, resume, create_batch_inference_client(manager.ai_client))
+            elif args.cluster:
+                counts = runner.run_clustered(run_id, resume, args.cluster_similarity)
+            elif args.prioritize or args.budget_tokens is not None or args.company_priorities:
+                company_priorities = {}
+                if args.company_priorities:
+                    with open(args.company_priorities, 'r') as f:
+                        company_priorities = json.load(f)
+                scheduler = ApplicationScheduler(
+                    runner,
+                    budget_tokens=args.budget_tokens,
+                    company_priorities=company_priorities,
+                    concurrency=args.concurrency,
+                )
+                
+                def report(stats):
+                    if (stats["completed"] + stats["failed"]) % 10 == 0:
+                        logger.info(f"Progress: {stats}")
+                
+                counts = scheduler.run(run_id, resume, on_progress=report)
+            else:
+                counts = runner.run(run_id, resume)
+            print(f"\nBatch run '{name}' (id {run_id}):")
+            for status, count in sorted(counts.items()):
+                print(f"  {status}: {count}")
+        
+        elif args.command == "worker":
+            init_db()
+            queues = [q.strip() for q in args.queues.split(",") if q.strip()]
+            worker = Worker(
+                BatchRunner(manager, artifact_store=ArtifactStore.from_config()),
+                WorkQueue(lease_seconds=args.lease),
+                queues=queues,
+                concurrency=args.concurrency,
+            )
+            print(f"\nWorker {worker.worker_id} serving queues: {', '.join(queues)}")
+            processed = worker.run(until_idle=args.until_idle)
+            print(f"\nProcessed {processed} work items")
+            for tenant, stats in sorted(worker.tenant_stats.summary().items()):
+                print(f"  {tenant}: {stats['items']} items ({stats['per_minute']:.1f}/min), "
+                      f"wait p50 {stats['wait_p50']:.1f}s p99 {stats['wait_p99']:.1f}s, "
+                      f"service p99 {stats['service_p99']:.1f}s")
+        
+        elif args.command == "candidate":
+            init_db()
+            fields = {
+                "weight": args.weight,
+                "max_in_flight": args.max_in_flight,
+                "daily_quota": args.daily_quota,
+                "smtp_server": args.smtp_server,
+                "smtp_port": args.smtp_port,
+                "smtp_username": args.smtp_username,
+                "smtp_password_env": args.smtp_password_env,
+            }
+            if args.resume_file:
+                with open(args.resume_file, 'r') as f:
+                    fields["resume_content"] = f.read()
+            if args.candidate_info:
+                with open(args.candidate_info, 'r') as f:
+                    fields["candidate_info"] = json.load(f)
+            if args.templates:
+                with open(args.templates, 'r') as f:
+                    fields["email_templates"] = json.load(f)
+            candidate_id = save_candidate(args.name, **fields)
+            print(f"\nSaved candidate '{args.name}' (id {candidate_id})")
+        
+        elif args.command == "library":
+            path = args.path or get_bullet_library_config()["path"]
+            if not path:
+                raise ValueError("No library file given; pass --path or set BULLET_LIBRARY")
+            library = BulletLibrary(manager.ai_client.embed, path)
+            added = 0
+            for resume_file in args.resume_files:
+                with open(resume_file, 'r') as f:
+                    added += library.add_resume(f.read())
+            library.save()
+            print(f"\nAdded {added} bullets; {path} now holds {len(library)}")
+        
+        elif args.command == "sync-inbox":
+            init_db()
+            counts = create_inbox_sync(mailbox=args.mailbox).sync()
+            print(f"\nFetched {counts['fetched']} new messages: "
+                  f"{counts['replies']} replies, {counts['bounces']} bounces")
+        
+        elif args.command == "search":
+            init_db()
+            # Bold matches on a terminal, brackets when piped
+            highlight = ("\033[1m", "\033[0m") if sys.stdout.isatty() else DEFAULT_HIGHLIGHT
+            session = Session()
+            try:
+                results = search(session, " ".join(args.query), args.limit, highlight)
+            finally:
+                session.close()
+            for result in results:
+                print(f"\n#{result['id']} {result['position_title']} at {result['company_name']} ({result['status']})")
+                print(f"  {result['snippet']}")
+            print(f"\n{len(results)} result(s)")
+        
+        elif args.command == "artifact":
+            ArtifactStore.from_config().export(args.digest, args.output)
+            print(f"\nWrote {args.digest} to {args.output}")
+        
+        elif args.command == "optimize-pdf":
+            config = get_pdf_config()
+            optimizer = PdfOptimizer(args.tool, linearize=args.linearize, subset_fonts=not args.no_subset_fonts,
+                                     timeout=config["timeout"], uplink_kbps=config["uplink_kbps"])
+            if not optimizer.tools():
+                raise ValueError("Neither Ghostscript (gs) nor qpdf is installed")
+            reports = []
+            for pdf_file in args.pdf_files:
+                report = optimizer.optimize(pdf_file)
+                reports.append(report)
+                status = f"failed: {report['error']}" if report["error"] else \
+                    f"{report['original_bytes']:>9} -> {report['optimized_bytes']:>9} bytes"
+                print(f"  {pdf_file}: {status} ({report['seconds']:.2f}s)")
+            summary = summarize_reports(reports)
+            print(f"\nOptimized {summary['documents']} PDFs with {', '.join(optimizer.tools())}:")
+            print(f"  size: {summary['original_bytes']} -> {summary['optimized_bytes']} bytes "
+                  f"({summary['reduction']:.1%} smaller) in {summary['seconds']:.2f}s")
+            print(f"  estimated upload at {config['uplink_kbps']:g} kbit/s: "
+                  f"{summary['send_seconds_before']:.2f}s -> {summary['send_seconds_after']:.2f}s")
+        
+        elif args.command == "serve":
+            init_db()
+            metrics.enabled = True
+            serve(manager, args.host, args.port, args.max_concurrency, args.queue_timeout)
     
     except Exception as e:
         logger.error(f"Error: {str(e)}")
         sys.exit(1)
+    finally:
+        export_configured(prometheus_file=args.metrics_file, trace_file=args.trace_file)
 
 if __name__ == "__main__":
     main()
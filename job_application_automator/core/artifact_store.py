@@ -0,0 +1,198 @@
+import gzip
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+from ..utils.config import get_artifact_config
+from ..utils.metrics import metrics
+
+try:
+    import zstandard
+except ImportError:  # Optional; gzip is used instead
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Suffix of the stored file for each compression method
+COMPRESSION_SUFFIXES = {"zstd": ".zst", "gzip": ".gz", "none": ""}
+
+
+class ArtifactStore:
+    """
+    Content-addressed storage for generated documents.
+
+    Artifacts are identified by the SHA-256 of their uncompressed content, so
+    identical outputs are stored once however many applications use them.
+    Files live at <root>/<hash[:2]>/<hash[2:4]>/<hash>, which keeps every
+    directory small and makes a lookup a fixed number of stat calls however
+    large the store grows. Text (LaTeX sources, transcripts) is compressed;
+    binary artifacts such as PDFs are stored as is, so their path can be
+    attached to an email directly.
+
+    Args:
+        root: Directory to keep artifacts in
+        compression: "zstd", "gzip" or "none"; zstd falls back to gzip when
+            the zstandard package is not installed
+        level: Compression level
+    """
+
+    def __init__(self, root: Union[str, Path], compression: str = "gzip", level: int = 6):
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Unknown compression '{compression}'")
+        if compression == "zstd" and zstandard is None:
+            logger.warning("zstandard is not installed; compressing artifacts with gzip")
+            compression = "gzip"
+        self.root = Path(root)
+        self.compression = compression
+        self.level = level
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_config(cls) -> "ArtifactStore":
+        """Creates a store from the environment configuration."""
+        config = get_artifact_config()
+        return cls(config["dir"], compression=config["compression"], level=config["level"])
+
+    def _base_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.compression == "zstd":
+            return zstandard.ZstdCompressor(level=self.level).compress(data)
+        if self.compression == "gzip":
+            return gzip.compress(data, compresslevel=self.level, mtime=0)
+        return data
+
+    def path(self, digest: str) -> Optional[Path]:
+        """
+        Finds the file holding an artifact.
+
+        Args:
+            digest: Hash of the artifact
+
+        Returns:
+            Path of the stored file, or None if the artifact is not stored
+        """
+        base = self._base_path(digest)
+        for suffix in COMPRESSION_SUFFIXES.values():
+            candidate = base.with_name(base.name + suffix)
+            if candidate.exists():
+                return candidate
+        return None
+
+    def __contains__(self, digest: str) -> bool:
+        return self.path(digest) is not None
+
+    def _write(self, digest: str, data: bytes, suffix: str) -> Path:
+        """Writes a file atomically, so readers never see a partial artifact."""
+        target = self._base_path(digest)
+        target = target.with_name(target.name + suffix)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=target.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, target)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        return target
+
+    def put(self, data: Union[bytes, str], compress: bool = True) -> str:
+        """
+        Stores an artifact unless it is already present.
+
+        Args:
+            data: Content to store; str is encoded as UTF-8
+            compress: Compress the stored file (pass False for PDFs and
+                other already-compressed formats)
+
+        Returns:
+            Hash identifying the artifact
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        if self.path(digest) is not None:
+            metrics.inc("artifact_dedup_hits")
+            return digest
+        if compress:
+            self._write(digest, self._compress(data), COMPRESSION_SUFFIXES[self.compression])
+        else:
+            self._write(digest, data, "")
+        metrics.inc("artifact_bytes_written", len(data))
+        return digest
+
+    def put_file(self, source: Union[str, Path], compress: bool = False) -> str:
+        """
+        Stores the contents of a file.
+
+        Args:
+            source: Path of the file
+            compress: Compress the stored file
+
+        Returns:
+            Hash identifying the artifact
+        """
+        with open(source, "rb") as f:
+            return self.put(f.read(), compress=compress)
+
+    def get(self, digest: str) -> bytes:
+        """
+        Reads an artifact.
+
+        Args:
+            digest: Hash of the artifact
+
+        Returns:
+            The uncompressed content
+
+        Raises:
+            KeyError: If the artifact is not stored
+        """
+        path = self.path(digest)
+        if path is None:
+            raise KeyError(digest)
+        data = path.read_bytes()
+        if path.suffix == ".zst":
+            if zstandard is None:
+                raise ValueError(f"Artifact {digest} is zstd-compressed but zstandard is not installed")
+            return zstandard.ZstdDecompressor().decompress(data)
+        if path.suffix == ".gz":
+            return gzip.decompress(data)
+        return data
+
+    def get_text(self, digest: str) -> str:
+        """Reads a text artifact."""
+        return self.get(digest).decode("utf-8")
+
+    def export(self, digest: str, destination: Union[str, Path]) -> Path:
+        """
+        Writes an artifact's uncompressed content to a file.
+
+        Args:
+            digest: Hash of the artifact
+            destination: Path to write to
+
+        Returns:
+            The destination path
+        """
+        destination = Path(destination)
+        path = self.path(digest)
+        if path is not None and path.suffix not in (".gz", ".zst"):
+            shutil.copyfile(path, destination)
+        else:
+            destination.write_bytes(self.get(digest))
+        return destination
+
+    def digests(self) -> Iterator[str]:
+        """Yields the hash of every stored artifact."""
+        for shard in sorted(self.root.glob("??/??")):
+            for path in shard.iterdir():
+                if not path.name.startswith("."):
+                    yield path.name.split(".", 1)[0]
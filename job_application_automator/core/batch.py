@@ -0,0 +1,761 @@
+import json
+import logging
+import smtplib
+import socket
+import threading
+from datetime import datetime
+from email.utils import make_msgid
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import func, insert, update
+
+from ..db.models import Application, BatchJob, BatchRun, Candidate, Email, Session
+from ..utils.batch_inference import BatchJobJournal
+from ..utils.metrics import metrics
+from .clustering import DEFAULT_MIN_SIMILARITY, cluster_analyses, representative_details, touch_up_resume
+from .ingestion import DEFAULT_CHUNK_SIZE, chunked, job_key
+from .task_graph import TaskGraph
+from .tenancy import candidate_communicator
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages in order; Application.stage records the last one completed.
+PENDING = "pending"
+ANALYZED = "analyzed"
+CUSTOMIZED = "customized"
+COMPILED = "compiled"
+SENDING = "sending"
+SENT = "sent"
+STAGES = [PENDING, ANALYZED, CUSTOMIZED, COMPILED, SENDING, SENT]
+
+# Kinds of work, so LLM-heavy and TeX-heavy stages can run on different nodes
+LLM_QUEUE = "llm"
+TEX_QUEUE = "tex"
+SEND_QUEUE = "send"
+QUEUES = [LLM_QUEUE, TEX_QUEUE, SEND_QUEUE]
+# The queue that performs the stage after each checkpoint
+STAGE_QUEUES = {
+    PENDING: LLM_QUEUE,
+    ANALYZED: LLM_QUEUE,
+    CUSTOMIZED: TEX_QUEUE,
+    COMPILED: SEND_QUEUE,
+    SENDING: SEND_QUEUE,
+}
+
+# Application.status values used by batch runs
+STATUS_PENDING = "pending"
+STATUS_FAILED = "failed"
+STATUS_SUBMITTED = "submitted"
+# A crash between marking an email as sending and recording the result leaves
+# its delivery unknown; such applications are never re-sent automatically.
+STATUS_SEND_UNKNOWN = "send_unknown"
+# Set by the inbox sync once the recipient replies or the email bounces
+STATUS_REPLIED = "replied"
+STATUS_BOUNCED = "bounced"
+# Set by the scheduler: postings past their expiry are never processed, and
+# deferred ones are left for a later run when the budget runs out
+STATUS_EXPIRED = "expired"
+STATUS_DEFERRED = "deferred"
+# Returned by process_application (never stored) when another worker claimed
+# the send first; that worker finishes the application
+STATUS_CLAIMED_ELSEWHERE = "claimed_elsewhere"
+FINISHED_STATUSES = {STATUS_SUBMITTED, STATUS_REPLIED, STATUS_BOUNCED, STATUS_EXPIRED}
+
+# Errors raised before the message is handed to the server, after which a
+# retry cannot result in a duplicate
+RETRYABLE_SEND_ERRORS = (
+    smtplib.SMTPConnectError,
+    smtplib.SMTPHeloError,
+    smtplib.SMTPAuthenticationError,
+    smtplib.SMTPSenderRefused,
+    smtplib.SMTPRecipientsRefused,
+    smtplib.SMTPDataError,
+    ConnectionRefusedError,
+    socket.gaierror,
+    FileNotFoundError,
+)
+
+class RunJobJournal(BatchJobJournal):
+    """
+    Records the provider batch jobs of a run in the batch_jobs table.
+
+    Args:
+        session_factory: Callable returning a new database session
+        run_id: ID of the batch run
+    """
+
+    def __init__(self, session_factory, run_id: int):
+        self.session_factory = session_factory
+        self.run_id = run_id
+
+    def pending(self):
+        session = self.session_factory()
+        try:
+            jobs = (
+                session.query(BatchJob)
+                .filter(BatchJob.batch_run_id == self.run_id, BatchJob.completed_at.is_(None))
+                .order_by(BatchJob.id)
+                .all()
+            )
+            return [(job.job_id, set(json.loads(job.custom_ids))) for job in jobs]
+        finally:
+            session.close()
+
+    def submitted(self, job_id: str, ids: set):
+        session = self.session_factory()
+        try:
+            session.add(BatchJob(batch_run_id=self.run_id, job_id=job_id, custom_ids=json.dumps(sorted(ids))))
+            session.commit()
+        finally:
+            session.close()
+
+    def completed(self, job_id: str):
+        session = self.session_factory()
+        try:
+            session.query(BatchJob).filter(
+                BatchJob.batch_run_id == self.run_id, BatchJob.job_id == job_id
+            ).update({BatchJob.completed_at: datetime.utcnow()})
+            session.commit()
+        finally:
+            session.close()
+
+
+class BatchRunner:
+    """
+    Runs many applications through analyze/customize/compile/send.
+
+    Each application's progress is checkpointed on its Application row after
+    every stage, so an interrupted run can be resumed without repeating LLM
+    calls, and an email is never sent twice.
+
+    Args:
+        manager: JobApplicationManager providing the clients
+        session_factory: Session factory for the database
+        artifact_store: Optional ArtifactStore; when given, generated LaTeX
+            and compiled PDFs are stored in it and referenced by hash
+    """
+
+    def __init__(self, manager, session_factory=Session, artifact_store=None):
+        self.manager = manager
+        self.session_factory = session_factory
+        self.artifact_store = artifact_store
+        self._communicators = {}
+        self._lock = threading.Lock()
+
+    def create_run(self, name: str, jobs: Iterable[Dict], resume_path: str,
+                   candidate_info: Optional[Dict] = None, resume_content: Optional[str] = None,
+                   candidate_id: Optional[int] = None) -> int:
+        """
+        Creates a batch run and its pending applications.
+
+        Args:
+            name: Name of the run, used to find it again with --resume
+            jobs: Job dictionaries as produced by ingestion.iter_jobs()
+            resume_path: Path to the base resume
+            candidate_info: Candidate details used for cover letters
+            resume_content: Base resume, stored so workers on other machines
+                do not need the file
+            candidate_id: Candidate the run belongs to, whose share of the
+                work queue and email settings it uses
+
+        Returns:
+            ID of the new batch run
+        """
+        session = self.session_factory()
+        try:
+            run = BatchRun(
+                name=name,
+                resume_path=str(resume_path),
+                resume_content=resume_content,
+                candidate_info=json.dumps(candidate_info or {}),
+                candidate_id=candidate_id,
+            )
+            session.add(run)
+            session.flush()
+            self._add_jobs(session, run.id, jobs)
+            session.commit()
+            return run.id
+        finally:
+            session.close()
+
+    def add_jobs(self, run_id: int, jobs: Iterable[Dict], chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+        """
+        Adds jobs that are not already part of a run.
+
+        Jobs are consumed and committed in chunks, so arbitrarily large
+        streams can be added with bounded memory.
+
+        Args:
+            run_id: ID of the batch run
+            jobs: Job dictionaries, e.g. from ingestion.iter_jobs()
+            chunk_size: Number of jobs inserted per transaction
+
+        Returns:
+            Number of applications added
+        """
+        session = self.session_factory()
+        try:
+            added = self._add_jobs(session, run_id, jobs, chunk_size)
+            session.commit()
+            return added
+        finally:
+            session.close()
+
+    def _add_jobs(self, session, run_id: int, jobs: Iterable[Dict], chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+        added = 0
+        for chunk in chunked(jobs, chunk_size):
+            by_key = {}
+            for job in chunk:
+                by_key.setdefault(job.get("job_key") or job_key(job), job)
+            existing = {
+                key for (key,) in session.query(Application.job_key)
+                .filter(Application.batch_run_id == run_id)
+                .filter(Application.job_key.in_(list(by_key)))
+            }
+            rows = [
+                {
+                    "batch_run_id": run_id,
+                    "job_key": key,
+                    "company_name": job.get("company_name") or "Unknown",
+                    "position_title": job.get("position_title") or "Unknown",
+                    "job_description": job.get("job_description") or "",
+                    "contact_email": job.get("contact_email"),
+                    "job_url": job.get("job_url"),
+                    "expires_at": job.get("expires_at"),
+                    # Jobs analyzed before ingestion skip the analysis stage
+                    "job_analysis": json.dumps(job["job_analysis"]) if job.get("job_analysis") else None,
+                    "stage": ANALYZED if job.get("job_analysis") else PENDING,
+                    "status": STATUS_PENDING,
+                }
+                for key, job in by_key.items() if key not in existing
+            ]
+            if rows:
+                session.execute(insert(Application), rows)
+                added += len(rows)
+            session.commit()
+        return added
+
+    def find_run(self, name: str) -> Optional[int]:
+        """
+        Finds the most recent batch run with the given name.
+
+        Args:
+            name: Name of the run
+
+        Returns:
+            ID of the run, or None if there is no such run
+        """
+        session = self.session_factory()
+        try:
+            run = (
+                session.query(BatchRun)
+                .filter(BatchRun.name == name)
+                .order_by(BatchRun.id.desc())
+                .first()
+            )
+            return run.id if run else None
+        finally:
+            session.close()
+
+    def _candidate_info(self, run_id: int) -> Dict:
+        session = self.session_factory()
+        try:
+            run = session.get(BatchRun, run_id)
+            if run is None:
+                raise ValueError(f"Batch run {run_id} not found")
+            return json.loads(run.candidate_info or "{}")
+        finally:
+            session.close()
+
+    def run(self, run_id: int, resume_content: str, queues: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """
+        Processes every unfinished application in a run.
+
+        Completed stages are skipped, so calling this again after a crash
+        resumes where each application left off.
+
+        Args:
+            run_id: ID of the batch run
+            resume_content: Base resume content in LaTeX format
+            queues: Kinds of work to perform (see process_application)
+
+        Returns:
+            Dictionary counting applications by final status
+        """
+        candidate_info = self._candidate_info(run_id)
+        for application_id in self._unfinished_application_ids(run_id):
+            self.process_application(application_id, resume_content, candidate_info, queues)
+        return self.finish_run(run_id)
+
+    def finish_run(self, run_id: int) -> Dict[str, int]:
+        """
+        Records whether a run is complete.
+
+        Args:
+            run_id: ID of the batch run
+
+        Returns:
+            Dictionary counting applications by status
+        """
+        counts = self.summary(run_id)
+        session = self.session_factory()
+        try:
+            run = session.get(BatchRun, run_id)
+            run.status = "completed" if set(counts) <= FINISHED_STATUSES else "incomplete"
+            session.commit()
+        finally:
+            session.close()
+        return counts
+
+    def run_offline(self, run_id: int, resume_content: str, inference) -> Dict[str, int]:
+        """
+        Processes a run with all LLM work done as provider batch jobs.
+
+        Pending analyses are submitted as one set of batch jobs, then the
+        resumes, cover letters and email bodies of every analyzed
+        application as another. Results are checkpointed by application as
+        they come back. The documents are then compiled and sent as usual.
+        Applications whose batch requests failed are marked failed and are
+        retried by the next run. Submitted jobs are recorded against the run,
+        so a run interrupted while waiting collects them on its next start
+        instead of paying for the same requests again.
+
+        Args:
+            run_id: ID of the batch run
+            resume_content: Base resume content in LaTeX format
+            inference: BatchInferenceClient used for the LLM requests
+
+        Returns:
+            Dictionary counting applications by final status
+        """
+        candidate_info = self._candidate_info(run_id)
+        ai_client = self.manager.ai_client
+
+        def analysis_requests():
+            for application in self._applications_at(run_id, PENDING):
+                yield f"job_analysis:{application.id}", ai_client.analysis_messages(application.job_description)
+
+        def document_requests():
+            for application in self._applications_at(run_id, ANALYZED):
+                job_details = json.loads(application.job_analysis)
+                if not application.resume_tex:
+                    yield f"resume_tex:{application.id}", ai_client.resume_messages(job_details, resume_content)
+                if not application.cover_letter_tex:
+                    yield (f"cover_letter_tex:{application.id}",
+                           ai_client.cover_letter_messages(job_details, candidate_info))
+                if not application.email_body:
+                    yield f"email_body:{application.id}", ai_client.email_messages(job_details, candidate_info)
+
+        journal = RunJobJournal(self.session_factory, run_id)
+        with metrics.timer("pipeline_stage", stage="batch_analyze"):
+            self._store_batch_results(inference.run(analysis_requests(), journal))
+        with metrics.timer("pipeline_stage", stage="batch_generate"):
+            self._store_batch_results(inference.run(document_requests(), journal))
+        return self.run(run_id, resume_content, queues=[TEX_QUEUE, SEND_QUEUE])
+
+    def run_clustered(self, run_id: int, resume_content: str,
+                      min_similarity: float = DEFAULT_MIN_SIMILARITY) -> Dict[str, int]:
+        """
+        Processes a run, customizing the resume once per group of similar jobs.
+
+        All pending jobs are analyzed first. Resumes are then shared within
+        clusters (see cluster_resumes), and the remaining stages run as usual.
+
+        Args:
+            run_id: ID of the batch run
+            resume_content: Base resume content in LaTeX format
+            min_similarity: Skill similarity required within a cluster
+
+        Returns:
+            Dictionary counting applications by final status
+        """
+        candidate_info = self._candidate_info(run_id)
+        for application_id in self._unfinished_application_ids(run_id):
+            self.process_application(application_id, resume_content, candidate_info, until=ANALYZED)
+        self.cluster_resumes(run_id, resume_content, min_similarity)
+        return self.run(run_id, resume_content)
+
+    def cluster_resumes(self, run_id: int, resume_content: str,
+                        min_similarity: float = DEFAULT_MIN_SIMILARITY) -> int:
+        """
+        Customizes one resume per cluster of near-identical analyzed jobs.
+
+        Analyzed applications without a resume are clustered by their skills.
+        Each cluster's resume is customized by the LLM once, for the
+        cluster's shared requirements. Every member then gets a copy with a
+        line naming its company, so the number of resume LLM calls grows
+        with the number of clusters rather than the number of jobs.
+
+        Args:
+            run_id: ID of the batch run
+            resume_content: Base resume content in LaTeX format
+            min_similarity: Skill similarity required within a cluster
+
+        Returns:
+            Number of clusters
+        """
+        members = [
+            (application.id, application.company_name, application.position_title,
+             json.loads(application.job_analysis))
+            for application in self._applications_at(run_id, ANALYZED)
+            if not application.resume_tex and application.status != STATUS_FAILED
+        ]
+        if not members:
+            return 0
+        labels = cluster_analyses([analysis for _, _, _, analysis in members], min_similarity)
+        clusters = int(labels.max()) + 1
+        logger.info(f"Customizing {clusters} resumes for {len(members)} applications")
+        metrics.inc("resume_clusters", clusters)
+
+        for cluster in range(clusters):
+            cluster_members = [member for member, label in zip(members, labels) if label == cluster]
+            job_details = representative_details([analysis for _, _, _, analysis in cluster_members])
+            try:
+                with metrics.timer("pipeline_stage", stage="customize"):
+                    shared_resume = self.manager.ai_client.customize_resume(job_details, resume_content)
+            except Exception as e:
+                # Members fall back to individual customization in run()
+                logger.error(f"Error customizing resume for cluster {cluster}: {e}")
+                continue
+            for chunk in chunked(cluster_members, DEFAULT_CHUNK_SIZE):
+                session = self.session_factory()
+                try:
+                    for application_id, company, position, _ in chunk:
+                        application = session.get(Application, application_id)
+                        resume = touch_up_resume(shared_resume, company, position)
+                        application.resume_tex = self._store_artifact(application, "resume_tex", resume)
+                    session.commit()
+                finally:
+                    session.close()
+        return clusters
+
+    def _applications_at(self, run_id: int, stage: str, page_size: int = DEFAULT_CHUNK_SIZE):
+        """Pages through the applications of a run at one stage."""
+        last_id = 0
+        while True:
+            session = self.session_factory()
+            try:
+                page = (
+                    session.query(Application)
+                    .filter(Application.batch_run_id == run_id)
+                    .filter(Application.id > last_id)
+                    .filter(Application.stage == stage)
+                    .order_by(Application.id)
+                    .limit(page_size)
+                    .all()
+                )
+            finally:
+                session.close()
+            if not page:
+                return
+            yield from page
+            last_id = page[-1].id
+
+    def _store_batch_results(self, results, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """Checkpoints (custom_id, content, error) results from BatchInferenceClient.run()."""
+        ai_client = self.manager.ai_client
+        for chunk in chunked(results, chunk_size):
+            session = self.session_factory()
+            try:
+                for custom_id, content, error in chunk:
+                    column, application_id = custom_id.rsplit(":", 1)
+                    application = session.get(Application, int(application_id))
+                    if error is None:
+                        try:
+                            if column == "job_analysis":
+                                content = json.dumps(ai_client.parse_analysis(content))
+                            elif column == "email_body":
+                                content = content.strip()
+                        except Exception as e:
+                            error = str(e)
+                    if error is not None:
+                        logger.error(f"Batch request {custom_id} failed: {error}")
+                        application.status = STATUS_FAILED
+                        application.last_error = error
+                        continue
+                    setattr(application, column, self._store_artifact(application, column, content))
+                    if column == "job_analysis":
+                        next_stage = ANALYZED
+                    elif application.resume_tex and application.cover_letter_tex and application.email_body:
+                        next_stage = CUSTOMIZED
+                    else:
+                        continue
+                    application.stage = next_stage
+                    application.last_error = None
+                    if application.status == STATUS_FAILED:
+                        application.status = STATUS_PENDING
+                session.commit()
+            finally:
+                session.close()
+
+    def _unfinished_application_ids(self, run_id: int, page_size: int = DEFAULT_CHUNK_SIZE):
+        """Pages through unfinished applications by ID so huge runs are never loaded at once."""
+        last_id = 0
+        while True:
+            session = self.session_factory()
+            try:
+                page = [
+                    app_id for (app_id,) in session.query(Application.id)
+                    .filter(Application.batch_run_id == run_id)
+                    .filter(Application.id > last_id)
+                    .filter(Application.stage != SENT)
+                    .filter(Application.status.notin_([STATUS_SEND_UNKNOWN, STATUS_EXPIRED]))
+                    .order_by(Application.id)
+                    .limit(page_size)
+                ]
+            finally:
+                session.close()
+            if not page:
+                return
+            yield from page
+            last_id = page[-1]
+
+    def summary(self, run_id: int) -> Dict[str, int]:
+        """
+        Counts the applications of a run by status.
+
+        Args:
+            run_id: ID of the batch run
+
+        Returns:
+            Dictionary mapping status to number of applications
+        """
+        session = self.session_factory()
+        try:
+            rows = (
+                session.query(Application.status, func.count(Application.id))
+                .filter(Application.batch_run_id == run_id)
+                .group_by(Application.status)
+            )
+            return {status: count for status, count in rows}
+        finally:
+            session.close()
+
+    def process_application(self, application_id: int, resume_content: str, candidate_info: Dict,
+                            queues: Optional[Iterable[str]] = None, until: Optional[str] = None) -> str:
+        """
+        Advances one application through the remaining pipeline stages.
+
+        Args:
+            application_id: ID of the application
+            resume_content: Base resume content in LaTeX format
+            candidate_info: Candidate details used for cover letters
+            queues: Kinds of work to perform (see QUEUES); processing stops
+                at the first stage belonging to another queue. Defaults to all.
+            until: Stage at which to stop, e.g. ANALYZED
+
+        Returns:
+            The application's status afterwards, or STATUS_CLAIMED_ELSEWHERE
+            if another worker claimed its send first
+        """
+        queues = set(QUEUES if queues is None else queues)
+        session = self.session_factory()
+        try:
+            application = session.get(Application, application_id)
+            try:
+                if application.stage == SENDING:
+                    # A previous run crashed mid-send; delivery cannot be confirmed
+                    application.status = STATUS_SEND_UNKNOWN
+                    session.commit()
+                    logger.warning(f"Application {application_id} may already have been sent; skipping")
+                    return application.status
+
+                while (STAGE_QUEUES.get(application.stage) in queues and application.stage != until
+                       and application.status != STATUS_SEND_UNKNOWN):
+                    if application.stage == PENDING:
+                        self._analyze(session, application)
+                    elif application.stage in (ANALYZED, CUSTOMIZED):
+                        self._generate(session, application, resume_content, candidate_info,
+                                       compile=TEX_QUEUE in queues)
+                    elif not self._send(session, application, candidate_info):
+                        return STATUS_CLAIMED_ELSEWHERE
+                return application.status
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Error processing application {application_id} at stage '{application.stage}': {e}")
+                application.status = STATUS_FAILED
+                application.last_error = str(e)
+                session.commit()
+                return application.status
+        finally:
+            session.close()
+
+    def _checkpoint(self, session, application: Application, stage: str):
+        application.stage = stage
+        application.last_error = None
+        if application.status in (STATUS_FAILED, STATUS_DEFERRED):
+            application.status = STATUS_PENDING
+        session.commit()
+
+    def _store_artifact(self, application: Application, column: str, value):
+        """
+        Records a generated document in the artifact store.
+
+        LaTeX sources get their hash recorded next to them. Compiled PDFs are
+        moved into the store, and the path of the stored copy is returned so
+        the application's attachments survive later runs. Stored files are
+        named by their hash, so _send attaches them under a readable name.
+        """
+        store = self.artifact_store
+        if store is None:
+            return value
+        if column in ("resume_tex", "cover_letter_tex"):
+            setattr(application, f"{column}_hash", store.put(value))
+        elif column in ("resume_pdf_path", "cover_letter_pdf_path"):
+            digest = store.put_file(value)
+            setattr(application, column.replace("_path", "_hash"), digest)
+            stored = str(store.path(digest))
+            if Path(value).resolve() != Path(stored).resolve():
+                Path(value).unlink(missing_ok=True)
+            return stored
+        return value
+
+    def _analyze(self, session, application: Application):
+        job_details = self.manager.handle_job_description(application.job_description)
+        application.job_analysis = json.dumps(job_details)
+        self._checkpoint(session, application, ANALYZED)
+
+    def _generate(self, session, application: Application, resume_content: str, candidate_info: Dict,
+                  compile: bool = True):
+        """
+        Generates and compiles the application documents concurrently.
+
+        Resume customization, cover letter generation and email drafting run
+        in parallel, and each PDF is compiled as soon as its LaTeX is ready.
+        Results are checkpointed one by one as they arrive, so a failure in
+        one branch does not throw away the others. With compile=False the
+        application stops at CUSTOMIZED; running this again then only
+        compiles, since the generated LaTeX and email are reused.
+        """
+        job_details = json.loads(application.job_analysis)
+        ai_client = self.manager.ai_client
+        latex_handler = self.manager.latex_handler
+        graph = TaskGraph()
+        documents = [
+            ("resume", lambda: ai_client.customize_resume(
+                job_details, resume_content, company_name=application.company_name
+            ), "customize"),
+            ("cover_letter", lambda: ai_client.generate_cover_letter(
+                job_details, candidate_info, company_name=application.company_name
+            ), "cover_letter"),
+        ]
+        for document, generate, stage in documents:
+            tex_column, pdf_column = f"{document}_tex", f"{document}_pdf_path"
+            if getattr(application, tex_column):
+                graph.add_value(tex_column, getattr(application, tex_column))
+            else:
+                graph.add(tex_column, metrics.wrap(generate, "pipeline_stage", stage=stage))
+            pdf_path = getattr(application, pdf_column)
+            if compile and (not pdf_path or not Path(pdf_path).exists()):
+                output_name = f"{document}_{application.id}"
+                graph.add(pdf_column, metrics.wrap(
+                    lambda content, name=output_name: latex_handler.compile_latex(content, name),
+                    "pipeline_stage", stage="compile"
+                ), tex_column)
+        if not application.email_body:
+            graph.add("email_body", metrics.wrap(
+                lambda: ai_client.draft_application_email(job_details, candidate_info),
+                "pipeline_stage", stage="email_body"
+            ))
+
+        def checkpoint(column, value):
+            setattr(application, column, self._store_artifact(application, column, value))
+            if (application.stage == ANALYZED and application.resume_tex and application.cover_letter_tex
+                    and application.email_body):
+                application.stage = CUSTOMIZED
+            session.commit()
+
+        graph.run(on_result=checkpoint)
+        self._checkpoint(session, application, COMPILED if compile else CUSTOMIZED)
+
+    def _communicator(self, session, application: Application):
+        """The email communicator of the candidate the application's run belongs to."""
+        run = session.get(BatchRun, application.batch_run_id) if application.batch_run_id else None
+        if run is None or run.candidate_id is None:
+            return self.manager.email_communicator
+        with self._lock:
+            if run.candidate_id not in self._communicators:
+                candidate = session.get(Candidate, run.candidate_id)
+                self._communicators[run.candidate_id] = (
+                    candidate_communicator(candidate) or self.manager.email_communicator
+                )
+            return self._communicators[run.candidate_id]
+
+    def _send(self, session, application: Application, candidate_info: Dict) -> bool:
+        """
+        Sends an application's email.
+
+        Returns:
+            False if another worker claimed the send first, True otherwise
+        """
+        if not application.contact_email:
+            raise ValueError("No contact email for application")
+
+        communicator = self._communicator(session, application)
+        email_content = communicator.compose_email(
+            template="application",
+            details={
+                "to": application.contact_email,
+                "company_name": application.company_name,
+                "position_title": application.position_title,
+                "candidate_name": candidate_info.get("name", ""),
+                "custom_content": application.email_body or "",
+                "attachments": [
+                    (application.resume_pdf_path, f"resume_{application.id}.pdf"),
+                    (application.cover_letter_pdf_path, f"cover_letter_{application.id}.pdf"),
+                ],
+            }
+        )
+        email_content["message_id"] = make_msgid()
+
+        # Claim the send with a compare-and-set, so that of several workers
+        # holding the same compiled application only one sends it
+        claimed = session.execute(
+            update(Application)
+            .where(Application.id == application.id, Application.stage == COMPILED)
+            .values(stage=SENDING)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not claimed:
+            session.rollback()
+            session.refresh(application)
+            logger.info(f"Application {application.id} is already being sent by another worker; skipping")
+            return False
+
+        # Record the attempt before talking to the SMTP server so that a crash
+        # mid-send is detected on resume instead of sending again
+        email = Email(
+            application_id=application.id,
+            message_id=email_content["message_id"],
+            subject=email_content["subject"],
+            content=email_content["body"],
+            status=SENDING,
+        )
+        session.add(email)
+        application.stage = SENDING
+        session.commit()
+
+        try:
+            with metrics.timer("pipeline_stage", stage="send"):
+                communicator.send_email(email_content)
+        except RETRYABLE_SEND_ERRORS:
+            # The message never reached the server, so it is safe to try again
+            email.status = STATUS_FAILED
+            application.stage = COMPILED
+            session.commit()
+            raise
+        except Exception as e:
+            email.status = STATUS_SEND_UNKNOWN
+            application.status = STATUS_SEND_UNKNOWN
+            application.last_error = str(e)
+            session.commit()
+            logger.error(f"Delivery of application {application.id} is unknown: {e}")
+            return True
+
+        email.status = SENT
+        email.sent_date = datetime.utcnow()
+        application.status = STATUS_SUBMITTED
+        application.submission_date = datetime.utcnow()
+        self._checkpoint(session, application, SENT)
+        return True
@@ -0,0 +1,246 @@
+import logging
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+import numpy as np
+
+from ..utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOP_K = 12
+EMBED_BATCH_SIZE = 64
+
+ITEM_PATTERN = re.compile(r"\\item\b\s*(?:\[[^\]]*\])?")
+LIST_PATTERN = re.compile(r"(\\begin\{(itemize|enumerate)\})(.*?)(\\end\{\2\})", re.DOTALL)
+
+
+def normalize_bullet(text: str) -> str:
+    """Collapses whitespace and drops LaTeX comments so equal bullets compare equal."""
+    text = re.sub(r"(?<!\\)%.*", "", text)
+    return " ".join(text.split())
+
+
+def _split_items(body: str) -> Tuple[str, List[str]]:
+    """Splits a list environment's body into the text before the first \\item and the items."""
+    starts = [m.start() for m in ITEM_PATTERN.finditer(body)]
+    if not starts:
+        return body, []
+    items = [body[start:end] for start, end in zip(starts, starts[1:] + [len(body)])]
+    return body[:starts[0]], items
+
+
+def _item_text(item: str) -> str:
+    return normalize_bullet(ITEM_PATTERN.sub("", item, count=1))
+
+
+def extract_bullets(latex: str) -> List[str]:
+    """
+    Extracts the bullet points of a resume.
+
+    Only the items of itemize/enumerate environments without nested lists
+    are taken, which covers the experience and project sections of
+    typical resumes.
+
+    Args:
+        latex: Resume in LaTeX format
+
+    Returns:
+        Normalized bullet texts in document order
+    """
+    bullets = []
+    for match in LIST_PATTERN.finditer(latex):
+        body = match.group(3)
+        if "\\begin{itemize}" in body or "\\begin{enumerate}" in body:
+            continue
+        for item in _split_items(body)[1]:
+            text = _item_text(item)
+            if text:
+                bullets.append(text)
+    return bullets
+
+
+def prune_bullets(latex: str, keep: Set[str]) -> str:
+    """
+    Removes the bullet points that are not in keep.
+
+    Lists keep at least their first item, so the document still compiles.
+
+    Args:
+        latex: Resume in LaTeX format
+        keep: Normalized texts of the bullets to keep
+
+    Returns:
+        The resume with the other bullets removed
+    """
+    def prune(match):
+        begin, _, body, end = match.groups()
+        if "\\begin{itemize}" in body or "\\begin{enumerate}" in body:
+            return match.group(0)
+        preamble, items = _split_items(body)
+        kept = [item for item in items if _item_text(item) in keep] or items[:1]
+        if kept and not kept[-1].endswith("\n"):
+            kept[-1] += "\n"
+        return begin + preamble + "".join(kept) + end
+
+    return LIST_PATTERN.sub(prune, latex)
+
+
+def job_queries(job_details: Dict) -> List[str]:
+    """Builds the retrieval queries for a job: its required skills and key responsibilities."""
+    queries = []
+    for key in ("required_skills", "key_responsibilities"):
+        value = job_details.get(key) or []
+        queries.extend([value] if isinstance(value, str) else value)
+    return [str(q) for q in queries if str(q).strip()]
+
+
+class BulletLibrary:
+    """
+    Embedding index of a candidate's resume bullets, persisted as a .npz file.
+
+    Bullets are embedded once when added. Vectors are kept L2-normalized in
+    one float32 matrix, so retrieval is a single matrix product followed by
+    a partial sort, which takes well under 10 ms for thousands of bullets.
+
+    Args:
+        embed: Callable turning a list of texts into an (n, d) array
+        path: File the index is saved to and loaded from
+    """
+
+    def __init__(self, embed: Callable[[List[str]], np.ndarray], path: Optional[Union[str, Path]] = None):
+        self.embed = embed
+        self.path = Path(path) if path else None
+        self.bullets: List[str] = []
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self._index: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        if self.path and self.path.exists():
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self.bullets)
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        batches = [self.embed(texts[i:i + EMBED_BATCH_SIZE]) for i in range(0, len(texts), EMBED_BATCH_SIZE)]
+        return self._normalize(np.vstack(batches))
+
+    def add(self, bullets: Iterable[str]) -> int:
+        """
+        Embeds and adds bullets that are not in the library yet.
+
+        Args:
+            bullets: Bullet texts
+
+        Returns:
+            Number of bullets added
+        """
+        new = []
+        for bullet in bullets:
+            bullet = normalize_bullet(bullet)
+            if bullet and bullet not in self._index and bullet not in new:
+                new.append(bullet)
+        if not new:
+            return 0
+        vectors = self._embed(new)
+        with self._lock:
+            # Another thread may have added some of them while we were embedding
+            fresh = [i for i, bullet in enumerate(new) if bullet not in self._index]
+            new, vectors = [new[i] for i in fresh], vectors[fresh]
+            if new:
+                self.vectors = vectors if not self.bullets else np.vstack([self.vectors, vectors])
+                self._index.update({bullet: len(self.bullets) + i for i, bullet in enumerate(new)})
+                self.bullets = self.bullets + new
+        return len(new)
+
+    def add_resume(self, latex: str) -> int:
+        """Adds the bullets of a LaTeX resume; returns the number of new bullets."""
+        return self.add(extract_bullets(latex))
+
+    def search(self, queries: List[str], k: int = DEFAULT_TOP_K) -> List[Tuple[str, float]]:
+        """
+        Finds the bullets most similar to any of the queries.
+
+        Args:
+            queries: Query texts, embedded in one call
+            k: Number of bullets to return
+
+        Returns:
+            (bullet, cosine similarity) pairs, best first
+        """
+        with self._lock:
+            bullets, vectors = self.bullets, self.vectors
+        if not bullets or not queries:
+            return []
+        query_vectors = self._normalize(self.embed(list(queries)))
+        with metrics.timer("bullet_retrieval"):
+            scores = (query_vectors @ vectors.T).max(axis=0)
+            k = min(k, len(bullets))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+        return [(bullets[i], float(scores[i])) for i in top]
+
+    def focus_resume(self, latex: str, job_details: Dict, k: int = DEFAULT_TOP_K) -> Tuple[str, List[str]]:
+        """
+        Reduces a resume to the bullets most relevant to a job.
+
+        Args:
+            latex: Resume in LaTeX format
+            job_details: Job analysis with required_skills and key_responsibilities
+            k: Number of bullets to retrieve
+
+        Returns:
+            The resume with its other bullets removed, and the retrieved
+            bullets that come from other resumes in the library
+        """
+        resume_bullets = extract_bullets(latex)
+        self.add(resume_bullets)
+        relevant = [bullet for bullet, _ in self.search(job_queries(job_details), k)]
+        if not relevant:
+            return latex, []
+        present = set(resume_bullets)
+        focused = prune_bullets(latex, set(relevant)) if len(present) > k else latex
+        return focused, [bullet for bullet in relevant if bullet not in present]
+
+    def save(self, path: Optional[Union[str, Path]] = None):
+        """
+        Writes the index to disk atomically.
+
+        Args:
+            path: Destination, defaults to the library's path
+        """
+        path = Path(path or self.path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".npz")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, vectors=self.vectors, bullets=np.array(self.bullets, dtype=str))
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    def load(self, path: Optional[Union[str, Path]] = None):
+        """
+        Reads the index from disk.
+
+        Args:
+            path: Source, defaults to the library's path
+        """
+        with np.load(path or self.path, allow_pickle=False) as data:
+            self.vectors = data["vectors"].astype(np.float32)
+            self.bullets = [str(bullet) for bullet in data["bullets"]]
+        self._index = {bullet: i for i, bullet in enumerate(self.bullets)}
+        logger.info(f"Loaded {len(self.bullets)} bullets from {path or self.path}")
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import logging
+import threading
+from typing import Dict, Optional
+
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from ..db.models import CandidateProfile, Session
+from ..utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Bump when the profile prompt or fields change, so stored profiles are rebuilt
+PROFILE_VERSION = 1
+PROFILE_FIELDS = ("name", "headline", "contact", "skills", "roles", "achievements", "education")
+
+
+def resume_hash(resume_content: str) -> str:
+    """SHA-256 of a resume, identifying the profile distilled from it."""
+    return hashlib.sha256(resume_content.encode("utf-8")).hexdigest()
+
+
+def _is_empty(value) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def merge_profile(profile: Dict, candidate_info: Optional[Dict] = None) -> Dict:
+    """
+    Combines a distilled profile with candidate details given explicitly.
+
+    Args:
+        profile: Profile distilled from the resume
+        candidate_info: Details from the user, which take precedence
+
+    Returns:
+        The profile fields and the candidate details, without empty values
+    """
+    merged = {key: profile[key] for key in PROFILE_FIELDS if not _is_empty(profile.get(key))}
+    merged.update({key: value for key, value in (candidate_info or {}).items() if not _is_empty(value)})
+    return merged
+
+
+class CandidateProfileStore:
+    """
+    Distills each resume once into a compact, versioned candidate profile.
+
+    Profiles are stored in the database keyed by the resume's SHA-256 and
+    PROFILE_VERSION, so editing the resume (or changing the profile format)
+    produces a new profile while every other call reuses the stored one.
+    Profiles are also kept in memory, and concurrent callers wait for a
+    single distillation instead of each making an LLM call. If the database
+    cannot be used (e.g. it was never initialized), profiles are only kept
+    in memory.
+
+    Args:
+        ai_client: MistralAIClient used to distill profiles
+        session_factory: Callable returning a new SQLAlchemy session
+    """
+
+    def __init__(self, ai_client, session_factory=Session):
+        self.ai_client = ai_client
+        self.session_factory = session_factory
+        self._profiles: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def cached(self, resume_content: str) -> Optional[Dict]:
+        """
+        Looks up a resume's profile without distilling it.
+
+        Args:
+            resume_content: Resume the profile was distilled from
+
+        Returns:
+            The profile, or None if it was never distilled
+        """
+        digest = resume_hash(resume_content)
+        profile = self._profiles.get(digest)
+        if profile is not None:
+            return profile
+        session = self.session_factory()
+        try:
+            row = (
+                session.query(CandidateProfile)
+                .filter(CandidateProfile.resume_hash == digest, CandidateProfile.version == PROFILE_VERSION)
+                .first()
+            )
+        except SQLAlchemyError as e:
+            logger.warning(f"Could not read stored candidate profiles: {e}")
+            return None
+        finally:
+            session.close()
+        if row is None:
+            return None
+        profile = self._profiles[digest] = json.loads(row.profile)
+        return profile
+
+    def store(self, resume_content: str, profile: Dict):
+        """
+        Saves a resume's profile.
+
+        Args:
+            resume_content: Resume the profile was distilled from
+            profile: The profile
+        """
+        digest = resume_hash(resume_content)
+        self._profiles[digest] = profile
+        session = self.session_factory()
+        try:
+            session.add(CandidateProfile(resume_hash=digest, version=PROFILE_VERSION, profile=json.dumps(profile)))
+            session.commit()
+        except IntegrityError:
+            # Another process stored the same resume's profile first
+            session.rollback()
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.warning(f"Could not store the candidate profile: {e}")
+        finally:
+            session.close()
+
+    def get(self, resume_content: str) -> Dict:
+        """
+        Returns a resume's profile, distilling it on first use.
+
+        Args:
+            resume_content: Resume in LaTeX format
+
+        Returns:
+            Profile with name, headline, contact, skills, roles,
+            achievements and education
+        """
+        profile = self.cached(resume_content)
+        if profile is not None:
+            return profile
+        with self._lock:
+            profile = self.cached(resume_content)
+            if profile is None:
+                with metrics.timer("candidate_profile"):
+                    profile = self.ai_client.extract_candidate_profile(resume_content)
+                self.store(resume_content, profile)
+        return profile
+
+    def candidate_details(self, resume_content: str, candidate_info: Optional[Dict] = None) -> Dict:
+        """
+        Builds candidate details to send in place of the resume text.
+
+        Used where the resume would otherwise be sent as the candidate's
+        details, e.g. by `job-automator cover`. Prompts that edit or review
+        the LaTeX need the resume itself, and prompts that are given explicit
+        candidate details do not need either.
+
+        Args:
+            resume_content: Resume in LaTeX format
+            candidate_info: Details from the user, which take precedence
+
+        Returns:
+            merge_profile() of the resume's profile and the details
+        """
+        return merge_profile(self.get(resume_content), candidate_info)
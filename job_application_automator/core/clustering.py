@@ -0,0 +1,158 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .latex_template import escape_latex
+from .skills import SKILL_FIELDS, SkillCorpus, taxonomy
+
+DEFAULT_MIN_SIMILARITY = 0.8
+DEFAULT_MAX_ITERATIONS = 50
+
+SUMMARY_SECTION_PATTERN = re.compile(r"\\section\*?\{\s*(?:Summary|Profile|Objective|About Me)\s*\}[^\n]*\n",
+                                     re.IGNORECASE)
+
+
+def skill_vectors(analyses: List[Dict]) -> Tuple[np.ndarray, List[str]]:
+    """
+    Turns job analyses into L2-normalized skill vectors.
+
+    Skills are normalized through the skill taxonomy, so "python3" and
+    "Python 3.x" share a column.
+
+    Args:
+        analyses: Job analyses as returned by analyze_job_description
+
+    Returns:
+        (n, vocabulary size) array and the vocabulary's canonical names
+    """
+    return SkillCorpus.from_analyses(analyses).vectors()
+
+
+def kmeans(vectors: np.ndarray, k: int, seed: int = 0,
+           max_iterations: int = DEFAULT_MAX_ITERATIONS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Spherical k-means (cosine similarity) with k-means++ initialization.
+
+    Args:
+        vectors: L2-normalized rows to cluster
+        k: Number of clusters
+        seed: Seed for the initialization
+        max_iterations: Upper bound on assignment/update rounds
+
+    Returns:
+        Cluster label of each row, and the normalized centroids
+    """
+    n = len(vectors)
+    k = max(1, min(k, n))
+    rng = np.random.default_rng(seed)
+    centroids = [vectors[rng.integers(n)]]
+    distances = 1.0 - vectors @ centroids[0]
+    for _ in range(1, k):
+        total = distances.clip(min=0).sum()
+        index = rng.choice(n, p=distances.clip(min=0) / total) if total > 0 else rng.integers(n)
+        centroids.append(vectors[index])
+        distances = np.minimum(distances, 1.0 - vectors @ vectors[index])
+    centroids = np.array(centroids)
+
+    labels = np.full(n, -1)
+    for _ in range(max_iterations):
+        new_labels = np.argmax(vectors @ centroids.T, axis=1)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for cluster in range(k):
+            members = vectors[labels == cluster]
+            if len(members):
+                centroid = members.sum(axis=0)
+                norm = np.linalg.norm(centroid)
+                centroids[cluster] = centroid / norm if norm else centroid
+    return labels, centroids
+
+
+def cluster_analyses(analyses: List[Dict], min_similarity: float = DEFAULT_MIN_SIMILARITY,
+                     seed: int = 0) -> np.ndarray:
+    """
+    Groups job analyses whose skills are near-identical.
+
+    The number of clusters is doubled, starting from one, until every job
+    has at least min_similarity cosine similarity to its cluster's centroid.
+
+    Args:
+        analyses: Job analyses
+        min_similarity: Required similarity of each job to its centroid
+        seed: Seed for k-means
+
+    Returns:
+        Cluster label of each analysis; labels are 0..k-1
+    """
+    labels = np.zeros(len(analyses), dtype=int)
+    if not analyses:
+        return labels
+    vectors, _ = skill_vectors(analyses)
+    # Jobs without any skills form a cluster of their own
+    has_skills = vectors.any(axis=1)
+    vectors = vectors[has_skills]
+    if len(vectors):
+        k = 1
+        while True:
+            cluster_labels, centroids = kmeans(vectors, k, seed)
+            similarity = np.einsum("ij,ij->i", vectors, centroids[cluster_labels])
+            if k >= len(vectors) or similarity.min() >= min_similarity:
+                break
+            k = min(len(vectors), k * 2)
+        # Renumber so that empty clusters leave no gaps
+        _, cluster_labels = np.unique(cluster_labels, return_inverse=True)
+        labels[has_skills] = cluster_labels
+        labels[~has_skills] = cluster_labels.max() + 1
+    return labels
+
+
+def representative_details(analyses: List[Dict]) -> Dict:
+    """
+    Builds the job details a cluster's shared resume is customized for.
+
+    The most typical member's analysis is used, with its skills replaced by
+    those that at least half of the members ask for.
+
+    Args:
+        analyses: Analyses of the cluster's jobs
+
+    Returns:
+        Job details for customize_resume
+    """
+    vectors, _ = skill_vectors(analyses)
+    centroid = vectors.mean(axis=0)
+    medoid = dict(analyses[int(np.argmax(vectors @ centroid))])
+    threshold = math.ceil(len(analyses) / 2)
+    for field in SKILL_FIELDS:
+        counts = Counter(
+            skill for analysis in analyses
+            for skill in dict.fromkeys(taxonomy.canonical(s) for s in analysis.get(field) or [] if str(s).strip())
+        )
+        medoid[field] = [skill for skill, count in counts.most_common() if count >= threshold]
+    return medoid
+
+
+def touch_up_resume(latex: str, company: str, position: Optional[str] = None) -> str:
+    """
+    Adapts a cluster's shared resume to one company without an LLM call.
+
+    A single targeting line naming the company and role is added at the
+    start of the summary section, if the resume has one.
+
+    Args:
+        latex: Shared customized resume
+        company: Company applied to
+        position: Position title
+
+    Returns:
+        The resume for this company
+    """
+    if not company:
+        return latex
+    role = f"the {position} role" if position else "this role"
+    line = escape_latex(f"Applying for {role} at {company}.")
+    return SUMMARY_SECTION_PATTERN.sub(lambda m: m.group(0) + line + "\n\n", latex, count=1)
@@ -1,24 +1,116 @@
 import os
 import smtplib
+import threading
+import time
+from collections import OrderedDict
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.application import MIMEApplication
-from typing import Dict, List
+from email.utils import make_msgid
+from typing import Dict, List, Optional, Tuple
 import logging
 from datetime import datetime
 
+from ..db import async_db
 from ..db.models import EmailTemplate, Session
+from ..utils.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+class AttachmentCache:
+    """
+    Bounded LRU cache of encoded MIME attachment parts.
+    
+    Parts are keyed by absolute path, modification time, size and the name
+    the file is attached under, so a file that changes on disk is re-read,
+    while the same resume attached to many emails is read and base64-encoded
+    only once. Cached parts are attached to messages by reference.
+    """
+    
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._parts = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, path: str, filename: Optional[str] = None) -> MIMEApplication:
+        """
+        Returns the encoded MIME part for a file, reading it only on a miss.
+        
+        Args:
+            path: Path to the attachment
+            filename: Name the recipient sees, defaults to the file's name
+            
+        Returns:
+            MIMEApplication part with Content-Disposition set
+        """
+        path = os.path.abspath(path)
+        filename = filename or os.path.basename(path)
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size, filename)
+        
+        with self._lock:
+            part = self._parts.get(key)
+            if part is not None:
+                self._parts.move_to_end(key)
+                self.hits += 1
+                metrics.inc("attachment_cache", result="hit")
+                return part
+        
+        with open(path, "rb") as f:
+            part = MIMEApplication(f.read(), Name=filename)
+        part["Content-Disposition"] = f'attachment; filename="{filename}"'
+        size = len(part.get_payload())
+        
+        with self._lock:
+            self.misses += 1
+            metrics.inc("attachment_cache", result="miss")
+            if size > self.max_bytes or key in self._parts:
+                return self._parts.get(key, part)
+            self._parts[key] = part
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._parts.popitem(last=False)
+                self.current_bytes -= len(evicted.get_payload())
+        return part
+    
+    def stats(self) -> Dict:
+        """Returns hit/miss counts and current memory use."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._parts),
+                "bytes": self.current_bytes,
+            }
+
 class EmailCommunicator:
-    """Handles email communication for job applications."""
+    """
+    Handles email communication for job applications.
     
-    def __init__(self):
-        self.smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-        self.smtp_port = int(os.getenv("SMTP_PORT", "587"))
-        self.username = os.getenv("EMAIL_USERNAME")
-        self.password = os.getenv("EMAIL_PASSWORD")
+    SMTP settings default to the environment; a candidate with their own
+    mailbox passes theirs, along with templates that take precedence over
+    the shared ones in the database.
+    """
+    
+    def __init__(self, smtp_server: Optional[str] = None, smtp_port: Optional[int] = None,
+                 username: Optional[str] = None, password: Optional[str] = None,
+                 templates: Optional[Dict[str, Dict]] = None):
+        self.smtp_server = smtp_server or os.getenv("SMTP_SERVER", "smtp.gmail.com")
+        self.smtp_port = int(smtp_port or os.getenv("SMTP_PORT", "587"))
+        self.username = username or os.getenv("EMAIL_USERNAME")
+        self.password = password or os.getenv("EMAIL_PASSWORD")
+        self.template_overrides = {
+            name: (template["subject"], template["content"]) for name, template in (templates or {}).items()
+        }
+        self.use_starttls = os.getenv("SMTP_STARTTLS", "true").lower() != "false"
+        self.template_cache_ttl = float(os.getenv("TEMPLATE_CACHE_TTL", "60"))
+        self._templates = {}
+        self.attachment_cache = AttachmentCache(
+            max_bytes=int(os.getenv("ATTACHMENT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+        )
         
         if not all([self.smtp_server, self.smtp_port, self.username, self.password]):
             raise ValueError("Missing required email configuration")
@@ -35,33 +127,93 @@ class EmailCommunicator:
             Dictionary containing email details
         """
         try:
-            session = Session()
-            email_template = session.query(EmailTemplate).filter_by(name=template).first()
-            
-            if not email_template:
-                raise ValueError(f"Email template '{template}' not found")
-            
-            content = email_template.content.format(**details)
-            subject = email_template.subject.format(**details)
+            return self._fill(self._get_template(template), details)
+        except Exception as e:
+            logger.error(f"Error composing email: {e}")
+            raise
+    
+    async def acompose_email(self, template: str, details: Dict) -> Dict:
+        """
+        Composes an email like compose_email, without blocking the event loop.
+        
+        The template is loaded through the async database layer, so many
+        coroutines can compose emails while their queries run concurrently.
+        
+        Args:
+            template: Name of the template to use
+            details: Dictionary containing details to fill in template
             
-            return {
-                "to": details.get("to"),
-                "subject": subject,
-                "body": content,
-                "attachments": details.get("attachments", [])
-            }
+        Returns:
+            Dictionary containing email details
+        """
+        try:
+            return self._fill(await self._aget_template(template), details)
         except Exception as e:
             logger.error(f"Error composing email: {e}")
             raise
+    
+    def _fill(self, template: Tuple[str, str], details: Dict) -> Dict:
+        subject_template, content_template = template
+        return {
+            "to": details.get("to"),
+            "subject": subject_template.format(**details),
+            "body": content_template.format(**details),
+            "attachments": details.get("attachments", [])
+        }
+    
+    def _cached_template(self, name: str) -> Optional[Tuple[str, str]]:
+        if name in self.template_overrides:
+            return self.template_overrides[name]
+        cached = self._templates.get(name)
+        if cached and time.monotonic() - cached[0] < self.template_cache_ttl:
+            return cached[1]
+        return None
+    
+    def _get_template(self, name: str) -> Tuple[str, str]:
+        """
+        Gets a template's subject and content, caching them for a short time.
+        
+        Args:
+            name: Name of the template
+            
+        Returns:
+            Tuple of (subject, content)
+        """
+        cached = self._cached_template(name)
+        if cached is not None:
+            return cached
+        
+        session = Session()
+        try:
+            email_template = session.query(EmailTemplate).filter_by(name=name).first()
+            if not email_template:
+                raise ValueError(f"Email template '{name}' not found")
+            value = (email_template.subject, email_template.content)
         finally:
             session.close()
+        self._templates[name] = (time.monotonic(), value)
+        return value
+    
+    async def _aget_template(self, name: str) -> Tuple[str, str]:
+        """Async counterpart of _get_template, sharing its cache."""
+        cached = self._cached_template(name)
+        if cached is not None:
+            return cached
+        
+        email_template = await async_db.get_email_template(name)
+        if not email_template:
+            raise ValueError(f"Email template '{name}' not found")
+        value = (email_template.subject, email_template.content)
+        self._templates[name] = (time.monotonic(), value)
+        return value
     
     def send_email(self, email_details: Dict) -> bool:
         """
         Sends an email with attachments.
         
         Args:
-            email_details: Dictionary containing email details
+            email_details: Dictionary containing email details; each attachment
+                is a path or a (path, filename) pair
             
         Returns:
             Boolean indicating success
@@ -71,19 +223,23 @@ class EmailCommunicator:
             msg["From"] = self.username
             msg["To"] = email_details["to"]
             msg["Subject"] = email_details["subject"]
+            msg["Message-ID"] = email_details.get("message_id") or make_msgid()
             
             msg.attach(MIMEText(email_details["body"], "plain"))
             
             for attachment in email_details.get("attachments", []):
-                with open(attachment, "rb") as f:
-                    part = MIMEApplication(f.read(), Name=os.path.basename(attachment))
-                    part["Content-Disposition"] = f'attachment; filename="{os.path.basename(attachment)}"'
-                    msg.attach(part)
+                if isinstance(attachment, (list, tuple)):
+                    msg.attach(self.attachment_cache.get(*attachment))
+                else:
+                    msg.attach(self.attachment_cache.get(attachment))
             
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.username, self.password)
-                server.send_message(msg)
+            with metrics.timer("smtp_send"):
+                with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
+                    if self.use_starttls:
+                        server.starttls()
+                    server.login(self.username, self.password)
+                    server.send_message(msg)
+            metrics.inc("emails_sent")
             
             return True
         except Exception as e:
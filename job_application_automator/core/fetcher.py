@@ -0,0 +1,365 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
+from urllib.parse import urlsplit
+
+import httpx
+
+from ..utils.config import get_fetch_config
+from ..utils.metrics import metrics
+from .ingestion import normalize_url
+
+logger = logging.getLogger(__name__)
+
+# Result statuses of JobFetcher.fetch()
+FETCHED = "fetched"
+NOT_MODIFIED = "not_modified"
+ERROR = "error"
+
+# Elements whose text is never part of a posting
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "nav", "header", "footer", "aside", "form",
+             "iframe", "button", "select"}
+BLOCK_TAGS = {"p", "div", "br", "li", "ul", "ol", "h1", "h2", "h3", "h4", "h5", "h6", "section", "article",
+              "main", "tr", "table", "dd", "dt", "blockquote", "pre", "hr"}
+VOID_TAGS = {"br", "hr", "img", "input", "meta", "link", "area", "base", "col", "embed", "source", "track", "wbr"}
+# Elements that hold the posting itself, when the page marks it up
+CONTENT_TAGS = {"main", "article"}
+CONTENT_HINT_PATTERN = re.compile(r"job[-_ ]?(description|details|posting|body)|posting[-_ ]?(body|content)",
+                                  re.IGNORECASE)
+# A marked-up content element shorter than this is probably a teaser; the whole body is used instead
+MIN_CONTENT_CHARS = 200
+WHITESPACE_PATTERN = re.compile(r"[ \t\r\f\v\xa0]+")
+
+
+class _TextExtractor(HTMLParser):
+    """Collects the visible text of a page, separately for the whole body and its content elements."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.body: List[str] = []
+        self.content: List[str] = []
+        self.json_ld: List[str] = []
+        self._open = Counter()
+        self._skipping: List[tuple] = []
+        self._in_content: List[tuple] = []
+        self._ld_depth = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            if tag in BLOCK_TAGS:
+                self._newline()
+            return
+        self._open[tag] += 1
+        attrs = dict(attrs)
+        if tag == "script" and (attrs.get("type") or "").lower() == "application/ld+json":
+            self._ld_depth = self._open[tag]
+            self.json_ld.append("")
+        elif tag in SKIP_TAGS:
+            self._skipping.append((tag, self._open[tag]))
+        elif tag in CONTENT_TAGS or CONTENT_HINT_PATTERN.search(f"{attrs.get('id') or ''} {attrs.get('class') or ''}"):
+            self._in_content.append((tag, self._open[tag]))
+        if tag in BLOCK_TAGS:
+            self._newline()
+
+    def handle_endtag(self, tag):
+        if not self._open[tag]:
+            return
+        if tag == "script" and self._ld_depth == self._open[tag]:
+            self._ld_depth = None
+        if self._skipping and self._skipping[-1] == (tag, self._open[tag]):
+            self._skipping.pop()
+        if self._in_content and self._in_content[-1] == (tag, self._open[tag]):
+            self._in_content.pop()
+        self._open[tag] -= 1
+        if tag in BLOCK_TAGS:
+            self._newline()
+
+    def handle_data(self, data):
+        if self._ld_depth is not None:
+            self.json_ld[-1] += data
+            return
+        if self._skipping:
+            return
+        self.body.append(data)
+        if self._in_content:
+            self.content.append(data)
+
+    def _newline(self):
+        self.body.append("\n")
+        if self._in_content:
+            self.content.append("\n")
+
+
+def _join(parts: List[str]) -> str:
+    lines = (WHITESPACE_PATTERN.sub(" ", line).strip() for line in "".join(parts).splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def _job_posting(json_ld: List[str]) -> Optional[Dict]:
+    """Finds a schema.org JobPosting among a page's JSON-LD blocks."""
+    for block in json_ld:
+        try:
+            data = json.loads(block)
+        except json.JSONDecodeError:
+            continue
+        items = data if isinstance(data, list) else data.get("@graph", [data]) if isinstance(data, dict) else []
+        for item in items:
+            if isinstance(item, dict) and item.get("@type") == "JobPosting" and item.get("description"):
+                return item
+    return None
+
+
+def extract_job_posting(html: str) -> Dict:
+    """
+    Extracts the text, title and company of a job posting from an HTML page.
+
+    The title and company are only known when the page publishes a
+    schema.org JobPosting; see extract_job_text() for how the text is found.
+
+    Args:
+        html: Page content
+
+    Returns:
+        Dictionary with text, title and company_name (None when unknown)
+    """
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+
+    posting = _job_posting(parser.json_ld)
+    if posting is not None:
+        organization = posting.get("hiringOrganization")
+        company = organization.get("name") if isinstance(organization, dict) else organization
+        title, company = (
+            value.strip() if isinstance(value, str) and value.strip() else None for value in (posting.get("title"), company)
+        )
+        description = extract_job_text(str(posting["description"]))
+        return {"text": "\n".join([line for line in (title, company) if line] + [description]),
+                "title": title, "company_name": company}
+
+    content = _join(parser.content)
+    return {"text": content if len(content) >= MIN_CONTENT_CHARS else _join(parser.body),
+            "title": None, "company_name": None}
+
+
+def extract_job_text(html: str) -> str:
+    """
+    Extracts the text of a job posting from an HTML page.
+
+    A schema.org JobPosting in the page's JSON-LD is preferred, since job
+    boards publish the full posting there for search engines. Otherwise
+    the text of the <main>/<article> element, or of an element whose id or
+    class names the job description, is used. Pages with neither fall back
+    to all text outside navigation, headers, footers, forms and scripts.
+
+    Args:
+        html: Page content
+
+    Returns:
+        Plain text with one block element per line
+    """
+    return extract_job_posting(html)["text"]
+
+
+class FetchCache:
+    """
+    On-disk cache of fetched postings, keyed by normalized URL.
+
+    Each entry is a small JSON file with the validators the server sent
+    (ETag, Last-Modified), the extracted text and, once available, the
+    posting's analysis, so an unchanged posting is neither downloaded nor
+    analyzed again.
+
+    Args:
+        root: Directory to keep entries in
+    """
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, url: str) -> Path:
+        digest = hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+        return self.root / digest[:2] / f"{digest}.json"
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Returns the cached entry of a URL, or None."""
+        try:
+            with open(self._path(url), "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, url: str, entry: Dict):
+        """Stores the entry of a URL atomically."""
+        path = self._path(url)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry, f)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+
+class JobFetcher:
+    """
+    Downloads job postings concurrently with conditional GETs.
+
+    Requests share one pooled HTTP client, so connections to a host are
+    kept alive and reused. At most concurrency requests run at once, and
+    at most per_host of them against the same host, so one job board is
+    never flooded. When a posting is cached, its ETag and Last-Modified are
+    sent back; a 304 reply returns the cached text and analysis without
+    downloading or analyzing the page again.
+
+    Args:
+        cache: Cache of earlier fetches, or None to always download
+        concurrency: Maximum requests in flight
+        per_host: Maximum requests in flight per host
+        timeout: Timeout of each request in seconds
+        client: HTTP client to use instead of a new pooled one
+    """
+
+    def __init__(self, cache: Optional[FetchCache] = None, concurrency: int = 16, per_host: int = 4,
+                 timeout: float = 20.0, client: Optional[httpx.Client] = None,
+                 user_agent: str = "job-application-automator"):
+        self.cache = cache
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.client = client or httpx.Client(
+            timeout=timeout,
+            follow_redirects=True,
+            headers={"User-Agent": user_agent},
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        )
+        self._host_slots = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> "JobFetcher":
+        """Creates a fetcher from the environment configuration."""
+        config = get_fetch_config()
+        return cls(
+            FetchCache(config["cache_dir"]),
+            concurrency=config["concurrency"],
+            per_host=config["per_host"],
+            timeout=config["timeout"],
+            user_agent=config["user_agent"],
+        )
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_slots[host]
+
+    def fetch(self, url: str) -> Dict:
+        """
+        Fetches one posting, revalidating the cached copy if there is one.
+
+        Args:
+            url: URL of the posting
+
+        Returns:
+            Dictionary with url, status (fetched, not_modified or error),
+            text, title and company_name from the page's JobPosting data
+            (None when it has none), the cached analysis if the posting is
+            unchanged, and error
+        """
+        entry = self.cache.get(url) if self.cache is not None else None
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            with self._host_slot(url):
+                with metrics.timer("fetch"):
+                    response = self.client.get(url, headers=headers)
+            if response.status_code == 304 and entry:
+                metrics.inc("fetch_not_modified")
+                return {"url": url, "status": NOT_MODIFIED, "text": entry["text"], "title": entry.get("title"),
+                        "company_name": entry.get("company_name"), "analysis": entry.get("analysis"), "error": None}
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.error(f"Error fetching {url}: {e}")
+            metrics.inc("fetch_errors")
+            return {"url": url, "status": ERROR, "text": None, "title": None, "company_name": None,
+                    "analysis": None, "error": str(e)}
+
+        content_type = response.headers.get("Content-Type", "")
+        if "html" in content_type or not content_type:
+            posting = extract_job_posting(response.text)
+        else:
+            posting = {"text": _join([response.text]), "title": None, "company_name": None}
+        text = posting["text"]
+        # Servers without validators still resend identical pages; keep their analysis
+        analysis = entry.get("analysis") if entry and entry.get("text") == text else None
+        if self.cache is not None:
+            self.cache.put(url, {
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "fetched_at": datetime.utcnow().isoformat(),
+                "text": text,
+                "title": posting["title"],
+                "company_name": posting["company_name"],
+                "analysis": analysis,
+            })
+        metrics.inc("fetch_downloaded")
+        return {"url": url, "status": FETCHED, "text": text, "title": posting["title"],
+                "company_name": posting["company_name"], "analysis": analysis, "error": None}
+
+    def _fetch_and_analyze(self, url: str, analyze: Optional[Callable[[str], Dict]]) -> Dict:
+        result = self.fetch(url)
+        if analyze is None or result["status"] == ERROR or result["analysis"] is not None:
+            return result
+        try:
+            result["analysis"] = analyze(result["text"])
+        except Exception as e:
+            logger.error(f"Error analyzing {url}: {e}")
+            result["error"] = str(e)
+            return result
+        if self.cache is not None:
+            entry = self.cache.get(url)
+            if entry is not None:
+                entry["analysis"] = result["analysis"]
+                self.cache.put(url, entry)
+        return result
+
+    def fetch_all(self, urls: Iterable[str], analyze: Optional[Callable[[str], Dict]] = None) -> Iterator[Dict]:
+        """
+        Fetches many postings concurrently, and analyzes the changed ones.
+
+        Args:
+            urls: Posting URLs; duplicates are fetched once
+            analyze: Called with the text of each new or changed posting,
+                e.g. JobApplicationManager.handle_job_description
+
+        Yields:
+            Results of fetch() with the analysis filled in, as they complete
+        """
+        unique = list(dict.fromkeys(url.strip() for url in urls if url.strip()))
+        with ThreadPoolExecutor(max_workers=max(1, min(self.concurrency, len(unique) or 1))) as executor:
+            futures = [executor.submit(self._fetch_and_analyze, url, analyze) for url in unique]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def close(self):
+        """Closes the pooled connections."""
+        self.client.close()
@@ -0,0 +1,286 @@
+import imaplib
+import logging
+import re
+from datetime import datetime
+from email.parser import BytesHeaderParser
+from email.utils import parseaddr
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import update
+
+from ..db.models import Application, Email, MailboxState, Session
+from ..utils.config import get_imap_config
+from ..utils.metrics import metrics
+from .batch import SENT, STATUS_BOUNCED, STATUS_REPLIED, STATUS_SEND_UNKNOWN, STATUS_SUBMITTED
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_BOUNCE_SCAN_BYTES = 16384
+
+# Only these headers are downloaded for each new message
+HEADER_FIELDS = "MESSAGE-ID IN-REPLY-TO REFERENCES FROM SUBJECT CONTENT-TYPE AUTO-SUBMITTED"
+
+MESSAGE_ID_PATTERN = re.compile(r"<[^<>\s]+>")
+UID_PATTERN = re.compile(rb"UID (\d+)")
+# Original Message-ID quoted in the body of a delivery status notification
+QUOTED_MESSAGE_ID_PATTERN = re.compile(r"^\s*Message-ID:\s*(<[^<>\s]+>)", re.IGNORECASE | re.MULTILINE)
+BOUNCE_SENDERS = {"mailer-daemon", "postmaster"}
+BOUNCE_SUBJECT_PATTERN = re.compile(
+    r"undeliver|delivery (status notification|failure|has failed)|returned mail|failure notice|mail delivery failed",
+    re.IGNORECASE,
+)
+
+# Statuses the sync may overwrite; anything else was set by hand
+UPDATABLE_STATUSES = (SENT, STATUS_SUBMITTED, STATUS_SEND_UNKNOWN, STATUS_REPLIED, STATUS_BOUNCED)
+
+
+def is_bounce(headers) -> bool:
+    """
+    Tells whether a message is a delivery failure report.
+
+    Args:
+        headers: Parsed message headers
+
+    Returns:
+        True for delivery status notifications and mailer-daemon messages
+    """
+    content_type = (headers.get("Content-Type") or "").lower()
+    if "multipart/report" in content_type and "delivery-status" in content_type:
+        return True
+    sender = parseaddr(headers.get("From") or "")[1].lower()
+    if sender.split("@", 1)[0] in BOUNCE_SENDERS:
+        return True
+    return BOUNCE_SUBJECT_PATTERN.search(headers.get("Subject") or "") is not None
+
+
+def referenced_ids(headers) -> List[str]:
+    """
+    Collects the Message-IDs a message refers to.
+
+    Args:
+        headers: Parsed message headers
+
+    Returns:
+        Message-IDs from In-Reply-To and References, most specific first
+    """
+    ids = []
+    for name in ("In-Reply-To", "References"):
+        for message_id in MESSAGE_ID_PATTERN.findall(headers.get(name) or ""):
+            if message_id not in ids:
+                ids.append(message_id)
+    return ids
+
+
+def connect_imap(config: Optional[Dict] = None) -> imaplib.IMAP4:
+    """
+    Opens an authenticated IMAP connection.
+
+    Args:
+        config: IMAP settings, defaults to get_imap_config()
+
+    Returns:
+        Logged-in imaplib client
+    """
+    config = config or get_imap_config()
+    if config["use_ssl"]:
+        imap = imaplib.IMAP4_SSL(config["host"], config["port"])
+    else:
+        imap = imaplib.IMAP4(config["host"], config["port"])
+    imap.login(config["username"], config["password"])
+    return imap
+
+
+class InboxSync:
+    """
+    Updates email and application statuses from replies and bounces.
+
+    Each sync fetches only messages whose UID is above the last one seen,
+    as long as the mailbox's UIDVALIDITY is unchanged. Only a few headers
+    are downloaded, in batched UID FETCH commands. Bounces whose headers do
+    not name the original message also get the start of their body
+    fetched. Messages are matched to sent Email rows through
+    In-Reply-To/References. Statuses are updated with one statement per
+    batch, in the same transaction that stores the new position. The cost
+    of a sync therefore grows with the amount of new mail, not with the
+    size of the mailbox.
+
+    Args:
+        connect: Callable returning a logged-in imaplib-compatible client
+        account: Name identifying the mailbox owner, e.g. the login
+        session_factory: Callable returning a new SQLAlchemy session
+        mailbox: Mailbox to read
+        batch_size: Messages fetched per FETCH command
+        bounce_scan_bytes: Bytes of a bounce's body searched for the
+            original Message-ID
+    """
+
+    def __init__(self, connect, account: str, session_factory=Session, mailbox: str = "INBOX",
+                 batch_size: int = DEFAULT_BATCH_SIZE, bounce_scan_bytes: int = DEFAULT_BOUNCE_SCAN_BYTES):
+        self.connect = connect
+        self.account = account
+        self.session_factory = session_factory
+        self.mailbox = mailbox
+        self.batch_size = batch_size
+        self.bounce_scan_bytes = bounce_scan_bytes
+        self._parser = BytesHeaderParser()
+
+    def _check(self, response, command: str):
+        status, data = response
+        if status != "OK":
+            raise ValueError(f"IMAP {command} failed: {data}")
+        return data
+
+    def _load_state(self, session, uid_validity: int) -> MailboxState:
+        state = (
+            session.query(MailboxState)
+            .filter(MailboxState.account == self.account, MailboxState.mailbox == self.mailbox)
+            .first()
+        )
+        if state is None:
+            state = MailboxState(account=self.account, mailbox=self.mailbox, uid_validity=uid_validity, last_uid=0)
+            session.add(state)
+        elif state.uid_validity != uid_validity:
+            logger.warning(f"UIDVALIDITY of {self.mailbox} changed; rescanning the mailbox")
+            state.uid_validity = uid_validity
+            state.last_uid = 0
+        return state
+
+    def _fetch(self, imap, uids: List[int], items: str) -> Iterator[Tuple[int, bytes]]:
+        """Runs one UID FETCH and yields (uid, literal) for each message."""
+        data = self._check(imap.uid("FETCH", ",".join(map(str, uids)), items), "FETCH")
+        for part in data:
+            if not isinstance(part, tuple):
+                continue
+            match = UID_PATTERN.search(part[0])
+            if match:
+                yield int(match.group(1)), part[1]
+
+    def sync(self) -> Dict[str, int]:
+        """
+        Processes the messages that arrived since the last sync.
+
+        Returns:
+            Counts of fetched messages and of replies and bounces matched
+        """
+        counts = {"fetched": 0, "replies": 0, "bounces": 0}
+        imap = self.connect()
+        session = self.session_factory()
+        try:
+            self._check(imap.select(self.mailbox, readonly=True), "SELECT")
+            uid_validity = imap.response("UIDVALIDITY")[1][0]
+            if uid_validity is None:
+                raise ValueError(f"Server did not report UIDVALIDITY for {self.mailbox}")
+            uid_validity = int(uid_validity)
+            state = self._load_state(session, uid_validity)
+            session.commit()
+
+            data = self._check(imap.uid("SEARCH", "UID", f"{state.last_uid + 1}:*"), "SEARCH")
+            # "n:*" always matches the newest message, even when its UID is below n
+            uids = sorted(uid for uid in map(int, b" ".join(data).split()) if uid > state.last_uid)
+
+            for start in range(0, len(uids), self.batch_size):
+                batch = uids[start:start + self.batch_size]
+                with metrics.timer("inbox_sync_batch"):
+                    replies, bounces = self._process_batch(imap, session, batch)
+                state.last_uid = batch[-1]
+                session.commit()
+                counts["fetched"] += len(batch)
+                counts["replies"] += replies
+                counts["bounces"] += bounces
+            metrics.inc("inbox_messages_fetched", counts["fetched"])
+            return counts
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error syncing mailbox {self.mailbox}: {str(e)}")
+            raise ValueError(f"Error syncing mailbox: {str(e)}")
+        finally:
+            session.close()
+            try:
+                imap.logout()
+            except Exception:
+                pass
+
+    def _process_batch(self, imap, session, uids: List[int]) -> Tuple[int, int]:
+        """Matches one batch of messages and updates their emails; returns (replies, bounces)."""
+        references = {}
+        bounces = set()
+        unmatched_bounces = []
+        for uid, raw in self._fetch(imap, uids, f"(UID BODY.PEEK[HEADER.FIELDS ({HEADER_FIELDS})])"):
+            headers = self._parser.parsebytes(raw)
+            if is_bounce(headers):
+                bounces.add(uid)
+            elif (headers.get("Auto-Submitted") or "no").lower() != "no":
+                continue  # Out-of-office and other automatic replies
+            references[uid] = referenced_ids(headers)
+            if uid in bounces and not references[uid]:
+                unmatched_bounces.append(uid)
+
+        if unmatched_bounces:
+            section = f"BODY.PEEK[TEXT]<0.{self.bounce_scan_bytes}>"
+            for uid, body in self._fetch(imap, unmatched_bounces, f"(UID {section})"):
+                text = body.decode("utf-8", errors="replace")
+                references[uid] = QUOTED_MESSAGE_ID_PATTERN.findall(text)
+
+        wanted = {message_id for ids in references.values() for message_id in ids}
+        if not wanted:
+            return 0, 0
+        emails = {
+            message_id: (email_id, application_id)
+            for email_id, application_id, message_id in session.query(
+                Email.id, Email.application_id, Email.message_id
+            ).filter(Email.message_id.in_(wanted))
+        }
+
+        matched = {STATUS_BOUNCED: {}, STATUS_REPLIED: {}}
+        for uid, ids in references.items():
+            status = STATUS_BOUNCED if uid in bounces else STATUS_REPLIED
+            for message_id in ids:
+                if message_id in emails:
+                    email_id, application_id = emails[message_id]
+                    matched[status][email_id] = application_id
+                    break
+
+        now = datetime.utcnow()
+        # Bounces first, so a reply in the same batch takes precedence
+        for status in (STATUS_BOUNCED, STATUS_REPLIED):
+            if not matched[status]:
+                continue
+            session.execute(
+                update(Email)
+                .where(Email.id.in_(list(matched[status])))
+                .where(Email.status.in_(UPDATABLE_STATUSES))
+                .values(status=status, response_date=now)
+                .execution_options(synchronize_session=False)
+            )
+            application_ids = [app_id for app_id in matched[status].values() if app_id is not None]
+            if application_ids:
+                session.execute(
+                    update(Application)
+                    .where(Application.id.in_(application_ids))
+                    .where(Application.status.in_(UPDATABLE_STATUSES))
+                    .values(status=status)
+                    .execution_options(synchronize_session=False)
+                )
+        return len(matched[STATUS_REPLIED]), len(matched[STATUS_BOUNCED])
+
+
+def create_inbox_sync(session_factory=Session, mailbox: Optional[str] = None) -> InboxSync:
+    """
+    Creates an inbox sync from the environment configuration.
+
+    Args:
+        session_factory: Callable returning a new SQLAlchemy session
+        mailbox: Mailbox to read, defaults to IMAP_MAILBOX
+
+    Returns:
+        Configured InboxSync
+    """
+    config = get_imap_config()
+    return InboxSync(
+        lambda: connect_imap(config),
+        account=f"{config['username']}@{config['host']}",
+        session_factory=session_factory,
+        mailbox=mailbox or config["mailbox"],
+        batch_size=config["batch_size"],
+    )
@@ -0,0 +1,240 @@
+import csv
+import gzip
+import hashlib
+import html
+import io
+import json
+import logging
+import re
+import sys
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+# Source field names accepted for each normalized job field, in priority order
+FIELD_ALIASES = {
+    "company_name": ("company_name", "company", "employer", "organization", "hiring_organization"),
+    "position_title": ("position_title", "title", "job_title", "position", "role"),
+    "job_description": ("job_description", "description", "body", "text", "details"),
+    "contact_email": ("contact_email", "apply_email", "email", "application_email"),
+    "job_url": ("job_url", "url", "link", "apply_url", "posting_url"),
+    "expires_at": ("expires_at", "valid_through", "validthrough", "expiry", "expiration_date", "deadline",
+                   "closing_date", "apply_by"),
+}
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {"gclid", "fbclid", "ref", "source", "src", "trk", "refid"}
+
+EMAIL_PATTERN = re.compile(r"[^@\s<>\"']+@[^@\s<>\"']+\.[A-Za-z]{2,}")
+TAG_PATTERN = re.compile(r"<[^>]+>")
+WHITESPACE_PATTERN = re.compile(r"[ \t\r\f\v]+")
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def _open_text(path: str):
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8", errors="replace", newline="")
+    return open(path, "r", encoding="utf-8", errors="replace", newline="")
+
+
+def read_records(path: str, file_format: Optional[str] = None) -> Iterator[Dict]:
+    """
+    Streams raw records from a JSON lines or CSV export.
+
+    Args:
+        path: Path to the file; a trailing .gz is decompressed on the fly
+        file_format: "jsonl" or "csv"; inferred from the extension if omitted
+
+    Yields:
+        One dictionary per record
+    """
+    if file_format is None:
+        base = path[:-3] if path.endswith(".gz") else path
+        file_format = "csv" if base.lower().endswith(".csv") else "jsonl"
+
+    with _open_text(path) as f:
+        if file_format == "csv":
+            # Job descriptions can easily exceed the default 128 KiB field limit
+            csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+            yield from csv.DictReader(f)
+        elif file_format == "jsonl":
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.error(f"Skipping invalid JSON on line {line_number} of {path}: {e}")
+                    continue
+                if isinstance(record, dict):
+                    yield record
+        else:
+            raise ValueError(f"Unsupported job feed format '{file_format}'")
+
+
+def _clean_text(value) -> str:
+    if value is None:
+        return ""
+    text = str(value)
+    if "<" in text and ">" in text:
+        text = TAG_PATTERN.sub(" ", text)
+    text = html.unescape(text)
+    lines = (WHITESPACE_PATTERN.sub(" ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonicalizes a posting URL so trivially different links compare equal.
+
+    Args:
+        url: Raw URL
+
+    Returns:
+        URL with lower-cased scheme and host, no fragment, no trailing slash
+        and no tracking parameters
+    """
+    parts = urlsplit(url.strip())
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith("utm_")
+    ))
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ""))
+
+
+def parse_date(value) -> Optional[datetime]:
+    """
+    Parses a posting date from a feed.
+
+    Args:
+        value: ISO 8601 or RFC 2822 string, or a Unix timestamp
+
+    Returns:
+        Naive UTC datetime, or None if the value cannot be parsed
+    """
+    if value is None or value == "":
+        return None
+    try:
+        if isinstance(value, (int, float)) or str(value).strip().isdigit():
+            parsed = datetime.fromtimestamp(float(value), tz=timezone.utc)
+        else:
+            text = str(value).strip()
+            try:
+                parsed = datetime.fromisoformat(text)
+            except ValueError:
+                parsed = parsedate_to_datetime(text)
+    except (TypeError, ValueError, OverflowError, OSError):
+        logger.debug(f"Ignoring unparseable date {value!r}")
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _analysis(value) -> Optional[Dict]:
+    """Reads an analysis stored with a record, as an object or a JSON string."""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            return None
+    return value if isinstance(value, dict) and value else None
+
+
+def normalize_record(record: Dict) -> Optional[Dict]:
+    """
+    Maps a raw feed record onto the fields used by the application pipeline.
+
+    Args:
+        record: Raw record from read_records()
+
+    Returns:
+        Dictionary with company_name, position_title, job_description,
+        contact_email, job_url and expires_at, plus job_analysis for records
+        carrying an analysis of the posting (e.g. from the fetch command),
+        or None if the record has no description
+    """
+    lowered = {str(k).strip().lower(): v for k, v in record.items() if k is not None}
+    job = {}
+    for field, aliases in FIELD_ALIASES.items():
+        job[field] = next((lowered[a] for a in aliases if lowered.get(a)), None)
+
+    job["job_description"] = _clean_text(job["job_description"])
+    if not job["job_description"]:
+        return None
+    job["company_name"] = _clean_text(job["company_name"]) or None
+    job["position_title"] = _clean_text(job["position_title"]) or None
+
+    email = EMAIL_PATTERN.search(str(job["contact_email"] or ""))
+    job["contact_email"] = email.group(0).lower() if email else None
+    job["job_url"] = normalize_url(str(job["job_url"])) if job["job_url"] else None
+    job["expires_at"] = parse_date(job["expires_at"])
+    analysis = _analysis(lowered.get("job_analysis"))
+    if analysis:
+        job["job_analysis"] = analysis
+    return job
+
+
+def job_key(job: Dict) -> str:
+    """
+    Stable identifier used to deduplicate jobs.
+
+    Postings with a URL are identified by their normalized URL; others by a
+    hash of their company, title and description.
+
+    Args:
+        job: Normalized job dictionary
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    if job.get("job_url"):
+        raw = "url:" + job["job_url"]
+    else:
+        raw = "\x1f".join(
+            (job.get(field) or "").lower() for field in ("company_name", "position_title", "job_description")
+        )
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def chunked(items: Iterable, size: int) -> Iterator[List]:
+    """Groups an iterable into lists of at most size items."""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_jobs(path: str, file_format: Optional[str] = None) -> Iterator[Dict]:
+    """
+    Streams normalized jobs from a feed export.
+
+    Records without a description are dropped. Duplicates are not removed
+    here; BatchRunner.add_jobs() deduplicates each chunk against the
+    database, so memory stays bounded by the chunk size.
+
+    Args:
+        path: Path to a JSON lines or CSV file (optionally gzipped)
+        file_format: "jsonl" or "csv"; inferred from the extension if omitted
+
+    Yields:
+        Normalized job dictionaries, each with a job_key
+    """
+    skipped = 0
+    for record in read_records(path, file_format):
+        job = normalize_record(record)
+        if job is None:
+            skipped += 1
+            continue
+        job["job_key"] = job_key(job)
+        yield job
+    if skipped:
+        logger.info(f"Skipped {skipped} records without a job description in {path}")
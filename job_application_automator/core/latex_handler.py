@@ -1,46 +1,210 @@
 import os
 from pathlib import Path
+import hashlib
 import subprocess
 import logging
-from typing import Dict, Union
+import time
+from typing import Dict, Optional, Union
+
+from ..utils.config import get_latex_config
+from ..utils.metrics import metrics
+from .latex_template import template_cache
+from .pdf_optimizer import PdfOptimizer
+from .latex_validation import (
+    LatexCompileError,
+    LatexValidationError,
+    parse_log,
+    requests_rerun,
+    uses_cross_references,
+    validate_latex,
+)
 
 logger = logging.getLogger(__name__)
 
+# Files through which one pdflatex pass passes information to the next
+AUXILIARY_EXTENSIONS = (".aux", ".out", ".toc", ".lof", ".lot")
+
 class LatexDocumentHandler:
     """Handles LaTeX document generation."""
     
-    def __init__(self):
+    def __init__(self, output_dir: Optional[Union[str, Path]] = None):
         self.templates_dir = Path(__file__).parent.parent / "templates"
-        self.output_dir = Path(__file__).parent.parent / "output"
+        self.output_dir = Path(output_dir) if output_dir else Path(__file__).parent.parent / "output"
+        
+        config = get_latex_config()
+        self.timeout = config["timeout"]
+        self.memory_limit_mb = config["memory_limit_mb"]
+        self.validate = config["validate"]
+        self.max_passes = config["max_passes"]
+        # Optional post-processing that shrinks PDFs before they are emailed
+        self.optimizer = PdfOptimizer.from_config()
         
         # Create output directory if it doesn't exist
         self.output_dir.mkdir(parents=True, exist_ok=True)
     
+    def _prepare(self, latex_content: str) -> str:
+        """Validates content before it is written, so broken documents never reach pdflatex."""
+        if not self.validate:
+            return latex_content
+        with metrics.timer("latex_validate"):
+            try:
+                return validate_latex(latex_content)
+            except LatexValidationError:
+                metrics.inc("latex_rejected")
+                raise
+    
+    def _render_template(self, template_name: str, values: Dict[str, str]) -> str:
+        """
+        Fills a template from the templates directory.
+        
+        The template is parsed once and cached until the file changes.
+        Values are LaTeX-escaped unless wrapped in RawLatex.
+        
+        Args:
+            template_name: File name of the template
+            values: Values for the template's $NAME placeholders
+            
+        Returns:
+            The rendered LaTeX
+        """
+        return template_cache.get(self.templates_dir / template_name).render(values)
+    
+    def _limited(self, command: list) -> list:
+        """
+        Wraps a command so it runs under the memory limit.
+        
+        The limit is set by a shell that then execs the command, rather than
+        with preexec_fn, which can deadlock the child when compiles are
+        started from several threads.
+        """
+        if os.name != "posix" or not self.memory_limit_mb:
+            return command
+        return ["sh", "-c", f'ulimit -v {self.memory_limit_mb * 1024} && exec "$@"', "sh"] + command
+    
+    def _auxiliary_digest(self, stem: str) -> Optional[str]:
+        """Hashes the files a pass leaves for the next one, or None if there are none."""
+        digest = hashlib.sha256()
+        found = False
+        for extension in AUXILIARY_EXTENSIONS:
+            path = self.output_dir / f"{stem}{extension}"
+            if path.exists():
+                digest.update(extension.encode() + path.read_bytes())
+                found = True
+        return digest.hexdigest() if found else None
+    
+    def _run_pass(self, tex_path: Path, draft: bool, timeout: float) -> str:
+        """
+        Runs a single pdflatex pass.
+        
+        Args:
+            tex_path: Path to the .tex file to compile
+            draft: Use -draftmode, which resolves references without writing a PDF
+            timeout: Seconds before pdflatex is killed
+            
+        Returns:
+            Contents of the .log file
+            
+        Raises:
+            LatexCompileError: With the errors parsed from the .log file
+        """
+        command = ['pdflatex', '-interaction=nonstopmode', '-halt-on-error', '-file-line-error']
+        if draft:
+            command.append('-draftmode')
+        command += ['-output-directory', str(self.output_dir), str(tex_path)]
+        try:
+            result = subprocess.run(
+                self._limited(command),
+                stdin=subprocess.DEVNULL,
+                capture_output=True,
+                timeout=timeout,
+            )
+        except subprocess.TimeoutExpired:
+            raise LatexCompileError(
+                f"pdflatex timed out after {timeout:.3g}s on {tex_path.name} "
+                f"(compile limit {self.timeout:g}s)"
+            )
+        log_path = self.output_dir / f"{tex_path.stem}.log"
+        log = log_path.read_text(errors="replace") if log_path.exists() else ""
+        if result.returncode != 0:
+            output = result.stdout.decode(errors="replace") if result.stdout else ""
+            raise LatexCompileError(
+                f"pdflatex failed on {tex_path.name} (exit code {result.returncode})",
+                parse_log(log or output),
+            )
+        return log
+    
+    def _run_pdflatex(self, tex_path: Path):
+        """
+        Compiles a file to PDF in as few pdflatex passes as possible.
+        
+        Documents without cross-references, citations or hyperref are
+        compiled in one pass. Others get another pass for as long as the
+        previous one changed the .aux/.out/.toc files or asked for a rerun
+        in its log, up to max_passes. A first pass without auxiliary files
+        from an earlier compile can never be the last one, so it uses
+        -draftmode, which skips writing the PDF.
+        
+        pdflatex runs non-interactively, stops at the first error and is
+        killed if the compile exceeds the configured wall-clock or memory
+        limit.
+        
+        Args:
+            tex_path: Path to the .tex file to compile
+            
+        Raises:
+            LatexCompileError: With the errors parsed from the .log file
+        """
+        with metrics.timer("latex_compile") as span:
+            span.set_attribute("document", tex_path.name)
+            deadline = time.monotonic() + self.timeout
+            multi_pass = self.max_passes > 1 and uses_cross_references(tex_path.read_text(errors="replace"))
+            before = self._auxiliary_digest(tex_path.stem)
+            # Without auxiliary files from an earlier compile the first pass
+            # cannot get references right, so there is no point writing its PDF
+            draft = multi_pass and before is None
+            passes = 0
+            while True:
+                log = self._run_pass(tex_path, draft, max(deadline - time.monotonic(), 0.001))
+                passes += 1
+                after = self._auxiliary_digest(tex_path.stem)
+                settled = after == before and not requests_rerun(log)
+                if not multi_pass or (settled and not draft) or (passes >= self.max_passes and not draft):
+                    break
+                before, draft = after, False
+            span.set_attribute("passes", passes)
+            # A counter, since histograms are in seconds; divided by the
+            # latex_compile count it gives the average passes per document
+            metrics.inc("latex_passes", passes)
+    
+    def _finish(self, pdf_path: Path) -> str:
+        """Optimizes a freshly compiled PDF when optimization is enabled."""
+        if self.optimizer is not None and pdf_path.exists():
+            report = self.optimizer.optimize(pdf_path)
+            logger.info(
+                f"Optimized {pdf_path.name}: {report['original_bytes']} -> {report['optimized_bytes']} bytes "
+                f"in {report['seconds']:.2f}s"
+            )
+        return str(pdf_path)
+    
     def create_resume(self, content: Union[str, Dict[str, str]]) -> str:
         """
         Creates a resume using the local LaTeX template.
         
         Args:
             content: Either a string containing LaTeX content or a dictionary with resume sections
+                (filling the template's $NAME placeholders; values are escaped
+                unless wrapped in RawLatex)
             
         Returns:
             Path to the generated PDF file
         """
         try:
-            # Read template
-            template_path = self.templates_dir / "resume_template.tex"
-            with open(template_path, 'r') as f:
-                template_content = f.read()
-            
             # If content is a string, use it directly
             if isinstance(content, str):
                 latex_content = content
             else:
-                # Replace template variables using safe substitution
-                latex_content = template_content
-                for key, value in content.items():
-                    placeholder = f"\\{{{key}}}"
-                    latex_content = latex_content.replace(placeholder, value)
+                latex_content = self._render_template("resume_template.tex", content)
+            latex_content = self._prepare(latex_content)
             
             # Write to temporary file
             temp_tex_path = self.output_dir / "resume.tex"
@@ -48,11 +212,13 @@ class LatexDocumentHandler:
                 f.write(latex_content)
             
             # Compile LaTeX to PDF
-            subprocess.run(['pdflatex', '-output-directory', str(self.output_dir), str(temp_tex_path)], check=True)
+            self._run_pdflatex(temp_tex_path)
             
-            return str(self.output_dir / "resume.pdf")
+            return self._finish(self.output_dir / "resume.pdf")
         except Exception as e:
             logger.error(f"Error creating resume: {e}")
+            if isinstance(e, (LatexValidationError, LatexCompileError)):
+                raise
             raise ValueError(f"Error creating resume: {str(e)}")
     
     def create_cover_letter(self, content: Union[str, Dict[str, str]]) -> str:
@@ -61,25 +227,19 @@ class LatexDocumentHandler:
         
         Args:
             content: Either a string containing LaTeX content or a dictionary with cover letter sections
+                (filling the template's $NAME placeholders; values are escaped
+                unless wrapped in RawLatex)
             
         Returns:
             Path to the generated PDF file
         """
         try:
-            # Read template
-            template_path = self.templates_dir / "cover_letter_template.tex"
-            with open(template_path, 'r') as f:
-                template_content = f.read()
-            
             # If content is a string, use it directly
             if isinstance(content, str):
                 latex_content = content
             else:
-                # Replace template variables using safe substitution
-                latex_content = template_content
-                for key, value in content.items():
-                    placeholder = f"\\{{{key}}}"
-                    latex_content = latex_content.replace(placeholder, value)
+                latex_content = self._render_template("cover_letter_template.tex", content)
+            latex_content = self._prepare(latex_content)
             
             # Write to temporary file
             temp_tex_path = self.output_dir / "cover_letter.tex"
@@ -87,11 +247,13 @@ class LatexDocumentHandler:
                 f.write(latex_content)
             
             # Compile LaTeX to PDF
-            subprocess.run(['pdflatex', '-output-directory', str(self.output_dir), str(temp_tex_path)], check=True)
+            self._run_pdflatex(temp_tex_path)
             
-            return str(self.output_dir / "cover_letter.pdf")
+            return self._finish(self.output_dir / "cover_letter.pdf")
         except Exception as e:
             logger.error(f"Error creating cover letter: {e}")
+            if isinstance(e, (LatexValidationError, LatexCompileError)):
+                raise
             raise ValueError(f"Error creating cover letter: {str(e)}")
     
     def compile_latex(self, content: str, output_name: str) -> str:
@@ -106,15 +268,19 @@ class LatexDocumentHandler:
             Path to the generated PDF file
         """
         try:
+            content = self._prepare(content)
+            
             # Write to temporary file
             temp_tex_path = self.output_dir / f"{output_name}.tex"
             with open(temp_tex_path, 'w') as f:
                 f.write(content)
             
             # Compile LaTeX to PDF
-            subprocess.run(['pdflatex', '-output-directory', str(self.output_dir), str(temp_tex_path)], check=True)
+            self._run_pdflatex(temp_tex_path)
             
-            return str(self.output_dir / f"{output_name}.pdf")
+            return self._finish(self.output_dir / f"{output_name}.pdf")
         except Exception as e:
             logger.error(f"Error compiling LaTeX: {e}")
+            if isinstance(e, (LatexValidationError, LatexCompileError)):
+                raise
             raise ValueError(f"Error compiling LaTeX: {str(e)}")
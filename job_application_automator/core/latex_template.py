@@ -0,0 +1,129 @@
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Placeholders look like $CANDIDATE_NAME; lower-case $x and math such as
+# $\bullet$ are left alone
+PLACEHOLDER_PATTERN = re.compile(r"\$([A-Z][A-Z0-9_]*)")
+
+LATEX_SPECIAL_CHARACTERS = {
+    "\\": r"\textbackslash{}",
+    "&": r"\&",
+    "%": r"\%",
+    "$": r"\$",
+    "#": r"\#",
+    "_": r"\_",
+    "{": r"\{",
+    "}": r"\}",
+    "~": r"\textasciitilde{}",
+    "^": r"\textasciicircum{}",
+}
+LATEX_SPECIAL_PATTERN = re.compile("|".join(re.escape(c) for c in LATEX_SPECIAL_CHARACTERS))
+
+
+class RawLatex(str):
+    """A template value that is already LaTeX and must not be escaped."""
+
+
+def escape_latex(value) -> str:
+    """
+    Escapes text so it is typeset literally by LaTeX.
+
+    Args:
+        value: Text to escape; RawLatex values are returned unchanged
+
+    Returns:
+        The escaped text
+    """
+    if isinstance(value, RawLatex):
+        return value
+    return LATEX_SPECIAL_PATTERN.sub(lambda m: LATEX_SPECIAL_CHARACTERS[m.group(0)], str(value))
+
+
+class CompiledTemplate:
+    """
+    A LaTeX template split once into literal text and placeholders.
+
+    Rendering is a single join over the segments, so its cost does not grow
+    with the number of values, and substituted values are never scanned
+    for placeholders again.
+
+    Args:
+        source: Template text with $NAME placeholders
+    """
+
+    def __init__(self, source: str):
+        self.literals: List[str] = []
+        self.names: List[str] = []
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(source):
+            self.literals.append(source[position:match.start()])
+            self.names.append(match.group(1))
+            position = match.end()
+        self.literals.append(source[position:])
+        self.placeholders = set(self.names)
+
+    def render(self, values: Dict[str, Union[str, RawLatex]]) -> str:
+        """
+        Fills in the placeholders.
+
+        Args:
+            values: Values keyed by placeholder name, matched case-insensitively
+                (candidate_name fills $CANDIDATE_NAME). Values are LaTeX-escaped
+                unless they are RawLatex.
+
+        Returns:
+            The rendered document
+        """
+        rendered = {name.upper(): escape_latex(value) for name, value in values.items()}
+        missing = self.placeholders - set(rendered)
+        if missing:
+            logger.warning(f"No values for template placeholders: {', '.join(sorted(missing))}")
+        parts = [self.literals[0]]
+        for name, literal in zip(self.names, self.literals[1:]):
+            parts.append(rendered.get(name, ""))
+            parts.append(literal)
+        return "".join(parts)
+
+
+class TemplateCache:
+    """
+    Caches compiled templates, recompiling a file only when it changes on disk.
+
+    Safe to share between threads.
+    """
+
+    def __init__(self):
+        self._templates: Dict[str, Tuple[Tuple[int, int], CompiledTemplate]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: Union[str, Path]) -> CompiledTemplate:
+        """
+        Gets the compiled template for a file.
+
+        Args:
+            path: Path to the template
+
+        Returns:
+            The compiled template
+        """
+        key = os.path.abspath(path)
+        stat = os.stat(key)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._templates.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        with open(key, "r") as f:
+            template = CompiledTemplate(f.read())
+        with self._lock:
+            self._templates[key] = (version, template)
+        return template
+
+
+template_cache = TemplateCache()
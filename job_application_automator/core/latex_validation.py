@@ -0,0 +1,204 @@
+import re
+from typing import Dict, List
+
+# Environments whose body is not parsed as LaTeX
+VERBATIM_ENVIRONMENTS = {"verbatim", "verbatim*", "lstlisting", "minted", "comment"}
+
+FENCE_PATTERN = re.compile(r"^\s*```[\w-]*\s*\n(.*?)\n\s*```\s*$", re.DOTALL)
+TOKEN_PATTERN = re.compile(r"\\\\|\\[{}%]|\\(begin|end)\s*\{([^{}]*)\}|[{}%]")
+FILE_LINE_ERROR_PATTERN = re.compile(r"^(?P<file>[^\s:][^:\n]*?):(?P<line>\d+): (?P<message>.+)$", re.MULTILINE)
+TEX_ERROR_PATTERN = re.compile(r"^! (?P<message>.+)$", re.MULTILINE)
+TEX_LINE_PATTERN = re.compile(r"^l\.(?P<line>\d+)", re.MULTILINE)
+
+# Anything whose output depends on the .aux (or .out/.toc) of a previous pass
+CROSS_REFERENCE_PATTERN = re.compile(
+    r"\\(?:ref|pageref|eqref|autoref|nameref|[cC]ref|cite\w*|tableofcontents|listoffigures|listoftables)\b"
+    r"|\\usepackage\s*(?:\[[^\]]*\])?\s*\{[^}]*\b(?:hyperref|lastpage|rerunfilecheck)\b"
+)
+RERUN_PATTERN = re.compile(
+    r"Rerun to get|may have changed\.\s*Rerun|Please rerun LaTeX|Rerun LaTeX", re.IGNORECASE
+)
+
+
+class LatexValidationError(ValueError):
+    """Raised when a document is rejected before compilation."""
+
+    def __init__(self, problems: List[str]):
+        self.problems = problems
+        super().__init__("Invalid LaTeX: " + "; ".join(problems))
+
+
+class LatexCompileError(ValueError):
+    """Raised when pdflatex fails, with the errors parsed from its log."""
+
+    def __init__(self, message: str, errors: List[Dict] = None):
+        self.errors = errors or []
+        details = "; ".join(
+            f"line {e['line']}: {e['message']}" if e.get("line") else e["message"] for e in self.errors[:3]
+        )
+        super().__init__(f"{message}: {details}" if details else message)
+
+
+def strip_markdown_fences(content: str) -> str:
+    """
+    Removes a markdown code fence wrapped around a whole document.
+
+    Models often answer with ```latex ... ``` even when asked for raw LaTeX.
+
+    Args:
+        content: Possibly fenced LaTeX
+
+    Returns:
+        The LaTeX without the fence
+    """
+    match = FENCE_PATTERN.match(content)
+    return match.group(1) if match else content
+
+
+def find_problems(content: str, require_document: bool = True) -> List[str]:
+    """
+    Checks a LaTeX document for structural errors that would make pdflatex fail.
+
+    Checks that braces are balanced and environments are properly nested,
+    ignoring escaped braces, comments and verbatim environments.
+
+    Args:
+        content: LaTeX source
+        require_document: Also require \\documentclass, \\begin{document}
+            and \\end{document}
+
+    Returns:
+        List of problems found; empty if none
+    """
+    problems = []
+    braces = []
+    environments = []
+    verbatim = None
+
+    for line_number, line in enumerate(content.splitlines(), 1):
+        for match in TOKEN_PATTERN.finditer(line):
+            token, kind, name = match.group(0), match.group(1), match.group(2)
+            if verbatim is not None:
+                if kind == "end" and name.strip() == verbatim:
+                    environments.pop()
+                    verbatim = None
+                continue
+            if token == "%":
+                break
+            if token == "{":
+                braces.append(line_number)
+            elif token == "}":
+                if braces:
+                    braces.pop()
+                else:
+                    problems.append(f"line {line_number}: unmatched '}}'")
+            elif kind == "begin":
+                environments.append((name.strip(), line_number))
+                if name.strip() in VERBATIM_ENVIRONMENTS:
+                    verbatim = name.strip()
+            elif kind == "end":
+                name = name.strip()
+                if not environments:
+                    problems.append(f"line {line_number}: \\end{{{name}}} without \\begin")
+                elif environments[-1][0] != name:
+                    opened, opened_line = environments[-1]
+                    problems.append(
+                        f"line {line_number}: \\end{{{name}}} closes \\begin{{{opened}}} from line {opened_line}"
+                    )
+                    if any(env == name for env, _ in environments):
+                        while environments[-1][0] != name:
+                            environments.pop()
+                        environments.pop()
+                else:
+                    environments.pop()
+
+    for line_number in braces:
+        problems.append(f"line {line_number}: unclosed '{{'")
+    for name, line_number in environments:
+        problems.append(f"line {line_number}: \\begin{{{name}}} is never closed")
+
+    if require_document:
+        if "\\documentclass" not in content:
+            problems.append("missing \\documentclass")
+        if "\\begin{document}" not in content:
+            problems.append("missing \\begin{document}")
+        if "\\end{document}" not in content:
+            problems.append("missing \\end{document}")
+    return problems
+
+
+def validate_latex(content: str, require_document: bool = True) -> str:
+    """
+    Prepares LLM-generated LaTeX for compilation.
+
+    Args:
+        content: LaTeX source, possibly wrapped in a markdown fence
+        require_document: Require a complete document (see find_problems)
+
+    Returns:
+        The cleaned LaTeX source
+
+    Raises:
+        LatexValidationError: If the document is structurally broken
+    """
+    content = strip_markdown_fences(content.strip())
+    problems = find_problems(content, require_document)
+    if problems:
+        raise LatexValidationError(problems)
+    return content
+
+
+def parse_log(log: str) -> List[Dict]:
+    """
+    Extracts errors from a pdflatex log.
+
+    Understands both the file:line:message format produced with
+    -file-line-error and the classic "! message ... l.<line>" format.
+
+    Args:
+        log: Contents of the .log file
+
+    Returns:
+        List of dictionaries with file (if known), line and message
+    """
+    errors = [
+        {"file": m.group("file"), "line": int(m.group("line")), "message": m.group("message").strip()}
+        for m in FILE_LINE_ERROR_PATTERN.finditer(log)
+    ]
+    if errors:
+        return errors
+    for match in TEX_ERROR_PATTERN.finditer(log):
+        line = TEX_LINE_PATTERN.search(log, match.end())
+        errors.append({
+            "file": None,
+            "line": int(line.group("line")) if line else None,
+            "message": match.group("message").strip(),
+        })
+    return errors
+
+
+def uses_cross_references(content: str) -> bool:
+    """
+    Tells whether a document may need more than one pdflatex pass.
+
+    Args:
+        content: LaTeX source
+
+    Returns:
+        True if the document references labels, citations, a table of
+        contents or uses a package that stores data between passes
+    """
+    return CROSS_REFERENCE_PATTERN.search(content) is not None
+
+
+def requests_rerun(log: str) -> bool:
+    """
+    Tells whether pdflatex asked for another pass.
+
+    Args:
+        log: Contents of the .log file
+
+    Returns:
+        True if the log contains a "Rerun" warning from LaTeX or a package
+    """
+    return RERUN_PATTERN.search(log) is not None
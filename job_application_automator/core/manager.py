@@ -1,21 +1,33 @@
-from typing import Dict, Optional
+from typing import Any, Callable, Dict, Optional
 from datetime import datetime, timedelta
 import logging
+import uuid
 
+from .candidate_profile import CandidateProfileStore
 from .latex_handler import LatexDocumentHandler
+from .task_graph import TaskGraph
 from .email_communicator import EmailCommunicator
 from ..utils.ai_client import MistralAIClient
+from ..db import async_db
 from ..db.models import Application
+from ..utils.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
 class JobApplicationManager:
     """Manages the entire job application process."""
     
-    def __init__(self):
-        self.latex_handler = LatexDocumentHandler()
-        self.email_communicator = EmailCommunicator()
-        self.ai_client = MistralAIClient()
+    def __init__(
+        self,
+        ai_client: Optional[MistralAIClient] = None,
+        latex_handler: Optional[LatexDocumentHandler] = None,
+        email_communicator: Optional[EmailCommunicator] = None,
+        candidate_profiles: Optional[CandidateProfileStore] = None,
+    ):
+        self.latex_handler = latex_handler or LatexDocumentHandler()
+        self.email_communicator = email_communicator or EmailCommunicator()
+        self.ai_client = ai_client or MistralAIClient()
+        self.candidate_profiles = candidate_profiles or CandidateProfileStore(self.ai_client)
     
     def handle_job_description(self, job_desc: str) -> Dict:
         """
@@ -28,7 +40,8 @@ class JobApplicationManager:
             Dict containing parsed job details
         """
         try:
-            job_details = self.ai_client.analyze_job_description(job_desc)
+            with metrics.timer("pipeline_stage", stage="analyze"):
+                job_details = self.ai_client.analyze_job_description(job_desc)
             return job_details
         except Exception as e:
             logger.error(f"Error analyzing job description: {e}")
@@ -50,8 +63,10 @@ class JobApplicationManager:
             job_details = self.handle_job_description(job_desc)
             
             # Then customize the resume
-            customized_resume = self.ai_client.customize_resume(job_details, resume_content)
-            return self.latex_handler.create_resume(customized_resume)
+            with metrics.timer("pipeline_stage", stage="customize"):
+                customized_resume = self.ai_client.customize_resume(job_details, resume_content)
+            with metrics.timer("pipeline_stage", stage="compile"):
+                return self.latex_handler.create_resume(customized_resume)
         except Exception as e:
             logger.error(f"Error customizing resume: {e}")
             raise ValueError("Error customizing resume")
@@ -68,12 +83,92 @@ class JobApplicationManager:
             Path to the generated PDF file
         """
         try:
-            cover_letter_content = self.ai_client.generate_cover_letter(job_details, candidate_info)
-            return self.latex_handler.create_cover_letter(cover_letter_content)
+            with metrics.timer("pipeline_stage", stage="cover_letter"):
+                cover_letter_content = self.ai_client.generate_cover_letter(job_details, candidate_info)
+            with metrics.timer("pipeline_stage", stage="compile"):
+                return self.latex_handler.create_cover_letter(cover_letter_content)
         except Exception as e:
             logger.error(f"Error generating cover letter: {e}")
             raise ValueError("Error generating cover letter")
     
+    def process_application(
+        self,
+        job_desc: str,
+        resume_content: str,
+        candidate_info: Dict,
+        email_details: Optional[Dict] = None,
+        on_result: Optional[Callable[[str, Any], None]] = None,
+    ) -> Dict:
+        """
+        Runs the whole pipeline for one job.
+        
+        Once the job description is analyzed, resume customization, cover
+        letter generation and email drafting run concurrently, and each PDF is
+        compiled as soon as its LaTeX is ready, overlapping the remaining LLM
+        calls.
+        
+        Args:
+            job_desc: The job description text
+            resume_content: Current resume content in LaTeX format
+            candidate_info: Dictionary containing candidate's information
+            email_details: Recipient and template details; when omitted the
+                application is prepared but not sent
+            on_result: Optional callback invoked with (step name, result) as
+                each step finishes, e.g. to report progress
+            
+        Returns:
+            Dictionary with job_details, resume_path, cover_letter_path,
+            email_body and sent
+        """
+        try:
+            # Unique file names let several applications compile at once
+            token = uuid.uuid4().hex[:12]
+            company_name = (email_details or {}).get("company_name")
+            graph = TaskGraph()
+            graph.add_value("job_desc", job_desc)
+            graph.add("job_details", self.handle_job_description, "job_desc")
+            graph.add("resume_tex", metrics.wrap(
+                lambda details: self.ai_client.customize_resume(details, resume_content, company_name=company_name),
+                "pipeline_stage", stage="customize"
+            ), "job_details")
+            graph.add("cover_letter_tex", metrics.wrap(
+                lambda details: self.ai_client.generate_cover_letter(details, candidate_info, company_name=company_name),
+                "pipeline_stage", stage="cover_letter"
+            ), "job_details")
+            graph.add("email_body", metrics.wrap(
+                lambda details: self.ai_client.draft_application_email(details, candidate_info),
+                "pipeline_stage", stage="email_body"
+            ), "job_details")
+            graph.add("resume_path", metrics.wrap(
+                lambda tex: self.latex_handler.compile_latex(tex, f"resume_{token}"),
+                "pipeline_stage", stage="compile"
+            ), "resume_tex")
+            graph.add("cover_letter_path", metrics.wrap(
+                lambda tex: self.latex_handler.compile_latex(tex, f"cover_letter_{token}"),
+                "pipeline_stage", stage="compile"
+            ), "cover_letter_tex")
+            
+            if email_details is not None:
+                def send(resume_path, cover_letter_path, email_body):
+                    return self.send_application({
+                        **email_details,
+                        "custom_content": email_body,
+                        "attachments": [resume_path, cover_letter_path] + list(email_details.get("attachments", [])),
+                    })
+                graph.add("sent", send, "resume_path", "cover_letter_path", "email_body")
+            
+            results = graph.run(on_result=on_result)
+            return {
+                "job_details": results["job_details"],
+                "resume_path": results["resume_path"],
+                "cover_letter_path": results["cover_letter_path"],
+                "email_body": results["email_body"],
+                "sent": results.get("sent", False),
+            }
+        except Exception as e:
+            logger.error(f"Error processing application: {e}")
+            raise ValueError(f"Error processing application: {str(e)}")
+    
     def send_application(self, email_details: Dict) -> bool:
         """
         Sends job application email with attachments.
@@ -85,11 +180,12 @@ class JobApplicationManager:
             Boolean indicating success
         """
         try:
-            email_content = self.email_communicator.compose_email(
-                template="application",
-                details=email_details
-            )
-            return self.email_communicator.send_email(email_content)
+            with metrics.timer("pipeline_stage", stage="send"):
+                email_content = self.email_communicator.compose_email(
+                    template="application",
+                    details=email_details
+                )
+                return self.email_communicator.send_email(email_content)
         except Exception as e:
             logger.error(f"Error sending application: {e}")
             raise ValueError("Error sending application")
@@ -130,3 +226,37 @@ class JobApplicationManager:
         except Exception as e:
             logger.error(f"Error scheduling follow-up: {e}")
             raise
+    
+    async def aschedule_follow_up(self, application_id: int) -> bool:
+        """
+        Schedules a follow-up email like schedule_follow_up, from a coroutine.
+        
+        The application and template are loaded through the async database
+        layer, so the event loop keeps running other applications meanwhile.
+        
+        Args:
+            application_id: Unique identifier for the application
+            
+        Returns:
+            Boolean indicating if scheduling was successful
+        """
+        try:
+            application = await async_db.get_application(application_id)
+            if not application:
+                raise ValueError("Application not found")
+            
+            follow_up_content = await self.email_communicator.acompose_email(
+                template="follow_up",
+                details={
+                    "company_name": application.company_name,
+                    "position": application.position_title,
+                    "application_date": application.submission_date.strftime("%Y-%m-%d")
+                }
+            )
+            return self.email_communicator.schedule_email(
+                content=follow_up_content,
+                send_date=datetime.now() + timedelta(days=7)
+            )
+        except Exception as e:
+            logger.error(f"Error scheduling follow-up: {e}")
+            raise
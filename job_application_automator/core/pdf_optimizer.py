@@ -0,0 +1,196 @@
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+from ..utils.config import get_pdf_config
+from ..utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Optimization tools, in the order they run when both are used
+TOOLS = ("gs", "qpdf")
+
+# Ghostscript settings that subset and compress fonts while keeping every
+# image and vector as it is (no downsampling or lossy recompression), so the
+# rendered pages do not change
+GS_LOSSLESS_ARGS = [
+    "-dSubsetFonts=true",
+    "-dCompressFonts=true",
+    "-dEmbedAllFonts=true",
+    "-dDetectDuplicateImages=true",
+    "-dPassThroughJPEGImages=true",
+    "-dAutoFilterColorImages=false",
+    "-dAutoFilterGrayImages=false",
+    "-dColorImageFilter=/FlateEncode",
+    "-dGrayImageFilter=/FlateEncode",
+    "-dDownsampleColorImages=false",
+    "-dDownsampleGrayImages=false",
+    "-dDownsampleMonoImages=false",
+]
+
+# Attachments are base64-encoded in the message, which adds a third to their size
+BASE64_OVERHEAD = 4 / 3
+
+
+def estimate_send_seconds(size_bytes: int, uplink_kbps: float) -> float:
+    """
+    Estimates how long an attachment takes to upload to the SMTP server.
+
+    Args:
+        size_bytes: Size of the file
+        uplink_kbps: Upload bandwidth in kilobits per second
+
+    Returns:
+        Seconds to transfer the base64-encoded file
+    """
+    if uplink_kbps <= 0:
+        return 0.0
+    return size_bytes * BASE64_OVERHEAD * 8 / (uplink_kbps * 1000)
+
+
+class PdfOptimizer:
+    """
+    Shrinks compiled PDFs before they are attached to emails.
+
+    Ghostscript re-writes the document with subsetted, compressed fonts,
+    then qpdf packs objects into compressed object streams, recompresses
+    every stream at the highest level and optionally linearizes the file.
+    Both rewrite the document's structure only, so the visible output is
+    unchanged. Tools that are not installed are skipped; a tool that fails
+    or a result that is not smaller leaves the original file in place, so
+    optimizing never stops an application from being sent.
+
+    Args:
+        tool: "auto" to use every installed tool, "gs" or "qpdf" to use one,
+            or "none"
+        linearize: Linearize the output for fast first-page display
+        subset_fonts: Run Ghostscript to subset fonts (with tool "auto")
+        timeout: Seconds before a tool is killed
+        uplink_kbps: Upload bandwidth used to estimate send times in reports
+    """
+
+    def __init__(self, tool: str = "auto", linearize: bool = False, subset_fonts: bool = True,
+                 timeout: float = 60.0, uplink_kbps: float = 1000.0):
+        if tool not in ("auto", "none") + TOOLS:
+            raise ValueError(f"Unknown PDF optimization tool: {tool}")
+        self.tool = tool
+        self.linearize = linearize
+        self.subset_fonts = subset_fonts
+        self.timeout = timeout
+        self.uplink_kbps = uplink_kbps
+
+    @classmethod
+    def from_config(cls) -> Optional["PdfOptimizer"]:
+        """Creates an optimizer from the environment configuration, or None if disabled."""
+        config = get_pdf_config()
+        if config["optimize"] == "none":
+            return None
+        return cls(
+            config["optimize"],
+            linearize=config["linearize"],
+            subset_fonts=config["subset_fonts"],
+            timeout=config["timeout"],
+            uplink_kbps=config["uplink_kbps"],
+        )
+
+    def tools(self) -> List[str]:
+        """Returns the installed tools this optimizer will run, in order."""
+        if self.tool == "none":
+            return []
+        wanted = [self.tool] if self.tool in TOOLS else [
+            tool for tool in TOOLS if tool != "gs" or self.subset_fonts
+        ]
+        return [tool for tool in wanted if shutil.which(tool)]
+
+    def _command(self, tool: str, source: Path, target: Path, last: bool) -> List[str]:
+        if tool == "gs":
+            command = ["gs", "-q", "-dSAFER", "-dBATCH", "-dNOPAUSE", "-sDEVICE=pdfwrite",
+                       "-dCompatibilityLevel=1.5"] + GS_LOSSLESS_ARGS
+            if self.linearize and last:
+                command.append("-dFastWebView=true")
+            return command + [f"-sOutputFile={target}", str(source)]
+        command = ["qpdf", "--object-streams=generate", "--compress-streams=y", "--recompress-flate",
+                   "--compression-level=9"]
+        if self.linearize:
+            command.append("--linearize")
+        return command + [str(source), str(target)]
+
+    def optimize(self, pdf_path: Union[str, Path]) -> Dict:
+        """
+        Optimizes a PDF in place.
+
+        Args:
+            pdf_path: Path to the PDF
+
+        Returns:
+            Report with path, tools, original_bytes, optimized_bytes,
+            seconds, send_seconds_before, send_seconds_after and error
+        """
+        pdf_path = Path(pdf_path)
+        original_bytes = pdf_path.stat().st_size
+        tools = self.tools()
+        report = {"path": str(pdf_path), "tools": tools, "original_bytes": original_bytes,
+                  "optimized_bytes": original_bytes, "seconds": 0.0, "error": None}
+
+        start = time.perf_counter()
+        deadline = time.monotonic() + self.timeout
+        with metrics.timer("pdf_optimize"), tempfile.TemporaryDirectory(dir=pdf_path.parent) as work_dir:
+            source = pdf_path
+            try:
+                for i, tool in enumerate(tools):
+                    target = Path(work_dir) / f"{i}-{tool}.pdf"
+                    result = subprocess.run(
+                        self._command(tool, source, target, i == len(tools) - 1),
+                        stdin=subprocess.DEVNULL,
+                        capture_output=True,
+                        timeout=max(deadline - time.monotonic(), 0.001),
+                    )
+                    # qpdf exits with 3 when it succeeded with warnings
+                    if result.returncode not in (0, 3) or not target.exists() or not target.stat().st_size:
+                        output = (result.stderr or result.stdout or b"").decode(errors="replace").strip()
+                        raise RuntimeError(f"{tool} failed (exit code {result.returncode}): {output[:200]}")
+                    source = target
+            except (OSError, RuntimeError, subprocess.TimeoutExpired) as e:
+                logger.warning(f"Could not optimize {pdf_path.name}, keeping it as compiled: {e}")
+                metrics.inc("pdf_optimize_errors")
+                report["error"] = str(e)
+                source = pdf_path
+
+            if source != pdf_path and source.stat().st_size < original_bytes:
+                os.replace(source, pdf_path)
+                report["optimized_bytes"] = pdf_path.stat().st_size
+                metrics.inc("pdf_bytes_saved", original_bytes - report["optimized_bytes"])
+
+        report["seconds"] = time.perf_counter() - start
+        report["send_seconds_before"] = estimate_send_seconds(original_bytes, self.uplink_kbps)
+        report["send_seconds_after"] = estimate_send_seconds(report["optimized_bytes"], self.uplink_kbps)
+        return report
+
+
+def summarize_reports(reports: Iterable[Dict]) -> Dict:
+    """
+    Totals the reports of several optimize() calls.
+
+    Args:
+        reports: Reports returned by PdfOptimizer.optimize()
+
+    Returns:
+        Dictionary with documents, original_bytes, optimized_bytes,
+        reduction (fraction of bytes saved), seconds, send_seconds_before,
+        send_seconds_after and errors
+    """
+    summary = {"documents": 0, "original_bytes": 0, "optimized_bytes": 0, "seconds": 0.0,
+               "send_seconds_before": 0.0, "send_seconds_after": 0.0, "errors": 0}
+    for report in reports:
+        summary["documents"] += 1
+        summary["errors"] += report["error"] is not None
+        for key in ("original_bytes", "optimized_bytes", "seconds", "send_seconds_before", "send_seconds_after"):
+            summary[key] += report[key]
+    original = summary["original_bytes"]
+    summary["reduction"] = (original - summary["optimized_bytes"]) / original if original else 0.0
+    return summary
@@ -0,0 +1,275 @@
+import heapq
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import update
+
+from ..db.models import Application
+from ..utils.llm_backends import estimate_tokens
+from ..utils.metrics import metrics
+from .batch import (
+    ANALYZED,
+    PENDING,
+    STATUS_DEFERRED,
+    STATUS_EXPIRED,
+    STATUS_FAILED,
+    BatchRunner,
+)
+from .ingestion import DEFAULT_CHUNK_SIZE, chunked
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_URGENCY_DAYS = 7
+# Tokens of instructions and completions per LLM step, on top of the job and resume text
+STEP_OVERHEAD_TOKENS = 600
+
+WORD_PATTERN = re.compile(r"[a-z][a-z0-9+#.]{2,}")
+
+
+def term_counts(text: str) -> Counter:
+    """Counts the words of a text, for match_score()."""
+    return Counter(WORD_PATTERN.findall(text.lower()))
+
+
+def match_score(description: str, resume_terms: Counter) -> float:
+    """
+    Estimates how well a posting matches the resume without an LLM call.
+
+    Args:
+        description: Job description
+        resume_terms: term_counts() of the resume
+
+    Returns:
+        Cosine similarity of the word counts, between 0 and 1
+    """
+    terms = term_counts(description)
+    dot = sum(count * resume_terms.get(term, 0) for term, count in terms.items())
+    norm = math.sqrt(sum(c * c for c in terms.values())) * math.sqrt(sum(c * c for c in resume_terms.values()))
+    return dot / norm if norm else 0.0
+
+
+def estimate_cost(stage: str, description: str, resume_content: str) -> int:
+    """
+    Estimates the tokens an application still needs.
+
+    Args:
+        stage: The application's current stage
+        description: Job description
+        resume_content: Base resume
+
+    Returns:
+        Estimated prompt and completion tokens of the remaining LLM steps
+    """
+    job_tokens = estimate_tokens(description)
+    resume_tokens = estimate_tokens(resume_content)
+    cost = 0
+    if stage == PENDING:
+        cost += job_tokens + STEP_OVERHEAD_TOKENS
+    if stage in (PENDING, ANALYZED):
+        # Resume in and out, then cover letter and email from the analysis
+        cost += 2 * resume_tokens + 3 * STEP_OVERHEAD_TOKENS
+    return cost
+
+
+class ApplicationScheduler:
+    """
+    Processes a batch run's applications in order of value, within a token budget.
+
+    Applications are kept in a heap keyed on their value: a cheap match
+    score between posting and resume, times the company's priority, times
+    an urgency factor that grows up to 2x as the posting's expiry
+    approaches. Postings already expired are shed. Before an application
+    starts, its estimated cost is reserved against the budget. Tokens
+    actually spent are read from the AI client. Applications that do not
+    fit once nothing else is running are deferred: they stay pending for a
+    later run, while cheaper ones may still go ahead. stats() can be called
+    from other threads at any time.
+
+    Args:
+        runner: BatchRunner that processes single applications
+        budget_tokens: Token budget for the run, or None for no limit
+        company_priorities: Priority multiplier by company name (default 1)
+        concurrency: Number of applications processed at once
+        urgency_days: Days before expiry from which urgency increases
+        clock: Returns the current UTC time
+    """
+
+    def __init__(self, runner: BatchRunner, budget_tokens: Optional[int] = None,
+                 company_priorities: Optional[Dict[str, float]] = None, concurrency: int = 1,
+                 urgency_days: float = DEFAULT_URGENCY_DAYS, clock: Callable[[], datetime] = datetime.utcnow):
+        self.runner = runner
+        self.budget_tokens = budget_tokens
+        self.company_priorities = {k.lower(): v for k, v in (company_priorities or {}).items()}
+        self.concurrency = concurrency
+        self.urgency_days = urgency_days
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._heap: List[Tuple] = []
+        self._counts = Counter()
+        self._reserved = 0
+        self._spent_at_start = 0
+
+    @property
+    def _ai_client(self):
+        return self.runner.manager.ai_client
+
+    def value(self, score: float, company: str, expires_at: Optional[datetime], now: datetime) -> float:
+        """Combines match score, company priority and urgency into one value."""
+        urgency = 1.0
+        if expires_at is not None and self.urgency_days > 0:
+            days_left = (expires_at - now).total_seconds() / 86400
+            urgency += min(1.0, max(0.0, (self.urgency_days - days_left) / self.urgency_days))
+        return score * self.company_priorities.get((company or "").lower(), 1.0) * urgency
+
+    def _spent(self) -> int:
+        return self._ai_client.tokens_used - self._spent_at_start
+
+    def stats(self) -> Dict:
+        """
+        Reports progress of the current run.
+
+        Returns:
+            Counts of queued, running, completed, failed, deferred and
+            expired applications, and the budget, tokens spent, tokens
+            reserved by running applications and tokens remaining
+        """
+        with self._lock:
+            stats = {"queued": len(self._heap)}
+            stats.update({key: self._counts[key] for key in ("running", "completed", "failed", "deferred", "expired")})
+            spent = self._spent()
+            stats.update(budget=self.budget_tokens, spent=spent, reserved=self._reserved)
+            stats["remaining"] = (None if self.budget_tokens is None
+                                  else max(0, self.budget_tokens - spent - self._reserved))
+        return stats
+
+    def _load(self, run_id: int, resume_content: str):
+        """Scores every unfinished application and builds the heap."""
+        resume_terms = term_counts(resume_content)
+        now = self.clock()
+        heap = []
+        for chunk in chunked(self.runner._unfinished_application_ids(run_id), DEFAULT_CHUNK_SIZE):
+            session = self.runner.session_factory()
+            try:
+                rows = (
+                    session.query(Application.id, Application.company_name, Application.job_description,
+                                  Application.expires_at, Application.stage)
+                    .filter(Application.id.in_(chunk))
+                )
+                scores = []
+                for app_id, company, description, expires_at, stage in rows:
+                    score = match_score(description or "", resume_terms)
+                    scores.append({"id": app_id, "match_score": score})
+                    cost = estimate_cost(stage, description or "", resume_content)
+                    expiry = expires_at.timestamp() if expires_at else math.inf
+                    value = self.value(score, company, expires_at, now)
+                    heap.append((-value, expiry, app_id, cost, expires_at))
+                session.execute(update(Application), scores)
+                session.commit()
+            finally:
+                session.close()
+        heapq.heapify(heap)
+        with self._lock:
+            self._heap = heap
+
+    def _set_status(self, application_ids: List[int], status: str):
+        if not application_ids:
+            return
+        session = self.runner.session_factory()
+        try:
+            session.execute(
+                update(Application).where(Application.id.in_(application_ids)).values(status=status)
+                .execution_options(synchronize_session=False)
+            )
+            session.commit()
+        finally:
+            session.close()
+
+    def _next(self) -> Optional[Tuple[int, int]]:
+        """Pops the most valuable application that can run now, shedding or deferring the rest."""
+        expired, deferred = [], []
+        selected = None
+        with self._lock:
+            now = self.clock()
+            while self._heap:
+                entry = heapq.heappop(self._heap)
+                _, _, app_id, cost, expires_at = entry
+                if expires_at is not None and expires_at <= now:
+                    expired.append(app_id)
+                    continue
+                if (self.budget_tokens is not None
+                        and self._spent() + self._reserved + cost > self.budget_tokens):
+                    if self._counts["running"]:
+                        # Running applications may cost less than reserved; wait for them
+                        heapq.heappush(self._heap, entry)
+                        break
+                    deferred.append(app_id)
+                    continue
+                self._reserved += cost
+                self._counts["running"] += 1
+                selected = (app_id, cost)
+                break
+            self._counts["expired"] += len(expired)
+            self._counts["deferred"] += len(deferred)
+        self._set_status(expired, STATUS_EXPIRED)
+        self._set_status(deferred, STATUS_DEFERRED)
+        metrics.inc("scheduler_shed", len(expired) + len(deferred))
+        return selected
+
+    def _finished(self, cost: int, status: str):
+        with self._lock:
+            self._reserved -= cost
+            self._counts["running"] -= 1
+            self._counts["failed" if status == STATUS_FAILED else "completed"] += 1
+
+    def run(self, run_id: int, resume_content: str,
+            on_progress: Optional[Callable[[Dict], None]] = None) -> Dict[str, int]:
+        """
+        Processes a run's unfinished applications, most valuable first.
+
+        Args:
+            run_id: ID of the batch run
+            resume_content: Base resume content in LaTeX format
+            on_progress: Called with stats() after each application
+
+        Returns:
+            Dictionary counting applications by final status
+        """
+        with self._lock:
+            self._counts = Counter()
+            self._reserved = 0
+            self._spent_at_start = self._ai_client.tokens_used
+        candidate_info = self.runner._candidate_info(run_id)
+        self._load(run_id, resume_content)
+
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while True:
+                while len(running) < self.concurrency:
+                    selected = self._next()
+                    if selected is None:
+                        break
+                    app_id, cost = selected
+                    future = executor.submit(self.runner.process_application, app_id, resume_content, candidate_info)
+                    running[future] = cost
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    cost = running.pop(future)
+                    try:
+                        status = future.result()
+                    except Exception as e:
+                        logger.error(f"Error processing application: {e}")
+                        status = STATUS_FAILED
+                    self._finished(cost, status)
+                    if on_progress is not None:
+                        on_progress(self.stats())
+
+        logger.info(f"Scheduled run {run_id} finished: {self.stats()}")
+        return self.runner.finish_run(run_id)
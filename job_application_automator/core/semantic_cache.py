@@ -0,0 +1,297 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Union
+
+import numpy as np
+
+from ..utils.config import get_semantic_cache_config
+from ..utils.metrics import metrics
+from .skills import SKILL_FIELDS, taxonomy
+
+logger = logging.getLogger(__name__)
+
+# Free-text fields of a job analysis that shape a generation, in the order
+# they are written into the normalized text; location, employment type and
+# company only change details the model does not rewrite
+TEXT_FIELDS = ("title", "experience_level", "industry", "key_responsibilities", "education_requirements",
+               "soft_skills", "company_values")
+
+
+def _text(value) -> str:
+    return " ".join(str(value).lower().split())
+
+
+def analysis_skill_names(job_details: Dict) -> List[str]:
+    """Returns the canonical names of the skills in a job analysis, sorted."""
+    skills = set()
+    for field in SKILL_FIELDS:
+        value = job_details.get(field) or []
+        skills.update(taxonomy.canonical(s) for s in ([value] if isinstance(value, str) else value) if str(s).strip())
+    return sorted(skills)
+
+
+def normalize_analysis(job_details: Dict) -> str:
+    """
+    Writes a job analysis as canonical text for embedding.
+
+    Skills are reduced to their canonical names and lists are sorted, so
+    analyses that differ only in spelling, aliases or ordering produce the
+    same text.
+
+    Args:
+        job_details: Job analysis
+
+    Returns:
+        One "field: value" line per non-empty field
+    """
+    lines = [f"skills: {', '.join(name.lower() for name in analysis_skill_names(job_details))}"]
+    for field in TEXT_FIELDS:
+        value = job_details.get(field)
+        if isinstance(value, (list, tuple)):
+            value = "; ".join(sorted({_text(v) for v in value if str(v).strip()}))
+        elif value is not None:
+            value = _text(value)
+        if value:
+            lines.append(f"{field}: {value}")
+    return "\n".join(lines)
+
+
+def context_hash(context) -> str:
+    """Fingerprints the other input of a generation, e.g. the resume being customized."""
+    if not isinstance(context, str):
+        context = json.dumps(context, sort_keys=True, default=str)
+    return hashlib.sha256(context.encode("utf-8")).hexdigest()
+
+
+# Generations addressed to the company (job analyses do not name it), which
+# are only reused as is for the same company
+COMPANY_SPECIFIC = {"cover_letter"}
+
+
+def _same_company(operation: str, entry: Dict, company: str) -> bool:
+    cached, company = entry["company"].lower(), company.strip().lower()
+    if operation in COMPANY_SPECIFIC:
+        return bool(cached) and cached == company
+    return not cached or cached == company or cached not in entry["output"].lower()
+
+
+class SemanticCache:
+    """
+    Cache of LLM generations keyed by the meaning of the job analysis.
+
+    Each generation is stored with the embedding of its normalized job
+    analysis and a hash of its other input (the resume, or the candidate
+    details). A later request with the same input looks up the most similar
+    analysis: at or above threshold the stored output is returned as is;
+    between adapt_threshold and threshold it is returned as a seed for a
+    short "adapt this" request instead of a full generation.
+
+    Two guards keep near matches from being reused wrongly: a match whose
+    skills differ too much from the new job (Jaccard below
+    min_skill_overlap) is treated as a miss, and a cover letter written for
+    another (or an unknown) company, or any other output that names another
+    company, is only ever used as a seed.
+
+    Args:
+        embed: Callable turning a list of texts into an (n, d) array
+        path: .npz file the cache is saved to after each store and loaded from
+        threshold: Cosine similarity at which a cached output is reused
+        adapt_threshold: Cosine similarity at which it is used as a seed
+        min_skill_overlap: Minimum Jaccard similarity of the skill sets
+        max_entries: Entries kept; the oldest are dropped first
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[List[str]], np.ndarray],
+        path: Optional[Union[str, Path]] = None,
+        threshold: float = 0.97,
+        adapt_threshold: float = 0.92,
+        min_skill_overlap: float = 0.8,
+        max_entries: int = 1000,
+    ):
+        if not 0 < adapt_threshold <= threshold <= 1:
+            raise ValueError("Semantic cache thresholds must satisfy 0 < adapt_threshold <= threshold <= 1")
+        self.embed = embed
+        self.path = Path(path) if path else None
+        self.threshold = threshold
+        self.adapt_threshold = adapt_threshold
+        self.min_skill_overlap = min_skill_overlap
+        self.max_entries = max_entries
+        self.entries: List[Dict] = []
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.counts = {"hit": 0, "adapt": 0, "miss": 0, "skills": 0, "company": 0}
+        self._lock = threading.Lock()
+        # Serializes saves, so a later snapshot is never replaced by an earlier one
+        self._save_lock = threading.Lock()
+        if self.path and self.path.exists():
+            self.load()
+
+    @classmethod
+    def from_config(cls, embed: Callable[[List[str]], np.ndarray]) -> Optional["SemanticCache"]:
+        """Creates a cache from the environment configuration, or None when SEMANTIC_CACHE is unset."""
+        config = get_semantic_cache_config()
+        if not config["path"]:
+            return None
+        return cls(
+            embed,
+            config["path"],
+            threshold=config["threshold"],
+            adapt_threshold=config["adapt_threshold"],
+            min_skill_overlap=config["min_skill_overlap"],
+            max_entries=config["max_entries"],
+        )
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _vector(self, job_details: Dict) -> np.ndarray:
+        vector = np.asarray(self.embed([normalize_analysis(job_details)]), dtype=np.float32)[0]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _count(self, operation: str, result: str, guard: Optional[str] = None):
+        with self._lock:
+            self.counts[result] += 1
+            if guard:
+                self.counts[guard] += 1
+        metrics.inc("semantic_cache", operation=operation, result=result)
+        if guard:
+            metrics.inc("semantic_cache_guard", operation=operation, reason=guard)
+
+    def lookup(self, operation: str, job_details: Dict, context, company: str = "") -> Dict:
+        """
+        Finds a cached generation for a job.
+
+        Args:
+            operation: Name of the generation, e.g. "customize_resume"
+            job_details: Job analysis
+            context: Other input of the generation; only entries generated
+                from an equal context are considered
+            company: Company the job is at, if known
+
+        Returns:
+            Dictionary with result ("hit", "adapt" or "miss"), score, output
+            (None on a miss) and vector, the analysis embedding to pass to
+            store()
+        """
+        vector = self._vector(job_details)
+        key = context_hash(context)
+        with self._lock:
+            entries, vectors = self.entries, self.vectors
+        rows = [i for i, entry in enumerate(entries) if entry["operation"] == operation and entry["context"] == key]
+        match = {"result": "miss", "score": 0.0, "output": None, "vector": vector}
+        if not rows:
+            self._count(operation, "miss")
+            return match
+
+        with metrics.timer("semantic_cache_lookup", operation=operation):
+            scores = vectors[rows] @ vector
+            best = int(np.argmax(scores))
+        entry, score = entries[rows[best]], float(scores[best])
+        match["score"] = score
+        if score < self.adapt_threshold:
+            self._count(operation, "miss")
+            return match
+
+        skills, cached_skills = set(analysis_skill_names(job_details)), set(entry["skills"])
+        union = skills | cached_skills
+        if union and len(skills & cached_skills) / len(union) < self.min_skill_overlap:
+            self._count(operation, "miss", guard="skills")
+            return match
+
+        result, guard = ("hit" if score >= self.threshold else "adapt"), None
+        if result == "hit" and not _same_company(operation, entry, company):
+            result, guard = "adapt", "company"
+        self._count(operation, result, guard)
+        match.update(result=result, output=entry["output"])
+        return match
+
+    def store(self, operation: str, job_details: Dict, context, output: str, vector: Optional[np.ndarray] = None,
+              company: str = ""):
+        """
+        Adds a generation to the cache and saves it if the cache has a path.
+
+        Args:
+            operation: Name of the generation
+            job_details: Job analysis the output was generated for
+            context: Other input of the generation
+            output: Generated text
+            vector: Embedding returned by lookup(), to avoid embedding again
+            company: Company the job is at, if known
+        """
+        if vector is None:
+            vector = self._vector(job_details)
+        entry = {
+            "operation": operation,
+            "context": context_hash(context),
+            "skills": analysis_skill_names(job_details),
+            "company": company.strip(),
+            "output": output,
+        }
+        with self._lock:
+            entries = self.entries + [entry]
+            vectors = vector[None, :] if not self.entries else np.vstack([self.vectors, vector])
+            self.entries, self.vectors = entries[-self.max_entries:], vectors[-self.max_entries:]
+        if self.path:
+            self.save()
+
+    def stats(self) -> Dict:
+        """
+        Returns lookup counts for tuning the thresholds.
+
+        hit_rate counts outputs returned as is; reuse_rate also counts seeds.
+        skills and company count matches rejected or downgraded by the guards.
+        """
+        with self._lock:
+            counts = dict(self.counts)
+            entries = len(self.entries)
+        lookups = counts["hit"] + counts["adapt"] + counts["miss"]
+        return {
+            **counts,
+            "lookups": lookups,
+            "entries": entries,
+            "hit_rate": counts["hit"] / lookups if lookups else 0.0,
+            "reuse_rate": (counts["hit"] + counts["adapt"]) / lookups if lookups else 0.0,
+        }
+
+    def save(self, path: Optional[Union[str, Path]] = None):
+        """
+        Writes the cache to disk atomically.
+
+        Args:
+            path: Destination, defaults to the cache's path
+        """
+        path = Path(path or self.path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._save_lock:
+            with self._lock:
+                entries, vectors = self.entries, self.vectors
+            fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".npz")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.savez(f, vectors=vectors, entries=np.array(json.dumps(entries)))
+                os.replace(temp_path, path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                raise
+
+    def load(self, path: Optional[Union[str, Path]] = None):
+        """
+        Reads the cache from disk.
+
+        Args:
+            path: Source, defaults to the cache's path
+        """
+        with np.load(path or self.path, allow_pickle=False) as data:
+            vectors = data["vectors"].astype(np.float32)
+            entries = json.loads(str(data["entries"]))
+        with self._lock:
+            self.entries, self.vectors = entries, vectors
+        logger.info(f"Loaded {len(entries)} cached generations from {path or self.path}")
@@ -0,0 +1,443 @@
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Canonical skill names and the aliases job postings use for them
+DEFAULT_SKILLS = {
+    "Python": ["python3", "py", "cpython"],
+    "Java": ["java se", "core java"],
+    "JavaScript": ["js", "ecmascript", "es6", "vanilla js"],
+    "TypeScript": ["ts"],
+    "Go": ["golang"],
+    "Rust": ["rustlang"],
+    "C++": ["cpp", "c plus plus"],
+    "C#": ["csharp", "c sharp"],
+    "Scala": [],
+    "Kotlin": [],
+    "Ruby": [],
+    "PHP": [],
+    "SQL": ["ansi sql", "t-sql", "tsql"],
+    "PostgreSQL": ["postgres", "postgresql db", "psql"],
+    "MySQL": [],
+    "MongoDB": ["mongo"],
+    "Redis": [],
+    "Elasticsearch": ["elastic search"],
+    "Kafka": ["apache kafka"],
+    "Spark": ["apache spark", "pyspark"],
+    "Airflow": ["apache airflow"],
+    "Hadoop": ["apache hadoop"],
+    "Docker": ["docker compose"],
+    "Kubernetes": ["k8s", "kube"],
+    "Terraform": ["hcl"],
+    "AWS": ["amazon web services"],
+    "GCP": ["google cloud", "google cloud platform"],
+    "Azure": ["microsoft azure"],
+    "Linux": [],
+    "Git": [],
+    "CI/CD": ["ci", "continuous integration", "continuous delivery", "continuous deployment"],
+    "REST": ["rest api", "rest apis", "restful", "restful apis"],
+    "GraphQL": [],
+    "gRPC": ["grpc"],
+    "React": ["react.js", "reactjs"],
+    "Angular": ["angular.js", "angularjs"],
+    "Vue": ["vue.js", "vuejs"],
+    "Node.js": ["node", "nodejs", "node js"],
+    "Django": [],
+    "Flask": [],
+    "FastAPI": ["fast api"],
+    "Spring": ["spring boot", "springboot"],
+    "Machine Learning": ["ml"],
+    "Deep Learning": ["dl"],
+    "PyTorch": ["torch"],
+    "TensorFlow": [],
+    "Pandas": [],
+    "NumPy": [],
+    "NLP": ["natural language processing"],
+    "Data Analysis": ["data analytics"],
+    "Microservices": ["microservice architecture", "micro services"],
+    "Distributed Systems": [],
+    "Agile": [],
+}
+
+# A trailing version ("Python 3.x", "Java 17", "Angular v2+") is dropped when
+# what remains is a known skill; otherwise it is part of the name (e.g. S3)
+VERSION_SUFFIX = re.compile(r"[\s-]*v?\d+(?:\.(?:\d+|x))*\+?$")
+WHITESPACE = re.compile(r"\s+")
+
+# Spellings remembered per taxonomy; the least recently used are forgotten
+DEFAULT_MAX_SPELLINGS = 10000
+
+
+def _key(name: str) -> str:
+    return WHITESPACE.sub(" ", str(name).strip().lower())
+
+
+class _SpellingCache:
+    """Least recently used mapping of at most max_size spellings."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: str):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def setdefault(self, key: str, value):
+        with self._lock:
+            value = self._items.setdefault(key, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+            return value
+
+
+class SkillTaxonomy:
+    """
+    Canonical skill names with interned integer IDs.
+
+    Free-text skills are normalized by case, whitespace, known aliases
+    ("golang" -> Go, "k8s" -> Kubernetes) and version suffixes ("Python
+    3.x" -> Python). Every canonical skill has a small integer ID; intern()
+    adds skills not in the taxonomy under their first spelling, so the same
+    text always maps to the same ID for the taxonomy's lifetime. lookup()
+    and canonical() never add skills, so a long-lived taxonomy only grows
+    through intern().
+
+    Args:
+        skills: Canonical names mapped to their aliases
+        max_spellings: Exact spellings remembered to skip normalization
+    """
+
+    def __init__(self, skills: Optional[Dict[str, Sequence[str]]] = None,
+                 max_spellings: int = DEFAULT_MAX_SPELLINGS):
+        self._names: List[str] = []
+        self._ids: Dict[str, int] = {}
+        # Exact spellings seen before, so repeated skills skip normalization
+        self._spellings = _SpellingCache(max_spellings)
+        # First spelling of each unknown skill passed to canonical()
+        self._unknown = _SpellingCache(max_spellings)
+        self._lock = threading.Lock()
+        for name, aliases in (DEFAULT_SKILLS if skills is None else skills).items():
+            self.add(name, aliases)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def add(self, name: str, aliases: Iterable[str] = ()) -> int:
+        """
+        Adds a canonical skill, or aliases of an existing one.
+
+        Args:
+            name: Canonical name
+            aliases: Other names of the skill
+
+        Returns:
+            ID of the skill
+        """
+        with self._lock:
+            skill_id = self._ids.get(_key(name))
+            if skill_id is None:
+                skill_id = self._ids[_key(name)] = len(self._names)
+                self._names.append(str(name).strip())
+            for alias in aliases:
+                self._ids.setdefault(_key(alias), skill_id)
+            return skill_id
+
+    def lookup(self, skill: str) -> Optional[int]:
+        """Returns the ID of a skill or alias, without interning unknown skills."""
+        key = _key(skill)
+        skill_id = self._ids.get(key)
+        if skill_id is None:
+            stripped = VERSION_SUFFIX.sub("", key)
+            if stripped and stripped != key:
+                skill_id = self._ids.get(stripped)
+        return skill_id
+
+    def intern(self, skill: str) -> int:
+        """
+        Returns the ID of a skill, adding it if it is unknown.
+
+        Args:
+            skill: Skill as written in a job analysis
+
+        Returns:
+            ID of its canonical skill
+        """
+        skill_id = self._spellings.get(skill)
+        if skill_id is None:
+            skill_id = self.lookup(skill)
+            if skill_id is None:
+                skill_id = self.add(skill)
+            self._spellings.setdefault(skill, skill_id)
+        return skill_id
+
+    def name(self, skill_id: int) -> str:
+        """Returns the canonical name of a skill ID."""
+        return self._names[skill_id]
+
+    def names(self, skill_ids: Iterable[int]) -> List[str]:
+        """Returns the canonical names of several skill IDs."""
+        return [self._names[skill_id] for skill_id in skill_ids]
+
+    def canonical(self, skill: str) -> str:
+        """
+        Returns the canonical name of a skill without interning it.
+
+        Unknown skills keep the first spelling seen (while it is among the
+        max_spellings remembered), so "Snowflake" and "snowflake" agree.
+        """
+        skill_id = self.lookup(skill)
+        if skill_id is not None:
+            return self._names[skill_id]
+        return self._unknown.setdefault(_key(skill), WHITESPACE.sub(" ", str(skill).strip()))
+
+    def ids(self, skills: Iterable[str]) -> np.ndarray:
+        """
+        Interns skills as a sorted array without duplicates.
+
+        Args:
+            skills: Skills as written in a job analysis; blanks are ignored
+
+        Returns:
+            Sorted int32 array of skill IDs
+        """
+        return np.unique(np.array(
+            [self.intern(skill) for skill in skills if str(skill).strip()], dtype=np.int32
+        ))
+
+
+# Shared by everything that canonicalizes skill names. Corpora intern the
+# skills of their jobs in a taxonomy of their own, so in a long-running
+# process this one does not grow with every unknown skill seen
+taxonomy = SkillTaxonomy()
+
+# Weight of each analysis field in a job's skill set; required skills count
+# fully, preferred ones half
+SKILL_FIELDS = {"required_skills": 1.0, "technical_requirements": 1.0, "preferred_skills": 0.5}
+
+
+def analysis_skills(analysis: Dict, skill_taxonomy: SkillTaxonomy) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Interns the skills of a job analysis.
+
+    Args:
+        analysis: Job analysis as returned by analyze_job_description
+        skill_taxonomy: Taxonomy to intern the skills in
+
+    Returns:
+        Sorted skill IDs and the weight of each (the highest of the fields
+        it appears in)
+    """
+    weights: Dict[int, float] = {}
+    for field, weight in SKILL_FIELDS.items():
+        skills = analysis.get(field) or []
+        if isinstance(skills, str):
+            skills = [skills]
+        for skill in skills:
+            skill = str(skill)
+            if skill.strip():
+                skill_id = skill_taxonomy.intern(skill)
+                if weights.get(skill_id, 0.0) < weight:
+                    weights[skill_id] = weight
+    ids = sorted(weights)
+    return np.array(ids, dtype=np.int32), np.array([weights[skill_id] for skill_id in ids], dtype=np.float32)
+
+
+class JobRecord:
+    """A job's skills as sorted ID and weight arrays."""
+
+    __slots__ = ("job_id", "skill_ids", "weights")
+
+    def __init__(self, job_id: int, skill_ids: np.ndarray, weights: np.ndarray):
+        self.job_id = job_id
+        self.skill_ids = skill_ids
+        self.weights = weights
+
+    def __repr__(self) -> str:
+        return f"JobRecord(job_id={self.job_id}, skills={self.skill_ids.tolist()})"
+
+
+class SkillCorpus:
+    """
+    The skills of many jobs, packed into flat arrays.
+
+    All jobs share three arrays in compressed sparse row layout: the
+    sorted skill IDs of every job one after another, their weights, and
+    the offset where each job starts. A job costs 8 bytes per skill plus 16
+    bytes, instead of a dict of lists of strings, and overlap, coverage and
+    similarity against every job are single NumPy passes over the arrays.
+
+    Args:
+        skill_taxonomy: Taxonomy the skill IDs come from; defaults to a new
+            one, which is freed with the corpus
+    """
+
+    def __init__(self, skill_taxonomy: Optional[SkillTaxonomy] = None):
+        self.taxonomy = skill_taxonomy or SkillTaxonomy()
+        self._job_ids = array("q")
+        self._offsets = array("q", [0])
+        self._skills = array("i")
+        self._weights = array("f")
+        self._arrays = None
+
+    @classmethod
+    def from_analyses(cls, analyses: Iterable[Dict], skill_taxonomy: Optional[SkillTaxonomy] = None) -> "SkillCorpus":
+        """Builds a corpus from job analyses, numbering jobs from 0."""
+        corpus = cls(skill_taxonomy)
+        for job_id, analysis in enumerate(analyses):
+            corpus.add(job_id, analysis)
+        return corpus
+
+    def __len__(self) -> int:
+        return len(self._job_ids)
+
+    def add(self, job_id: int, analysis: Dict) -> int:
+        """
+        Adds a job.
+
+        Args:
+            job_id: Caller's ID of the job, e.g. the application ID
+            analysis: Job analysis
+
+        Returns:
+            Row of the job in the corpus
+        """
+        ids, weights = analysis_skills(analysis, self.taxonomy)
+        self._job_ids.append(job_id)
+        self._skills.frombytes(ids.tobytes())
+        self._weights.frombytes(weights.tobytes())
+        self._offsets.append(len(self._skills))
+        self._arrays = None
+        return len(self._job_ids) - 1
+
+    def _views(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """NumPy copies of the arrays, and the row of every skill entry, until the next add()."""
+        if self._arrays is None:
+            # Copies, since arrays exporting their buffer cannot grow
+            offsets = np.array(self._offsets, dtype=np.int64)
+            skills = np.array(self._skills, dtype=np.int32)
+            weights = np.array(self._weights, dtype=np.float32)
+            rows = np.repeat(np.arange(len(self), dtype=np.int32), np.diff(offsets))
+            self._arrays = (offsets, skills, weights, rows)
+        return self._arrays
+
+    @property
+    def job_ids(self) -> np.ndarray:
+        """Caller's IDs of the jobs, by row."""
+        return np.array(self._job_ids, dtype=np.int64)
+
+    def record(self, row: int) -> JobRecord:
+        """Returns the skills of the job in a row."""
+        offsets, skills, weights, _ = self._views()
+        start, end = offsets[row], offsets[row + 1]
+        return JobRecord(int(self._job_ids[row]), skills[start:end], weights[start:end])
+
+    def skill_names(self, row: int) -> List[str]:
+        """Returns the canonical skill names of the job in a row."""
+        return self.taxonomy.names(self.record(row).skill_ids.tolist())
+
+    def query(self, skills: Iterable) -> np.ndarray:
+        """Turns skill names (or IDs) into a sorted ID array, ignoring unknown names."""
+        ids = []
+        for skill in skills:
+            skill_id = int(skill) if isinstance(skill, (int, np.integer)) else self.taxonomy.lookup(str(skill))
+            if skill_id is not None:
+                ids.append(skill_id)
+        return np.unique(np.array(ids, dtype=np.int32))
+
+    def overlap(self, skill_ids: np.ndarray, weighted: bool = False) -> np.ndarray:
+        """
+        Counts, for every job, how many of the given skills it asks for.
+
+        Args:
+            skill_ids: Sorted skill IDs, e.g. from query()
+            weighted: Sum the jobs' skill weights instead of counting
+
+        Returns:
+            float32 array with one value per job
+        """
+        _, skills, weights, rows = self._views()
+        hits = np.isin(skills, skill_ids, assume_unique=False)
+        return np.bincount(rows[hits], weights=weights[hits] if weighted else None,
+                           minlength=len(self)).astype(np.float32)
+
+    def sizes(self, weighted: bool = False) -> np.ndarray:
+        """Number of skills (or their total weight) of every job."""
+        offsets, _, weights, rows = self._views()
+        if weighted:
+            return np.bincount(rows, weights=weights, minlength=len(self)).astype(np.float32)
+        return np.diff(offsets).astype(np.float32)
+
+    def coverage(self, skill_ids: np.ndarray) -> np.ndarray:
+        """
+        Fraction of every job's skills, by weight, that the given skills cover.
+
+        Args:
+            skill_ids: Sorted skill IDs, e.g. a candidate's skills from query()
+
+        Returns:
+            float32 array of values in [0, 1]; jobs without skills get 0
+        """
+        totals = self.sizes(weighted=True)
+        covered = self.overlap(skill_ids, weighted=True)
+        return np.divide(covered, totals, out=np.zeros_like(covered), where=totals > 0)
+
+    def jaccard(self, skill_ids: np.ndarray) -> np.ndarray:
+        """
+        Jaccard similarity between a skill set and every job's skills.
+
+        Args:
+            skill_ids: Sorted skill IDs
+
+        Returns:
+            float32 array of values in [0, 1]
+        """
+        intersection = self.overlap(skill_ids)
+        union = self.sizes() + len(skill_ids) - intersection
+        return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+    def similar(self, skill_ids: np.ndarray, threshold: float = 0.9) -> np.ndarray:
+        """
+        Finds the jobs whose skills are near-identical to a skill set.
+
+        Args:
+            skill_ids: Sorted skill IDs, e.g. JobRecord.skill_ids of a new posting
+            threshold: Minimum Jaccard similarity
+
+        Returns:
+            Rows of the matching jobs, most similar first
+        """
+        similarity = self.jaccard(skill_ids)
+        rows = np.nonzero(similarity >= threshold)[0]
+        return rows[np.argsort(-similarity[rows], kind="stable")]
+
+    def vectors(self) -> Tuple[np.ndarray, List[str]]:
+        """
+        Dense L2-normalized weighted skill vectors of the jobs.
+
+        Returns:
+            (jobs, skills used) array and the canonical names of its columns
+        """
+        _, skills, weights, rows = self._views()
+        used, columns = np.unique(skills, return_inverse=True)
+        dense = np.zeros((len(self), len(used)), dtype=np.float32)
+        dense[rows, columns] = weights
+        norms = np.linalg.norm(dense, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return dense / norms, self.taxonomy.names(used.tolist())
+
+    def nbytes(self) -> int:
+        """Memory held by the corpus arrays."""
+        return sum(buffer.itemsize * len(buffer) for buffer in (self._job_ids, self._offsets, self._skills, self._weights))
@@ -0,0 +1,120 @@
+import contextvars
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TaskGraph:
+    """
+    Runs a small graph of dependent tasks on a thread pool.
+
+    Each task is started as soon as all of its dependencies have finished, so
+    independent branches (e.g. resume customization and cover letter
+    generation) overlap, and the total wall-clock time approaches that of the
+    longest branch rather than the sum of all tasks.
+
+    Usage:
+        graph = TaskGraph()
+        graph.add_value("job_desc", job_desc)
+        graph.add("analysis", analyze, "job_desc")
+        graph.add("resume", customize, "analysis")
+        results = graph.run()
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self._tasks = {}
+        self._results = {}
+
+    def add(self, name: str, func: Callable, *dependencies: str):
+        """
+        Adds a task to the graph.
+
+        Args:
+            name: Unique task name; its result is stored under this key
+            func: Callable invoked with the results of its dependencies, in order
+            *dependencies: Names of tasks (or values) this task depends on
+        """
+        if name in self._tasks or name in self._results:
+            raise ValueError(f"Task '{name}' already exists")
+        self._tasks[name] = (func, dependencies)
+
+    def add_value(self, name: str, value: Any):
+        """
+        Adds an already-known result that other tasks can depend on.
+
+        Args:
+            name: Name under which dependents refer to the value
+            value: The value
+        """
+        if name in self._tasks or name in self._results:
+            raise ValueError(f"Task '{name}' already exists")
+        self._results[name] = value
+
+    def _validate(self):
+        for name, (_, dependencies) in self._tasks.items():
+            for dependency in dependencies:
+                if dependency not in self._tasks and dependency not in self._results:
+                    raise ValueError(f"Task '{name}' depends on unknown task '{dependency}'")
+        # Kahn's algorithm: every task must eventually become ready
+        resolved = set(self._results)
+        remaining = dict(self._tasks)
+        while remaining:
+            ready = [n for n, (_, deps) in remaining.items() if all(d in resolved for d in deps)]
+            if not ready:
+                raise ValueError(f"Dependency cycle between tasks: {sorted(remaining)}")
+            for name in ready:
+                resolved.add(name)
+                del remaining[name]
+
+    def run(self, on_result: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """
+        Runs all tasks, respecting dependencies.
+
+        If a task fails, no new tasks are started; tasks already running are
+        allowed to finish (and reported to on_result) before the first error
+        is re-raised.
+
+        Args:
+            on_result: Optional callback invoked in the calling thread with
+                (name, result) as each task completes, e.g. to checkpoint
+
+        Returns:
+            Dictionary mapping task names (and added values) to results
+        """
+        self._validate()
+        pending = dict(self._tasks)
+        running = {}
+        error = None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                if error is None:
+                    for name in [n for n, (_, deps) in pending.items() if all(d in self._results for d in deps)]:
+                        func, dependencies = pending.pop(name)
+                        args = [self._results[d] for d in dependencies]
+                        # Copy the context so metric spans nest under the caller's span
+                        context = contextvars.copy_context()
+                        running[executor.submit(context.run, func, *args)] = name
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"Task '{name}' failed: {e}")
+                        if error is None:
+                            error = e
+                        continue
+                    self._results[name] = result
+                    if on_result:
+                        on_result(name, result)
+
+        if error is not None:
+            raise error
+        return dict(self._results)
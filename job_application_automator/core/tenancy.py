@@ -0,0 +1,226 @@
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Dict, List, Optional
+
+from ..db.models import Candidate, Session
+from ..utils.config import get_tenancy_config
+from ..utils.metrics import metrics
+from .email_communicator import EmailCommunicator
+
+logger = logging.getLogger(__name__)
+
+# TenantShare.candidate_id of runs that belong to no candidate
+DEFAULT_TENANT = 0
+DEFAULT_TENANT_NAME = "default"
+
+# Candidate columns that can be set through save_candidate()
+CANDIDATE_FIELDS = (
+    "resume_content", "candidate_info", "email_templates", "smtp_server", "smtp_port",
+    "smtp_username", "smtp_password_env", "weight", "max_in_flight", "daily_quota",
+)
+
+# A candidate's own SMTP settings; once any is set, the required ones must all
+# be, so a candidate's server is never sent the shared credentials
+SMTP_FIELDS = ("smtp_server", "smtp_port", "smtp_username", "smtp_password_env")
+REQUIRED_SMTP_FIELDS = ("smtp_server", "smtp_username", "smtp_password_env")
+
+
+def check_smtp_settings(candidate: Candidate):
+    """
+    Checks that a candidate either has complete SMTP settings or none.
+
+    Args:
+        candidate: Candidate row
+
+    Raises:
+        ValueError: If some but not all required SMTP settings are set
+    """
+    if not any(getattr(candidate, field) for field in SMTP_FIELDS):
+        return
+    missing = [field for field in REQUIRED_SMTP_FIELDS if not getattr(candidate, field)]
+    if missing:
+        raise ValueError(
+            f"Candidate {candidate.name} has its own SMTP settings but no {', '.join(missing)}; "
+            "set smtp_server, smtp_username and smtp_password_env together"
+        )
+
+
+def save_candidate(name: str, session_factory=Session, **fields) -> int:
+    """
+    Creates a candidate, or updates the given fields of an existing one.
+
+    Args:
+        name: Unique name of the candidate
+        session_factory: Callable returning a new SQLAlchemy session
+        **fields: Candidate columns; candidate_info and email_templates may
+            be given as dictionaries
+
+    Returns:
+        ID of the candidate
+    """
+    unknown = set(fields) - set(CANDIDATE_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown candidate fields: {', '.join(sorted(unknown))}")
+    if fields.get("weight") is not None and fields["weight"] <= 0:
+        raise ValueError("Candidate weight must be positive")
+    for key in ("candidate_info", "email_templates"):
+        if isinstance(fields.get(key), dict):
+            fields[key] = json.dumps(fields[key])
+    session = session_factory()
+    try:
+        candidate = session.query(Candidate).filter(Candidate.name == name).first()
+        if candidate is None:
+            candidate = Candidate(name=name)
+            session.add(candidate)
+        for key, value in fields.items():
+            if value is not None:
+                setattr(candidate, key, value)
+        check_smtp_settings(candidate)
+        session.commit()
+        return candidate.id
+    finally:
+        session.close()
+
+
+def find_candidate(name: str, session_factory=Session) -> Optional[Dict]:
+    """
+    Looks up a candidate by name.
+
+    Args:
+        name: Name of the candidate
+        session_factory: Callable returning a new SQLAlchemy session
+
+    Returns:
+        Dictionary with id, name, resume_content and the parsed
+        candidate_info, or None if there is no such candidate
+    """
+    session = session_factory()
+    try:
+        candidate = session.query(Candidate).filter(Candidate.name == name).first()
+        if candidate is None:
+            return None
+        return {
+            "id": candidate.id,
+            "name": candidate.name,
+            "resume_content": candidate.resume_content,
+            "candidate_info": json.loads(candidate.candidate_info or "{}"),
+        }
+    finally:
+        session.close()
+
+
+def candidate_communicator(candidate: Candidate) -> Optional[EmailCommunicator]:
+    """
+    Creates an email communicator with a candidate's SMTP settings and templates.
+
+    Args:
+        candidate: Candidate row
+
+    Returns:
+        The communicator, or None if the candidate uses the shared settings
+
+    Raises:
+        ValueError: If the candidate's SMTP settings are incomplete or its
+            password variable is not set; the shared server and credentials
+            are never used in their place
+    """
+    templates = json.loads(candidate.email_templates or "{}")
+    check_smtp_settings(candidate)
+    if not (candidate.smtp_server or templates):
+        return None
+    password = None
+    if candidate.smtp_server:
+        password = os.getenv(candidate.smtp_password_env)
+        if not password:
+            raise ValueError(f"Environment variable {candidate.smtp_password_env} for {candidate.name} is not set")
+    return EmailCommunicator(
+        smtp_server=candidate.smtp_server,
+        smtp_port=candidate.smtp_port,
+        username=candidate.smtp_username,
+        password=password,
+        templates=templates,
+    )
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of values, for q between 0 and 100."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+class TenantStats:
+    """
+    Per-candidate latency and throughput of the items one worker processed.
+
+    Keeps the most recent window of queue waits (time from an item becoming
+    available to being claimed) and service times per candidate. Every
+    sample is also exported as a metric labeled with the candidate. A
+    warning is logged whenever a candidate's p99 wait exceeds the bound,
+    which under fair queuing points at too little capacity for the
+    candidates' combined weight rather than at another candidate's load.
+
+    Args:
+        latency_bound: p99 queue wait in seconds that should not be exceeded
+        window: Number of samples kept per candidate
+    """
+
+    def __init__(self, latency_bound: Optional[float] = None, window: Optional[int] = None):
+        config = get_tenancy_config()
+        self.latency_bound = config["latency_bound"] if latency_bound is None else latency_bound
+        window = window or config["stats_window"]
+        self._waits = defaultdict(lambda: deque(maxlen=window))
+        self._services = defaultdict(lambda: deque(maxlen=window))
+        self._counts = defaultdict(int)
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, tenant: str, queue: str, wait: float, service: float):
+        """
+        Records one processed item.
+
+        Args:
+            tenant: Candidate name
+            queue: Queue the item was claimed from
+            wait: Seconds the item waited to be claimed
+            service: Seconds spent processing it
+        """
+        metrics.observe("tenant_queue_wait", wait, candidate=tenant, queue=queue)
+        metrics.observe("tenant_service", service, candidate=tenant, queue=queue)
+        metrics.inc("tenant_items_processed", candidate=tenant, queue=queue)
+        with self._lock:
+            self._waits[tenant].append(wait)
+            self._services[tenant].append(service)
+            self._counts[tenant] += 1
+            p99 = percentile(list(self._waits[tenant]), 99)
+        if self.latency_bound and p99 > self.latency_bound:
+            metrics.inc("tenant_latency_bound_exceeded", candidate=tenant)
+            logger.warning(f"p99 queue wait of {tenant} is {p99:.1f}s, above the {self.latency_bound:g}s bound")
+
+    def summary(self) -> Dict[str, Dict]:
+        """
+        Summarizes the recorded samples.
+
+        Returns:
+            Dictionary mapping candidate name to items processed, throughput
+            in items per minute, and p50/p99 queue wait and service time
+        """
+        with self._lock:
+            elapsed = max(time.monotonic() - self._started, 1e-9)
+            return {
+                tenant: {
+                    "items": self._counts[tenant],
+                    "per_minute": self._counts[tenant] * 60 / elapsed,
+                    "wait_p50": percentile(list(self._waits[tenant]), 50),
+                    "wait_p99": percentile(list(self._waits[tenant]), 99),
+                    "service_p50": percentile(list(self._services[tenant]), 50),
+                    "service_p99": percentile(list(self._services[tenant]), 99),
+                }
+                for tenant in self._counts
+            }
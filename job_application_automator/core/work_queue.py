@@ -0,0 +1,613 @@
+import json
+import logging
+import os
+import socket
+import threading
+import uuid
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Integer, case, func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+
+from ..db.models import Application, BatchRun, Candidate, Email, Session, TenantShare, WorkItem
+from ..utils.metrics import metrics
+from .batch import (
+    QUEUES,
+    SEND_QUEUE,
+    SENT,
+    STAGE_QUEUES,
+    STATUS_CLAIMED_ELSEWHERE,
+    STATUS_FAILED,
+    STATUS_SEND_UNKNOWN,
+    BatchRunner,
+)
+from .tenancy import DEFAULT_TENANT, DEFAULT_TENANT_NAME, TenantStats
+
+logger = logging.getLogger(__name__)
+
+# WorkItem.status values
+QUEUED = "queued"
+CLAIMED = "claimed"
+DONE = "done"
+FAILED = "failed"
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_DELAY = 60
+
+
+class WorkQueue:
+    """
+    Database-backed queue that lets several worker nodes share batch runs.
+
+    Each unfinished application has one WorkItem, routed to the queue that
+    performs its next stage. Workers claim items with a lease: on PostgreSQL
+    the claim uses SELECT ... FOR UPDATE SKIP LOCKED so concurrent workers
+    never block on or double-claim a row; on SQLite, which serializes writes,
+    the same single UPDATE statement is atomic. Leases are extended by
+    heartbeats and items whose lease expires (e.g. because a node died) are
+    put back on the queue.
+
+    Runs that belong to different candidates share the queues by start-time
+    fair queuing: each claim goes to the candidate whose next item has the
+    earliest virtual start time, and every claimed item advances that
+    candidate's virtual time by 1/weight. A candidate's wait therefore
+    depends on its own backlog and weight, not on how much work the others
+    have queued. Candidates may also cap their items in flight and the
+    emails they send per day.
+
+    Args:
+        session_factory: Callable returning a new SQLAlchemy session
+        lease_seconds: How long a claim stays valid without a heartbeat
+        max_attempts: Claims of one stage after which an item is failed
+        retry_delay: Seconds before a failed stage is retried (multiplied
+            by the number of attempts)
+    """
+
+    def __init__(self, session_factory=Session, lease_seconds: int = DEFAULT_LEASE_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS, retry_delay: int = DEFAULT_RETRY_DELAY):
+        self.session_factory = session_factory
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    def enqueue_run(self, run_id: int) -> int:
+        """
+        Queues every unfinished application of a run that is not queued yet.
+
+        Args:
+            run_id: ID of the batch run
+
+        Returns:
+            Number of work items created
+        """
+        stage_queue = case(
+            *[(Application.stage == stage, queue) for stage, queue in STAGE_QUEUES.items()],
+            else_=None,
+        )
+        now = datetime.utcnow()
+        session = self.session_factory()
+        try:
+            candidate_id = session.get(BatchRun, run_id).candidate_id
+        finally:
+            session.close()
+        unqueued = (
+            select(
+                Application.id, Application.batch_run_id, literal(candidate_id, Integer), stage_queue,
+                literal(QUEUED), literal(now), literal(0), literal(now), literal(now),
+            )
+            .where(Application.batch_run_id == run_id)
+            .where(Application.stage.in_(list(STAGE_QUEUES)))
+            .where(Application.status != STATUS_SEND_UNKNOWN)
+            .where(~select(WorkItem.id).where(WorkItem.application_id == Application.id).exists())
+        )
+        session = self.session_factory()
+        try:
+            result = session.execute(insert(WorkItem).from_select(
+                ["application_id", "batch_run_id", "candidate_id", "queue", "status", "available_at",
+                 "attempts", "created_at", "updated_at"],
+                unqueued,
+            ))
+            session.commit()
+            return result.rowcount
+        finally:
+            session.close()
+
+    def claim(self, worker_id: str, queues: Iterable[str], limit: int = 1) -> List[Dict]:
+        """
+        Leases up to limit queued items from the given queues.
+
+        Args:
+            worker_id: Identifier of the claiming worker, for diagnostics
+            queues: Queues this worker serves
+            limit: Maximum number of items to claim
+
+        Returns:
+            List of dictionaries with id, application_id, batch_run_id,
+            candidate_id, queue, available_at and lease_token of the
+            claimed items
+        """
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        queues = list(queues)
+        session = self.session_factory()
+        try:
+            backlog = {
+                (queue, candidate_id): count
+                for queue, candidate_id, count in session.execute(
+                    select(WorkItem.queue, WorkItem.candidate_id, func.count(WorkItem.id))
+                    .where(WorkItem.status == QUEUED)
+                    .where(WorkItem.queue.in_(queues))
+                    .where(WorkItem.available_at <= now)
+                    .group_by(WorkItem.queue, WorkItem.candidate_id)
+                )
+            }
+            shares = None
+            if any(candidate_id is not None for _, candidate_id in backlog):
+                picks, shares = self._fair_picks(session, backlog, queues, limit)
+                for (queue, candidate_id), count in picks.items():
+                    self._lease(session, worker_id, token, now, count, [queue],
+                                WorkItem.candidate_id.is_(None) if candidate_id is None
+                                else WorkItem.candidate_id == candidate_id)
+            elif backlog:
+                self._lease(session, worker_id, token, now, limit, queues)
+            items = [
+                {"id": item_id, "application_id": application_id, "batch_run_id": run_id,
+                 "candidate_id": candidate_id, "queue": queue, "available_at": available_at,
+                 "lease_token": token}
+                for item_id, application_id, run_id, candidate_id, queue, available_at in session.execute(
+                    select(WorkItem.id, WorkItem.application_id, WorkItem.batch_run_id, WorkItem.candidate_id,
+                           WorkItem.queue, WorkItem.available_at)
+                    .where(WorkItem.lease_token == token)
+                )
+            ]
+            session.commit()
+            if shares:
+                self._save_shares(session, shares)
+        finally:
+            session.close()
+        for item in items:
+            metrics.inc("work_items_claimed", queue=item["queue"])
+        return items
+
+    def _lease(self, session, worker_id: str, token: str, now: datetime, limit: int,
+               queues: List[str], *conditions):
+        """Leases up to limit available items of the queues that match the conditions."""
+        candidates = (
+            select(WorkItem.id)
+            .where(WorkItem.status == QUEUED)
+            .where(WorkItem.queue.in_(queues))
+            .where(WorkItem.available_at <= now)
+            .where(*conditions)
+            .order_by(WorkItem.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        session.execute(
+            update(WorkItem)
+            .where(WorkItem.id.in_(candidates.scalar_subquery()))
+            .where(WorkItem.status == QUEUED)
+            .values(
+                status=CLAIMED,
+                worker_id=worker_id,
+                lease_token=token,
+                lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                attempts=WorkItem.attempts + 1,
+                updated_at=now,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    def _fair_picks(self, session, backlog: Dict[Tuple[str, Optional[int]], int], queues: List[str],
+                    limit: int) -> Tuple[Counter, Dict[Tuple[str, int], Tuple[float, float]]]:
+        """
+        Chooses which candidates' items to claim.
+
+        Args:
+            session: Open session
+            backlog: Available item count by (queue, candidate_id)
+            queues: Queues being claimed from
+            limit: Number of items to claim
+
+        Returns:
+            Item count to claim by (queue, candidate_id), and the new
+            (start, finish) virtual times by (queue, tenant)
+        """
+        candidate_ids = {candidate_id for _, candidate_id in backlog if candidate_id is not None}
+        settings = {
+            row.id: row for row in session.execute(
+                select(Candidate.id, Candidate.weight, Candidate.max_in_flight, Candidate.daily_quota)
+                .where(Candidate.id.in_(candidate_ids))
+            )
+        }
+        in_flight, sending = Counter(), Counter()
+        for candidate_id, queue, count in session.execute(
+            select(WorkItem.candidate_id, WorkItem.queue, func.count(WorkItem.id))
+            .where(WorkItem.status == CLAIMED)
+            .where(WorkItem.candidate_id.in_(candidate_ids))
+            .group_by(WorkItem.candidate_id, WorkItem.queue)
+        ):
+            in_flight[candidate_id] += count
+            if queue == SEND_QUEUE:
+                sending[candidate_id] += count
+        quota_ids = [c for c, row in settings.items() if row.daily_quota is not None]
+        if quota_ids and SEND_QUEUE in queues:
+            midnight = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+            sending.update(dict(session.execute(
+                select(BatchRun.candidate_id, func.count(Email.id))
+                .join(Application, Application.id == Email.application_id)
+                .join(BatchRun, BatchRun.id == Application.batch_run_id)
+                .where(BatchRun.candidate_id.in_(quota_ids))
+                .where(Email.sent_date >= midnight)
+                .where(Email.status != STATUS_FAILED)
+                .group_by(BatchRun.candidate_id)
+            ).all()))
+
+        tags = {
+            (share.queue, share.candidate_id): (share.start_time, share.finish_time)
+            for share in session.query(TenantShare).filter(TenantShare.queue.in_(queues))
+        }
+        # System virtual time: the latest start time dispatched in each queue
+        clock = {queue: max([start for (q, _), (start, _) in tags.items() if q == queue], default=0.0)
+                 for queue in queues}
+
+        backlog = dict(backlog)
+        picks, updated = Counter(), {}
+        for _ in range(limit):
+            best = None
+            for (queue, candidate_id), count in backlog.items():
+                if count <= 0:
+                    continue
+                row = settings.get(candidate_id)
+                if row is not None and row.max_in_flight is not None and in_flight[candidate_id] >= row.max_in_flight:
+                    continue
+                if (row is not None and row.daily_quota is not None and queue == SEND_QUEUE
+                        and sending[candidate_id] >= row.daily_quota):
+                    continue
+                tenant = DEFAULT_TENANT if candidate_id is None else candidate_id
+                start = max(clock[queue], tags.get((queue, tenant), (0.0, 0.0))[1])
+                if best is None or (start, tenant) < best[:2]:
+                    best = (start, tenant, queue, candidate_id)
+            if best is None:
+                break
+            start, tenant, queue, candidate_id = best
+            row = settings.get(candidate_id)
+            weight = row.weight if row is not None and row.weight else 1.0
+            tags[(queue, tenant)] = updated[(queue, tenant)] = (start, start + 1.0 / weight)
+            clock[queue] = max(clock[queue], start)
+            backlog[(queue, candidate_id)] -= 1
+            in_flight[candidate_id] += 1
+            if queue == SEND_QUEUE:
+                sending[candidate_id] += 1
+            picks[(queue, candidate_id)] += 1
+        return picks, updated
+
+    def _save_shares(self, session, shares: Dict[Tuple[str, int], Tuple[float, float]]):
+        """Stores candidates' virtual times; a lost race only makes the next claim slightly less fair."""
+        try:
+            for (queue, tenant), (start, finish) in shares.items():
+                result = session.execute(
+                    update(TenantShare)
+                    .where(TenantShare.queue == queue)
+                    .where(TenantShare.candidate_id == tenant)
+                    .values(start_time=start, finish_time=finish)
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount == 0:
+                    session.add(TenantShare(candidate_id=tenant, queue=queue, start_time=start, finish_time=finish))
+            session.commit()
+        except IntegrityError:
+            session.rollback()
+
+    def heartbeat(self, items: Iterable[Dict]) -> List[int]:
+        """
+        Extends the leases of items still being worked on.
+
+        Args:
+            items: Items returned by claim()
+
+        Returns:
+            IDs of items whose lease was lost, e.g. because it had already
+            expired and the item was reclaimed by another worker
+        """
+        expires = datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+        lost = []
+        session = self.session_factory()
+        try:
+            for item in items:
+                result = session.execute(
+                    update(WorkItem)
+                    .where(WorkItem.id == item["id"])
+                    .where(WorkItem.lease_token == item["lease_token"])
+                    .values(lease_expires_at=expires)
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount == 0:
+                    lost.append(item["id"])
+            session.commit()
+        finally:
+            session.close()
+        return lost
+
+    def complete(self, item: Dict, next_queue: Optional[str]) -> bool:
+        """
+        Finishes a claimed item's stage and routes it to its next queue.
+
+        Args:
+            item: Item returned by claim()
+            next_queue: Queue for the application's next stage, or None if
+                the application needs no more work
+
+        Returns:
+            False if the lease had been lost in the meantime
+        """
+        values = {"status": DONE} if next_queue is None else {
+            "status": QUEUED, "queue": next_queue, "attempts": 0, "available_at": datetime.utcnow(),
+        }
+        return self._release(item, worker_id=None, lease_token=None, lease_expires_at=None,
+                             last_error=None, **values)
+
+    def fail(self, item: Dict, error: str, attempts: int, queue: Optional[str] = None) -> bool:
+        """
+        Puts a claimed item back for a delayed retry, or fails it for good.
+
+        Args:
+            item: Item returned by claim()
+            error: Description of the failure
+            attempts: Number of times the item's current stage was claimed
+            queue: Queue to retry in, if the stages that did succeed moved
+                the application on; defaults to the item's current queue
+
+        Returns:
+            False if the lease had been lost in the meantime
+        """
+        if attempts >= self.max_attempts:
+            values = {"status": FAILED}
+        else:
+            delay = timedelta(seconds=self.retry_delay * attempts)
+            values = {"status": QUEUED, "queue": queue or item["queue"], "available_at": datetime.utcnow() + delay}
+        return self._release(item, worker_id=None, lease_token=None, lease_expires_at=None,
+                             last_error=error, **values)
+
+    def _release(self, item: Dict, **values) -> bool:
+        session = self.session_factory()
+        try:
+            result = session.execute(
+                update(WorkItem)
+                .where(WorkItem.id == item["id"])
+                .where(WorkItem.lease_token == item["lease_token"])
+                .values(updated_at=datetime.utcnow(), **values)
+                .execution_options(synchronize_session=False)
+            )
+            session.commit()
+        finally:
+            session.close()
+        if result.rowcount == 0:
+            logger.warning(f"Lease on work item {item['id']} was lost before it was released")
+            return False
+        return True
+
+    def reclaim_expired(self) -> int:
+        """
+        Returns items whose lease expired to their queue.
+
+        Items that have exhausted their attempts are failed instead, so an
+        application that keeps crashing workers cannot take down the fleet.
+
+        Returns:
+            Number of items reclaimed or failed
+        """
+        now = datetime.utcnow()
+        session = self.session_factory()
+        try:
+            result = session.execute(
+                update(WorkItem)
+                .where(WorkItem.status == CLAIMED)
+                .where(WorkItem.lease_expires_at < now)
+                .values(
+                    status=case((WorkItem.attempts >= self.max_attempts, FAILED), else_=QUEUED),
+                    last_error="Lease expired",
+                    worker_id=None,
+                    lease_token=None,
+                    lease_expires_at=None,
+                    updated_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            session.commit()
+        finally:
+            session.close()
+        if result.rowcount:
+            logger.warning(f"Reclaimed {result.rowcount} work items with expired leases")
+            metrics.inc("work_items_reclaimed", result.rowcount)
+        return result.rowcount
+
+    def stats(self, run_id: Optional[int] = None) -> Dict[str, Dict[str, int]]:
+        """
+        Counts work items by queue and status.
+
+        Args:
+            run_id: Restrict the counts to one batch run
+
+        Returns:
+            Dictionary mapping queue to a dictionary of status counts
+        """
+        query = select(WorkItem.queue, WorkItem.status, func.count(WorkItem.id)).group_by(
+            WorkItem.queue, WorkItem.status
+        )
+        if run_id is not None:
+            query = query.where(WorkItem.batch_run_id == run_id)
+        session = self.session_factory()
+        try:
+            counts = {}
+            for queue, status, count in session.execute(query):
+                counts.setdefault(queue, {})[status] = count
+            return counts
+        finally:
+            session.close()
+
+    def attempts(self, item_id: int) -> int:
+        """Number of times the current stage of an item has been claimed."""
+        session = self.session_factory()
+        try:
+            return session.get(WorkItem, item_id).attempts
+        finally:
+            session.close()
+
+
+class Worker:
+    """
+    Processes queued applications on one node.
+
+    Runs concurrency threads that each claim an item, advance its application
+    through the stages of the queues this node serves, and route it on to
+    the next queue. A background thread heartbeats the leases of all items
+    in progress. Queue wait and service time of every item are recorded per
+    candidate in tenant_stats.
+
+    Args:
+        runner: BatchRunner used to process applications
+        queue: Work queue to claim items from
+        queues: Queues this node serves, e.g. ["llm"] for an LLM-heavy node
+        concurrency: Number of items processed at once
+        worker_id: Identifier recorded on claimed items; defaults to
+            hostname and process ID
+        poll_interval: Seconds to wait when no work is available
+        tenant_stats: Collector of per-candidate latency and throughput
+    """
+
+    def __init__(self, runner: BatchRunner, queue: WorkQueue, queues: Iterable[str] = QUEUES,
+                 concurrency: int = 1, worker_id: Optional[str] = None, poll_interval: float = 2.0,
+                 tenant_stats: Optional[TenantStats] = None):
+        unknown = set(queues) - set(QUEUES)
+        if unknown:
+            raise ValueError(f"Unknown queues: {', '.join(sorted(unknown))}")
+        self.runner = runner
+        self.queue = queue
+        self.queues = list(queues)
+        self.concurrency = concurrency
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.poll_interval = poll_interval
+        self.tenant_stats = tenant_stats or TenantStats()
+        self.processed = 0
+        self._held = {}
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def run(self, stop_event: Optional[threading.Event] = None, until_idle: bool = False) -> int:
+        """
+        Processes work until stopped.
+
+        Args:
+            stop_event: Event that stops the worker once set
+            until_idle: Return once no work is available to this node
+
+        Returns:
+            Number of items processed
+        """
+        stop_event = stop_event or threading.Event()
+        heartbeat_stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, args=(heartbeat_stop,), daemon=True)
+        heartbeat.start()
+        threads = [
+            threading.Thread(target=self._loop, args=(stop_event, until_idle), daemon=True)
+            for _ in range(self.concurrency)
+        ]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            logger.info("Stopping worker after the items in progress")
+            stop_event.set()
+            for thread in threads:
+                thread.join()
+        finally:
+            heartbeat_stop.set()
+        return self.processed
+
+    def _loop(self, stop_event: threading.Event, until_idle: bool):
+        while not stop_event.is_set():
+            self.queue.reclaim_expired()
+            items = self.queue.claim(self.worker_id, self.queues)
+            if not items:
+                with self._lock:
+                    busy = bool(self._held)
+                if until_idle and not busy:
+                    return
+                stop_event.wait(self.poll_interval)
+                continue
+            self.process(items[0])
+
+    def _heartbeat_loop(self, stop: threading.Event):
+        while not stop.wait(max(self.queue.lease_seconds / 3, 0.1)):
+            with self._lock:
+                held = list(self._held.values())
+            if held:
+                for item_id in self.queue.heartbeat(held):
+                    logger.warning(f"Lost the lease on work item {item_id}")
+
+    def _run_inputs(self, run_id: int):
+        with self._lock:
+            if run_id in self._runs:
+                return self._runs[run_id]
+        session = self.runner.session_factory()
+        try:
+            run = session.get(BatchRun, run_id)
+            resume_content = run.resume_content
+            if resume_content is None:
+                with open(run.resume_path, "r") as f:
+                    resume_content = f.read()
+            tenant = run.candidate.name if run.candidate is not None else DEFAULT_TENANT_NAME
+            inputs = (resume_content, json.loads(run.candidate_info or "{}"), tenant)
+        finally:
+            session.close()
+        with self._lock:
+            self._runs[run_id] = inputs
+        return inputs
+
+    def process(self, item: Dict):
+        """
+        Processes one claimed item and releases it.
+
+        Args:
+            item: Item returned by WorkQueue.claim()
+        """
+        with self._lock:
+            self._held[item["id"]] = item
+        try:
+            resume_content, candidate_info, tenant = self._run_inputs(item["batch_run_id"])
+            wait = (datetime.utcnow() - item["available_at"]).total_seconds() if item.get("available_at") else 0.0
+            started = time.monotonic()
+            with metrics.timer("work_item", queue=item["queue"], candidate=tenant):
+                status = self.runner.process_application(
+                    item["application_id"], resume_content, candidate_info, queues=self.queues
+                )
+            self.tenant_stats.record(tenant, item["queue"], max(0.0, wait), time.monotonic() - started)
+            session = self.runner.session_factory()
+            try:
+                application = session.get(Application, item["application_id"])
+                stage, error = application.stage, application.last_error
+            finally:
+                session.close()
+
+            if status == STATUS_FAILED:
+                self.queue.fail(item, error or "Unknown error", self.queue.attempts(item["id"]),
+                                queue=STAGE_QUEUES.get(stage))
+            elif status in (STATUS_SEND_UNKNOWN, STATUS_CLAIMED_ELSEWHERE) or stage == SENT:
+                # Requeueing a send another worker is doing would flag it as interrupted
+                self.queue.complete(item, None)
+            else:
+                self.queue.complete(item, STAGE_QUEUES[stage])
+        except Exception as e:
+            logger.error(f"Error processing work item {item['id']}: {e}")
+            self.queue.fail(item, str(e), self.queue.attempts(item["id"]))
+        finally:
+            with self._lock:
+                self._held.pop(item["id"], None)
+                self.processed += 1
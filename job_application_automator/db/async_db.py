@@ -0,0 +1,189 @@
+import threading
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.engine import make_url
+
+from ..utils.config import get_database_config
+from .models import Application, Base, EmailTemplate, _add_missing_columns
+from .search import create_search_index
+
+try:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+except ImportError:  # Requires greenlet: pip install "job_application_automator[async]"
+    async_sessionmaker = None
+    create_async_engine = None
+
+# asyncio drivers used in place of the blocking ones
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+    "mysql": "aiomysql",
+}
+# Drivers that already support asyncio
+ASYNC_CAPABLE_DRIVERS = {"aiosqlite", "asyncpg", "aiomysql", "asyncmy", "psycopg"}
+
+_engine = None
+_session_factory = None
+_lock = threading.Lock()
+
+
+def async_database_url(url: str) -> str:
+    """
+    Converts a database URL to use an asyncio driver.
+
+    Args:
+        url: SQLAlchemy URL, e.g. sqlite:///applications.db
+
+    Returns:
+        The URL with its driver replaced, e.g. sqlite+aiosqlite:///applications.db;
+        URLs that already name an asyncio driver are returned unchanged
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if parsed.get_driver_name() in ASYNC_CAPABLE_DRIVERS or backend not in ASYNC_DRIVERS:
+        return url
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+def create_engine_from_config(url: Optional[str] = None):
+    """
+    Creates an async engine from the database configuration.
+
+    Args:
+        url: Database URL; defaults to ASYNC_DATABASE_URL, or DATABASE_URL
+            with its driver swapped for an asyncio one
+
+    Returns:
+        AsyncEngine whose connection pool is sized by DATABASE_POOL_SIZE
+        and DATABASE_MAX_OVERFLOW
+    """
+    if create_async_engine is None:
+        raise ImportError('Async database access requires: pip install "job_application_automator[async]"')
+    config = get_database_config()
+    url = url or config["async_url"] or async_database_url(config["url"])
+    options = {"pool_pre_ping": True}
+    # SQLite picks its own pool (a single connection for in-memory databases)
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(pool_size=config["pool_size"], max_overflow=config["max_overflow"])
+    return create_async_engine(url, **options)
+
+
+def get_engine():
+    """
+    Returns the process-wide async engine, creating it on first use.
+
+    Coroutines share the engine, so they share its connection pool: each
+    session borrows a connection only while it runs a query, and concurrent
+    coroutines use separate connections instead of queueing on one.
+    """
+    global _engine
+    with _lock:
+        if _engine is None:
+            _engine = create_engine_from_config()
+        return _engine
+
+
+def get_session_factory():
+    """Returns the async session factory bound to the shared engine."""
+    global _session_factory
+    engine = get_engine()
+    with _lock:
+        if _session_factory is None:
+            # Objects stay readable after the session that loaded them closes
+            _session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        return _session_factory
+
+
+async def dispose():
+    """Closes the shared engine's connections, e.g. before the event loop exits."""
+    global _engine, _session_factory
+    with _lock:
+        engine, _engine, _session_factory = _engine, None, None
+    if engine is not None:
+        await engine.dispose()
+
+
+async def init_db(engine=None):
+    """
+    Creates the tables without blocking the loop, like models.init_db.
+
+    Columns added since an existing database was created are added, and
+    the full-text index is created (and filled) if it is missing.
+
+    Args:
+        engine: AsyncEngine to use instead of the shared one
+    """
+    async with (engine or get_engine()).begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(create_search_index)
+
+
+async def get_application(application_id: int, session_factory=None) -> Optional[Application]:
+    """
+    Gets an application by ID; the async counterpart of Application.get_by_id.
+
+    Args:
+        application_id: ID of the application
+        session_factory: Async session factory; defaults to the shared one
+
+    Returns:
+        The application, detached from its session, or None
+    """
+    async with (session_factory or get_session_factory())() as session:
+        return await session.get(Application, application_id)
+
+
+async def get_applications(application_ids: List[int], session_factory=None) -> List[Application]:
+    """
+    Gets several applications in one query.
+
+    Args:
+        application_ids: IDs of the applications
+        session_factory: Async session factory; defaults to the shared one
+
+    Returns:
+        The applications that exist, in ID order
+    """
+    async with (session_factory or get_session_factory())() as session:
+        result = await session.execute(
+            select(Application).where(Application.id.in_(application_ids)).order_by(Application.id)
+        )
+        return list(result.scalars())
+
+
+async def get_email_template(name: str, session_factory=None) -> Optional[EmailTemplate]:
+    """
+    Gets a template by name; the async counterpart of EmailTemplate.get_by_name.
+
+    Args:
+        name: Name of the template
+        session_factory: Async session factory; defaults to the shared one
+
+    Returns:
+        The template, detached from its session, or None
+    """
+    async with (session_factory or get_session_factory())() as session:
+        result = await session.execute(select(EmailTemplate).where(EmailTemplate.name == name))
+        return result.scalars().first()
+
+
+async def update_application(application_id: int, fields: Dict, session_factory=None) -> bool:
+    """
+    Updates columns of an application.
+
+    Args:
+        application_id: ID of the application
+        fields: Column names and their new values
+        session_factory: Async session factory; defaults to the shared one
+
+    Returns:
+        Whether the application exists
+    """
+    async with (session_factory or get_session_factory())() as session:
+        result = await session.execute(
+            update(Application).where(Application.id == application_id).values(**fields)
+        )
+        await session.commit()
+        return result.rowcount > 0
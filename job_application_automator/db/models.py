@@ -1,13 +1,72 @@
+import time
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import create_engine, event, inspect, text, BigInteger, Column, Float, Index, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
 from ..utils.config import get_database_config
+from ..utils.metrics import metrics
+from .search import create_search_index
 
 Base = declarative_base()
 engine = create_engine(get_database_config()["url"])
 Session = sessionmaker(bind=engine)
 
+@event.listens_for(engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if metrics.enabled:
+        context._query_start = time.perf_counter()
+
+@event.listens_for(engine, "after_cursor_execute")
+def _record_query_time(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_query_start", None)
+    if start is not None:
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+        metrics.observe("db_query", time.perf_counter() - start, operation=operation)
+
+class Candidate(Base):
+    """Model for a candidate (tenant) whose runs share the worker fleet."""
+    
+    __tablename__ = "candidates"
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String(255), unique=True, nullable=False)
+    resume_content = Column(Text)
+    candidate_info = Column(Text)
+    # JSON mapping template name to {"subject": ..., "content": ...}
+    email_templates = Column(Text)
+    smtp_server = Column(String(255))
+    smtp_port = Column(Integer)
+    smtp_username = Column(String(255))
+    # Name of the environment variable holding the SMTP password
+    smtp_password_env = Column(String(255))
+    # Share of the fleet relative to other candidates with queued work
+    weight = Column(Float, default=1.0, nullable=False)
+    max_in_flight = Column(Integer)
+    daily_quota = Column(Integer)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    batch_runs = relationship("BatchRun", back_populates="candidate")
+
+class BatchRun(Base):
+    """Model for tracking batch runs over many job applications."""
+    
+    __tablename__ = "batch_runs"
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String(255), nullable=False, index=True)
+    candidate_id = Column(Integer, ForeignKey("candidates.id"), index=True)
+    resume_path = Column(String(500))
+    resume_content = Column(Text)
+    candidate_info = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    status = Column(String(50), default="running")
+    
+    # Relationships
+    applications = relationship("Application", back_populates="batch_run")
+    candidate = relationship("Candidate", back_populates="batch_runs")
+
 class Application(Base):
     """Model for tracking job applications."""
     
@@ -22,8 +81,31 @@ class Application(Base):
     resume_version = Column(String(255))
     cover_letter_version = Column(String(255))
     
+    # Batch pipeline checkpoint: the last completed stage and its artifacts
+    batch_run_id = Column(Integer, ForeignKey("batch_runs.id"), index=True)
+    job_key = Column(String(64), index=True)
+    contact_email = Column(String(255))
+    job_url = Column(String(2048))
+    expires_at = Column(DateTime, index=True)
+    match_score = Column(Float)
+    stage = Column(String(50), default="pending")
+    job_analysis = Column(Text)
+    resume_tex = Column(Text)
+    cover_letter_tex = Column(Text)
+    email_body = Column(Text)
+    resume_pdf_path = Column(String(500))
+    cover_letter_pdf_path = Column(String(500))
+    # SHA-256 of each document in the artifact store
+    resume_tex_hash = Column(String(64), index=True)
+    cover_letter_tex_hash = Column(String(64), index=True)
+    resume_pdf_hash = Column(String(64), index=True)
+    cover_letter_pdf_hash = Column(String(64), index=True)
+    last_error = Column(Text)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
     # Relationships
     emails = relationship("Email", back_populates="application")
+    batch_run = relationship("BatchRun", back_populates="applications")
     
     @classmethod
     def get_by_id(cls, application_id: int):
@@ -31,6 +113,11 @@ class Application(Base):
         session = Session()
         return session.query(cls).filter(cls.id == application_id).first()
 
+@event.listens_for(Application.__table__, "after_create")
+def _create_search_index(target, connection, **kw):
+    # The full-text index is created with the table, wherever that happens
+    create_search_index(connection)
+
 class Email(Base):
     """Model for tracking email communications."""
     
@@ -38,14 +125,91 @@ class Email(Base):
     
     id = Column(Integer, primary_key=True)
     application_id = Column(Integer, ForeignKey("applications.id"))
+    message_id = Column(String(255), index=True)
     subject = Column(String(255))
     content = Column(Text)
     sent_date = Column(DateTime, default=datetime.utcnow)
     status = Column(String(50), default="pending")
+    # Set by the inbox sync when a reply or bounce is matched to this email
+    response_date = Column(DateTime)
     
     # Relationships
     application = relationship("Application", back_populates="emails")
 
+class BatchJob(Base):
+    """Model for provider batch jobs submitted for a batch run, so an interrupted run can collect them."""
+    
+    __tablename__ = "batch_jobs"
+    
+    id = Column(Integer, primary_key=True)
+    batch_run_id = Column(Integer, ForeignKey("batch_runs.id"), index=True)
+    job_id = Column(String(255), nullable=False)
+    # JSON list of the custom IDs of the requests in the job
+    custom_ids = Column(Text, nullable=False)
+    submitted_at = Column(DateTime, default=datetime.utcnow)
+    completed_at = Column(DateTime)
+
+class WorkItem(Base):
+    """Model for the distributed work queue: one row per application in flight."""
+    
+    __tablename__ = "work_items"
+    __table_args__ = (Index("ix_work_items_claim", "status", "queue", "available_at"),)
+    
+    id = Column(Integer, primary_key=True)
+    application_id = Column(Integer, ForeignKey("applications.id"), unique=True, nullable=False)
+    batch_run_id = Column(Integer, ForeignKey("batch_runs.id"), index=True)
+    # Copied from the batch run, so claims can be shared out per candidate
+    candidate_id = Column(Integer, index=True)
+    queue = Column(String(20), nullable=False)
+    status = Column(String(20), default="queued", nullable=False)
+    worker_id = Column(String(255))
+    lease_token = Column(String(32), index=True)
+    lease_expires_at = Column(DateTime, index=True)
+    available_at = Column(DateTime, default=datetime.utcnow)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class CandidateProfile(Base):
+    """Model for the compact profile distilled from a resume, keyed by the resume's hash."""
+    
+    __tablename__ = "candidate_profiles"
+    __table_args__ = (Index("ix_candidate_profiles_hash_version", "resume_hash", "version", unique=True),)
+    
+    id = Column(Integer, primary_key=True)
+    resume_hash = Column(String(64), nullable=False)
+    version = Column(Integer, nullable=False)
+    profile = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class TenantShare(Base):
+    """Model for each candidate's position in the fair-share schedule of a queue."""
+    
+    __tablename__ = "tenant_shares"
+    __table_args__ = (Index("ix_tenant_shares_candidate_queue", "candidate_id", "queue", unique=True),)
+    
+    id = Column(Integer, primary_key=True)
+    # 0 stands for runs without a candidate
+    candidate_id = Column(Integer, nullable=False)
+    queue = Column(String(20), nullable=False)
+    # Virtual start and finish time of the candidate's last claimed item
+    start_time = Column(Float, default=0.0, nullable=False)
+    finish_time = Column(Float, default=0.0, nullable=False)
+
+class MailboxState(Base):
+    """Model for the position of the incremental inbox sync in each mailbox."""
+    
+    __tablename__ = "mailbox_states"
+    __table_args__ = (Index("ix_mailbox_states_account_mailbox", "account", "mailbox", unique=True),)
+    
+    id = Column(Integer, primary_key=True)
+    account = Column(String(255), nullable=False)
+    mailbox = Column(String(255), nullable=False)
+    uid_validity = Column(BigInteger)
+    last_uid = Column(BigInteger, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class EmailTemplate(Base):
     """Model for storing email templates."""
     
@@ -62,9 +226,27 @@ class EmailTemplate(Base):
         session = Session()
         return session.query(cls).filter(cls.name == name).first()
 
+def _add_missing_columns(bind):
+    """Add columns introduced after a table was first created, on an engine or connection."""
+    if isinstance(bind, Engine):
+        with bind.begin() as conn:
+            return _add_missing_columns(conn)
+    inspector = inspect(bind)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(dialect=bind.dialect)
+                bind.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
 def init_db():
     """Initialize the database."""
     Base.metadata.create_all(engine)
+    _add_missing_columns(engine)
+    with engine.begin() as conn:
+        create_search_index(conn)
     
     # Create default email templates
     session = Session()
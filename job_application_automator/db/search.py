@@ -0,0 +1,198 @@
+import logging
+import re
+from typing import Dict, List, Tuple
+
+from sqlalchemy import inspect, text
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = "applications_fts"
+# Indexed columns of the applications table, with their bm25 weights:
+# a match in the company or title ranks above one deep in a description
+SEARCH_COLUMNS = (
+    ("company_name", 5.0),
+    ("position_title", 5.0),
+    ("job_description", 1.0),
+    ("job_analysis", 1.0),
+    ("cover_letter_tex", 0.5),
+)
+DEFAULT_HIGHLIGHT = ("[", "]")
+# Tokens in a snippet around the best match
+SNIPPET_TOKENS = 16
+# Only the most recent matches are ranked, which bounds the cost of a search
+# for a common word regardless of how many postings are stored
+DEFAULT_RANK_WINDOW = 5000
+
+_COLUMN_LIST = ", ".join(name for name, _ in SEARCH_COLUMNS)
+# Postgres has no external-content index, so an expression index over the
+# same weighted document is used; queries must repeat the expression exactly
+_PG_DOCUMENT = " || ".join(
+    f"setweight(to_tsvector('english', coalesce({name}, '')), '{weight}')"
+    for (name, _), weight in zip(SEARCH_COLUMNS, "AABCD")
+)
+_QUERY_TOKEN = re.compile(r'-?"[^"]*"|\S+')
+
+
+def _sqlite_statements() -> List[str]:
+    """DDL of the FTS5 index and the triggers keeping it in sync with applications."""
+    values = lambda prefix: ", ".join(f"{prefix}.{name}" for name, _ in SEARCH_COLUMNS)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+        f"{_COLUMN_LIST}, content='applications', content_rowid='id', tokenize='porter unicode61')",
+        f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert AFTER INSERT ON applications BEGIN "
+        f"INSERT INTO {SEARCH_TABLE}(rowid, {_COLUMN_LIST}) VALUES (new.id, {values('new')}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete AFTER DELETE ON applications BEGIN "
+        f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, {_COLUMN_LIST}) "
+        f"VALUES ('delete', old.id, {values('old')}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update AFTER UPDATE OF {_COLUMN_LIST} ON applications BEGIN "
+        f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, {_COLUMN_LIST}) "
+        f"VALUES ('delete', old.id, {values('old')}); "
+        f"INSERT INTO {SEARCH_TABLE}(rowid, {_COLUMN_LIST}) VALUES (new.id, {values('new')}); END",
+    ]
+
+
+def create_search_index(conn):
+    """
+    Creates the full-text index over applications, if it does not exist.
+
+    On SQLite this is an FTS5 table over the application columns, kept in
+    sync by insert, update and delete triggers; an index created for an
+    existing table is filled from it. On Postgres it is a GIN index over
+    the columns' weighted tsvector, which Postgres maintains itself. Other
+    databases have no index, and search() falls back to LIKE scans.
+
+    Args:
+        conn: SQLAlchemy connection, inside a transaction
+    """
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        existed = inspect(conn).has_table(SEARCH_TABLE)
+        for statement in _sqlite_statements():
+            conn.exec_driver_sql(statement)
+        if not existed:
+            conn.exec_driver_sql(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
+    elif dialect == "postgresql":
+        conn.exec_driver_sql(
+            f"CREATE INDEX IF NOT EXISTS ix_applications_search ON applications USING GIN (({_PG_DOCUMENT}))"
+        )
+
+
+def fts_query(query: str) -> str:
+    """
+    Turns a user's search into an FTS5 query.
+
+    Every word must match. "Quoted phrases" match as phrases, a trailing *
+    matches a prefix and a leading - excludes a word. Everything else is
+    quoted, so input such as C++ or node.js is never read as FTS syntax.
+
+    Args:
+        query: Search as typed by the user
+
+    Returns:
+        FTS5 MATCH expression
+    """
+    include, exclude = [], []
+    for token in _QUERY_TOKEN.findall(query):
+        negate = token.startswith("-") and len(token) > 1
+        token = token[1:] if negate else token
+        prefix = token.endswith("*") and not token.startswith('"')
+        term = token.strip('"').rstrip("*") if prefix else token.strip('"')
+        if not term.strip():
+            continue
+        term = '"' + term.replace('"', '""') + '"' + ("*" if prefix else "")
+        (exclude if negate else include).append(term)
+    if not include:
+        raise ValueError("Search needs at least one word to match")
+    return " ".join(include) + "".join(f" NOT {term}" for term in exclude)
+
+
+def _search_sqlite(session, query: str, limit: int, highlight: Tuple[str, str], window: int):
+    match = fts_query(query)
+    floor = 0
+    if window:
+        floor = session.execute(text(
+            f"SELECT min(rowid) FROM (SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :query "
+            f"ORDER BY rowid DESC LIMIT :window)"
+        ), {"query": match, "window": window}).scalar() or 0
+    weights = ", ".join(str(weight) for _, weight in SEARCH_COLUMNS)
+    scores = dict(session.execute(text(
+        f"SELECT rowid, bm25({SEARCH_TABLE}, {weights}) AS score FROM {SEARCH_TABLE} "
+        f"WHERE {SEARCH_TABLE} MATCH :query AND rowid >= :floor ORDER BY score LIMIT :limit"
+    ), {"query": match, "floor": floor, "limit": limit}).all())
+    if not scores:
+        return []
+    # Snippets are only built for the results, not for every match
+    rows = session.execute(text(
+        f"SELECT a.id, a.company_name, a.position_title, a.status, "
+        f"snippet({SEARCH_TABLE}, -1, :start, :end, '...', {SNIPPET_TOKENS}) AS snippet "
+        f"FROM {SEARCH_TABLE} JOIN applications a ON a.id = {SEARCH_TABLE}.rowid "
+        f"WHERE {SEARCH_TABLE} MATCH :query AND {SEARCH_TABLE}.rowid IN ({', '.join(map(str, scores))})"
+    ), {"query": match, "start": highlight[0], "end": highlight[1]})
+    return sorted(
+        ({**row, "score": scores[row["id"]]} for row in rows.mappings()),
+        key=lambda row: row["score"],
+    )
+
+
+def _search_postgres(session, query: str, limit: int, highlight: Tuple[str, str]):
+    options = f"StartSel={highlight[0]}, StopSel={highlight[1]}, MaxWords={SNIPPET_TOKENS}, MinWords=5"
+    return session.execute(text(
+        f"SELECT id, company_name, position_title, status, "
+        f"-ts_rank_cd({_PG_DOCUMENT}, q) AS score, "
+        f"ts_headline('english', coalesce(job_description, ''), q, :options) AS snippet "
+        f"FROM applications, websearch_to_tsquery('english', :query) AS q "
+        f"WHERE ({_PG_DOCUMENT}) @@ q ORDER BY score LIMIT :limit"
+    ), {"query": query, "options": options, "limit": limit}).mappings().all()
+
+
+def _search_like(session, query: str, limit: int):
+    words = [word.strip('"') for word in query.split() if word.strip('"')]
+    if not words:
+        raise ValueError("Search needs at least one word to match")
+    clauses = " AND ".join(
+        f"(coalesce(company_name, '') || ' ' || coalesce(position_title, '') || ' ' || "
+        f"coalesce(job_description, '') LIKE :w{i})" for i in range(len(words))
+    )
+    return session.execute(text(
+        f"SELECT id, company_name, position_title, status, 0.0 AS score, "
+        f"substr(coalesce(job_description, ''), 1, 200) AS snippet FROM applications "
+        f"WHERE {clauses} ORDER BY id DESC LIMIT :limit"
+    ), {**{f"w{i}": f"%{word}%" for i, word in enumerate(words)}, "limit": limit}).mappings().all()
+
+
+def search(session, query: str, limit: int = 20, highlight: Tuple[str, str] = DEFAULT_HIGHLIGHT,
+           window: int = DEFAULT_RANK_WINDOW) -> List[Dict]:
+    """
+    Finds applications whose posting, analysis or cover letter match a search.
+
+    Args:
+        session: SQLAlchemy session
+        query: Words to find; see fts_query() for the syntax
+        limit: Maximum number of results
+        highlight: Markers put around matched words in snippets
+        window: On SQLite, rank only this many of the most recent matches
+            (0 ranks all of them)
+
+    Returns:
+        Best matches first, as dictionaries with id, company_name,
+        position_title, status, score (lower is better) and snippet
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect == "sqlite":
+        rows = _search_sqlite(session, query, limit, highlight, window)
+    elif dialect == "postgresql":
+        rows = _search_postgres(session, query, limit, highlight)
+    else:
+        logger.warning(f"No full-text index on {dialect}; scanning applications")
+        rows = _search_like(session, query, limit)
+    return [
+        {
+            "id": row["id"],
+            "company_name": row["company_name"],
+            "position_title": row["position_title"],
+            "status": row["status"],
+            "score": float(row["score"]),
+            "snippet": " ".join((row["snippet"] or "").split()),
+        }
+        for row in rows
+    ]
@@ -0,0 +1,245 @@
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+from .core.manager import JobApplicationManager
+from .utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BODY_BYTES = 5 * 1024 * 1024
+
+
+class BadRequest(Exception):
+    """Raised for malformed or incomplete requests."""
+
+
+class ApplicationServer(ThreadingHTTPServer):
+    """
+    Long-running HTTP/JSON server around a warm JobApplicationManager.
+
+    The manager (and with it the LLM client, DB engine pool, email template
+    cache and attachment cache) is created once and shared by all requests,
+    so per-request overhead is only the work itself. At most max_concurrency
+    requests are processed at a time; others wait up to queue_timeout seconds
+    for a slot before being rejected with 503.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        manager: JobApplicationManager,
+        max_concurrency: int = 8,
+        queue_timeout: float = 30.0,
+        max_body_bytes: int = DEFAULT_MAX_BODY_BYTES,
+    ):
+        super().__init__(address, ApplicationRequestHandler)
+        self.manager = manager
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.queue_timeout = queue_timeout
+        self.max_body_bytes = max_body_bytes
+
+
+class ApplicationRequestHandler(BaseHTTPRequestHandler):
+    """Routes JSON requests to the shared JobApplicationManager."""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "JobAutomator/0.1"
+
+    POST_ROUTES = {
+        "/analyze": "_analyze",
+        "/customize": "_customize",
+        "/cover": "_cover",
+        "/suggest": "_suggest",
+        "/apply": "_apply",
+    }
+
+    def log_message(self, format, *args):
+        logger.info(f"{self.address_string()} - {format % args}")
+
+    def _send_json(self, status: int, payload: Dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 503:
+            self.send_header("Retry-After", "1")
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _content_length(self) -> int:
+        try:
+            return int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            self.close_connection = True
+            raise BadRequest("Invalid Content-Length")
+
+    def _discard_body(self):
+        """
+        Reads and drops the request body, so the next request on the
+        connection does not start in the middle of it. Bodies too large to
+        read are not read; the connection is closed after the reply instead.
+        """
+        try:
+            length = self._content_length()
+        except BadRequest:
+            return
+        if length > self.server.max_body_bytes:
+            self.close_connection = True
+        elif length:
+            self.rfile.read(length)
+
+    def _read_json(self) -> Dict:
+        length = self._content_length()
+        if length > self.server.max_body_bytes:
+            # The body is left unread, so the connection cannot be reused
+            self.close_connection = True
+            raise BadRequest(f"Request body exceeds {self.server.max_body_bytes} bytes")
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as e:
+            raise BadRequest(f"Invalid JSON: {e}")
+        if not isinstance(payload, dict):
+            raise BadRequest("Request body must be a JSON object")
+        return payload
+
+    @staticmethod
+    def _require(payload: Dict, field: str):
+        value = payload.get(field)
+        if not value:
+            raise BadRequest(f"Missing required field '{field}'")
+        return value
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/metrics":
+            body = metrics.to_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {"error": f"Unknown endpoint {self.path}"})
+
+    def do_POST(self):
+        handler_name = self.POST_ROUTES.get(self.path)
+        if handler_name is None:
+            self._discard_body()
+            self._send_json(404, {"error": f"Unknown endpoint {self.path}"})
+            return
+        try:
+            payload = self._read_json()
+        except BadRequest as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        if not self.server.slots.acquire(timeout=self.server.queue_timeout):
+            metrics.inc("http_rejected", endpoint=self.path)
+            self._send_json(503, {"error": "Server busy, try again later"})
+            return
+        try:
+            with metrics.timer("http_request", endpoint=self.path):
+                getattr(self, handler_name)(payload)
+        except BadRequest as e:
+            self._send_json(400, {"error": str(e)})
+        except Exception as e:
+            logger.error(f"Error handling {self.path}: {e}")
+            self._send_json(500, {"error": str(e)})
+        finally:
+            self.server.slots.release()
+
+    def _job_details(self, payload: Dict) -> Dict:
+        if payload.get("job_details"):
+            return payload["job_details"]
+        return self.server.manager.handle_job_description(self._require(payload, "job_description"))
+
+    def _analyze(self, payload: Dict):
+        job_details = self.server.manager.handle_job_description(self._require(payload, "job_description"))
+        self._send_json(200, {"job_details": job_details})
+
+    def _customize(self, payload: Dict):
+        resume = self._require(payload, "resume")
+        job_details = self._job_details(payload)
+        resume_tex = self.server.manager.ai_client.customize_resume(
+            job_details, resume, company_name=payload.get("company_name")
+        )
+        self._send_json(200, {"job_details": job_details, "resume_tex": resume_tex})
+
+    def _cover(self, payload: Dict):
+        job_details = self._job_details(payload)
+        cover_letter_tex = self.server.manager.ai_client.generate_cover_letter(
+            job_details, payload.get("candidate_info") or {}, company_name=payload.get("company_name")
+        )
+        self._send_json(200, {"job_details": job_details, "cover_letter_tex": cover_letter_tex})
+
+    def _suggest(self, payload: Dict):
+        suggestions = self.server.manager.ai_client.suggest_improvements(self._require(payload, "resume"))
+        self._send_json(200, {"suggestions": suggestions})
+
+    def _apply(self, payload: Dict):
+        """Streams one NDJSON event per pipeline step, then a final result event."""
+        job_desc = self._require(payload, "job_description")
+        resume = self._require(payload, "resume")
+        candidate_info = payload.get("candidate_info") or {}
+        email_details = payload.get("email")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def write_event(event: Dict):
+            data = (json.dumps(event) + "\n").encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        try:
+            result = self.server.manager.process_application(
+                job_desc, resume, candidate_info, email_details,
+                on_result=lambda step, value: write_event({"event": "step", "step": step, "result": value}),
+            )
+            write_event({"event": "done", "result": result})
+        except Exception as e:
+            logger.error(f"Error handling /apply: {e}")
+            write_event({"event": "error", "error": str(e)})
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def serve(
+    manager: Optional[JobApplicationManager] = None,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    max_concurrency: int = 8,
+    queue_timeout: float = 30.0,
+):
+    """
+    Runs the HTTP server until interrupted.
+
+    Args:
+        manager: Manager to share between requests; created if omitted
+        host: Interface to bind
+        port: Port to listen on
+        max_concurrency: Maximum number of requests processed at once
+        queue_timeout: Seconds a request waits for a free slot before a 503
+    """
+    server = ApplicationServer(
+        (host, port),
+        manager or JobApplicationManager(),
+        max_concurrency=max_concurrency,
+        queue_timeout=queue_timeout,
+    )
+    logger.info(f"Serving on http://{host}:{server.server_address[1]} (max {max_concurrency} concurrent requests)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
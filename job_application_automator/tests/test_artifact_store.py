@@ -0,0 +1,43 @@
+import gzip
+import pytest
+from job_application_automator.core import artifact_store
+from job_application_automator.core.artifact_store import ArtifactStore
+
+LATEX = "\\documentclass{article}\n\\begin{document}\nJane Doe\n\\end{document}\n" * 20
+
+def test_put_and_get_text(tmp_path):
+    store = ArtifactStore(tmp_path)
+    digest = store.put(LATEX)
+
+    path = store.path(digest)
+    assert path == tmp_path / digest[:2] / digest[2:4] / f"{digest}.gz"
+    assert path.stat().st_size < len(LATEX)
+    assert gzip.decompress(path.read_bytes()).decode() == LATEX
+    assert store.get_text(digest) == LATEX
+
+def test_identical_content_is_stored_once(tmp_path):
+    store = ArtifactStore(tmp_path)
+    assert store.put(LATEX) == store.put(LATEX.encode())
+    assert store.put("other") != store.put(LATEX)
+    assert len(list(store.digests())) == 2
+
+def test_files_are_stored_uncompressed(tmp_path):
+    store = ArtifactStore(tmp_path / "store")
+    pdf = tmp_path / "resume.pdf"
+    pdf.write_bytes(b"%PDF-1.5 binary")
+
+    digest = store.put_file(pdf)
+    assert store.path(digest).read_bytes() == b"%PDF-1.5 binary"
+    assert store.export(digest, tmp_path / "copy.pdf").read_bytes() == b"%PDF-1.5 binary"
+
+def test_missing_artifact(tmp_path):
+    store = ArtifactStore(tmp_path)
+    assert "0" * 64 not in store
+    with pytest.raises(KeyError):
+        store.get("0" * 64)
+
+def test_zstd_falls_back_to_gzip_when_unavailable(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifact_store, "zstandard", None)
+    store = ArtifactStore(tmp_path, compression="zstd")
+    assert store.compression == "gzip"
+    assert store.get_text(store.put(LATEX)) == LATEX
@@ -0,0 +1,107 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+import pytest
+from job_application_automator.core.email_communicator import EmailCommunicator
+from job_application_automator.db import async_db
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import sessionmaker
+from job_application_automator.db.models import Application, EmailTemplate
+from job_application_automator.db.search import search
+
+def test_database_urls_get_asyncio_drivers():
+    assert async_db.async_database_url("sqlite:///applications.db") == "sqlite+aiosqlite:///applications.db"
+    assert async_db.async_database_url("postgresql+psycopg2://app:secret@db/jobs") == \
+        "postgresql+asyncpg://app:secret@db/jobs"
+    assert async_db.async_database_url("mysql+pymysql://db/jobs") == "mysql+aiomysql://db/jobs"
+    assert async_db.async_database_url("postgresql+asyncpg://db/jobs") == "postgresql+asyncpg://db/jobs"
+
+def test_compose_email_without_blocking(monkeypatch):
+    monkeypatch.setenv("EMAIL_USERNAME", "jane@example.com")
+    monkeypatch.setenv("EMAIL_PASSWORD", "secret")
+    communicator = EmailCommunicator()
+    template = EmailTemplate(name="application", subject="Applying to {company_name}", content="Hello {company_name}")
+    with patch.object(async_db, "get_email_template", AsyncMock(return_value=template)) as get_template:
+        async def compose_many():
+            return await asyncio.gather(*(
+                communicator.acompose_email("application", {"company_name": f"Company {i}", "to": "jobs@acme.test"})
+                for i in range(3)
+            ))
+        emails = asyncio.run(compose_many())
+        # Later calls reuse the template cached by earlier ones, like compose_email
+        communicator.compose_email("application", {"company_name": "Acme"})
+
+    assert [email["subject"] for email in emails] == ["Applying to Company 0", "Applying to Company 1",
+                                                      "Applying to Company 2"]
+    assert get_template.await_count <= 3
+    assert get_template.await_args.args == ("application",)
+
+@pytest.fixture
+def session_factory(tmp_path):
+    pytest.importorskip("greenlet")
+    pytest.importorskip("aiosqlite")
+    engine = async_db.create_engine_from_config(f"sqlite+aiosqlite:///{tmp_path / 'applications.db'}")
+    asyncio.run(async_db.init_db(engine))
+    yield async_db.async_sessionmaker(engine, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+def test_repository_functions(session_factory):
+    async def scenario():
+        async with session_factory() as session:
+            session.add_all([Application(company_name=f"Company {i}", position_title="Engineer") for i in range(3)])
+            session.add(EmailTemplate(name="follow_up", subject="Following up", content="Hello"))
+            await session.commit()
+
+        application = await async_db.get_application(2, session_factory)
+        assert application.company_name == "Company 1"
+        assert await async_db.get_application(99, session_factory) is None
+        assert (await async_db.get_email_template("follow_up", session_factory)).subject == "Following up"
+
+        assert await async_db.update_application(2, {"status": "interview"}, session_factory)
+        assert not await async_db.update_application(99, {"status": "interview"}, session_factory)
+        applications = await async_db.get_applications([3, 2, 99], session_factory)
+        assert [(a.id, a.status) for a in applications] == [(2, "interview"), (3, "submitted")]
+
+    asyncio.run(scenario())
+
+def test_concurrent_queries_do_not_block_the_loop(session_factory):
+    async def scenario():
+        async with session_factory() as session:
+            session.add_all([Application(company_name=f"Company {i}", position_title="Engineer") for i in range(50)])
+            await session.commit()
+
+        ticks = 0
+        done = asyncio.Event()
+
+        async def ticker():
+            nonlocal ticks
+            while not done.is_set():
+                ticks += 1
+                await asyncio.sleep(0)
+
+        tick_task = asyncio.create_task(ticker())
+        applications = await asyncio.gather(*(async_db.get_application(i, session_factory) for i in range(1, 51)))
+        done.set()
+        await tick_task
+        return applications, ticks
+
+    applications, ticks = asyncio.run(scenario())
+    assert [a.company_name for a in applications] == [f"Company {i}" for i in range(50)]
+    # The loop kept running other coroutines while the queries were in flight
+    assert ticks > 1
+
+def test_init_db_upgrades_an_existing_database(tmp_path):
+    pytest.importorskip("greenlet")
+    pytest.importorskip("aiosqlite")
+    path = tmp_path / "applications.db"
+    old = create_engine(f"sqlite:///{path}")
+    with old.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE applications (id INTEGER PRIMARY KEY, company_name VARCHAR(255) NOT NULL, "
+                             "position_title VARCHAR(255) NOT NULL, job_description TEXT)")
+        conn.exec_driver_sql("INSERT INTO applications VALUES (1, 'Acme', 'Engineer', 'Run Kubernetes clusters')")
+
+    engine = async_db.create_engine_from_config(f"sqlite+aiosqlite:///{path}")
+    asyncio.run(async_db.init_db(engine))
+    asyncio.run(engine.dispose())
+
+    assert {"stage", "resume_tex_hash", "last_error"} <= {c["name"] for c in inspect(old).get_columns("applications")}
+    assert [r["company_name"] for r in search(sessionmaker(bind=old)(), "kubernetes")] == ["Acme"]
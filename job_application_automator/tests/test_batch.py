@@ -0,0 +1,165 @@
+import json
+import smtplib
+import pytest
+from unittest.mock import MagicMock
+from job_application_automator.core import batch
+from job_application_automator.core.artifact_store import ArtifactStore
+from job_application_automator.core.batch import BatchRunner
+from job_application_automator.core.ingestion import iter_jobs
+from job_application_automator.db.models import Application, Email
+from job_application_automator.utils.ai_client import MistralAIClient
+from job_application_automator.utils.llm_backends import StubBackend
+
+RESUME = "\\documentclass{article}\n\\begin{document}\nJane Doe\n\\end{document}"
+
+JOBS = [
+    {"company": "Acme", "title": "Backend Engineer", "description": "Python and SQL", "email": "jobs@acme.test"},
+    {"company": "Globex", "title": "Data Engineer", "description": "Spark and Kafka", "email": "hr@globex.test"},
+]
+
+@pytest.fixture
+def jobs_file(tmp_path):
+    path = tmp_path / "jobs.jsonl"
+    path.write_text("\n".join(json.dumps(job) for job in JOBS) + "\n")
+    return str(path)
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = MagicMock()
+    manager.ai_client = MistralAIClient(backend=StubBackend())
+    manager.handle_job_description.side_effect = manager.ai_client.analyze_job_description
+
+    def compile_latex(content, output_name):
+        path = tmp_path / f"{output_name}.pdf"
+        path.write_bytes(b"%PDF")
+        return str(path)
+
+    manager.latex_handler.compile_latex.side_effect = compile_latex
+    manager.email_communicator.compose_email.side_effect = lambda template, details: {
+        "to": details["to"], "subject": "Application", "body": "Hello", "attachments": details["attachments"],
+    }
+    manager.email_communicator.send_email.return_value = True
+    return manager
+
+def test_run_completes_all_stages(manager, session_factory, jobs_file):
+    runner = BatchRunner(manager, session_factory=session_factory)
+    run_id = runner.create_run("nightly", iter_jobs(jobs_file), "resume.tex", {"name": "Jane"})
+
+    assert runner.run(run_id, RESUME) == {"submitted": 2}
+    assert manager.email_communicator.send_email.call_count == 2
+
+    session = session_factory()
+    emails = session.query(Email).all()
+    assert [e.status for e in emails] == ["sent", "sent"]
+    assert all(e.message_id for e in emails)
+
+def test_resume_skips_completed_stages(manager, session_factory, jobs_file):
+    runner = BatchRunner(manager, session_factory=session_factory)
+    run_id = runner.create_run("nightly", iter_jobs(jobs_file), "resume.tex")
+    manager.latex_handler.compile_latex.side_effect = RuntimeError("pdflatex crashed")
+
+    assert runner.run(run_id, RESUME) == {"failed": 2}
+    llm_calls = manager.ai_client.client.calls
+
+    manager.latex_handler.compile_latex.side_effect = lambda content, name: name + ".pdf"
+    assert runner.find_run("nightly") == run_id
+    assert runner.add_jobs(run_id, iter_jobs(jobs_file)) == 0
+    assert runner.run(run_id, RESUME) == {"submitted": 2}
+    # Analysis and generation results were reused from the checkpoint
+    assert manager.ai_client.client.calls == llm_calls
+
+def test_interrupted_send_is_never_repeated(manager, session_factory, jobs_file):
+    runner = BatchRunner(manager, session_factory=session_factory)
+    run_id = runner.create_run("nightly", iter_jobs(jobs_file), "resume.tex")
+
+    session = session_factory()
+    application = session.query(Application).first()
+    application.stage = batch.SENDING
+    session.commit()
+
+    counts = runner.run(run_id, RESUME)
+    assert counts == {"send_unknown": 1, "submitted": 1}
+    assert manager.email_communicator.send_email.call_count == 1
+
+    runner.run(run_id, RESUME)
+    assert manager.email_communicator.send_email.call_count == 1
+
+def test_rejected_send_is_retried(manager, session_factory, jobs_file):
+    runner = BatchRunner(manager, session_factory=session_factory)
+    run_id = runner.create_run("nightly", iter_jobs(jobs_file), "resume.tex")
+    manager.email_communicator.send_email.side_effect = smtplib.SMTPRecipientsRefused({})
+
+    assert runner.run(run_id, RESUME) == {"failed": 2}
+
+    manager.email_communicator.send_email.side_effect = None
+    assert runner.run(run_id, RESUME) == {"submitted": 2}
+
+def test_ambiguous_send_failure_is_not_retried(manager, session_factory, jobs_file):
+    runner = BatchRunner(manager, session_factory=session_factory)
+    run_id = runner.create_run("nightly", iter_jobs(jobs_file), "resume.tex")
+    manager.email_communicator.send_email.side_effect = smtplib.SMTPServerDisconnected()
+
+    assert runner.run(run_id, RESUME) == {"send_unknown": 2}
+    manager.email_communicator.send_email.side_effect = None
+    runner.run(run_id, RESUME)
+    assert manager.email_communicator.send_email.call_count == 2
+
+def test_send_is_claimed_by_one_worker(manager, session_factory, jobs_file):
+    runner = BatchRunner(manager, session_factory=session_factory)
+    run_id = runner.create_run("nightly", iter_jobs(jobs_file), "resume.tex")
+    application_id = session_factory().query(Application.id).first()[0]
+    runner.process_application(application_id, RESUME, {"name": "Jane"}, until=batch.COMPILED)
+
+    # Both workers read the compiled application; the other one claims it first
+    stale = session_factory()
+    application = stale.get(Application, application_id)
+    other = session_factory()
+    other.get(Application, application_id).stage = batch.SENDING
+    other.commit()
+
+    assert runner._send(stale, application, {"name": "Jane"}) is False
+    assert application.stage == batch.SENDING
+    assert manager.email_communicator.send_email.call_count == 0
+    assert stale.query(Email).count() == 0
+
+def test_documents_are_stored_by_hash(manager, session_factory, jobs_file, tmp_path):
+    store = ArtifactStore(tmp_path / "artifacts")
+    runner = BatchRunner(manager, session_factory=session_factory, artifact_store=store)
+    run_id = runner.create_run("nightly", iter_jobs(jobs_file), "resume.tex", {"name": "Jane"})
+    runner.run(run_id, RESUME)
+
+    session = session_factory()
+    for application in session.query(Application).all():
+        assert store.get_text(application.resume_tex_hash) == application.resume_tex
+        assert store.get_text(application.cover_letter_tex_hash) == application.cover_letter_tex
+        assert application.resume_pdf_path == str(store.path(application.resume_pdf_hash))
+    assert not list(tmp_path.glob("*.pdf"))
+    # Stored PDFs are named by hash, but are attached under readable names
+    attachments = [call.kwargs["details"]["attachments"]
+                   for call in manager.email_communicator.compose_email.call_args_list]
+    assert sorted(name for sent in attachments for _, name in sent) == \
+        ["cover_letter_1.pdf", "cover_letter_2.pdf", "resume_1.pdf", "resume_2.pdf"]
+    # Both applications compiled identical (fake) PDFs, which are stored once
+    assert len({a.resume_pdf_hash for a in session.query(Application)}) == 1
+    session.close()
+
+def test_clustered_run_customizes_once_per_cluster(manager, session_factory, tmp_path):
+    jobs = [
+        {"company": f"Company {i}", "title": "Backend Engineer", "description": "Python and SQL",
+         "email": f"jobs@company{i}.test"}
+        for i in range(4)
+    ] + [{"company": "Globex", "title": "Data Engineer", "description": "Spark and Kafka", "email": "hr@globex.test"}]
+    path = tmp_path / "similar.jsonl"
+    path.write_text("\n".join(json.dumps(job) for job in jobs) + "\n")
+    resume = RESUME.replace("Jane Doe", "\\section*{Summary}\nJane Doe")
+    manager.ai_client.customize_resume = MagicMock(side_effect=lambda details, content, **kwargs: content)
+
+    runner = BatchRunner(manager, session_factory=session_factory)
+    run_id = runner.create_run("clustered", iter_jobs(str(path)), "resume.tex", {"name": "Jane"})
+    assert runner.run_clustered(run_id, resume) == {"submitted": 5}
+    assert manager.ai_client.customize_resume.call_count == 2
+
+    session = session_factory()
+    application = session.query(Application).filter(Application.company_name == "Company 2").one()
+    assert "Applying for the Backend Engineer role at Company 2." in application.resume_tex
+    session.close()
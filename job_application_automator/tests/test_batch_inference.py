@@ -0,0 +1,133 @@
+import json
+import pytest
+from unittest.mock import MagicMock
+from mistralai.models.chat_completion import ChatMessage
+from job_application_automator.core.batch import BatchRunner
+from job_application_automator.core.ingestion import iter_jobs
+from job_application_automator.db.models import Application, BatchJob
+from job_application_automator.utils.ai_client import MistralAIClient
+from job_application_automator.utils.batch_inference import (
+    BatchInferenceClient,
+    LocalBatchEndpoint,
+    parse_result_line,
+)
+from job_application_automator.utils.llm_backends import StubBackend
+
+RESUME = "\\documentclass{article}\n\\begin{document}\nJane Doe\n\\end{document}"
+
+JOBS = [
+    {"company": "Acme", "title": "Backend Engineer", "description": "Python and SQL", "email": "jobs@acme.test"},
+    {"company": "Globex", "title": "Data Engineer", "description": "Spark and Kafka", "email": "hr@globex.test"},
+    {"company": "Initech", "title": "SRE", "description": "Linux and Go", "email": "it@initech.test"},
+]
+
+def requests(n):
+    for i in range(n):
+        yield f"req-{i}", [ChatMessage(role="user", content=f"Question {i}")]
+
+@pytest.fixture
+def backend():
+    return StubBackend()
+
+@pytest.fixture
+def offline_manager(tmp_path, backend):
+    manager = MagicMock()
+    manager.ai_client = MistralAIClient(backend=backend)
+    manager.handle_job_description.side_effect = AssertionError("synchronous LLM call")
+    manager.ai_client._chat = MagicMock(side_effect=AssertionError("synchronous LLM call"))
+
+    def compile_latex(content, output_name):
+        path = tmp_path / f"{output_name}.pdf"
+        path.write_bytes(b"%PDF")
+        return str(path)
+
+    manager.latex_handler.compile_latex.side_effect = compile_latex
+    manager.email_communicator.compose_email.side_effect = lambda template, details: {
+        "to": details["to"], "subject": "Application", "body": "Hello", "attachments": details["attachments"],
+    }
+    manager.email_communicator.send_email.return_value = True
+    return manager
+
+@pytest.fixture
+def jobs_file(tmp_path):
+    path = tmp_path / "jobs.jsonl"
+    path.write_text("\n".join(json.dumps(job) for job in JOBS) + "\n")
+    return str(path)
+
+def test_jobs_are_chunked_and_all_results_returned(tmp_path):
+    backend = StubBackend()
+    endpoint = LocalBatchEndpoint(tmp_path, backend)
+    client = BatchInferenceClient(endpoint, max_requests_per_job=2, sleep=lambda s: None)
+
+    results = list(client.run(requests(5)))
+
+    assert endpoint.submitted == 3
+    assert backend.calls == 5
+    assert sorted(custom_id for custom_id, _, _ in results) == [f"req-{i}" for i in range(5)]
+    assert all(content and error is None for _, content, error in results)
+
+def test_polls_until_jobs_finish(tmp_path):
+    sleeps = []
+    endpoint = LocalBatchEndpoint(tmp_path, StubBackend(), polls_until_done=2)
+    client = BatchInferenceClient(endpoint, poll_interval=5, sleep=sleeps.append)
+
+    assert len(list(client.run(requests(3)))) == 3
+    assert sleeps == [5, 5]
+
+def test_unfinished_jobs_time_out(tmp_path):
+    endpoint = LocalBatchEndpoint(tmp_path, StubBackend(), polls_until_done=100)
+    client = BatchInferenceClient(endpoint, timeout=0, sleep=lambda s: None)
+
+    results = list(client.run(requests(2)))
+    assert [content for _, content, _ in results] == [None, None]
+    assert all("did not finish" in error for _, _, error in results)
+
+def test_failed_requests_are_reported(tmp_path):
+    endpoint = LocalBatchEndpoint(tmp_path, StubBackend(error_rate=1.0))
+    client = BatchInferenceClient(endpoint, sleep=lambda s: None)
+
+    [(custom_id, content, error)] = list(client.run(requests(1)))
+    assert custom_id == "req-0" and content is None and error
+
+    assert parse_result_line({
+        "custom_id": "x", "response": {"status_code": 429, "body": {"message": "slow down"}}, "error": None,
+    }) == ("x", None, json.dumps({"message": "slow down"}))
+
+def test_run_offline_makes_no_synchronous_llm_calls(tmp_path, session_factory, backend, offline_manager, jobs_file):
+    endpoint = LocalBatchEndpoint(tmp_path / "jobs", backend)
+    inference = BatchInferenceClient(endpoint, sleep=lambda s: None)
+    runner = BatchRunner(offline_manager, session_factory=session_factory)
+    run_id = runner.create_run("offline", iter_jobs(jobs_file), "resume.tex", {"name": "Jane"})
+
+    assert runner.run_offline(run_id, RESUME, inference) == {"submitted": 3}
+    # One job for the analyses, one for the resumes, cover letters and emails
+    assert endpoint.submitted == 2
+    assert backend.calls == 3 * 4
+
+    session = session_factory()
+    for application in session.query(Application).all():
+        assert json.loads(application.job_analysis)
+        assert application.resume_tex and application.cover_letter_tex and application.email_body
+        assert application.stage == "sent"
+    session.close()
+
+def test_interrupted_offline_run_collects_its_jobs(tmp_path, session_factory, backend, offline_manager, jobs_file):
+    endpoint = LocalBatchEndpoint(tmp_path / "jobs", backend, polls_until_done=100)
+    runner = BatchRunner(offline_manager, session_factory=session_factory)
+    run_id = runner.create_run("offline", iter_jobs(jobs_file), "resume.tex", {"name": "Jane"})
+
+    # Gives up while the analysis job is still running
+    inference = BatchInferenceClient(endpoint, timeout=0, sleep=lambda s: None)
+    assert runner.run_offline(run_id, RESUME, inference) == {"failed": 3}
+    assert endpoint.submitted == 1
+
+    endpoint.polls_until_done = 0
+    inference = BatchInferenceClient(endpoint, sleep=lambda s: None)
+    assert runner.run_offline(run_id, RESUME, inference) == {"submitted": 3}
+    # The analysis job was collected rather than submitted again
+    assert endpoint.submitted == 2
+    assert backend.calls == 3 * 4
+
+    session = session_factory()
+    assert session.query(BatchJob).filter(BatchJob.completed_at.is_(None)).count() == 0
+    session.close()
@@ -0,0 +1,75 @@
+import time
+import numpy as np
+from job_application_automator.core.bullet_library import BulletLibrary, extract_bullets, prune_bullets
+from job_application_automator.utils.ai_client import MistralAIClient
+from job_application_automator.utils.llm_backends import StubBackend
+
+RESUME = r"""\documentclass{article}
+\begin{document}
+\section{Experience}
+\begin{itemize}
+  \item Built Python REST APIs serving 2M requests a day
+  \item Organized the office holiday party % not relevant
+  \item Tuned PostgreSQL queries, cutting p99 latency by 40\%
+\end{itemize}
+\section{Volunteering}
+\begin{itemize}
+  \item Taught weekend art classes
+\end{itemize}
+\end{document}
+"""
+
+JOB = {"required_skills": ["Python", "PostgreSQL"], "key_responsibilities": ["Build REST APIs"]}
+
+def library(tmp_path=None):
+    client = MistralAIClient(backend=StubBackend())
+    return BulletLibrary(client.embed, tmp_path / "bullets.npz" if tmp_path else None)
+
+def test_extract_bullets():
+    assert extract_bullets(RESUME) == [
+        "Built Python REST APIs serving 2M requests a day",
+        "Organized the office holiday party",
+        "Tuned PostgreSQL queries, cutting p99 latency by 40\\%",
+        "Taught weekend art classes",
+    ]
+
+def test_prune_keeps_selected_and_one_item_per_list():
+    pruned = prune_bullets(RESUME, {"Built Python REST APIs serving 2M requests a day"})
+    assert extract_bullets(pruned) == ["Built Python REST APIs serving 2M requests a day", "Taught weekend art classes"]
+    assert pruned.count("\\begin{itemize}") == pruned.count("\\end{itemize}") == 2
+
+def test_search_and_persistence(tmp_path):
+    bullets = library(tmp_path)
+    assert bullets.add_resume(RESUME) == 4
+    assert bullets.add_resume(RESUME) == 0
+
+    top = bullets.search(["Python"], k=1)
+    assert top[0][0].startswith("Built Python")
+    bullets.save()
+
+    reloaded = library(tmp_path)
+    assert reloaded.bullets == bullets.bullets
+    np.testing.assert_array_equal(reloaded.vectors, bullets.vectors)
+
+def test_resume_prompt_only_carries_relevant_bullets():
+    bullets = library()
+    bullets.add(["Migrated PostgreSQL clusters with zero downtime"])
+    client = MistralAIClient(backend=StubBackend(), bullet_library=bullets)
+    client.bullet_top_k = 3
+
+    prompt = client.resume_messages(JOB, RESUME)[1].content
+    assert "Built Python REST APIs" in prompt
+    assert "holiday party" not in prompt
+    assert "- Migrated PostgreSQL clusters with zero downtime" in prompt
+
+def test_retrieval_over_thousands_of_bullets_is_fast():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(5000, 1024)).astype(np.float32)
+    bullets = BulletLibrary(lambda texts: rng.normal(size=(len(texts), 1024)))
+    bullets.add([f"bullet {i}" for i in range(5000)])
+    bullets.vectors = BulletLibrary._normalize(vectors)
+
+    bullets.search(["warm up"] * 4)
+    start = time.perf_counter()
+    assert len(bullets.search(["Python", "SQL", "APIs", "Kafka"], k=12)) == 12
+    assert time.perf_counter() - start < 0.05
@@ -0,0 +1,64 @@
+import json
+from unittest.mock import MagicMock
+import pytest
+from job_application_automator.core import candidate_profile
+from job_application_automator.core.batch import BatchRunner
+from job_application_automator.core.candidate_profile import CandidateProfileStore, merge_profile
+from job_application_automator.core.ingestion import iter_jobs
+from job_application_automator.db.models import CandidateProfile
+from job_application_automator.utils.ai_client import MistralAIClient
+from job_application_automator.utils.llm_backends import StubBackend
+
+RESUME = "\\documentclass{article}\n\\begin{document}\nJane Doe, jane@example.com\nPython, SQL\n\\end{document}"
+
+@pytest.fixture
+def ai_client():
+    client = MistralAIClient(backend=StubBackend())
+    client.extract_candidate_profile = MagicMock(wraps=client.extract_candidate_profile)
+    return client
+
+def test_profile_is_distilled_once_per_resume(ai_client, session_factory, monkeypatch):
+    store = CandidateProfileStore(ai_client, session_factory)
+    profile = store.get(RESUME)
+    assert profile["skills"] == ["Python", "SQL"]
+    assert profile["contact"] == {"email": "jane@example.com"}
+    assert store.get(RESUME) is profile
+
+    # A new process reads the stored profile instead of distilling it again
+    assert CandidateProfileStore(ai_client, session_factory).get(RESUME) == profile
+    assert ai_client.extract_candidate_profile.call_count == 1
+
+    # Editing the resume, or changing the profile format, invalidates it
+    CandidateProfileStore(ai_client, session_factory).get(RESUME.replace("SQL", "Rust"))
+    monkeypatch.setattr(candidate_profile, "PROFILE_VERSION", candidate_profile.PROFILE_VERSION + 1)
+    CandidateProfileStore(ai_client, session_factory).get(RESUME)
+    assert ai_client.extract_candidate_profile.call_count == 3
+    assert session_factory().query(CandidateProfile).count() == 3
+
+def test_explicit_details_take_precedence():
+    profile = {"name": "Jane Doe", "headline": "", "skills": ["Python"], "resume": "ignored"}
+    assert merge_profile(profile, {"name": "Jane Q. Doe", "phone": None, "linkedin": "jane"}) == {
+        "name": "Jane Q. Doe", "skills": ["Python"], "linkedin": "jane",
+    }
+
+def test_batch_sends_candidate_details_as_given(ai_client, session_factory, tmp_path):
+    manager = MagicMock()
+    manager.ai_client = ai_client
+    manager.handle_job_description.side_effect = ai_client.analyze_job_description
+    manager.latex_handler.compile_latex.side_effect = lambda content, name: str(tmp_path / f"{name}.pdf")
+    manager.email_communicator.compose_email.side_effect = lambda template, details: {
+        "to": details["to"], "subject": "Application", "body": "Hello", "attachments": details["attachments"],
+    }
+    ai_client.cover_letter_messages = MagicMock(wraps=ai_client.cover_letter_messages)
+    jobs_file = tmp_path / "jobs.jsonl"
+    jobs_file.write_text("\n".join(json.dumps({
+        "company": f"Company {i}", "title": "Engineer", "description": "Python", "email": f"jobs@c{i}.test",
+    }) for i in range(3)))
+
+    runner = BatchRunner(manager, session_factory=session_factory)
+    run_id = runner.create_run("profiled", iter_jobs(str(jobs_file)), "resume.tex", {"name": "Jane Q. Doe"})
+    assert runner.run(run_id, RESUME) == {"submitted": 3}
+
+    # Cover letters never carried the resume, so no profile is distilled for them
+    assert ai_client.extract_candidate_profile.call_count == 0
+    assert [call.args[1] for call in ai_client.cover_letter_messages.call_args_list] == [{"name": "Jane Q. Doe"}] * 3
@@ -0,0 +1,36 @@
+import numpy as np
+from job_application_automator.core.clustering import (
+    cluster_analyses,
+    representative_details,
+    touch_up_resume,
+)
+
+BACKEND = {"title": "Backend Engineer", "required_skills": ["Python", "PostgreSQL", "Docker"]}
+DATA = {"title": "Data Engineer", "required_skills": ["Spark", "Kafka", "Scala"]}
+
+def test_near_identical_jobs_share_a_cluster():
+    analyses = [BACKEND, DATA, dict(BACKEND, preferred_skills=["AWS"]), DATA, BACKEND, {"title": "Chef"}]
+    labels = cluster_analyses(analyses)
+    assert labels[0] == labels[2] == labels[4]
+    assert labels[1] == labels[3]
+    assert len(set(labels)) == 3
+
+def test_dissimilar_jobs_are_split():
+    analyses = [{"required_skills": [f"Skill {i}"]} for i in range(5)]
+    assert sorted(cluster_analyses(analyses)) == [0, 1, 2, 3, 4]
+    assert list(cluster_analyses([])) == []
+
+def test_representative_keeps_majority_skills():
+    details = representative_details([
+        BACKEND,
+        dict(BACKEND, required_skills=["Python", "PostgreSQL", "Go"]),
+        dict(BACKEND, required_skills=["Python", "Docker"]),
+    ])
+    assert details["title"] == "Backend Engineer"
+    assert details["required_skills"] == ["Python", "PostgreSQL", "Docker"]
+
+def test_touch_up_adds_company_line():
+    resume = "\\begin{document}\n\\section*{Summary}\nBackend engineer.\n\\end{document}"
+    touched = touch_up_resume(resume, "AT&T", "SRE")
+    assert "\\section*{Summary}\nApplying for the SRE role at AT\\&T.\n\nBackend engineer." in touched
+    assert touch_up_resume("\\begin{document}\nx\n\\end{document}", "Acme") == "\\begin{document}\nx\n\\end{document}"
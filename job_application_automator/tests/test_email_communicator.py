@@ -77,3 +77,53 @@ def test_schedule_email(email_communicator):
         result = email_communicator.schedule_email(content, send_date, application_id)
         assert result is True
         mock_schedule.assert_called_once()
+
+@pytest.fixture
+def communicator(monkeypatch):
+    monkeypatch.setenv("EMAIL_USERNAME", "test@example.com")
+    monkeypatch.setenv("EMAIL_PASSWORD", "password123")
+    return EmailCommunicator()
+
+def test_attachments_are_encoded_once(communicator, tmp_path):
+    resume = tmp_path / "resume.pdf"
+    resume.write_bytes(b"%PDF-1.5 resume")
+    content = {"to": "recruiter@company.com", "subject": "Application", "body": "Hi",
+               "attachments": [str(resume)]}
+
+    with patch('smtplib.SMTP') as mock_smtp:
+        for _ in range(20):
+            assert communicator.send_email(content) is True
+        sent = [c[0][0] for c in mock_smtp.return_value.__enter__.return_value.send_message.call_args_list]
+
+    assert communicator.attachment_cache.stats()["misses"] == 1
+    assert communicator.attachment_cache.stats()["hits"] == 19
+    # Every message references the same encoded part
+    parts = {id(message.get_payload()[1]) for message in sent}
+    assert len(parts) == 1
+    assert sent[0].get_payload()[1].get_filename() == "resume.pdf"
+
+    # A file can be attached under another name, e.g. one stored by its hash
+    renamed = communicator.attachment_cache.get(str(resume), "resume_jane_doe.pdf")
+    assert renamed.get_filename() == "resume_jane_doe.pdf"
+    assert renamed is communicator.attachment_cache.get(str(resume), "resume_jane_doe.pdf")
+
+def test_attachment_cache_detects_changes(communicator, tmp_path):
+    cache = communicator.attachment_cache
+    resume = tmp_path / "resume.pdf"
+    resume.write_bytes(b"version one")
+    first = cache.get(str(resume))
+    resume.write_bytes(b"version two, longer")
+    second = cache.get(str(resume))
+    assert first is not second
+    assert second.get_payload(decode=True) == b"version two, longer"
+
+def test_attachment_cache_is_bounded(tmp_path):
+    from job_application_automator.core.email_communicator import AttachmentCache
+    cache = AttachmentCache(max_bytes=100)
+    for i in range(5):
+        path = tmp_path / f"file{i}.pdf"
+        path.write_bytes(bytes(40))
+        cache.get(str(path))
+    stats = cache.stats()
+    assert stats["bytes"] <= 100
+    assert stats["entries"] == 1
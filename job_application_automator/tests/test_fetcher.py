@@ -0,0 +1,169 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+import pytest
+from job_application_automator import cli
+from job_application_automator.core.batch import ANALYZED, BatchRunner
+from job_application_automator.core.fetcher import (
+    FETCHED,
+    NOT_MODIFIED,
+    FetchCache,
+    JobFetcher,
+    extract_job_posting,
+    extract_job_text,
+)
+from job_application_automator.core.ingestion import iter_jobs
+from job_application_automator.db.models import Application
+from job_application_automator.utils.ai_client import MistralAIClient
+from job_application_automator.utils.llm_backends import StubBackend
+
+DESCRIPTION = "We are looking for a Python engineer to build data pipelines. " * 5
+
+PAGE = f"""<html><head><title>Engineer</title><style>body {{ color: red; }}</style></head>
+<body>
+<nav><a href="/">Home</a> <a href="/jobs">All jobs</a></nav>
+<div class="sidebar">Similar jobs</div>
+<div class="job-description">
+  <h1>Python Engineer</h1>
+  <p>{DESCRIPTION}</p>
+  <ul><li>5 years of Python</li><li>SQL &amp; Airflow</li></ul>
+</div>
+<footer>&copy; Example Jobs</footer>
+<script>trackPageView();</script>
+</body></html>"""
+
+class PostingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), PostingHandler)
+        self.requests = []
+        self.pages = {}
+        self.delay = 0.0
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+class PostingHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, self.headers.get("If-None-Match")))
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            time.sleep(server.delay)
+            page = server.pages.get(self.path)
+            if page is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            etag = f'"{hash(page) & 0xffffffff:x}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            body = page.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def server():
+    server = PostingServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_extract_job_text_keeps_only_the_posting():
+    text = extract_job_text(PAGE)
+    assert text.startswith("Python Engineer\n")
+    assert "5 years of Python\nSQL & Airflow" in text
+    for noise in ("Home", "Similar jobs", "Example Jobs", "trackPageView", "color: red"):
+        assert noise not in text
+
+def test_extract_job_text_prefers_json_ld():
+    posting = {"@context": "https://schema.org", "@type": "JobPosting", "title": "Data Engineer",
+               "hiringOrganization": {"@type": "Organization", "name": "Acme"},
+               "description": "<p>Build pipelines.</p><p>Use Spark.</p>"}
+    page = f'<html><body><script type="application/ld+json">{json.dumps(posting)}</script>' \
+           f'<p>Cookie banner</p></body></html>'
+    assert extract_job_text(page) == "Data Engineer\nAcme\nBuild pipelines.\nUse Spark."
+    posting = extract_job_posting(page)
+    assert (posting["title"], posting["company_name"]) == ("Data Engineer", "Acme")
+    assert extract_job_posting(PAGE)["company_name"] is None
+
+def test_unchanged_postings_are_not_downloaded_or_analyzed_again(server, tmp_path):
+    server.pages = {"/jobs/1": PAGE, "/jobs/2": PAGE.replace("Python Engineer", "Data Engineer")}
+    urls = [f"{server.base_url}/jobs/1", f"{server.base_url}/jobs/2"]
+    analyze = MagicMock(side_effect=lambda text: {"title": text.splitlines()[0], "required_skills": ["Python"]})
+    fetcher = JobFetcher(FetchCache(tmp_path / "cache"))
+
+    first = {r["url"]: r for r in fetcher.fetch_all(urls + urls[:1], analyze)}
+    assert [r["status"] for r in first.values()] == [FETCHED, FETCHED]
+    assert first[urls[1]]["analysis"] == {"title": "Data Engineer", "required_skills": ["Python"]}
+    assert analyze.call_count == 2
+
+    # The second posting changes; the first one is answered with 304
+    server.pages["/jobs/2"] = PAGE.replace("Python Engineer", "ML Engineer")
+    second = {r["url"]: r for r in fetcher.fetch_all(urls, analyze)}
+    assert second[urls[0]]["status"] == NOT_MODIFIED
+    assert second[urls[0]]["analysis"] == {"title": "Python Engineer", "required_skills": ["Python"]}
+    assert second[urls[1]]["status"] == FETCHED
+    assert second[urls[1]]["analysis"] == {"title": "ML Engineer", "required_skills": ["Python"]}
+    assert analyze.call_count == 3
+    assert [etag is not None for path, etag in server.requests[2:]] == [True, True]
+    fetcher.close()
+
+def test_per_host_limit_and_errors(server):
+    server.pages = {f"/jobs/{i}": PAGE for i in range(8)}
+    server.delay = 0.05
+    fetcher = JobFetcher(concurrency=8, per_host=2)
+    results = list(fetcher.fetch_all([f"{server.base_url}/jobs/{i}" for i in range(9)]))
+    assert sorted(r["status"] for r in results) == ["error"] + ["fetched"] * 8
+    assert server.max_active <= 2
+    fetcher.close()
+
+def test_fetch_command_writes_a_feed_batch_can_use(server, tmp_path, monkeypatch, session_factory):
+    posting = {"@context": "https://schema.org", "@type": "JobPosting", "title": "Data Engineer",
+               "hiringOrganization": {"@type": "Organization", "name": "Acme"},
+               "description": f"<p>{DESCRIPTION}</p>"}
+    server.pages = {"/jobs/1": f'<html><body><script type="application/ld+json">{json.dumps(posting)}</script>'
+                               f'</body></html>'}
+    manager = MagicMock()
+    manager.handle_job_description.side_effect = MistralAIClient(backend=StubBackend()).analyze_job_description
+    monkeypatch.setattr(cli, "JobApplicationManager", lambda: manager)
+    monkeypatch.setenv("FETCH_CACHE_DIR", str(tmp_path / "cache"))
+    output = tmp_path / "jobs.jsonl"
+    monkeypatch.setattr("sys.argv", ["job-automator", "fetch", f"{server.base_url}/jobs/1", "-o", str(output)])
+    cli.main()
+
+    [job] = iter_jobs(str(output))
+    assert (job["company_name"], job["position_title"]) == ("Acme", "Data Engineer")
+    assert "Python" in job["job_analysis"]["required_skills"]
+
+    # The analysis made while fetching is not made again by batch
+    runner = BatchRunner(manager, session_factory=session_factory)
+    runner.create_run("fetched", iter_jobs(str(output)), "resume.tex")
+    application = session_factory().query(Application).one()
+    assert (application.stage, application.company_name) == (ANALYZED, "Acme")
+    assert json.loads(application.job_analysis)["title"] == "Data Engineer"
+    assert manager.handle_job_description.call_count == 1
@@ -0,0 +1,113 @@
+import re
+import pytest
+from job_application_automator.core.inbox_sync import InboxSync
+from job_application_automator.db.models import Application, Email, MailboxState
+
+class FakeIMAP:
+    """In-memory stand-in for an imaplib connection to one mailbox."""
+
+    def __init__(self, uid_validity=1):
+        self.uid_validity = uid_validity
+        self.messages = {}
+        self.fetched = []
+
+    def add(self, raw: str) -> int:
+        uid = max(self.messages, default=0) + 1
+        self.messages[uid] = raw.encode()
+        return uid
+
+    def select(self, mailbox, readonly=False):
+        return "OK", [str(len(self.messages)).encode()]
+
+    def response(self, code):
+        return code, [str(self.uid_validity).encode()]
+
+    def uid(self, command, *args):
+        if command == "SEARCH":
+            start = int(args[1].split(":")[0])
+            matching = [uid for uid in self.messages if uid >= start]
+            if not matching and self.messages:
+                matching = [max(self.messages)]
+            return "OK", [" ".join(map(str, matching)).encode()]
+        uids = [int(uid) for uid in args[0].split(",")]
+        self.fetched.extend(uids)
+        data = []
+        for uid in uids:
+            headers, _, body = self.messages[uid].partition(b"\n\n")
+            if "HEADER.FIELDS" in args[1]:
+                wanted = set(re.search(r"\(([A-Z -]+)\)\]", args[1]).group(1).split())
+                literal = b"".join(
+                    line + b"\n" for line in headers.split(b"\n")
+                    if line.split(b":", 1)[0].decode().upper() in wanted
+                ) + b"\n"
+            else:
+                literal = body
+            data.append((f"{uid} (UID {uid} BODY[] {{{len(literal)}}}".encode(), literal))
+            data.append(b")")
+        return "OK", data
+
+    def logout(self):
+        pass
+
+@pytest.fixture(autouse=True)
+def sent_applications(session_factory):
+    session = session_factory()
+    for i in range(1, 4):
+        session.add(Application(id=i, company_name=f"Company {i}", position_title="Engineer", status="submitted"))
+        session.add(Email(id=i, application_id=i, message_id=f"<sent-{i}@example.com>", status="sent"))
+    session.commit()
+    session.close()
+
+def statuses(session_factory):
+    session = session_factory()
+    try:
+        return (
+            {a.id: a.status for a in session.query(Application)},
+            {e.id: e.status for e in session.query(Email)},
+        )
+    finally:
+        session.close()
+
+def test_matches_replies_and_bounces(session_factory):
+    imap = FakeIMAP()
+    imap.add("From: hr@acme.test\nSubject: Re: Application\nIn-Reply-To: <sent-1@example.com>\n\nLet's talk")
+    imap.add("From: newsletter@example.com\nSubject: Weekly digest\n\nNothing")
+    imap.add("From: MAILER-DAEMON@mx.test\nSubject: Undelivered Mail Returned to Sender\n"
+             "Content-Type: multipart/report; report-type=delivery-status\n\n"
+             "Original message:\nMessage-ID: <sent-2@example.com>\n")
+    imap.add("From: boss@corp.test\nAuto-Submitted: auto-replied\nIn-Reply-To: <sent-3@example.com>\n\nOut of office")
+
+    sync = InboxSync(lambda: imap, "me@example.com", session_factory=session_factory, batch_size=2)
+    assert sync.sync() == {"fetched": 4, "replies": 1, "bounces": 1}
+
+    applications, emails = statuses(session_factory)
+    assert applications == {1: "replied", 2: "bounced", 3: "submitted"}
+    assert emails == {1: "replied", 2: "bounced", 3: "sent"}
+
+def test_only_new_messages_are_fetched(session_factory):
+    imap = FakeIMAP()
+    for i in range(5):
+        imap.add(f"From: someone@example.com\nSubject: Hello {i}\n\nHi")
+    sync = InboxSync(lambda: imap, "me@example.com", session_factory=session_factory)
+    sync.sync()
+
+    imap.fetched.clear()
+    assert sync.sync()["fetched"] == 0
+    assert imap.fetched == []
+
+    uid = imap.add("From: hr@globex.test\nReferences: <other@x> <sent-3@example.com>\n\nThanks")
+    assert sync.sync() == {"fetched": 1, "replies": 1, "bounces": 0}
+    assert imap.fetched == [uid]
+
+def test_uid_validity_change_rescans(session_factory):
+    imap = FakeIMAP()
+    imap.add("From: hr@acme.test\nIn-Reply-To: <sent-1@example.com>\n\nHi")
+    sync = InboxSync(lambda: imap, "me@example.com", session_factory=session_factory)
+    sync.sync()
+
+    imap.uid_validity = 2
+    assert sync.sync()["fetched"] == 1
+    session = session_factory()
+    state = session.query(MailboxState).one()
+    assert (state.uid_validity, state.last_uid) == (2, 1)
+    session.close()
@@ -0,0 +1,86 @@
+import csv
+import gzip
+import json
+import pytest
+from datetime import datetime
+from unittest.mock import MagicMock
+from job_application_automator.core.batch import BatchRunner
+from job_application_automator.core.ingestion import (
+    chunked,
+    iter_jobs,
+    job_key,
+    normalize_record,
+    normalize_url,
+    parse_date,
+    read_records,
+)
+from job_application_automator.db.models import Application
+
+RECORDS = [
+    {"Company": "Acme", "job_title": "Backend Engineer", "description": "<p>Python &amp; SQL</p>",
+     "apply_email": "Apply: Jobs@Acme.test", "url": "https://Acme.test/jobs/1/?utm_source=feed"},
+    {"company": "Acme", "title": "Backend Engineer", "description": "Python & SQL",
+     "email": "jobs@acme.test", "url": "https://acme.test/jobs/1"},
+    {"company": "Globex", "title": "Data Engineer", "description": ""},
+    {"company": "Initech", "title": "SRE", "description": "Linux and Kubernetes"},
+]
+
+def test_normalize_record():
+    job = normalize_record(RECORDS[0])
+    assert job == {
+        "company_name": "Acme",
+        "position_title": "Backend Engineer",
+        "job_description": "Python & SQL",
+        "contact_email": "jobs@acme.test",
+        "job_url": "https://acme.test/jobs/1",
+        "expires_at": None,
+    }
+    assert normalize_record(RECORDS[2]) is None
+
+def test_parse_date():
+    assert parse_date("2024-05-01") == datetime(2024, 5, 1)
+    assert parse_date("2024-05-01T12:00:00+02:00") == datetime(2024, 5, 1, 10)
+    assert parse_date("Wed, 01 May 2024 10:00:00 GMT") == datetime(2024, 5, 1, 10)
+    assert parse_date(1714557600) == datetime(2024, 5, 1, 10)
+    assert parse_date("next week") is None
+
+def test_normalize_url_drops_tracking_parameters():
+    assert normalize_url("HTTPS://Example.com/a/?b=2&utm_medium=x&a=1#top") == "https://example.com/a?a=1&b=2"
+
+def test_job_key_prefers_url():
+    first, second = normalize_record(RECORDS[0]), normalize_record(RECORDS[1])
+    assert job_key(first) == job_key(second)
+    without_url = normalize_record(RECORDS[3])
+    assert job_key(without_url) == job_key(dict(without_url, company_name="INITECH"))
+
+def test_read_records_streams_csv_and_gzipped_jsonl(tmp_path):
+    csv_path = tmp_path / "jobs.csv"
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["company", "title", "description"])
+        writer.writeheader()
+        writer.writerow({"company": "Acme", "title": "SRE", "description": "Line one\nLine two"})
+    assert list(read_records(str(csv_path)))[0]["description"] == "Line one\nLine two"
+
+    jsonl_path = tmp_path / "jobs.jsonl.gz"
+    with gzip.open(jsonl_path, "wt") as f:
+        f.write(json.dumps(RECORDS[3]) + "\n\nnot json\n")
+    assert list(read_records(str(jsonl_path))) == [RECORDS[3]]
+
+def test_chunked():
+    assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+def test_add_jobs_deduplicates_across_chunks(tmp_path, session_factory):
+    path = tmp_path / "jobs.jsonl"
+    path.write_text("\n".join(json.dumps(r) for r in RECORDS * 3))
+
+    runner = BatchRunner(MagicMock(), session_factory=session_factory)
+    run_id = runner.create_run("feed", [], "resume.tex")
+    assert runner.add_jobs(run_id, iter_jobs(str(path)), chunk_size=2) == 2
+    assert runner.add_jobs(run_id, iter_jobs(str(path)), chunk_size=2) == 0
+
+    session = session_factory()
+    rows = session.query(Application).order_by(Application.id).all()
+    assert [(a.company_name, a.contact_email, a.job_url) for a in rows] == [
+        ("Acme", "jobs@acme.test", "https://acme.test/jobs/1"),
+        ("Initech", None, None),
+    ]
@@ -1,6 +1,12 @@
+import os
+import subprocess
+import time
 import pytest
 from unittest.mock import patch, MagicMock, call
+from job_application_automator.core import latex_handler as latex_handler_module
 from job_application_automator.core.latex_handler import LatexDocumentHandler
+from job_application_automator.core.latex_validation import LatexCompileError, LatexValidationError
+from job_application_automator.utils.metrics import Metrics
 
 @pytest.fixture
 def latex_handler():
@@ -80,3 +86,121 @@ def test_format_entry(latex_handler):
 def test_invalid_section(latex_handler):
     with pytest.raises(ValueError):
         latex_handler.customize_resume_section("invalid_section", "content")
+
+@pytest.fixture
+def fake_pdflatex(tmp_path, monkeypatch):
+    """Puts a pdflatex script that runs the given shell body on PATH."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+
+    def install(body):
+        script = bin_dir / "pdflatex"
+        script.write_text("#!/bin/sh\n" + body + "\n")
+        script.chmod(0o755)
+
+    monkeypatch.setenv("PATH", f"{bin_dir}:{os.environ['PATH']}")
+    return install
+
+VALID = "\\documentclass{article}\n\\begin{document}\nHello\n\\end{document}"
+
+def test_invalid_latex_is_rejected_without_compiling(tmp_path):
+    handler = LatexDocumentHandler(output_dir=tmp_path)
+    with patch('subprocess.run') as mock_run:
+        with pytest.raises(LatexValidationError, match="unclosed"):
+            handler.compile_latex("\\documentclass{article}\n\\begin{document}\n\\textbf{x\n\\end{document}", "bad")
+        mock_run.assert_not_called()
+
+def test_compile_runs_non_interactively(tmp_path):
+    handler = LatexDocumentHandler(output_dir=tmp_path)
+    with patch('subprocess.run') as mock_run:
+        mock_run.return_value = MagicMock(returncode=0)
+        pdf_path = handler.compile_latex("```latex\n" + VALID + "\n```", "doc")
+
+    assert pdf_path == str(tmp_path / "doc.pdf")
+    assert (tmp_path / "doc.tex").read_text() == VALID
+    args, kwargs = mock_run.call_args
+    command = args[0][args[0].index('pdflatex'):]
+    assert command[:4] == ['pdflatex', '-interaction=nonstopmode', '-halt-on-error', '-file-line-error']
+    assert kwargs["stdin"] == subprocess.DEVNULL
+    assert 0 < kwargs["timeout"] <= handler.timeout
+    # The memory limit is set by a shell, not in the forked child
+    assert args[0][:2] == ['sh', '-c'] and f"ulimit -v {handler.memory_limit_mb * 1024}" in args[0][2]
+    assert "preexec_fn" not in kwargs
+
+def test_compile_errors_are_parsed_from_log(tmp_path, fake_pdflatex):
+    fake_pdflatex(f"echo './doc.tex:3: Undefined control sequence.' > {tmp_path}/doc.log; exit 1")
+    handler = LatexDocumentHandler(output_dir=tmp_path)
+    with pytest.raises(LatexCompileError) as e:
+        handler.compile_latex(VALID, "doc")
+    assert e.value.errors == [{"file": "./doc.tex", "line": 3, "message": "Undefined control sequence."}]
+    assert "line 3: Undefined control sequence." in str(e.value)
+
+def test_compile_is_killed_after_timeout(tmp_path, fake_pdflatex, monkeypatch):
+    fake_pdflatex("read line; sleep 5")
+    monkeypatch.setenv("LATEX_TIMEOUT", "0.2")
+    handler = LatexDocumentHandler(output_dir=tmp_path)
+    start = time.perf_counter()
+    with pytest.raises(LatexCompileError, match=r"timed out after 0\.\d+s on doc\.tex \(compile limit 0\.2s\)"):
+        handler.compile_latex(VALID, "doc")
+    assert time.perf_counter() - start < 2
+
+WITH_REFS = "\\documentclass{article}\n\\begin{document}\n\\section{A}\\label{a} See \\ref{a}.\n\\end{document}"
+
+def simulate_pdflatex(output_dir, aux_per_pass, rerun_on=()):
+    """Fake subprocess.run writing the given .aux content on each pass."""
+    calls = []
+
+    def run(command, **kwargs):
+        pass_number = len(calls)
+        calls.append(command)
+        (output_dir / "doc.aux").write_text(aux_per_pass[min(pass_number, len(aux_per_pass) - 1)])
+        log = "LaTeX Warning: Label(s) may have changed. Rerun to get cross-references right." \
+            if pass_number in rerun_on else "Output written"
+        (output_dir / "doc.log").write_text(log)
+        return MagicMock(returncode=0)
+
+    return run, calls
+
+def test_document_without_references_compiles_once(tmp_path):
+    handler = LatexDocumentHandler(output_dir=tmp_path)
+    run, calls = simulate_pdflatex(tmp_path, ["\\relax"])
+    with patch('subprocess.run', side_effect=run):
+        handler.compile_latex(VALID, "doc")
+    assert len(calls) == 1
+    assert '-draftmode' not in calls[0]
+
+def test_references_get_draft_pass_then_final_pass(tmp_path, monkeypatch):
+    registry = Metrics(enabled=True)
+    monkeypatch.setattr(latex_handler_module, "metrics", registry)
+    handler = LatexDocumentHandler(output_dir=tmp_path)
+    run, calls = simulate_pdflatex(tmp_path, ["\\newlabel{a}{{1}{1}}"])
+    with patch('subprocess.run', side_effect=run):
+        handler.compile_latex(WITH_REFS, "doc")
+    assert ['-draftmode' in command for command in calls] == [True, False]
+
+    # A recompile finds the settled .aux and needs a single pass
+    calls.clear()
+    with patch('subprocess.run', side_effect=run):
+        handler.compile_latex(WITH_REFS, "doc")
+    assert ['-draftmode' in command for command in calls] == [False]
+
+    text = registry.to_prometheus()
+    assert "job_automator_latex_passes_total 3" in text
+    assert "job_automator_latex_compile_seconds_count 2" in text
+    assert "latex_passes_seconds" not in text
+
+def test_reruns_until_references_settle(tmp_path):
+    handler = LatexDocumentHandler(output_dir=tmp_path)
+    run, calls = simulate_pdflatex(tmp_path, ["v1", "v2", "v2"], rerun_on=(1,))
+    with patch('subprocess.run', side_effect=run):
+        handler.compile_latex(WITH_REFS, "doc")
+    assert ['-draftmode' in command for command in calls] == [True, False, False]
+
+def test_pass_limit(tmp_path, monkeypatch):
+    monkeypatch.setenv("LATEX_MAX_PASSES", "3")
+    handler = LatexDocumentHandler(output_dir=tmp_path)
+    run, calls = simulate_pdflatex(tmp_path, ["v1", "v2", "v3", "v4", "v5"])
+    with patch('subprocess.run', side_effect=run):
+        handler.compile_latex(WITH_REFS, "doc")
+    assert len(calls) == 3
+    assert '-draftmode' not in calls[-1]
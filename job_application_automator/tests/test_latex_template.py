@@ -0,0 +1,51 @@
+import os
+from unittest.mock import MagicMock, patch
+from job_application_automator.core.latex_handler import LatexDocumentHandler
+from job_application_automator.core.latex_template import (
+    CompiledTemplate,
+    RawLatex,
+    TemplateCache,
+    escape_latex,
+)
+
+def test_escape_latex():
+    assert escape_latex("R&D: 100% of $5 #1 a_b {x} ~ ^ \\") == (
+        "R\\&D: 100\\% of \\$5 \\#1 a\\_b \\{x\\} \\textasciitilde{} \\textasciicircum{} \\textbackslash{}"
+    )
+    assert escape_latex(RawLatex("\\textbf{x}")) == "\\textbf{x}"
+
+def test_render_is_single_pass():
+    template = CompiledTemplate("\\item $NAME: $BODY $\\bullet$ $NAME")
+    rendered = template.render({"name": "$BODY", "BODY": RawLatex("\\emph{hi}")})
+    assert rendered == "\\item \\$BODY: \\emph{hi} $\\bullet$ \\$BODY"
+
+def test_missing_values_render_empty():
+    assert CompiledTemplate("a $X b").render({}) == "a  b"
+
+def test_cache_reloads_changed_template(tmp_path):
+    path = tmp_path / "letter.tex"
+    path.write_text("Dear $NAME")
+    cache = TemplateCache()
+    first = cache.get(path)
+    assert cache.get(path) is first
+
+    path.write_text("Hello $NAME")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert cache.get(path).render({"name": "Jane"}) == "Hello Jane"
+
+def test_create_cover_letter_fills_template(tmp_path):
+    handler = LatexDocumentHandler(output_dir=tmp_path)
+    with patch('subprocess.run') as mock_run:
+        mock_run.return_value = MagicMock(returncode=0)
+        handler.create_cover_letter({
+            "candidate_name": "Jane O'Neil & Co",
+            "candidate_info": RawLatex("1 Main St\\\\jane@example.com"),
+            "recipient_info": "Acme",
+            "letter_content": "I offer 100% commitment.",
+        })
+    tex = (tmp_path / "cover_letter.tex").read_text()
+    assert "$CANDIDATE_NAME" not in tex
+    assert "\\textbf{Jane O'Neil \\& Co}" in tex
+    assert "1 Main St\\\\jane@example.com" in tex
+    assert "I offer 100\\% commitment." in tex
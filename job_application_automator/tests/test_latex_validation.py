@@ -0,0 +1,53 @@
+import pytest
+from job_application_automator.core.latex_validation import (
+    LatexValidationError,
+    find_problems,
+    parse_log,
+    strip_markdown_fences,
+    validate_latex,
+)
+
+DOCUMENT = """\\documentclass{article}
+\\begin{document}
+\\section{Skills} Python, SQL \\& 100\\% {\\bf Go}\\\\{}
+% a comment with an unbalanced { brace
+\\begin{verbatim}
+\\end{itemize} { not parsed
+\\end{verbatim}
+\\end{document}"""
+
+def test_valid_document_passes():
+    assert find_problems(DOCUMENT) == []
+    assert validate_latex(DOCUMENT) == DOCUMENT
+
+def test_strips_markdown_fences():
+    assert strip_markdown_fences("```latex\n" + DOCUMENT + "\n```") == DOCUMENT
+    assert validate_latex("```tex\n" + DOCUMENT + "\n```\n") == DOCUMENT
+
+def test_reports_unbalanced_braces_and_environments():
+    problems = find_problems("\\textbf{open\n\\begin{itemize}\n\\item x\n\\end{enumerate}\n}}", require_document=False)
+    assert problems == [
+        "line 4: \\end{enumerate} closes \\begin{itemize} from line 2",
+        "line 5: unmatched '}'",
+        "line 2: \\begin{itemize} is never closed",
+    ]
+    assert find_problems("\\begin{itemize}\n\\item {x", require_document=False) == [
+        "line 2: unclosed '{'",
+        "line 1: \\begin{itemize} is never closed",
+    ]
+
+def test_requires_complete_document():
+    with pytest.raises(LatexValidationError) as e:
+        validate_latex("\\section{Experience}")
+    assert e.value.problems == ["missing \\documentclass", "missing \\begin{document}", "missing \\end{document}"]
+
+def test_parse_log():
+    log = (
+        "(./resume.tex\n"
+        "./resume.tex:12: Undefined control sequence.\n"
+        "l.12 \\foo\n"
+    )
+    assert parse_log(log) == [{"file": "./resume.tex", "line": 12, "message": "Undefined control sequence."}]
+
+    classic = "! Missing $ inserted.\n<inserted text>\n$\nl.7 x_1\n"
+    assert parse_log(classic) == [{"file": None, "line": 7, "message": "Missing $ inserted."}]
@@ -0,0 +1,58 @@
+import json
+import pytest
+from mistralai.models.chat_completion import ChatMessage
+from job_application_automator.utils.ai_client import MistralAIClient
+from job_application_automator.utils.llm_backends import StubBackend, StubBackendError
+
+JOB_DESC = """
+Backend Engineer
+We need Python, PostgreSQL and Docker experience.
+"""
+
+def test_stub_backend_is_deterministic():
+    messages = [ChatMessage(role="system", content="test"), ChatMessage(role="user", content="hello")]
+    first = StubBackend(seed=7).chat(model="m", messages=messages)
+    second = StubBackend(seed=7).chat(model="m", messages=messages)
+    assert first.id == second.id
+    assert first.choices[0].message.content == second.choices[0].message.content
+
+def test_stub_backend_latency_and_token_rate():
+    sleeps = []
+    backend = StubBackend(latency_mean=0.5, tokens_per_second=100, sleep=sleeps.append)
+    response = backend.chat(model="m", messages=[ChatMessage(role="user", content="hi")])
+    assert response.usage.completion_tokens > 0
+    assert sleeps == [pytest.approx(0.5 + response.usage.completion_tokens / 100)]
+
+def test_stub_backend_lognormal_latency():
+    sleeps = []
+    backend = StubBackend(latency_distribution="lognormal", latency_mean=0.2,
+                          latency_stddev=0.1, sleep=sleeps.append)
+    for _ in range(500):
+        backend.chat(model="m", messages=[ChatMessage(role="user", content="hi")])
+    assert all(s > 0 for s in sleeps)
+    assert sum(sleeps) / len(sleeps) == pytest.approx(0.2, rel=0.15)
+
+def test_stub_backend_error_injection():
+    backend = StubBackend(error_rate=1.0)
+    with pytest.raises(StubBackendError):
+        backend.chat(model="m", messages=[ChatMessage(role="user", content="hi")])
+
+def test_stub_backend_rejects_unknown_distribution():
+    with pytest.raises(ValueError):
+        StubBackend(latency_distribution="pareto")
+
+def test_client_with_stub_backend():
+    client = MistralAIClient(backend=StubBackend())
+    analysis = client.analyze_job_description(JOB_DESC)
+    assert analysis["title"] == "Backend Engineer"
+    assert analysis["required_skills"] == ["Python", "PostgreSQL", "Docker"]
+
+    resume = "\\documentclass{article}\n\\begin{document}\nJane\n\\end{document}"
+    assert client.customize_resume(analysis, resume) == resume
+    assert "\\begin{letter}" in client.generate_cover_letter(analysis, {"name": "Jane"})
+    assert len(client.suggest_improvements(resume)) == 3
+
+def test_client_surfaces_injected_errors():
+    client = MistralAIClient(backend=StubBackend(error_rate=1.0))
+    with pytest.raises(ValueError, match="Error analyzing job description"):
+        client.analyze_job_description(JOB_DESC)
@@ -0,0 +1,48 @@
+import json
+import pytest
+from unittest.mock import patch
+from job_application_automator.utils.ai_client import MistralAIClient
+from job_application_automator.utils.llm_backends import StubBackend
+from job_application_automator.utils.metrics import Metrics
+
+@pytest.fixture
+def registry():
+    return Metrics(enabled=True)
+
+def test_disabled_registry_records_nothing():
+    registry = Metrics(enabled=False)
+    with registry.timer("llm_request", operation="analyze") as span:
+        span.set_attribute("prompt_tokens", 10)
+    registry.inc("llm_tokens", 10)
+    assert registry.to_prometheus() == "\n"
+
+def test_timer_records_histogram_and_spans(registry, tmp_path):
+    with registry.timer("pipeline_stage", stage="analyze"):
+        with registry.timer("llm_request", operation="analyze"):
+            pass
+    text = registry.to_prometheus()
+    assert 'job_automator_pipeline_stage_seconds_count{stage="analyze"} 1' in text
+    assert 'job_automator_llm_request_seconds_bucket{operation="analyze",le="+Inf"} 1' in text
+
+    trace_file = tmp_path / "spans.jsonl"
+    registry.export_spans(str(trace_file))
+    spans = [json.loads(line) for line in trace_file.read_text().splitlines()]
+    inner, outer = spans
+    assert inner["parentSpanId"] == outer["spanId"]
+    assert inner["traceId"] == outer["traceId"]
+    assert outer["attributes"] == {"stage": "analyze"}
+
+def test_timer_counts_errors(registry):
+    with pytest.raises(RuntimeError):
+        with registry.timer("smtp_send"):
+            raise RuntimeError("connection refused")
+    assert "job_automator_smtp_send_errors_total 1" in registry.to_prometheus()
+
+def test_ai_client_records_token_usage(registry):
+    client = MistralAIClient(backend=StubBackend())
+    with patch("job_application_automator.utils.ai_client.metrics", registry):
+        client.suggest_improvements("\\section{Experience}")
+    text = registry.to_prometheus()
+    assert 'job_automator_llm_tokens_total{operation="suggest_improvements",type="prompt"}' in text
+    assert 'job_automator_llm_tokens_total{operation="suggest_improvements",type="completion"}' in text
+    assert 'job_automator_llm_request_seconds_count{operation="suggest_improvements"} 1' in text
@@ -0,0 +1,79 @@
+import os
+import pytest
+from job_application_automator.core.latex_handler import LatexDocumentHandler
+from job_application_automator.core.pdf_optimizer import PdfOptimizer, estimate_send_seconds, summarize_reports
+
+PDF = b"%PDF-1.5\n" + b"0" * 10000 + b"\n%%EOF\n"
+
+@pytest.fixture
+def fake_tools(tmp_path, monkeypatch):
+    """Puts scripts named after the optimization tools on PATH, logging their arguments."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    log = tmp_path / "calls.log"
+
+    def install(name, body):
+        script = bin_dir / name
+        script.write_text(f'#!/bin/sh\necho "{name} $*" >> {log}\n{body}\n')
+        script.chmod(0o755)
+
+    monkeypatch.setenv("PATH", f"{bin_dir}:/usr/bin:/bin")
+    install.calls = lambda: log.read_text().splitlines() if log.exists() else []
+    return install
+
+# Keeps the first bytes of the input: $1..$n are the options, then input and output
+QPDF_SHRINK = 'for last; do :; done; eval "input=\\${$(($#-1))}"; head -c 4000 "$input" > "$last"'
+GS_SHRINK = 'for arg; do case "$arg" in -sOutputFile=*) out="${arg#-sOutputFile=}";; esac; input="$arg"; done; ' \
+            'head -c 6000 "$input" > "$out"'
+
+def test_tools_run_in_order_and_shrink_the_pdf(tmp_path, fake_tools):
+    fake_tools("gs", GS_SHRINK)
+    fake_tools("qpdf", QPDF_SHRINK)
+    pdf = tmp_path / "resume.pdf"
+    pdf.write_bytes(PDF)
+
+    report = PdfOptimizer(linearize=True, uplink_kbps=100).optimize(pdf)
+
+    assert report["tools"] == ["gs", "qpdf"]
+    assert (report["original_bytes"], report["optimized_bytes"]) == (len(PDF), 4000)
+    assert pdf.read_bytes() == PDF[:4000]
+    assert report["error"] is None
+    assert report["send_seconds_after"] < report["send_seconds_before"] == estimate_send_seconds(len(PDF), 100)
+    gs_call, qpdf_call = fake_tools.calls()
+    assert "-dSubsetFonts=true" in gs_call and "-dDownsampleColorImages=false" in gs_call
+    assert "--object-streams=generate" in qpdf_call and "--linearize" in qpdf_call
+    # Intermediate files are cleaned up
+    assert sorted(os.listdir(tmp_path)) == ["bin", "calls.log", "resume.pdf"]
+
+def test_failures_and_larger_results_keep_the_original(tmp_path, fake_tools):
+    pdf = tmp_path / "resume.pdf"
+    pdf.write_bytes(PDF)
+
+    fake_tools("qpdf", "echo 'qpdf: damaged file' >&2; exit 2")
+    report = PdfOptimizer("qpdf").optimize(pdf)
+    assert "damaged file" in report["error"]
+    assert pdf.read_bytes() == PDF
+
+    fake_tools("qpdf", 'for last; do :; done; eval "input=\\${$(($#-1))}"; cat "$input" "$input" > "$last"')
+    report = PdfOptimizer("qpdf").optimize(pdf)
+    assert report["error"] is None
+    assert report["optimized_bytes"] == report["original_bytes"]
+    assert pdf.read_bytes() == PDF
+
+    summary = summarize_reports([report, {**report, "optimized_bytes": len(PDF) // 2}])
+    assert summary["documents"] == 2
+    assert summary["reduction"] == pytest.approx(0.25, abs=0.001)
+
+def test_compiled_pdfs_are_optimized_when_enabled(tmp_path, fake_tools, monkeypatch):
+    fake_tools("pdflatex", f"printf '%s' '{PDF.decode()}' > {tmp_path}/doc.pdf; : > {tmp_path}/doc.log")
+    fake_tools("qpdf", QPDF_SHRINK)
+    valid = "\\documentclass{article}\n\\begin{document}\nHello\n\\end{document}"
+
+    assert LatexDocumentHandler(output_dir=tmp_path).compile_latex(valid, "doc") == str(tmp_path / "doc.pdf")
+    assert (tmp_path / "doc.pdf").stat().st_size == len(PDF)
+
+    monkeypatch.setenv("PDF_OPTIMIZE", "auto")
+    monkeypatch.setenv("PDF_SUBSET_FONTS", "false")
+    LatexDocumentHandler(output_dir=tmp_path).compile_latex(valid, "doc")
+    assert (tmp_path / "doc.pdf").stat().st_size == 4000
+    assert [call.split()[0] for call in fake_tools.calls()] == ["pdflatex", "pdflatex", "qpdf"]
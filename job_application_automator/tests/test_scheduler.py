@@ -0,0 +1,87 @@
+import json
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+import pytest
+from job_application_automator import cli
+from job_application_automator.core.batch import BatchRunner
+from job_application_automator.core.scheduler import ApplicationScheduler, estimate_cost, match_score, term_counts
+from job_application_automator.db.models import Application
+from job_application_automator.utils.ai_client import MistralAIClient
+from job_application_automator.utils.llm_backends import StubBackend
+
+RESUME = "\\documentclass{article}\n\\begin{document}\nPython engineer: Django, PostgreSQL, Docker\n\\end{document}"
+NOW = datetime(2024, 5, 1)
+
+@pytest.fixture
+def runner(session_factory, tmp_path):
+    manager = MagicMock()
+    manager.ai_client = MistralAIClient(backend=StubBackend())
+    manager.handle_job_description.side_effect = manager.ai_client.analyze_job_description
+
+    def compile_latex(content, output_name):
+        path = tmp_path / f"{output_name}.pdf"
+        path.write_bytes(b"%PDF")
+        return str(path)
+
+    manager.latex_handler.compile_latex.side_effect = compile_latex
+    manager.email_communicator.compose_email.side_effect = lambda template, details: {
+        "to": details["to"], "subject": "Application", "body": "Hello", "attachments": details["attachments"],
+    }
+    manager.email_communicator.send_email.return_value = True
+    return BatchRunner(manager, session_factory=session_factory)
+
+def add_jobs(runner, jobs):
+    return runner.create_run("prioritized", [
+        dict({"contact_email": "jobs@example.com", "position_title": "Engineer"}, **job) for job in jobs
+    ], "resume.tex", {"name": "Jane"})
+
+def sent_order(runner):
+    calls = runner.manager.email_communicator.compose_email.call_args_list
+    return [call.kwargs["details"]["company_name"] for call in calls]
+
+def test_match_score():
+    resume = term_counts(RESUME)
+    assert match_score("Python Django PostgreSQL", resume) > match_score("Java Spring Oracle", resume) == 0.0
+
+def test_most_valuable_applications_go_first(runner):
+    run_id = add_jobs(runner, [
+        {"company_name": "Weak", "job_description": "Java Spring Oracle"},
+        {"company_name": "Strong", "job_description": "Python Django PostgreSQL Docker"},
+        {"company_name": "Favourite", "job_description": "Java Spring Oracle Python"},
+        {"company_name": "Gone", "job_description": "Python Django", "expires_at": NOW - timedelta(days=1)},
+        {"company_name": "Urgent", "job_description": "Python Django Docker Java",
+         "expires_at": NOW + timedelta(hours=6)},
+    ])
+    scheduler = ApplicationScheduler(runner, company_priorities={"favourite": 10}, clock=lambda: NOW)
+
+    assert scheduler.run(run_id, RESUME) == {"submitted": 4, "expired": 1}
+    assert sent_order(runner) == ["Favourite", "Urgent", "Strong", "Weak"]
+
+def test_budget_defers_low_priority_work(runner):
+    jobs = [{"company_name": f"Company {i}", "job_description": "Python " * (10 - i)} for i in range(5)]
+    run_id = add_jobs(runner, jobs)
+    per_application = estimate_cost("pending", jobs[0]["job_description"], RESUME)
+    progress = []
+    scheduler = ApplicationScheduler(runner, budget_tokens=int(per_application * 2.5), clock=lambda: NOW)
+
+    counts = scheduler.run(run_id, RESUME, on_progress=progress.append)
+    assert counts["deferred"] >= 1
+    assert counts.get("submitted", 0) + counts["deferred"] == 5
+    assert sent_order(runner) == [f"Company {i}" for i in range(counts["submitted"])]
+    stats = scheduler.stats()
+    assert stats["spent"] == runner.manager.ai_client.tokens_used <= stats["budget"]
+    assert stats["queued"] == stats["running"] == 0 and progress[-1]["completed"] == counts["submitted"]
+
+def test_embeddings_count_against_the_budget():
+    ai_client = MistralAIClient(backend=StubBackend())
+    ai_client.embed(["Python engineer", "Django and PostgreSQL"])
+    assert ai_client.tokens_used > 0
+
+@pytest.mark.parametrize("options", [["--offline", "--budget-tokens", "1000"], ["--cluster", "--prioritize"],
+                                     ["--offline", "--cluster"]])
+def test_batch_rejects_options_it_would_ignore(monkeypatch, options):
+    monkeypatch.setattr(cli, "JobApplicationManager", MagicMock(side_effect=AssertionError("run started")))
+    monkeypatch.setattr("sys.argv", ["job-automator", "batch", "jobs.jsonl", "resume.tex"] + options)
+    with pytest.raises(SystemExit) as e:
+        cli.main()
+    assert e.value.code == 2
@@ -0,0 +1,74 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from job_application_automator.db.models import Application, Base
+from job_application_automator.db.search import create_search_index, fts_query, search
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return engine
+
+def add(session, company, title, description, **fields):
+    application = Application(company_name=company, position_title=title, job_description=description, **fields)
+    session.add(application)
+    session.commit()
+    return application
+
+def test_results_are_ranked_and_highlighted(engine):
+    session = sessionmaker(bind=engine)()
+    add(session, "Acme", "Office Manager", "Keep the office running. Some scripting in Python is a plus.")
+    add(session, "Initech", "Python Developer", "Build Python services and data pipelines.")
+    add(session, "Globex", "Java Developer", "Build Java services.")
+
+    results = search(session, "python")
+    assert [r["company_name"] for r in results] == ["Initech", "Acme"]
+    assert results[0]["score"] < results[1]["score"]
+    assert "[Python]" in results[0]["snippet"]
+    # A rank window of one only considers the newest match
+    assert [r["company_name"] for r in search(session, "services", window=1)] == ["Globex"]
+
+    # Stemming matches other forms; exclusions and phrases are honoured
+    assert [r["company_name"] for r in search(session, "pipeline")] == ["Initech"]
+    assert [r["company_name"] for r in search(session, "build -java")] == ["Initech"]
+    assert [r["company_name"] for r in search(session, '"java services"')] == ["Globex"]
+    assert [r["company_name"] for r in search(session, "scrip*")] == ["Acme"]
+
+def test_index_follows_updates_and_deletes(engine):
+    session = sessionmaker(bind=engine)()
+    application = add(session, "Acme", "Engineer", "Build things.")
+    assert search(session, "kubernetes") == []
+
+    application.job_analysis = '{"required_skills": ["Kubernetes"]}'
+    application.cover_letter_tex = "I have run Terraform in production."
+    session.commit()
+    assert [r["id"] for r in search(session, "kubernetes")] == [application.id]
+    assert [r["id"] for r in search(session, "terraform")] == [application.id]
+
+    application.job_description = "Build other things."
+    session.commit()
+    assert [r["id"] for r in search(session, "other")] == [application.id]
+
+    session.delete(application)
+    session.commit()
+    assert search(session, "kubernetes") == []
+
+def test_index_is_built_for_existing_tables(engine):
+    with engine.begin() as conn:
+        for name in ("insert", "update", "delete"):
+            conn.exec_driver_sql(f"DROP TRIGGER applications_fts_{name}")
+        conn.exec_driver_sql("DROP TABLE applications_fts")
+    session = sessionmaker(bind=engine)()
+    add(session, "Acme", "Rust Developer", "Write Rust.")
+
+    with engine.begin() as conn:
+        create_search_index(conn)
+    assert [r["company_name"] for r in search(session, "rust")] == ["Acme"]
+
+def test_user_input_is_never_fts_syntax():
+    assert fts_query('C++ node.js "machine learning" -php react*') == \
+        '"C++" "node.js" "machine learning" "react"* NOT "php"'
+    with pytest.raises(ValueError):
+        fts_query("-java")
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from job_application_automator.core.semantic_cache import SemanticCache, normalize_analysis
+from job_application_automator.utils.ai_client import MistralAIClient
+from job_application_automator.utils.llm_backends import StubBackend
+
+RESUME = "\\documentclass{article}\n\\begin{document}\nBuilt Python services\n\\end{document}"
+
+JOB = {
+    "title": "Backend Engineer",
+    "required_skills": ["Python", "PostgreSQL", "Kubernetes"],
+    "preferred_skills": ["AWS"],
+    "key_responsibilities": ["Design and build services", "Collaborate with the team"],
+    "location": "Remote",
+}
+
+def queued_embed(*vectors):
+    """Embedding function returning the given vectors, one per call."""
+    queue = [np.array([vector], dtype=np.float32) for vector in vectors]
+    return lambda texts: queue.pop(0)
+
+def test_normalized_analysis_ignores_spelling_and_order():
+    variant = {
+        "title": " backend  engineer",
+        "required_skills": ["k8s", "python3", "Postgres"],
+        "preferred_skills": ["Amazon Web Services"],
+        "key_responsibilities": ["Collaborate with the team", "Design and build services"],
+        "location": "Berlin",
+    }
+    assert normalize_analysis(variant) == normalize_analysis(JOB)
+    assert normalize_analysis(JOB).splitlines()[0] == "skills: aws, kubernetes, postgresql, python"
+
+def test_thresholds_and_guards():
+    cache = SemanticCache(queued_embed([1, 0], [1, 0], [0.95, 0.31], [0.8, 0.6], [1, 0], [1, 0], [1, 0]),
+                          threshold=0.99, adapt_threshold=0.9)
+    miss = cache.lookup("customize_resume", JOB, RESUME)
+    assert miss["result"] == "miss"
+    cache.store("customize_resume", JOB, RESUME, "Resume for Acme", miss["vector"], company="Acme")
+
+    hit = cache.lookup("customize_resume", JOB, RESUME, company="Acme")
+    assert (hit["result"], hit["output"]) == ("hit", "Resume for Acme")
+    assert cache.lookup("customize_resume", JOB, RESUME, company="Acme")["result"] == "adapt"
+    assert cache.lookup("customize_resume", JOB, RESUME)["result"] == "miss"
+    # Similar embeddings, but the skills or the company differ
+    assert cache.lookup("customize_resume", {**JOB, "required_skills": ["Java"]}, RESUME)["result"] == "miss"
+    assert cache.lookup("customize_resume", JOB, RESUME, company="Initech")["result"] == "adapt"
+    # Entries only match the same operation and input
+    assert cache.lookup("customize_resume", JOB, RESUME + "%")["result"] == "miss"
+
+    stats = cache.stats()
+    assert (stats["hit"], stats["adapt"], stats["miss"], stats["skills"], stats["company"]) == (1, 2, 4, 1, 1)
+    assert stats["hit_rate"] == pytest.approx(1 / 7)
+    assert stats["reuse_rate"] == pytest.approx(3 / 7)
+
+def test_client_reuses_and_adapts_generations(tmp_path):
+    client = MistralAIClient(backend=StubBackend())
+    client.semantic_cache = SemanticCache(client.embed, tmp_path / "generations.npz", threshold=0.99,
+                                          adapt_threshold=0.5, min_skill_overlap=0.5)
+    first = client.customize_resume(JOB, RESUME)
+    prompts = []
+    chat = client.client.chat
+    client.client.chat = lambda **kwargs: prompts.append(kwargs["messages"]) or chat(**kwargs)
+
+    # Same analysis in other words: no chat request at all
+    variant = {**JOB, "required_skills": ["kubernetes", "python3", "Postgres"]}
+    assert client.customize_resume(variant, RESUME) == first
+    assert prompts == []
+
+    # Similar job: the cached resume is sent to be adapted
+    similar = {**JOB, "preferred_skills": ["AWS", "Terraform"], "title": "Platform Engineer"}
+    assert client.customize_resume(similar, RESUME) == first
+    assert "very similar job" in prompts[0][0].content
+    assert client.semantic_cache.stats()["adapt"] == 1
+
+    reloaded = SemanticCache(client.embed, tmp_path / "generations.npz", max_entries=1)
+    assert len(reloaded) == 2
+    np.testing.assert_array_equal(reloaded.vectors, client.semantic_cache.vectors)
+    reloaded.store("cover_letter", JOB, {"name": "Jane"}, "Dear Hiring Manager")
+    assert [entry["operation"] for entry in reloaded.entries] == ["cover_letter"]
+
+def test_cover_letters_are_not_reused_across_companies():
+    client = MistralAIClient(backend=StubBackend())
+    client.semantic_cache = SemanticCache(client.embed)
+    analysis = client.analyze_job_description("Backend Engineer\nWe use Python, PostgreSQL and Docker.")
+    candidate = {"name": "Jane Doe", "skills": ["Python"]}
+    prompts = []
+    chat = client.client.chat
+    client.client.chat = lambda **kwargs: prompts.append(kwargs["messages"]) or chat(**kwargs)
+
+    acme = client.generate_cover_letter(analysis, candidate, company_name="Acme")
+    assert client.generate_cover_letter(dict(analysis), candidate, company_name="acme ") == acme
+    assert len(prompts) == 1
+
+    # The same posting at another company, or at an unknown one, is only a seed
+    initech = client.generate_cover_letter(dict(analysis), candidate, company_name="Initech")
+    assert initech != acme
+    assert "Company: Initech" in prompts[1][1].content and acme in prompts[1][1].content
+    client.generate_cover_letter(dict(analysis), candidate)
+    assert len(prompts) == 3
+    assert client.semantic_cache.stats()["company"] == 2
@@ -0,0 +1,116 @@
+import http.client
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+import pytest
+from unittest.mock import MagicMock
+from job_application_automator.core.manager import JobApplicationManager
+from job_application_automator.server import ApplicationServer
+from job_application_automator.utils.ai_client import MistralAIClient
+from job_application_automator.utils.llm_backends import StubBackend
+
+JOB = "Backend Engineer at Acme\nPython and SQL"
+RESUME = "\\section{Experience}\nJane Doe"
+
+@pytest.fixture
+def make_server():
+    servers = []
+
+    def make(backend=None, **kwargs):
+        latex_handler = MagicMock()
+        latex_handler.compile_latex.side_effect = lambda content, name: f"/tmp/{name}.pdf"
+        manager = JobApplicationManager(
+            ai_client=MistralAIClient(backend=backend or StubBackend()),
+            latex_handler=latex_handler,
+            email_communicator=MagicMock(),
+        )
+        server = ApplicationServer(("127.0.0.1", 0), manager, **kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield make
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+def post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(), method="POST")
+    with urllib.request.urlopen(request) as response:
+        return response.status, response.headers, response.read()
+
+def test_analyze_and_customize(make_server):
+    base = make_server()
+    status, _, body = post(base + "/analyze", {"job_description": JOB})
+    assert status == 200
+    job_details = json.loads(body)["job_details"]
+    assert "Python" in job_details["required_skills"]
+
+    _, _, body = post(base + "/customize", {"job_details": job_details, "resume": RESUME})
+    assert "Jane Doe" in json.loads(body)["resume_tex"]
+
+def test_bad_requests(make_server):
+    base = make_server()
+    with pytest.raises(urllib.error.HTTPError) as e:
+        post(base + "/customize", {"job_description": JOB})
+    assert e.value.code == 400
+    assert "resume" in json.loads(e.value.read())["error"]
+
+    request = urllib.request.Request(base + "/analyze", data=b"{not json", method="POST")
+    with pytest.raises(urllib.error.HTTPError) as e:
+        urllib.request.urlopen(request)
+    assert e.value.code == 400
+
+    with pytest.raises(urllib.error.HTTPError) as e:
+        urllib.request.urlopen(base + "/missing")
+    assert e.value.code == 404
+
+def test_connection_is_reused_after_unknown_endpoint(make_server):
+    base = make_server(max_body_bytes=1024)
+    connection = http.client.HTTPConnection(base.split("//")[1])
+    body = json.dumps({"job_description": JOB})
+
+    connection.request("POST", "/missing", body=body)
+    response = connection.getresponse()
+    assert response.status == 404 and response.getheader("Connection") is None
+    response.read()
+
+    # The unread body of the first request is not taken for the next request
+    connection.request("POST", "/analyze", body=body)
+    response = connection.getresponse()
+    assert response.status == 200
+    assert "Python" in json.loads(response.read())["job_details"]["required_skills"]
+
+    # Bodies too large to drain end the connection instead
+    connection.request("POST", "/missing", body="x" * 2048)
+    response = connection.getresponse()
+    assert response.status == 404 and response.will_close
+    connection.close()
+
+def test_apply_streams_step_events(make_server):
+    base = make_server()
+    status, headers, body = post(base + "/apply", {"job_description": JOB, "resume": RESUME})
+    assert status == 200
+    assert headers["Content-Type"] == "application/x-ndjson"
+    events = [json.loads(line) for line in body.decode().splitlines()]
+    steps = [e["step"] for e in events if e["event"] == "step"]
+    assert steps[0] == "job_details"
+    assert {"resume_tex", "cover_letter_tex", "email_body", "resume_path", "cover_letter_path"} <= set(steps)
+    assert events[-1]["event"] == "done"
+    assert events[-1]["result"]["resume_path"].startswith("/tmp/resume_")
+
+def test_rejects_requests_over_concurrency_limit(make_server):
+    base = make_server(StubBackend(latency_mean=0.3, sleep=time.sleep), max_concurrency=1, queue_timeout=0.05)
+    slow = threading.Thread(target=post, args=(base + "/analyze", {"job_description": JOB}))
+    slow.start()
+    time.sleep(0.1)
+    with pytest.raises(urllib.error.HTTPError) as e:
+        post(base + "/analyze", {"job_description": JOB})
+    slow.join()
+    assert e.value.code == 503
+    assert e.value.headers["Retry-After"] == "1"
+
+    with urllib.request.urlopen(base + "/health") as response:
+        assert json.loads(response.read()) == {"status": "ok"}
@@ -0,0 +1,87 @@
+import random
+import numpy as np
+from job_application_automator.core.clustering import cluster_analyses
+from job_application_automator.core import skills
+from job_application_automator.core.skills import JobRecord, SkillCorpus, SkillTaxonomy
+
+def test_aliases_and_versions_map_to_one_id():
+    taxonomy = SkillTaxonomy()
+    python = taxonomy.intern("Python")
+    assert {taxonomy.intern(s) for s in ("python3", "Python 3.x", " PYTHON ", "python-3.11")} == {python}
+    assert taxonomy.canonical("golang") == "Go"
+    assert taxonomy.canonical("k8s") == "Kubernetes"
+    assert taxonomy.canonical("Java 17") == "Java"
+    # Digits that are part of a name are kept
+    assert taxonomy.canonical("S3") == "S3"
+
+    # Unknown skills are interned under their first spelling
+    size = len(taxonomy)
+    assert taxonomy.lookup("Snowflake") is None
+    snowflake = taxonomy.intern("Snowflake")
+    assert taxonomy.intern("snowflake") == snowflake == size
+    assert taxonomy.name(snowflake) == "Snowflake"
+    assert taxonomy.ids(["k8s", "Python", "python3", ""]).tolist() == sorted([python, taxonomy.intern("Kubernetes")])
+
+def test_shared_taxonomy_does_not_grow():
+    size = len(skills.taxonomy)
+    assert skills.taxonomy.canonical("Snowflake") == skills.taxonomy.canonical(" snowflake ") == "Snowflake"
+    cluster_analyses([{"required_skills": [f"tool {i}", "Python"]} for i in range(50)])
+    assert len(skills.taxonomy) == size
+
+    taxonomy = SkillTaxonomy(max_spellings=10)
+    taxonomy.ids(f"Python {i}" for i in range(100))
+    assert len(taxonomy) == size and len(taxonomy._spellings) == 10
+    assert taxonomy.intern("Python 99") == taxonomy.intern("Python")
+
+def test_corpus_matches_set_arithmetic():
+    taxonomy = SkillTaxonomy()
+    names = [f"skill {i}" for i in range(40)]
+    rng = random.Random(0)
+    analyses = [{"required_skills": rng.sample(names, rng.randint(0, 8)),
+                 "preferred_skills": rng.sample(names, rng.randint(0, 3))} for _ in range(300)]
+    corpus = SkillCorpus(taxonomy)
+    for job_id, analysis in enumerate(analyses):
+        corpus.add(1000 + job_id, analysis)
+        # Reading the corpus between adds must not stop it from growing
+        corpus.overlap(np.zeros(0, dtype=np.int32))
+
+    candidate = names[:12]
+    query = corpus.query(candidate + ["unknown skill"])
+    overlap, coverage, jaccard = corpus.overlap(query), corpus.coverage(query), corpus.jaccard(query)
+    for row, analysis in enumerate(analyses):
+        skills = set(analysis["required_skills"]) | set(analysis["preferred_skills"])
+        weights = {s: 0.5 for s in analysis["preferred_skills"]}
+        weights.update({s: 1.0 for s in analysis["required_skills"]})
+        assert overlap[row] == len(skills & set(candidate))
+        total = sum(weights.values())
+        expected = sum(weights[s] for s in skills & set(candidate)) / total if total else 0.0
+        assert np.isclose(coverage[row], expected)
+        union = skills | set(candidate)
+        assert np.isclose(jaccard[row], len(skills & set(candidate)) / len(union))
+
+    record = corpus.record(5)
+    assert isinstance(record, JobRecord) and record.job_id == 1005
+    assert record.skill_ids.dtype == np.int32
+    assert np.all(np.diff(record.skill_ids) > 0)
+    assert sorted(corpus.skill_names(5)) == sorted(set(analyses[5]["required_skills"]) |
+                                                  set(analyses[5]["preferred_skills"]))
+    assert corpus.job_ids[:3].tolist() == [1000, 1001, 1002]
+    assert corpus.nbytes() == 16 * len(analyses) + 8 + 8 * int(corpus.sizes().sum())
+
+def test_similar_postings_are_found_across_aliases():
+    corpus = SkillCorpus.from_analyses([
+        {"required_skills": ["Python", "PostgreSQL", "Docker", "AWS"]},
+        {"required_skills": ["Java", "Spring"]},
+        {"required_skills": ["python3", "Postgres", "docker", "Amazon Web Services"]},
+    ])
+    assert corpus.similar(corpus.record(0).skill_ids).tolist() == [0, 2]
+    assert corpus.similar(corpus.record(1).skill_ids).tolist() == [1]
+
+def test_clusters_merge_skill_aliases():
+    analyses = [
+        {"required_skills": ["Python", "Kubernetes", "Go"]},
+        {"required_skills": ["python3", "k8s", "golang"]},
+        {"required_skills": ["React", "TypeScript"]},
+    ]
+    labels = cluster_analyses(analyses, min_similarity=0.99)
+    assert labels[0] == labels[1] != labels[2]
@@ -0,0 +1,78 @@
+import time
+import pytest
+from unittest.mock import MagicMock
+from job_application_automator.core.manager import JobApplicationManager
+from job_application_automator.core.task_graph import TaskGraph
+from job_application_automator.utils.ai_client import MistralAIClient
+from job_application_automator.utils.llm_backends import StubBackend
+
+def test_independent_tasks_run_concurrently():
+    graph = TaskGraph()
+    graph.add_value("x", 2)
+    graph.add("slow_a", lambda x: time.sleep(0.2) or x * 10, "x")
+    graph.add("slow_b", lambda x: time.sleep(0.2) or x * 100, "x")
+    graph.add("total", lambda a, b: a + b, "slow_a", "slow_b")
+
+    start = time.perf_counter()
+    results = graph.run()
+    assert time.perf_counter() - start < 0.35
+    assert results["total"] == 220
+
+def test_results_reported_in_completion_order():
+    graph = TaskGraph()
+    graph.add("slow", lambda: time.sleep(0.1) or "slow")
+    graph.add("fast", lambda: "fast")
+    seen = []
+    graph.run(on_result=lambda name, result: seen.append(name))
+    assert seen == ["fast", "slow"]
+
+def test_failure_stops_dependents_but_keeps_running_tasks():
+    graph = TaskGraph()
+    graph.add("fails", lambda: 1 / 0)
+    graph.add("dependent", lambda value: value, "fails")
+    graph.add("independent", lambda: time.sleep(0.05) or "done")
+    seen = {}
+    with pytest.raises(ZeroDivisionError):
+        graph.run(on_result=seen.__setitem__)
+    assert seen == {"independent": "done"}
+
+def test_rejects_cycles_and_unknown_dependencies():
+    graph = TaskGraph()
+    graph.add("a", lambda b: b, "b")
+    graph.add("b", lambda a: a, "a")
+    with pytest.raises(ValueError, match="cycle"):
+        graph.run()
+
+    graph = TaskGraph()
+    graph.add("a", lambda b: b, "missing")
+    with pytest.raises(ValueError, match="unknown task"):
+        graph.run()
+
+def test_process_application_overlaps_generation():
+    backend = StubBackend(latency_mean=0.15, sleep=time.sleep)
+    latex_handler = MagicMock()
+    latex_handler.compile_latex.side_effect = lambda content, name: f"/tmp/{name}.pdf"
+    email_communicator = MagicMock()
+    email_communicator.compose_email.side_effect = lambda template, details: details
+    email_communicator.send_email.return_value = True
+    manager = JobApplicationManager(
+        ai_client=MistralAIClient(backend=backend),
+        latex_handler=latex_handler,
+        email_communicator=email_communicator,
+    )
+
+    start = time.perf_counter()
+    result = manager.process_application(
+        "Backend Engineer\nPython", "\\section{Experience}", {"name": "Jane"},
+        email_details={"to": "jobs@acme.test"},
+    )
+    elapsed = time.perf_counter() - start
+
+    # Four LLM calls, but only two sequential steps: analysis, then generation
+    assert backend.calls == 4
+    assert elapsed < 0.45
+    assert result["sent"] is True
+    sent = email_communicator.send_email.call_args[0][0]
+    assert sent["attachments"] == [result["resume_path"], result["cover_letter_path"]]
+    assert result["resume_path"].startswith("/tmp/resume_")
+    assert sent["custom_content"] == result["email_body"]
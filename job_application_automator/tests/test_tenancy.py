@@ -0,0 +1,130 @@
+import json
+from collections import Counter
+from unittest.mock import MagicMock, patch
+import pytest
+from job_application_automator.core.batch import BatchRunner
+from job_application_automator.core.ingestion import iter_jobs
+from job_application_automator.core.tenancy import TenantStats, candidate_communicator, percentile, save_candidate
+from job_application_automator.core.work_queue import WorkQueue
+from job_application_automator.db.models import Candidate
+from job_application_automator.utils.ai_client import MistralAIClient
+from job_application_automator.utils.llm_backends import StubBackend
+
+RESUME = "\\documentclass{article}\n\\begin{document}\nJane Doe\n\\end{document}"
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = MagicMock()
+    manager.ai_client = MistralAIClient(backend=StubBackend())
+    manager.handle_job_description.side_effect = manager.ai_client.analyze_job_description
+
+    def compile_latex(content, output_name):
+        path = tmp_path / f"{output_name}.pdf"
+        path.write_bytes(b"%PDF")
+        return str(path)
+
+    manager.latex_handler.compile_latex.side_effect = compile_latex
+    return manager
+
+def create_run(tmp_path, runner, name, count, candidate_id):
+    path = tmp_path / f"{name}.jsonl"
+    path.write_text("\n".join(json.dumps({
+        "company": f"{name} {i}", "title": "Engineer", "description": f"Python job {i}", "email": f"jobs@{name}{i}.test",
+    }) for i in range(count)))
+    return runner.create_run(name, iter_jobs(str(path)), "resume.tex", {"name": name}, resume_content=RESUME,
+                             candidate_id=candidate_id)
+
+def claim_all(queue, count):
+    owners = []
+    for _ in range(count):
+        items = queue.claim("worker", ["llm"])
+        if not items:
+            break
+        owners.append(items[0]["candidate_id"])
+    return owners
+
+def test_backlogged_candidate_cannot_starve_another(tmp_path, manager, session_factory):
+    runner = BatchRunner(manager, session_factory=session_factory)
+    heavy = save_candidate("heavy", session_factory=session_factory)
+    light = save_candidate("light", session_factory=session_factory)
+    queue = WorkQueue(session_factory)
+    # The heavy candidate queues its whole backlog first
+    queue.enqueue_run(create_run(tmp_path, runner, "heavy", 20, heavy))
+    queue.enqueue_run(create_run(tmp_path, runner, "light", 3, light))
+
+    owners = claim_all(queue, 23)
+    assert len(owners) == 23
+    # Served alternately, so the light candidate is done within six claims
+    assert Counter(owners[:6]) == {heavy: 3, light: 3}
+
+def test_weights_divide_claims(tmp_path, manager, session_factory):
+    runner = BatchRunner(manager, session_factory=session_factory)
+    gold = save_candidate("gold", session_factory=session_factory, weight=2.0)
+    basic = save_candidate("basic", session_factory=session_factory)
+    queue = WorkQueue(session_factory)
+    queue.enqueue_run(create_run(tmp_path, runner, "basic", 10, basic))
+    queue.enqueue_run(create_run(tmp_path, runner, "gold", 10, gold))
+
+    assert Counter(claim_all(queue, 9)) == {gold: 6, basic: 3}
+
+def test_in_flight_cap(tmp_path, manager, session_factory):
+    runner = BatchRunner(manager, session_factory=session_factory)
+    capped = save_candidate("capped", session_factory=session_factory, max_in_flight=1)
+    queue = WorkQueue(session_factory)
+    queue.enqueue_run(create_run(tmp_path, runner, "capped", 3, capped))
+    queue.enqueue_run(create_run(tmp_path, runner, "shared", 2, None))
+
+    assert Counter(claim_all(queue, 5)) == {capped: 1, None: 2}
+    assert queue.stats()["llm"] == {"claimed": 3, "queued": 2}
+
+def test_candidate_mailbox_and_templates(tmp_path, manager, session_factory, monkeypatch):
+    monkeypatch.setenv("JANE_SMTP_PASSWORD", "secret")
+    runner = BatchRunner(manager, session_factory=session_factory)
+    jane = save_candidate(
+        "jane", session_factory=session_factory,
+        smtp_server="smtp.jane.test", smtp_username="jane@jane.test", smtp_password_env="JANE_SMTP_PASSWORD",
+        email_templates={"application": {"subject": "Jane for {position_title}", "content": "{custom_content}"}},
+    )
+    run_id = create_run(tmp_path, runner, "jane", 1, jane)
+
+    with patch("job_application_automator.core.email_communicator.smtplib.SMTP") as mock_smtp:
+        assert runner.run(run_id, RESUME) == {"submitted": 1}
+
+    mock_smtp.assert_called_once_with("smtp.jane.test", 587)
+    server = mock_smtp.return_value.__enter__.return_value
+    server.login.assert_called_once_with("jane@jane.test", "secret")
+    message = server.send_message.call_args[0][0]
+    assert message["Subject"] == "Jane for Engineer"
+    assert message["From"] == "jane@jane.test"
+    manager.email_communicator.send_email.assert_not_called()
+
+def test_partial_mailbox_never_uses_shared_credentials(session_factory, monkeypatch):
+    monkeypatch.setenv("EMAIL_USERNAME", "shared@example.com")
+    monkeypatch.setenv("EMAIL_PASSWORD", "shared-secret")
+    with pytest.raises(ValueError, match="smtp_username, smtp_password_env"):
+        save_candidate("jane", session_factory=session_factory, smtp_server="smtp.jane.test")
+    jane = save_candidate("jane", session_factory=session_factory)
+    with pytest.raises(ValueError, match="smtp_server"):
+        save_candidate("jane", session_factory=session_factory, smtp_username="jane@jane.test")
+
+    # Rows written some other way are checked again before sending
+    with pytest.raises(ValueError, match="smtp_username, smtp_password_env"):
+        candidate_communicator(Candidate(id=jane, name="jane", smtp_server="smtp.jane.test"))
+    with pytest.raises(ValueError, match="JANE_SMTP_PASSWORD"):
+        candidate_communicator(Candidate(id=jane, name="jane", smtp_server="smtp.jane.test",
+                                         smtp_username="jane@jane.test", smtp_password_env="JANE_SMTP_PASSWORD"))
+    # Templates alone keep the shared mailbox
+    communicator = candidate_communicator(Candidate(name="jane", email_templates='{"application": '
+                                                    '{"subject": "Hi", "content": "Hello"}}'))
+    assert communicator.username == "shared@example.com"
+
+def test_tenant_stats():
+    assert percentile([5, 1, 3, 2, 4], 50) == 3
+    assert percentile(list(range(1, 101)), 99) == 99
+    stats = TenantStats(latency_bound=10, window=100)
+    for wait in range(20):
+        stats.record("jane", "llm", float(wait), 1.0)
+    summary = stats.summary()["jane"]
+    assert summary["items"] == 20
+    assert summary["wait_p99"] == 19.0
+    assert summary["service_p50"] == 1.0
@@ -0,0 +1,186 @@
+import json
+import threading
+from datetime import datetime, timedelta
+import pytest
+from unittest.mock import MagicMock
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from job_application_automator.core import batch
+from job_application_automator.core.batch import BatchRunner
+from job_application_automator.core.ingestion import iter_jobs
+from job_application_automator.core.work_queue import Worker, WorkQueue
+from job_application_automator.db.models import Application, Base, WorkItem
+from job_application_automator.utils.ai_client import MistralAIClient
+from job_application_automator.utils.llm_backends import StubBackend
+
+RESUME = "\\documentclass{article}\n\\begin{document}\nJane Doe\n\\end{document}"
+
+JOBS = [
+    {"company": f"Company {i}", "title": "Engineer", "description": f"Python job {i}", "email": f"jobs@c{i}.test"}
+    for i in range(3)
+]
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = MagicMock()
+    manager.ai_client = MistralAIClient(backend=StubBackend())
+    manager.handle_job_description.side_effect = manager.ai_client.analyze_job_description
+
+    def compile_latex(content, output_name):
+        path = tmp_path / f"{output_name}.pdf"
+        path.write_bytes(b"%PDF")
+        return str(path)
+
+    manager.latex_handler.compile_latex.side_effect = compile_latex
+    manager.email_communicator.compose_email.side_effect = lambda template, details: {
+        "to": details["to"], "subject": "Application", "body": "Hello", "attachments": details["attachments"],
+    }
+    manager.email_communicator.send_email.return_value = True
+    return manager
+
+@pytest.fixture
+def run_id(tmp_path, session_factory, manager):
+    path = tmp_path / "jobs.jsonl"
+    path.write_text("\n".join(json.dumps(job) for job in JOBS))
+    runner = BatchRunner(manager, session_factory=session_factory)
+    return runner.create_run("shared", iter_jobs(str(path)), "resume.tex", {"name": "Jane"}, resume_content=RESUME)
+
+def test_stage_routing_across_nodes(manager, session_factory, run_id):
+    queue = WorkQueue(session_factory)
+    assert queue.enqueue_run(run_id) == 3
+    assert queue.enqueue_run(run_id) == 0
+    runner = BatchRunner(manager, session_factory=session_factory)
+
+    # An LLM-only node generates everything but compiles nothing
+    assert Worker(runner, queue, queues=["llm"], poll_interval=0).run(until_idle=True) == 3
+    assert manager.latex_handler.compile_latex.call_count == 0
+    assert queue.stats(run_id) == {"tex": {"queued": 3}}
+    llm_calls = manager.ai_client.client.calls
+
+    Worker(runner, queue, queues=["tex"], poll_interval=0).run(until_idle=True)
+    assert queue.stats(run_id) == {"send": {"queued": 3}}
+    Worker(runner, queue, queues=["send"], poll_interval=0).run(until_idle=True)
+    assert queue.stats(run_id) == {"send": {"done": 3}}
+
+    assert manager.ai_client.client.calls == llm_calls
+    assert manager.email_communicator.send_email.call_count == 3
+    assert runner.summary(run_id) == {"submitted": 3}
+
+def test_claims_are_exclusive(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'queue.db'}", connect_args={"timeout": 30})
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    session = session_factory()
+    session.add_all(WorkItem(application_id=i, queue="llm", status="queued") for i in range(1, 201))
+    session.commit()
+    session.close()
+
+    queue = WorkQueue(session_factory)
+    claimed = []
+
+    def claim_all():
+        while True:
+            items = queue.claim("node", ["llm"], limit=3)
+            if not items:
+                return
+            claimed.extend(item["application_id"] for item in items)
+
+    threads = [threading.Thread(target=claim_all) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == list(range(1, 201))
+
+def test_expired_leases_are_reclaimed(session_factory, run_id):
+    queue = WorkQueue(session_factory, max_attempts=2)
+    queue.enqueue_run(run_id)
+    first = queue.claim("dead-node", ["llm"])[0]
+    assert queue.claim("other", ["tex", "send"]) == []
+
+    session = session_factory()
+    session.query(WorkItem).update({WorkItem.lease_expires_at: datetime.utcnow() - timedelta(seconds=1)})
+    session.commit()
+    assert queue.reclaim_expired() == 1
+
+    # The dead node has lost its lease and can no longer complete the item
+    assert queue.heartbeat([first]) == [first["id"]]
+    assert queue.complete(first, "tex") is False
+
+    second = [item for item in queue.claim("node", ["llm"], limit=3) if item["id"] == first["id"]][0]
+    assert queue.heartbeat([second]) == []
+    session.query(WorkItem).update({WorkItem.lease_expires_at: datetime.utcnow() - timedelta(seconds=1)})
+    session.commit()
+    queue.reclaim_expired()
+    # The item crashed a node twice, so it is failed rather than requeued
+    assert session.get(WorkItem, first["id"]).status == "failed"
+
+def test_send_raced_by_two_workers_is_sent_once(manager, session_factory, run_id):
+    queue = WorkQueue(session_factory)
+    queue.enqueue_run(run_id)
+    runner = BatchRunner(manager, session_factory=session_factory)
+    Worker(runner, queue, queues=["llm", "tex"], poll_interval=0).run(until_idle=True)
+
+    # A slow worker's lease on a send expires and another worker claims it
+    slow_item = queue.claim("slow", ["send"])[0]
+    session = session_factory()
+    session.query(WorkItem).filter(WorkItem.id == slow_item["id"]).update(
+        {WorkItem.lease_expires_at: datetime.utcnow() - timedelta(seconds=1)})
+    session.commit()
+    queue.reclaim_expired()
+    fast_item = [item for item in queue.claim("fast", ["send"], limit=3) if item["id"] == slow_item["id"]][0]
+
+    # While the new holder composes the email, the slow worker claims the
+    # send and is still delivering it when the new holder gives up
+    compose = manager.email_communicator.compose_email.side_effect
+    sending, delivered = threading.Event(), threading.Event()
+    slow = threading.Thread(target=Worker(runner, queue, queues=["send"], poll_interval=0).process, args=(slow_item,))
+
+    def compose_during_race(template, details):
+        if not slow.is_alive() and not sending.is_set():
+            slow.start()
+            assert sending.wait(5)
+        return compose(template, details)
+
+    def send_slowly(email_content):
+        sending.set()
+        return delivered.wait(5)
+
+    manager.email_communicator.compose_email.side_effect = compose_during_race
+    manager.email_communicator.send_email.side_effect = send_slowly
+    Worker(runner, queue, queues=["send"], poll_interval=0).process(fast_item)
+    manager.email_communicator.compose_email.side_effect = compose
+    assert session.get(WorkItem, fast_item["id"]).status == "done"
+
+    # Nothing is left on the send queue to be flagged as interrupted
+    Worker(runner, queue, queues=["send"], poll_interval=0).run(until_idle=True)
+    delivered.set()
+    slow.join()
+    application = session.get(Application, fast_item["application_id"])
+    session.refresh(application)
+    assert application.status == "submitted"
+    assert manager.email_communicator.send_email.call_count == 1
+    session.close()
+
+def test_failed_stage_is_retried_later(manager, session_factory, run_id):
+    queue = WorkQueue(session_factory, retry_delay=3600)
+    queue.enqueue_run(run_id)
+    manager.latex_handler.compile_latex.side_effect = RuntimeError("pdflatex crashed")
+
+    runner = BatchRunner(manager, session_factory=session_factory)
+    Worker(runner, queue, poll_interval=0).run(until_idle=True)
+    session = session_factory()
+    items = session.query(WorkItem).all()
+    assert [item.status for item in items] == ["queued"] * 3
+    for item in items:
+        assert item.attempts == 1
+        assert item.available_at > datetime.utcnow()
+        assert "pdflatex crashed" in item.last_error
+        application = session.get(Application, item.application_id)
+        assert item.queue == batch.STAGE_QUEUES[application.stage]
+    # Nothing is retried before the delay has passed
+    assert queue.claim("node", batch.QUEUES) == []
+
+def test_worker_rejects_unknown_queue(manager, session_factory):
+    with pytest.raises(ValueError, match="gpu"):
+        Worker(BatchRunner(manager, session_factory=session_factory), WorkQueue(session_factory), queues=["gpu"])
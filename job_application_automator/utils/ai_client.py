@@ -1,19 +1,193 @@
 import json
 import logging
-from typing import Dict, List
+import threading
+from typing import Callable, Dict, List, Optional
+import numpy as np
 from mistralai.client import MistralClient
 from mistralai.models.chat_completion import ChatMessage
-from ..utils.config import get_mistral_config
+from ..core.bullet_library import BulletLibrary
+from ..core.semantic_cache import SemanticCache
+from ..utils.config import get_bullet_library_config, get_llm_backend_config, get_mistral_config
+from .llm_backends import create_stub_backend
+from .metrics import metrics
 
 logger = logging.getLogger(__name__)
 
 class MistralAIClient:
     """Client for interacting with Mistral AI API."""
     
-    def __init__(self):
-        config = get_mistral_config()
-        self.client = MistralClient(api_key=config["api_key"])
+    def __init__(self, backend=None, bullet_library=None, semantic_cache=None):
+        """
+        Args:
+            backend: Chat backend to use, defaults to the configured backend
+                (the Mistral API unless LLM_BACKEND selects the offline stub)
+            bullet_library: BulletLibrary used to send only the most relevant
+                resume bullets when customizing; defaults to the one at
+                BULLET_LIBRARY, if set
+            semantic_cache: SemanticCache reused for resumes and cover letters
+                of near-identical jobs; defaults to the one at SEMANTIC_CACHE,
+                if set
+        """
+        if backend is None:
+            backend_config = get_llm_backend_config()
+            if backend_config["backend"] == "stub":
+                backend = create_stub_backend(backend_config)
+            else:
+                backend = MistralClient(api_key=get_mistral_config()["api_key"])
+        self.client = backend
         self.model = "mistral-medium"
+        self.embedding_model = "mistral-embed"
+        # Total tokens used by chat and embedding requests, e.g. for enforcing a budget
+        self.tokens_used = 0
+        self._usage_lock = threading.Lock()
+        
+        library_config = get_bullet_library_config()
+        if bullet_library is None and library_config["path"]:
+            bullet_library = BulletLibrary(self.embed, library_config["path"])
+        self.bullet_library = bullet_library
+        self.bullet_top_k = library_config["top_k"]
+        
+        if semantic_cache is None:
+            semantic_cache = SemanticCache.from_config(self.embed)
+        self.semantic_cache = semantic_cache
+    
+    def _chat(self, operation: str, messages: List[ChatMessage]):
+        """
+        Sends a chat request, recording latency and token usage.
+        
+        Args:
+            operation: Name of the calling operation, used as a metric label
+            messages: Messages to send
+            
+        Returns:
+            Chat completion response
+        """
+        with metrics.timer("llm_request", operation=operation) as span:
+            response = self.client.chat(
+                model=self.model,
+                messages=messages
+            )
+            self._record_usage(operation, response, span)
+            return response
+    
+    def _record_usage(self, operation: str, response, span):
+        """Adds a response's token usage to tokens_used and the metrics."""
+        usage = getattr(response, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        with self._usage_lock:
+            self.tokens_used += sum(t for t in (prompt_tokens, completion_tokens) if isinstance(t, int))
+        if metrics.enabled:
+            if isinstance(prompt_tokens, int):
+                metrics.inc("llm_tokens", prompt_tokens, operation=operation, type="prompt")
+                span.set_attribute("prompt_tokens", prompt_tokens)
+            if isinstance(completion_tokens, int):
+                metrics.inc("llm_tokens", completion_tokens, operation=operation, type="completion")
+                span.set_attribute("completion_tokens", completion_tokens)
+    
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embeds texts with the embedding model.
+        
+        Args:
+            texts: Texts to embed
+            
+        Returns:
+            Array with one row per text
+        """
+        with metrics.timer("llm_request", operation="embed") as span:
+            response = self.client.embeddings(model=self.embedding_model, input=texts)
+            self._record_usage("embed", response, span)
+        return np.array([item.embedding for item in sorted(response.data, key=lambda item: item.index)],
+                        dtype=np.float32)
+    
+    def _generate(
+        self,
+        operation: str,
+        job_details: Dict,
+        context,
+        messages: Callable[[], List[ChatMessage]],
+        company_name: Optional[str] = None,
+    ) -> str:
+        """
+        Generates text for a job, reusing the semantic cache when one is set.
+        
+        A cached output for a near-identical job is returned as is; one for a
+        similar job is sent with adapt_messages() instead of messages().
+        
+        Args:
+            operation: Name of the calling operation
+            job_details: Job analysis the text is generated for
+            context: The operation's other input, e.g. the current resume
+            messages: Builds the messages of a full generation
+            company_name: Company the job is at; job analyses do not name it
+            
+        Returns:
+            Generated text
+        """
+        if self.semantic_cache is None:
+            return self._chat(operation, messages()).choices[0].message.content
+        company_name = company_name or ""
+        match = self.semantic_cache.lookup(operation, job_details, context, company_name)
+        if match["result"] == "hit":
+            return match["output"]
+        if match["result"] == "adapt":
+            response = self._chat(f"{operation}_adapt", self.adapt_messages(
+                operation, job_details, match["output"], company_name
+            ))
+        else:
+            response = self._chat(operation, messages())
+        content = response.choices[0].message.content
+        self.semantic_cache.store(operation, job_details, context, content, match["vector"], company_name)
+        return content
+    
+    def adapt_messages(
+        self,
+        operation: str,
+        job_details: Dict,
+        previous: str,
+        company_name: Optional[str] = None,
+    ) -> List[ChatMessage]:
+        """
+        Builds the messages for adapting a cached generation to a similar job.
+        
+        Args:
+            operation: "customize_resume" or "cover_letter"
+            job_details: Job analysis to adapt to
+            previous: Output generated for the similar job
+            company_name: Company the job is at, if known
+            
+        Returns:
+            Messages asking for the smallest changes that fit the new job
+        """
+        if operation == "customize_resume":
+            system = """You are an expert at customizing resumes to match job requirements.
+                    Your task is to adjust a resume that was already customized for a very similar job,
+                    changing only what the new job requirements call for."""
+            document = "Current Resume"
+        else:
+            system = """You are an expert at writing professional cover letters.
+                    Your task is to adjust a cover letter that was already written for a very similar
+                    position, changing only what the new job details call for."""
+            document = "Cover Letter"
+        company = f"Company: {company_name}" if company_name else ""
+        return [
+            ChatMessage(role="system", content=system),
+            ChatMessage(
+                role="user",
+                content=f"""
+                    Please adapt the following document to these job details with minimal edits.
+                    Keep the LaTeX formatting intact, and correct any company or position names.
+                    
+                    Job Details:
+                    {json.dumps(job_details, indent=2)}
+                    {company}
+                    
+                    {document}:
+                    {previous}
+                    """
+            )
+        ]
     
     def _parse_json_response(self, response: str) -> Dict:
         """Parse JSON response from the API."""
@@ -25,27 +199,18 @@ class MistralAIClient:
             logger.error(f"Error parsing JSON response: {e}")
             raise ValueError("Invalid JSON response from AI model")
     
-    def analyze_job_description(self, job_desc: str) -> Dict:
-        """
-        Analyzes job description to extract key information.
-        
-        Args:
-            job_desc: Job description text
-            
-        Returns:
-            Dictionary containing parsed job details
-        """
-        try:
-            messages = [
-                ChatMessage(
-                    role="system",
-                    content="""You are an expert at analyzing job descriptions and extracting key information.
+    def analysis_messages(self, job_desc: str) -> List[ChatMessage]:
+        """Builds the messages for analyze_job_description()."""
+        return [
+            ChatMessage(
+                role="system",
+                content="""You are an expert at analyzing job descriptions and extracting key information.
                     Your task is to analyze the job description and provide structured information that will be used
                     to customize resumes and generate cover letters. Be precise and thorough in your analysis."""
-                ),
-                ChatMessage(
-                    role="user",
-                    content=f"""
+            ),
+            ChatMessage(
+                role="user",
+                content=f"""
                     Analyze the following job description and extract key information in JSON format:
                     
                     {job_desc}
@@ -66,13 +231,27 @@ class MistralAIClient:
                         "employment_type": "Full-time/Part-time/Contract"
                     }}
                     """
-                )
-            ]
-            
-            response = self.client.chat(
-                model=self.model,
-                messages=messages
             )
+        ]
+    
+    def parse_analysis(self, content: str) -> Dict:
+        """Parses a response to analysis_messages() into job details."""
+        return self._parse_json_response(content)
+    
+    def analyze_job_description(self, job_desc: str) -> Dict:
+        """
+        Analyzes job description to extract key information.
+        
+        Args:
+            job_desc: Job description text
+            
+        Returns:
+            Dictionary containing parsed job details
+        """
+        try:
+            messages = self.analysis_messages(job_desc)
+            
+            response = self._chat("analyze", messages)
             
             return self._parse_json_response(response.choices[0].message.content)
         except json.JSONDecodeError as e:
@@ -82,93 +261,211 @@ class MistralAIClient:
             logger.error(f"Error analyzing job description: {e}")
             raise ValueError(f"Error analyzing job description: {str(e)}")
     
-    def customize_resume(self, job_details: Dict, current_resume: str) -> str:
+    def resume_messages(self, job_details: Dict, current_resume: str) -> List[ChatMessage]:
         """
-        Customizes resume content based on job details.
+        Builds the messages for customize_resume().
         
-        Args:
-            job_details: Dictionary containing job requirements
-            current_resume: Current resume content in LaTeX format
-            
-        Returns:
-            Customized resume content in LaTeX format
+        With a bullet library, only the resume bullets most relevant to the
+        job are sent, together with relevant bullets from other resumes.
         """
-        try:
-            messages = [
-                ChatMessage(
-                    role="system",
-                    content="""You are an expert at customizing resumes to match job requirements.
+        additional = ""
+        if self.bullet_library is not None:
+            current_resume, extra = self.bullet_library.focus_resume(current_resume, job_details, self.bullet_top_k)
+            if extra:
+                additional = "Other relevant achievements of the candidate (add where they fit):\n" + "\n".join(
+                    f"- {bullet}" for bullet in extra
+                )
+        return [
+            ChatMessage(
+                role="system",
+                content="""You are an expert at customizing resumes to match job requirements.
                     Your task is to modify the provided resume to better match the job requirements
                     while maintaining professionalism and authenticity. Focus on highlighting relevant
                     experience and using industry-specific keywords."""
-                ),
-                ChatMessage(
-                    role="user",
-                    content=f"""
+            ),
+            ChatMessage(
+                role="user",
+                content=f"""
                     Please customize the following resume to better match the job requirements.
                     Keep the LaTeX formatting intact and only modify the content.
                     
                     Job Requirements:
                     {json.dumps(job_details, indent=2)}
                     
+                    {additional}
+                    
                     Current Resume:
                     {current_resume}
                     """
-                )
-            ]
-            
-            response = self.client.chat(
-                model=self.model,
-                messages=messages
             )
+        ]
+    
+    def customize_resume(self, job_details: Dict, current_resume: str, company_name: Optional[str] = None) -> str:
+        """
+        Customizes resume content based on job details.
+        
+        Args:
+            job_details: Dictionary containing job requirements
+            current_resume: Current resume content in LaTeX format
+            company_name: Company the job is at, used by the semantic cache
             
-            return response.choices[0].message.content
+        Returns:
+            Customized resume content in LaTeX format
+        """
+        try:
+            return self._generate(
+                "customize_resume", job_details, current_resume,
+                lambda: self.resume_messages(job_details, current_resume), company_name
+            )
         except Exception as e:
             logger.error(f"Error customizing resume: {e}")
             raise ValueError(f"Error customizing resume: {str(e)}")
     
-    def generate_cover_letter(self, job_details: Dict, candidate_info: Dict) -> str:
+    def cover_letter_messages(self, job_details: Dict, candidate_info: Dict) -> List[ChatMessage]:
+        """Builds the messages for generate_cover_letter()."""
+        return [
+            ChatMessage(
+                role="system",
+                content="""You are an expert at writing professional cover letters.
+                    Your task is to generate a compelling cover letter that highlights the candidate's
+                    qualifications and demonstrates their fit for the position."""
+            ),
+            ChatMessage(
+                role="user",
+                content=f"""
+                    Please generate a cover letter in LaTeX format using the following information:
+                    
+                    Job Details:
+                    {json.dumps(job_details, indent=2)}
+                    
+                    Candidate Information:
+                    {json.dumps(candidate_info, separators=(",", ":"))}
+                    """
+            )
+        ]
+    
+    def generate_cover_letter(
+        self,
+        job_details: Dict,
+        candidate_info: Dict,
+        company_name: Optional[str] = None,
+    ) -> str:
         """
         Generates a cover letter based on job details.
         
         Args:
             job_details: Dictionary containing job and company information
             candidate_info: Dictionary containing candidate's background and experience
+            company_name: Company the job is at; without it a cached letter is
+                never reused as is
             
         Returns:
             Generated cover letter in LaTeX format
         """
         try:
-            messages = [
-                ChatMessage(
-                    role="system",
-                    content="""You are an expert at writing professional cover letters.
-                    Your task is to generate a compelling cover letter that highlights the candidate's
-                    qualifications and demonstrates their fit for the position."""
-                ),
-                ChatMessage(
-                    role="user",
-                    content=f"""
-                    Please generate a cover letter in LaTeX format using the following information:
+            return self._generate(
+                "cover_letter", job_details, candidate_info,
+                lambda: self.cover_letter_messages(job_details, candidate_info), company_name
+            )
+        except Exception as e:
+            logger.error(f"Error generating cover letter: {e}")
+            raise ValueError(f"Error generating cover letter: {str(e)}")
+    
+    def email_messages(self, job_details: Dict, candidate_info: Dict) -> List[ChatMessage]:
+        """Builds the messages for draft_application_email()."""
+        return [
+            ChatMessage(
+                role="system",
+                content="""You are an expert at writing concise application emails.
+                    Your task is to write a short, plain-text paragraph introducing the candidate
+                    and explaining why they are a strong fit for the position."""
+            ),
+            ChatMessage(
+                role="user",
+                content=f"""
+                    Please write a short paragraph (no greeting or signature) for an application email:
                     
                     Job Details:
                     {json.dumps(job_details, indent=2)}
                     
                     Candidate Information:
-                    {json.dumps(candidate_info, indent=2)}
+                    {json.dumps(candidate_info, separators=(",", ":"))}
                     """
-                )
-            ]
+            )
+        ]
+    
+    def draft_application_email(self, job_details: Dict, candidate_info: Dict) -> str:
+        """
+        Drafts the body of an application email.
+        
+        Args:
+            job_details: Dictionary containing job and company information
+            candidate_info: Dictionary containing candidate's background and experience
             
-            response = self.client.chat(
-                model=self.model,
-                messages=messages
+        Returns:
+            Plain-text paragraph to include in the application email
+        """
+        try:
+            messages = self.email_messages(job_details, candidate_info)
+            
+            response = self._chat("email_body", messages)
+            
+            return response.choices[0].message.content.strip()
+        except Exception as e:
+            logger.error(f"Error drafting application email: {e}")
+            raise ValueError(f"Error drafting application email: {str(e)}")
+    
+    def profile_messages(self, resume_content: str) -> List[ChatMessage]:
+        """Builds the messages for extract_candidate_profile()."""
+        return [
+            ChatMessage(
+                role="system",
+                content="""You are an expert at distilling resumes into compact candidate profiles.
+                    Your task is to extract the facts about the candidate that a cover letter or
+                    application email needs, as briefly as possible."""
+            ),
+            ChatMessage(
+                role="user",
+                content=f"""
+                    Extract a candidate profile from the following resume in JSON format:
+                    
+                    {resume_content}
+                    
+                    Please provide a JSON object with the following structure:
+                    {{
+                        "name": "Full name",
+                        "headline": "One-line professional summary",
+                        "contact": {{"email": "", "phone": "", "location": "", "links": []}},
+                        "skills": ["list", "of", "skills"],
+                        "roles": [{{"title": "", "company": "", "period": ""}}],
+                        "achievements": ["up to eight quantified achievements, one short sentence each"],
+                        "education": ["degree, institution, year"]
+                    }}
+                    """
             )
+        ]
+    
+    def parse_profile(self, content: str) -> Dict:
+        """Parses a response to profile_messages() into a candidate profile."""
+        return self._parse_json_response(content)
+    
+    def extract_candidate_profile(self, resume_content: str) -> Dict:
+        """
+        Distills a resume into a compact candidate profile.
+        
+        Args:
+            resume_content: Resume content in LaTeX format
             
-            return response.choices[0].message.content
+        Returns:
+            Dictionary with name, headline, contact, skills, roles,
+            achievements and education
+        """
+        try:
+            response = self._chat("candidate_profile", self.profile_messages(resume_content))
+            return self.parse_profile(response.choices[0].message.content)
         except Exception as e:
-            logger.error(f"Error generating cover letter: {e}")
-            raise ValueError(f"Error generating cover letter: {str(e)}")
+            logger.error(f"Error extracting candidate profile: {e}")
+            raise ValueError(f"Error extracting candidate profile: {str(e)}")
     
     def suggest_improvements(self, resume_content: str) -> List[str]:
         """
@@ -198,10 +495,7 @@ class MistralAIClient:
                 )
             ]
             
-            response = self.client.chat(
-                model=self.model,
-                messages=messages
-            )
+            response = self._chat("suggest_improvements", messages)
             
             suggestions = response.choices[0].message.content.split("\n")
             return [s.strip() for s in suggestions if s.strip()]
@@ -0,0 +1,385 @@
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import httpx
+from mistralai.models.chat_completion import ChatMessage
+
+from .config import get_batch_inference_config, get_mistral_config
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Batch job statuses, as reported by the Mistral batch API
+QUEUED = "QUEUED"
+RUNNING = "RUNNING"
+SUCCESS = "SUCCESS"
+FAILED = "FAILED"
+TIMEOUT_EXCEEDED = "TIMEOUT_EXCEEDED"
+CANCELLED = "CANCELLED"
+TERMINAL_STATUSES = {SUCCESS, FAILED, TIMEOUT_EXCEEDED, CANCELLED}
+
+DEFAULT_MAX_REQUESTS_PER_JOB = 10000
+
+
+class BatchInferenceError(Exception):
+    """Raised when a batch job cannot be submitted or does not finish."""
+
+
+def request_line(custom_id: str, messages: List[ChatMessage]) -> Dict:
+    """
+    Serializes one chat request for a batch input file.
+
+    Args:
+        custom_id: Identifier echoed back with the result
+        messages: Chat messages to send
+
+    Returns:
+        Dictionary in the batch input format
+    """
+    return {
+        "custom_id": custom_id,
+        "body": {"messages": [{"role": m.role, "content": m.content} for m in messages]},
+    }
+
+
+def parse_result_line(line: Dict) -> Tuple[str, Optional[str], Optional[str]]:
+    """
+    Extracts the outcome of one request from a batch output or error file.
+
+    Args:
+        line: Parsed JSON line
+
+    Returns:
+        Tuple of (custom_id, message content or None, error or None)
+    """
+    response = line.get("response") or {}
+    error = line.get("error")
+    if not error and response.get("status_code", 200) >= 400:
+        error = json.dumps(response.get("body"))
+    if error:
+        return line["custom_id"], None, error if isinstance(error, str) else json.dumps(error)
+    choices = (response.get("body") or {}).get("choices") or []
+    if not choices:
+        return line["custom_id"], None, "Empty response"
+    return line["custom_id"], choices[0]["message"]["content"], None
+
+
+class BatchEndpoint:
+    """Interface for providers that run chat requests as asynchronous batch jobs."""
+
+    def submit(self, model: str, input_path: Path) -> str:
+        """
+        Starts a batch job.
+
+        Args:
+            model: Name of the model to use
+            input_path: JSON lines file of request_line() entries
+
+        Returns:
+            ID of the job
+        """
+        raise NotImplementedError
+
+    def status(self, job_id: str) -> str:
+        """Returns the job's status, one of the status constants in this module."""
+        raise NotImplementedError
+
+    def results(self, job_id: str) -> Iterator[Dict]:
+        """Streams the parsed lines of a finished job's output and error files."""
+        raise NotImplementedError
+
+
+class MistralBatchEndpoint(BatchEndpoint):
+    """
+    The Mistral batch API.
+
+    Args:
+        api_key: Mistral API key
+        base_url: API base URL
+        timeout: Timeout for each HTTP request in seconds
+    """
+
+    def __init__(self, api_key: str, base_url: str = "https://api.mistral.ai", timeout: float = 120.0):
+        self.http = httpx.Client(
+            base_url=base_url,
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=timeout,
+        )
+
+    def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        response = self.http.request(method, url, **kwargs)
+        if response.status_code >= 400:
+            raise BatchInferenceError(f"{method} {url} failed with {response.status_code}: {response.text}")
+        return response
+
+    def submit(self, model: str, input_path: Path) -> str:
+        with open(input_path, "rb") as f:
+            uploaded = self._request(
+                "POST", "/v1/files", data={"purpose": "batch"}, files={"file": (input_path.name, f)}
+            ).json()
+        job = self._request("POST", "/v1/batch/jobs", json={
+            "input_files": [uploaded["id"]],
+            "endpoint": "/v1/chat/completions",
+            "model": model,
+        }).json()
+        return job["id"]
+
+    def status(self, job_id: str) -> str:
+        return self._request("GET", f"/v1/batch/jobs/{job_id}").json()["status"]
+
+    def results(self, job_id: str) -> Iterator[Dict]:
+        job = self._request("GET", f"/v1/batch/jobs/{job_id}").json()
+        for file_id in (job.get("output_file"), job.get("error_file")):
+            if not file_id:
+                continue
+            with self.http.stream("GET", f"/v1/files/{file_id}/content") as response:
+                if response.status_code >= 400:
+                    raise BatchInferenceError(f"Downloading batch file {file_id} failed with {response.status_code}")
+                for line in response.iter_lines():
+                    if line.strip():
+                        yield json.loads(line)
+
+
+class LocalBatchEndpoint(BatchEndpoint):
+    """
+    File-based stand-in for a provider batch API, for tests and offline runs.
+
+    Jobs are directories holding input.jsonl and, once processed,
+    output.jsonl in the provider's output format. A job is processed with
+    the given chat backend the first time its status is polled after
+    polls_until_done polls.
+
+    Args:
+        directory: Directory to keep jobs in
+        backend: Chat backend that answers the requests, e.g. StubBackend
+        polls_until_done: Number of status polls that report RUNNING first
+    """
+
+    def __init__(self, directory, backend, polls_until_done: int = 0):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.backend = backend
+        self.polls_until_done = polls_until_done
+        self.submitted = 0
+        self._polls = {}
+
+    def submit(self, model: str, input_path: Path) -> str:
+        job_id = uuid.uuid4().hex
+        job_dir = self.directory / job_id
+        job_dir.mkdir()
+        os.replace(input_path, job_dir / "input.jsonl")
+        (job_dir / "model").write_text(model)
+        self.submitted += 1
+        return job_id
+
+    def status(self, job_id: str) -> str:
+        job_dir = self.directory / job_id
+        if (job_dir / "output.jsonl").exists():
+            return SUCCESS
+        polls = self._polls.get(job_id, 0)
+        self._polls[job_id] = polls + 1
+        if polls < self.polls_until_done:
+            return RUNNING
+        self._process(job_dir)
+        return SUCCESS
+
+    def _process(self, job_dir: Path):
+        model = (job_dir / "model").read_text()
+        partial = job_dir / "output.jsonl.part"
+        with open(job_dir / "input.jsonl") as source, open(partial, "w") as output:
+            for line in source:
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                messages = [ChatMessage(**m) for m in request["body"]["messages"]]
+                result = {"id": uuid.uuid4().hex, "custom_id": request["custom_id"], "error": None}
+                try:
+                    response = self.backend.chat(model=model, messages=messages)
+                    result["response"] = {"status_code": 200, "body": response.model_dump(mode="json")}
+                except Exception as e:
+                    result["response"] = None
+                    result["error"] = {"message": str(e)}
+                output.write(json.dumps(result) + "\n")
+        os.replace(partial, job_dir / "output.jsonl")
+
+    def results(self, job_id: str) -> Iterator[Dict]:
+        with open(self.directory / job_id / "output.jsonl") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class BatchJobJournal:
+    """
+    Record of submitted batch jobs whose results have not been collected.
+
+    A run interrupted while waiting resumes polling the jobs it finds here
+    instead of submitting their requests again. This base class keeps
+    nothing; BatchRunner records the jobs of each run in the database.
+    """
+
+    def pending(self) -> List[Tuple[str, set]]:
+        """Returns (job_id, custom IDs) for every job not yet collected, oldest first."""
+        return []
+
+    def submitted(self, job_id: str, ids: set):
+        """Records a newly submitted job."""
+
+    def completed(self, job_id: str):
+        """Records that all results of a job were returned."""
+
+
+class BatchInferenceClient:
+    """
+    Runs large numbers of chat requests through a provider batch endpoint.
+
+    Requests are streamed to JSON lines files of at most
+    max_requests_per_job entries, so memory does not grow with the number of
+    requests. All jobs are submitted before any is waited on, and jobs left
+    in the journal by an interrupted run are collected before anything new
+    is submitted.
+
+    Args:
+        endpoint: Batch endpoint to submit jobs to
+        model: Name of the model to use
+        poll_interval: Seconds between status polls
+        timeout: Seconds to wait for all jobs before giving up
+        max_requests_per_job: Maximum number of requests in one job
+        sleep: Function used to wait between polls
+    """
+
+    def __init__(self, endpoint: BatchEndpoint, model: str = "mistral-medium", poll_interval: float = 60.0,
+                 timeout: float = 24 * 3600, max_requests_per_job: int = DEFAULT_MAX_REQUESTS_PER_JOB,
+                 sleep=time.sleep):
+        self.endpoint = endpoint
+        self.model = model
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.max_requests_per_job = max_requests_per_job
+        self.sleep = sleep
+
+    def _write_input(self, requests: Iterator[Tuple[str, List[ChatMessage]]]) -> Tuple[Optional[Path], set]:
+        """Writes the next job's worth of requests to a temporary file."""
+        ids = set()
+        fd, path = tempfile.mkstemp(prefix="batch-", suffix=".jsonl")
+        with os.fdopen(fd, "w") as f:
+            for custom_id, messages in islice(requests, self.max_requests_per_job):
+                f.write(json.dumps(request_line(custom_id, messages)) + "\n")
+                ids.add(custom_id)
+        if not ids:
+            os.unlink(path)
+            return None, ids
+        return Path(path), ids
+
+    def run(self, requests: Iterable[Tuple[str, List[ChatMessage]]],
+            journal: Optional[BatchJobJournal] = None) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+        """
+        Submits requests as batch jobs and streams back their results.
+
+        Args:
+            requests: (custom_id, messages) pairs; custom IDs must be unique
+            journal: Record of submitted jobs; pending jobs in it are
+                collected first, and requests they contain are not submitted
+                again
+
+        Yields:
+            (custom_id, content, error) for every request, in no particular
+            order; exactly one of content and error is None
+        """
+        journal = journal or BatchJobJournal()
+        deadline = time.monotonic() + self.timeout
+        requests = iter(requests)
+
+        resumed = journal.pending()
+        if resumed:
+            logger.info(f"Resuming {len(resumed)} batch jobs submitted by an earlier run")
+            collected = set().union(*(ids for _, ids in resumed))
+            if not (yield from self._collect(resumed, journal, deadline)):
+                return
+            requests = ((custom_id, messages) for custom_id, messages in requests if custom_id not in collected)
+
+        waiting = []
+        while True:
+            input_path, ids = self._write_input(requests)
+            if input_path is None:
+                break
+            try:
+                job_id = self.endpoint.submit(self.model, input_path)
+            finally:
+                if input_path.exists():
+                    input_path.unlink()
+            journal.submitted(job_id, ids)
+            logger.info(f"Submitted batch job {job_id} with {len(ids)} requests")
+            metrics.inc("llm_batch_requests", len(ids))
+            waiting.append((job_id, ids))
+        yield from self._collect(waiting, journal, deadline)
+
+    def _collect(self, waiting: List[Tuple[str, set]], journal: BatchJobJournal, deadline: float):
+        """
+        Polls jobs until they finish and yields their results.
+
+        Returns:
+            False if the deadline passed first, in which case the unfinished
+            jobs' requests were yielded as errors and stay in the journal
+        """
+        waiting = [(job_id, set(ids)) for job_id, ids in waiting]
+        while waiting:
+            still_waiting = []
+            for job_id, ids in waiting:
+                status = self.endpoint.status(job_id)
+                if status not in TERMINAL_STATUSES:
+                    still_waiting.append((job_id, ids))
+                    continue
+                if status != SUCCESS:
+                    logger.error(f"Batch job {job_id} finished with status {status}")
+                for line in self.endpoint.results(job_id):
+                    custom_id, content, error = parse_result_line(line)
+                    if custom_id in ids:
+                        ids.discard(custom_id)
+                        yield custom_id, content, error
+                for custom_id in ids:
+                    yield custom_id, None, f"No result (batch job {job_id} {status})"
+                journal.completed(job_id)
+            waiting = still_waiting
+            if waiting:
+                if time.monotonic() >= deadline:
+                    for job_id, ids in waiting:
+                        for custom_id in ids:
+                            yield custom_id, None, f"Batch job {job_id} did not finish in time"
+                    return False
+                self.sleep(self.poll_interval)
+        return True
+
+
+def create_batch_inference_client(ai_client) -> BatchInferenceClient:
+    """
+    Creates a batch inference client from the environment configuration.
+
+    Args:
+        ai_client: MistralAIClient whose model (and, for the local endpoint,
+            chat backend) is used
+
+    Returns:
+        Configured BatchInferenceClient
+    """
+    config = get_batch_inference_config()
+    if config["endpoint"] == "local":
+        endpoint = LocalBatchEndpoint(config["local_dir"], ai_client.client)
+    elif config["endpoint"] == "mistral":
+        endpoint = MistralBatchEndpoint(get_mistral_config()["api_key"], base_url=config["api_url"])
+    else:
+        raise ValueError(f"Unknown batch endpoint '{config['endpoint']}'")
+    return BatchInferenceClient(
+        endpoint,
+        model=ai_client.model,
+        poll_interval=config["poll_interval"],
+        timeout=config["timeout"],
+        max_requests_per_job=config["max_requests_per_job"],
+    )
@@ -49,5 +49,168 @@ def get_database_config() -> Dict:
         Dictionary containing database configuration
     """
     return {
-        "url": os.getenv("DATABASE_URL", "sqlite:///job_applications.db")
+        "url": os.getenv("DATABASE_URL", "sqlite:///job_applications.db"),
+        "async_url": os.getenv("ASYNC_DATABASE_URL"),
+        "pool_size": int(os.getenv("DATABASE_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DATABASE_MAX_OVERFLOW", "20"))
+    }
+
+def get_llm_backend_config() -> Dict:
+    """
+    Gets LLM backend configuration.
+    
+    Returns:
+        Dictionary containing backend selection and stub settings
+    """
+    return {
+        "backend": os.getenv("LLM_BACKEND", "mistral"),
+        "stub_latency_distribution": os.getenv("STUB_LATENCY_DISTRIBUTION", "fixed"),
+        "stub_latency_mean": float(os.getenv("STUB_LATENCY_MEAN", "0")),
+        "stub_latency_stddev": float(os.getenv("STUB_LATENCY_STDDEV", "0")),
+        "stub_tokens_per_second": float(os.getenv("STUB_TOKENS_PER_SECOND", "0")),
+        "stub_error_rate": float(os.getenv("STUB_ERROR_RATE", "0")),
+        "stub_seed": int(os.getenv("STUB_SEED", "0"))
+    }
+
+def get_metrics_config() -> Dict:
+    """
+    Gets metrics and tracing configuration.
+    
+    Returns:
+        Dictionary containing metrics configuration
+    """
+    return {
+        "enabled": os.getenv("METRICS_ENABLED", "false").lower() == "true",
+        "prometheus_file": os.getenv("METRICS_PROMETHEUS_FILE"),
+        "trace_file": os.getenv("METRICS_TRACE_FILE")
+    }
+
+def get_latex_config() -> Dict:
+    """
+    Gets LaTeX compilation configuration.
+    
+    Returns:
+        Dictionary containing compile limits and validation settings
+    """
+    return {
+        "timeout": float(os.getenv("LATEX_TIMEOUT", "30")),
+        "memory_limit_mb": int(os.getenv("LATEX_MEMORY_LIMIT_MB", "1024")),
+        "max_passes": int(os.getenv("LATEX_MAX_PASSES", "4")),
+        "validate": os.getenv("LATEX_VALIDATE", "true").lower() == "true"
+    }
+
+def get_pdf_config() -> Dict:
+    """
+    Gets PDF optimization configuration.
+    
+    Returns:
+        Dictionary containing the optimization tools and report settings
+    """
+    return {
+        "optimize": os.getenv("PDF_OPTIMIZE", "none").lower(),
+        "linearize": os.getenv("PDF_LINEARIZE", "false").lower() == "true",
+        "subset_fonts": os.getenv("PDF_SUBSET_FONTS", "true").lower() == "true",
+        "timeout": float(os.getenv("PDF_OPTIMIZE_TIMEOUT", "60")),
+        "uplink_kbps": float(os.getenv("SMTP_UPLINK_KBPS", "1000"))
+    }
+
+def get_batch_inference_config() -> Dict:
+    """
+    Gets configuration for offline batch inference.
+    
+    Returns:
+        Dictionary containing the batch endpoint and polling settings
+    """
+    return {
+        "endpoint": os.getenv("BATCH_ENDPOINT", "mistral"),
+        "local_dir": os.getenv("BATCH_LOCAL_DIR", "batch_jobs"),
+        "api_url": os.getenv("MISTRAL_API_URL", "https://api.mistral.ai"),
+        "poll_interval": float(os.getenv("BATCH_POLL_INTERVAL", "60")),
+        "timeout": float(os.getenv("BATCH_TIMEOUT", str(24 * 3600))),
+        "max_requests_per_job": int(os.getenv("BATCH_MAX_REQUESTS_PER_JOB", "10000"))
+    }
+
+def get_artifact_config() -> Dict:
+    """
+    Gets artifact store configuration.
+    
+    Returns:
+        Dictionary containing the store location and compression settings
+    """
+    return {
+        "dir": os.getenv("ARTIFACT_DIR", "artifacts"),
+        "compression": os.getenv("ARTIFACT_COMPRESSION", "gzip"),
+        "level": int(os.getenv("ARTIFACT_COMPRESSION_LEVEL", "6"))
+    }
+
+def get_imap_config() -> Dict:
+    """
+    Gets IMAP configuration for the inbox sync.
+    
+    Returns:
+        Dictionary containing IMAP configuration
+    """
+    return {
+        "host": os.getenv("IMAP_HOST"),
+        "port": int(os.getenv("IMAP_PORT", "993")),
+        "use_ssl": os.getenv("IMAP_USE_SSL", "true").lower() == "true",
+        "username": os.getenv("IMAP_USERNAME", os.getenv("EMAIL_USERNAME")),
+        "password": os.getenv("IMAP_PASSWORD", os.getenv("EMAIL_PASSWORD")),
+        "mailbox": os.getenv("IMAP_MAILBOX", "INBOX"),
+        "batch_size": int(os.getenv("IMAP_BATCH_SIZE", "500"))
+    }
+
+def get_bullet_library_config() -> Dict:
+    """
+    Gets resume bullet library configuration.
+    
+    Returns:
+        Dictionary containing the index path and retrieval settings
+    """
+    return {
+        "path": os.getenv("BULLET_LIBRARY"),
+        "top_k": int(os.getenv("BULLET_TOP_K", "12"))
+    }
+
+def get_semantic_cache_config() -> Dict:
+    """
+    Gets semantic generation cache configuration.
+    
+    Returns:
+        Dictionary containing the cache path, similarity thresholds and size
+    """
+    return {
+        "path": os.getenv("SEMANTIC_CACHE"),
+        "threshold": float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.97")),
+        "adapt_threshold": float(os.getenv("SEMANTIC_CACHE_ADAPT_THRESHOLD", "0.92")),
+        "min_skill_overlap": float(os.getenv("SEMANTIC_CACHE_MIN_SKILL_OVERLAP", "0.8")),
+        "max_entries": int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+    }
+
+def get_tenancy_config() -> Dict:
+    """
+    Gets multi-candidate scheduling configuration.
+    
+    Returns:
+        Dictionary containing the per-candidate latency bound and the
+        number of samples kept per candidate for latency statistics
+    """
+    return {
+        "latency_bound": float(os.getenv("TENANT_LATENCY_BOUND", "300")),
+        "stats_window": int(os.getenv("TENANT_STATS_WINDOW", "1000"))
+    }
+
+def get_fetch_config() -> Dict:
+    """
+    Gets job page fetcher configuration.
+    
+    Returns:
+        Dictionary containing the cache location and connection limits
+    """
+    return {
+        "cache_dir": os.getenv("FETCH_CACHE_DIR", "fetch_cache"),
+        "concurrency": int(os.getenv("FETCH_CONCURRENCY", "16")),
+        "per_host": int(os.getenv("FETCH_PER_HOST", "4")),
+        "timeout": float(os.getenv("FETCH_TIMEOUT", "20")),
+        "user_agent": os.getenv("FETCH_USER_AGENT", "job-application-automator")
     }
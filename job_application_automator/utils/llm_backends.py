@@ -0,0 +1,296 @@
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from mistralai.models.chat_completion import (
+    ChatCompletionResponse,
+    ChatCompletionResponseChoice,
+    ChatMessage,
+)
+from mistralai.models.common import UsageInfo
+from mistralai.models.embeddings import EmbeddingObject, EmbeddingResponse
+
+from .config import get_llm_backend_config
+
+# Rough characters-per-token ratio used to estimate token counts offline.
+CHARS_PER_TOKEN = 4
+
+# Size of the stub's hashed bag-of-words embeddings
+STUB_EMBEDDING_DIMENSION = 256
+
+KNOWN_SKILLS = [
+    "Python", "Java", "JavaScript", "TypeScript", "Go", "Rust", "C++", "SQL",
+    "PostgreSQL", "MySQL", "MongoDB", "Redis", "Docker", "Kubernetes", "AWS",
+    "GCP", "Azure", "Terraform", "Linux", "Git", "REST APIs", "GraphQL",
+    "Django", "Flask", "FastAPI", "React", "Node.js", "Spark", "Kafka",
+    "AI/ML", "Machine Learning", "TensorFlow", "PyTorch", "CI/CD", "Cloud",
+]
+
+
+class LLMBackend:
+    """
+    Interface for chat-completion backends used by MistralAIClient.
+
+    Any object with a compatible ``chat`` method can be used as a backend,
+    including ``mistralai.client.MistralClient`` itself.
+    """
+
+    def chat(self, model: str, messages: List[ChatMessage], **kwargs) -> ChatCompletionResponse:
+        """
+        Sends a chat completion request.
+
+        Args:
+            model: Name of the model to use
+            messages: Conversation messages
+
+        Returns:
+            Chat completion response
+        """
+        raise NotImplementedError
+
+    def embeddings(self, model: str, input: List[str]) -> EmbeddingResponse:
+        """
+        Embeds texts.
+
+        Args:
+            model: Name of the embedding model
+            input: Texts to embed
+
+        Returns:
+            Embedding response with one vector per text, in order
+        """
+        raise NotImplementedError
+
+
+class StubBackendError(Exception):
+    """Error injected by StubBackend to simulate API failures."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimates the number of tokens in a piece of text."""
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+class StubBackend(LLMBackend):
+    """
+    Deterministic, offline stand-in for the Mistral API.
+
+    Responses are derived from the prompt so the rest of the pipeline receives
+    realistic payloads (JSON analyses, LaTeX documents, suggestion lists).
+    Latency is drawn from a seeded distribution and scaled by the simulated
+    token generation rate, and failures can be injected at a fixed rate.
+    """
+
+    def __init__(
+        self,
+        latency_distribution: str = "fixed",
+        latency_mean: float = 0.0,
+        latency_stddev: float = 0.0,
+        tokens_per_second: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if latency_distribution not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution '{latency_distribution}'")
+        if not 0.0 <= error_rate <= 1.0:
+            raise ValueError("error_rate must be between 0 and 1")
+
+        self.latency_distribution = latency_distribution
+        self.latency_mean = latency_mean
+        self.latency_stddev = latency_stddev
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.sleep = sleep
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _sample_latency(self) -> float:
+        """Draws a base latency (in seconds) from the configured distribution."""
+        mean, stddev = self.latency_mean, self.latency_stddev
+        if self.latency_distribution == "fixed" or mean <= 0:
+            return max(0.0, mean)
+        if self.latency_distribution == "uniform":
+            return self._random.uniform(max(0.0, mean - stddev), mean + stddev)
+        if self.latency_distribution == "normal":
+            return max(0.0, self._random.gauss(mean, stddev))
+        # Parameterise the lognormal so that its mean and stddev match the config
+        variance = stddev ** 2
+        sigma2 = math.log(1 + variance / mean ** 2)
+        mu = math.log(mean) - sigma2 / 2
+        return self._random.lognormvariate(mu, sigma2 ** 0.5)
+
+    def chat(self, model: str, messages: List[ChatMessage], **kwargs) -> ChatCompletionResponse:
+        with self._lock:
+            self.calls += 1
+            call_number = self.calls
+            latency = self._sample_latency()
+            failed = self.error_rate > 0 and self._random.random() < self.error_rate
+            response_id = uuid.UUID(int=self._random.getrandbits(128)).hex
+
+        system = messages[0].content if messages else ""
+        prompt = messages[-1].content if messages else ""
+        content = self._respond(system, prompt)
+
+        prompt_tokens = sum(estimate_tokens(m.content) for m in messages)
+        completion_tokens = estimate_tokens(content)
+        if self.tokens_per_second > 0:
+            latency += completion_tokens / self.tokens_per_second
+
+        if latency > 0:
+            self.sleep(latency)
+        if failed:
+            raise StubBackendError(f"Injected failure on call {call_number}")
+
+        return ChatCompletionResponse(
+            id=f"stub-{response_id}",
+            object="chat.completion",
+            created=int(time.time()),
+            model=model,
+            choices=[
+                ChatCompletionResponseChoice(
+                    index=0,
+                    message=ChatMessage(role="assistant", content=content),
+                    finish_reason="stop",
+                )
+            ],
+            usage=UsageInfo(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+            ),
+        )
+
+    def embeddings(self, model: str, input: List[str]) -> EmbeddingResponse:
+        # Hashed bag of words, so texts sharing words get similar vectors
+        with self._lock:
+            self.calls += 1
+        if isinstance(input, str):
+            input = [input]
+        data = []
+        for index, text in enumerate(input):
+            vector = [0.0] * STUB_EMBEDDING_DIMENSION
+            for word in re.findall(r"[a-z0-9+#]+", text.lower()):
+                bucket = int(hashlib.md5(word.encode()).hexdigest(), 16) % STUB_EMBEDDING_DIMENSION
+                vector[bucket] += 1.0
+            data.append(EmbeddingObject(object="embedding", embedding=vector, index=index))
+        tokens = sum(estimate_tokens(text) for text in input)
+        return EmbeddingResponse(
+            id=f"stub-{uuid.uuid4().hex}",
+            object="list",
+            data=data,
+            model=model,
+            usage=UsageInfo(prompt_tokens=tokens, total_tokens=tokens, completion_tokens=0),
+        )
+
+    def _respond(self, system: str, prompt: str) -> str:
+        """Builds a deterministic response appropriate for the prompt type."""
+        if "candidate profiles" in system:
+            return self._profile(prompt)
+        if "analyzing job descriptions" in system:
+            return self._analysis(prompt)
+        if "customizing resumes" in system:
+            return self._resume(prompt)
+        if "cover letters" in system:
+            return self._cover_letter(prompt)
+        if "application emails" in system:
+            return (
+                "My background building production systems closely matches the "
+                "requirements of this role, and I would welcome the chance to contribute."
+            )
+        if "reviewing resumes" in system:
+            return "\n".join([
+                "- Add quantifiable achievements to each role",
+                "- Move the skills section above experience",
+                "- Remove outdated technologies",
+            ])
+        return "OK"
+
+    def _analysis(self, prompt: str) -> str:
+        skills = [
+            s for s in KNOWN_SKILLS
+            if re.search(rf"(?<!\w){re.escape(s)}(?!\w)", prompt)
+        ]
+        digest = int(hashlib.sha256(prompt.encode()).hexdigest(), 16)
+        title_match = re.search(r"^\s*([A-Z][\w /+-]*(Engineer|Developer|Scientist|Manager|Analyst))", prompt, re.M)
+        return json.dumps({
+            "title": title_match.group(1).strip() if title_match else "Software Engineer",
+            "required_skills": skills[:6] or ["Python"],
+            "preferred_skills": skills[6:10],
+            "experience_level": f"{digest % 8 + 1}+ years",
+            "education_requirements": ["BS in Computer Science or equivalent"],
+            "key_responsibilities": ["Design and build services", "Collaborate with the team"],
+            "technical_requirements": skills[:3],
+            "soft_skills": ["Communication", "Ownership"],
+            "company_values": ["Customer focus"],
+            "industry": "Technology",
+            "location": "Remote",
+            "employment_type": "Full-time",
+        })
+
+    def _profile(self, prompt: str) -> str:
+        skills = [s for s in KNOWN_SKILLS if re.search(rf"(?<!\w){re.escape(s)}(?!\w)", prompt)]
+        email = re.search(r"[\w.+-]+@[\w-]+\.[\w.]+", prompt)
+        return json.dumps({
+            "name": "Jane Doe",
+            "headline": "Software engineer",
+            "contact": {"email": email.group(0) if email else ""},
+            "skills": skills or ["Python"],
+            "roles": [{"title": "Software Engineer", "company": "Example Corp", "period": "2020-present"}],
+            "achievements": ["Cut service latency by 40%"],
+            "education": ["BS in Computer Science"],
+        })
+
+    def _resume(self, prompt: str) -> str:
+        # Echo the resume back so the result is still a compilable document
+        _, _, resume = prompt.partition("Current Resume:")
+        resume = resume.strip()
+        if "\\documentclass" in resume:
+            return resume
+        return "\n".join([
+            "\\documentclass{article}",
+            "\\begin{document}",
+            resume or "Customized resume",
+            "\\end{document}",
+        ])
+
+    def _cover_letter(self, prompt: str) -> str:
+        digest = hashlib.sha256(prompt.encode()).hexdigest()[:8]
+        return "\n".join([
+            "\\documentclass{letter}",
+            "\\begin{document}",
+            "\\begin{letter}{Hiring Manager}",
+            "\\opening{Dear Hiring Manager,}",
+            f"I am excited to apply for this position (ref {digest}).",
+            "\\closing{Sincerely,}",
+            "\\end{letter}",
+            "\\end{document}",
+        ])
+
+
+def create_stub_backend(config: Optional[Dict] = None) -> StubBackend:
+    """
+    Creates a StubBackend from the LLM backend configuration.
+
+    Args:
+        config: Backend configuration, defaults to get_llm_backend_config()
+
+    Returns:
+        Configured StubBackend instance
+    """
+    config = config or get_llm_backend_config()
+    return StubBackend(
+        latency_distribution=config["stub_latency_distribution"],
+        latency_mean=config["stub_latency_mean"],
+        latency_stddev=config["stub_latency_stddev"],
+        tokens_per_second=config["stub_tokens_per_second"],
+        error_rate=config["stub_error_rate"],
+        seed=config["stub_seed"],
+    )
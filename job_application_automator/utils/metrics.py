@@ -0,0 +1,270 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Dict, Optional, Tuple
+
+from .config import get_metrics_config
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "job_automator"
+
+# Upper bounds (in seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current_span = contextvars.ContextVar("job_automator_current_span", default=None)
+
+
+def _label_key(labels: Dict) -> Tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: Tuple, extra: Optional[Dict] = None) -> str:
+    pairs = list(key) + sorted((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in pairs) + "}"
+
+
+class _NoopSpan:
+    """Span returned when metrics are disabled; every operation is a no-op."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set_attribute(self, key: str, value):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """A timed operation, recorded as a histogram sample and a trace span."""
+
+    __slots__ = ("metrics", "name", "labels", "attributes", "trace_id", "span_id",
+                 "parent_id", "start_ns", "end_ns", "status", "_token")
+
+    def __init__(self, metrics: "Metrics", name: str, labels: Dict):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+        self.attributes = {}
+        self.status = "ok"
+
+    def set_attribute(self, key: str, value):
+        """Attaches an attribute to the exported span (not to the metric labels)."""
+        self.attributes[key] = value
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.span_id = os.urandom(8).hex()
+        self._token = _current_span.set(self)
+        self.start_ns = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.time_ns()
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.status = "error"
+            self.attributes["error"] = f"{exc_type.__name__}: {exc}"
+        self.metrics._finish(self)
+        return False
+
+
+class Metrics:
+    """
+    Lightweight registry of counters, latency histograms and trace spans.
+
+    When disabled, timer() returns a shared no-op span and inc() returns
+    immediately, so instrumented code pays only an attribute check.
+    """
+
+    def __init__(self, enabled: bool = False, max_spans: int = 100000):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._histograms = {}
+        self._spans = deque(maxlen=max_spans)
+
+    def timer(self, name: str, **labels):
+        """
+        Times a block of code.
+
+        Args:
+            name: Metric name, e.g. "llm_request"
+            **labels: Metric labels, e.g. operation="analyze"
+
+        Returns:
+            Context manager yielding the active span
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, name, labels)
+
+    def wrap(self, func, name: str, **labels):
+        """
+        Wraps a callable so that every call is timed.
+
+        Args:
+            func: Callable to wrap
+            name: Metric name
+            **labels: Metric labels
+
+        Returns:
+            Wrapped callable
+        """
+        def wrapper(*args, **kwargs):
+            with self.timer(name, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """
+        Increments a counter.
+
+        Args:
+            name: Counter name, e.g. "llm_tokens"
+            value: Amount to add
+            **labels: Counter labels
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[(name, _label_key(labels))] += value
+
+    def observe(self, name: str, seconds: float, **labels):
+        """Records a latency sample without creating a span."""
+        if not self.enabled:
+            return
+        self._observe((name, _label_key(labels)), seconds)
+
+    def _observe(self, key: Tuple, seconds: float):
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(DEFAULT_BUCKETS), 0, 0.0]
+            buckets, _, _ = histogram
+            for i, bound in enumerate(DEFAULT_BUCKETS):
+                if seconds <= bound:
+                    buckets[i] += 1
+                    break
+            histogram[1] += 1
+            histogram[2] += seconds
+
+    def _finish(self, span: Span):
+        key = (span.name, _label_key(span.labels))
+        self._observe(key, (span.end_ns - span.start_ns) / 1e9)
+        if span.status == "error":
+            with self._lock:
+                self._counters[(f"{span.name}_errors", key[1])] += 1
+        self._spans.append(span)
+
+    def reset(self):
+        """Discards all recorded metrics and spans."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._spans.clear()
+
+    def to_prometheus(self) -> str:
+        """
+        Renders all counters and histograms in the Prometheus text format.
+
+        Returns:
+            Exposition text
+        """
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._histograms.items())
+
+        seen = set()
+        for (name, key), value in counters:
+            metric = f"{METRIC_PREFIX}_{name}_total"
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} counter")
+                seen.add(metric)
+            lines.append(f"{metric}{_format_labels(key)} {value:g}")
+
+        for (name, key), (buckets, count, total) in histograms:
+            metric = f"{METRIC_PREFIX}_{name}_seconds"
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} histogram")
+                seen.add(metric)
+            cumulative = 0
+            for bound, bucket in zip(DEFAULT_BUCKETS, buckets):
+                cumulative += bucket
+                lines.append(f"{metric}_bucket{_format_labels(key, {'le': f'{bound:g}'})} {cumulative}")
+            lines.append(f"{metric}_bucket{_format_labels(key, {'le': '+Inf'})} {count}")
+            lines.append(f"{metric}_sum{_format_labels(key)} {total:.6f}")
+            lines.append(f"{metric}_count{_format_labels(key)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def export_prometheus(self, path: str):
+        """Writes the Prometheus exposition text to a file."""
+        with open(path, "w") as f:
+            f.write(self.to_prometheus())
+
+    def export_spans(self, path: str):
+        """
+        Writes recorded spans as OpenTelemetry-style JSON lines.
+
+        Args:
+            path: File to append spans to
+        """
+        with self._lock:
+            spans = list(self._spans)
+        with open(path, "a") as f:
+            for span in spans:
+                f.write(json.dumps({
+                    "traceId": span.trace_id,
+                    "spanId": span.span_id,
+                    "parentSpanId": span.parent_id,
+                    "name": span.name,
+                    "startTimeUnixNano": span.start_ns,
+                    "endTimeUnixNano": span.end_ns,
+                    "status": span.status,
+                    "attributes": {**{k: str(v) for k, v in span.labels.items()}, **span.attributes},
+                }) + "\n")
+
+
+metrics = Metrics(enabled=get_metrics_config()["enabled"])
+
+
+def export_configured(registry: Metrics = metrics, prometheus_file: Optional[str] = None,
+                      trace_file: Optional[str] = None):
+    """
+    Exports metrics to the files named in the arguments or the configuration.
+
+    Args:
+        registry: Metrics registry to export
+        prometheus_file: Path for Prometheus text output
+        trace_file: Path for span JSON lines output
+    """
+    if not registry.enabled:
+        return
+    config = get_metrics_config()
+    prometheus_file = prometheus_file or config["prometheus_file"]
+    trace_file = trace_file or config["trace_file"]
+    try:
+        if prometheus_file:
+            registry.export_prometheus(prometheus_file)
+        if trace_file:
+            registry.export_spans(trace_file)
+    except OSError as e:
+        logger.error(f"Error exporting metrics: {e}")
@@ -3,16 +3,26 @@ from setuptools import setup, find_packages
 setup(
     name="job_application_automator",
     version="0.1",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*"]),
     install_requires=[
         "mistralai==0.0.9",
         "python-dotenv>=1.0.0",
         "SQLAlchemy>=2.0.0",
+        "numpy>=1.24.0",
+        "httpx>=0.25.0",
         "pytest>=8.0.0",
         "Jinja2>=3.0.0",
         "schedule>=1.2.0",
         "pdflatex>=0.1.3",
     ],
+    extras_require={
+        # Async database layer (db/async_db.py); the default SQLite URL uses aiosqlite
+        "async": [
+            "SQLAlchemy[asyncio]>=2.0.0",
+            "greenlet>=3.0.0",
+            "aiosqlite>=0.19.0",
+        ],
+    },
     entry_points={
         "console_scripts": [
             "job-automator=job_application_automator.cli:main",